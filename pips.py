@@ -29,13 +29,14 @@ U{http://www.pserc.cornell.edu/matpower/} for more info.
 #------------------------------------------------------------------------------
 
 from numpy import \
-    array, flatnonzero, Inf, any, isnan, ones, r_, finfo, zeros, dot, \
-    absolute
+    flatnonzero, Inf, any, isnan, ones, r_, finfo, zeros, dot, \
+    absolute, minimum, maximum, sqrt, asarray, diff, repeat, arange, \
+    cumsum, unique, searchsorted, bincount, int32, int64
 
 from numpy.linalg import norm
 
-from scipy.sparse import csr_matrix, vstack, hstack, eye
-from scipy.sparse.linalg import spsolve
+from scipy.sparse import csr_matrix, csc_matrix, vstack, hstack, eye
+from scipy.sparse.linalg import splu
 
 #------------------------------------------------------------------------------
 #  Constants:
@@ -48,7 +49,7 @@ EPS = finfo(float).eps
 #------------------------------------------------------------------------------
 
 def pips(f_fcn, x0, A=None, l=None, u=None, xmin=None, xmax=None,
-         gh_fcn=None, hess_fcn=None, opt=None):
+         gh_fcn=None, hess_fcn=None, opt=None, lmbda0=None):
     """Primal-dual interior point method for NLP (non-linear programming).
     Minimize a function F(X) beginning from a starting point M{x0}, subject to
     optional linear and non-linear constraints and variable bounds::
@@ -168,7 +169,22 @@ def pips(f_fcn, x0, A=None, l=None, u=None, xmin=None, xmax=None,
                     same value must also be passed to the Hessian evaluation
                     function so that it can appropriately scale the objective
                     function term in the Hessian of the Lagrangian.
+                  - C{mehrotra} (False) - set to True to compute each step
+                    with Mehrotra's predictor-corrector method, reusing one
+                    factorization of the KKT matrix for all of the solves
+                  - C{max_gondzio} (0) - maximum number of Gondzio centrality
+                    corrections per iteration if C{mehrotra} is on
+                  - C{warm_gamma} (1e-4) - minimum barrier coefficient to
+                    which the complementarity products are re-centred when
+                    warm-starting
     @type opt: dict
+    @param lmbda0: Optional multipliers from a previous solution, as given by
+                   its C{lmbda} dictionary, with which to warm-start the
+                   method from C{x0}.  The slack variables are taken from the
+                   constraint values at C{x0}.  Multipliers for linear
+                   constraints appended since the previous solution are
+                   taken to be zero.
+    @type lmbda0: dict
 
     @rtype: dict
     @return: The solution dictionary has the following keys:
@@ -199,325 +215,167 @@ def pips(f_fcn, x0, A=None, l=None, u=None, xmin=None, xmax=None,
     nA = A.shape[0] if A is not None else 0 # number of original linear constr
 
     # default argument values
-#    l = array([]) if A is None else l
-#    u = array([]) if A is None else u
     l = -Inf * ones(nA) if l is None else l
     u =  Inf * ones(nA) if u is None else u
     xmin = -Inf * ones(x0.shape[0]) if xmin is None else xmin
     xmax =  Inf * ones(x0.shape[0]) if xmax is None else xmax
-    if gh_fcn is None:
-        nonlinear = False
-        gn = array([])
-        hn = array([])
-    else:
-        nonlinear = True
+    nonlinear = gh_fcn is not None
 
-    opt = {} if opt is None else opt
-    # options
-    if not opt.has_key("feastol"):
-        opt["feastol"] = 1e-06
-    if not opt.has_key("gradtol"):
-        opt["gradtol"] = 1e-06
-    if not opt.has_key("comptol"):
-        opt["comptol"] = 1e-06
-    if not opt.has_key("costtol"):
-        opt["costtol"] = 1e-06
-    if not opt.has_key("max_it"):
-        opt["max_it"] = 150
-    if not opt.has_key("max_red"):
-        opt["max_red"] = 20
-    if not opt.has_key("step_control"):
-        opt["step_control"] = False
-    if not opt.has_key("cost_mult"):
-        opt["cost_mult"] = 1
-    if not opt.has_key("verbose"):
-        opt["verbose"] = False
+    opt = _default_options({} if opt is None else opt)
 
-    # initialize history
-    hist = {}
+    # add var limits to linear constraints and split them up
+    ieq, igt, ilt, ibx, Ae, Ai, be, bi = \
+        _split_constraints(nx, A, l, u, xmin, xmax)
 
-    # constants
-    xi = 0.99995
-    sigma = 0.1
-    z0 = 1
-    alpha_min = 1e-8
-#    rho_min = 0.95
-#    rho_max = 1.05
-    mu_threshold = 1e-5
-
-    # initialize
-    i = 0                       # iteration counter
-    converged = False           # flag
-    eflag = False               # exit flag
-
-    # add var limits to linear constraints
-    eyex = eye(nx, nx, format="csr")
-    AA = eyex if A is None else vstack([eyex, A], "csr")
-    ll = r_[xmin, l]
-    uu = r_[xmax, u]
+    def evaluate(x):
+        # evaluate cost f(x) and constraints g(x), h(x)
+        f, df, _ = f_fcn(x)                 # cost
+        f = f * opt["cost_mult"]
+        df = df * opt["cost_mult"]
+        if nonlinear:
+            hn, gn, dhn, dgn = gh_fcn(x)        # non-linear constraints
+            h = hn if Ai is None else r_[hn, Ai * x - bi] # ieq constraints
+            g = gn if Ae is None else r_[gn, Ae * x - be] # eq constraints
 
-    # split up linear constraints
-    ieq = flatnonzero( absolute(uu - ll) <= EPS )
-    igt = flatnonzero( (uu >=  1e10) & (ll > -1e10) )
-    ilt = flatnonzero( (ll <= -1e10) & (uu <  1e10) )
-    ibx = flatnonzero( (absolute(uu - ll) > EPS) & (uu < 1e10) & (ll > -1e10) )
-    # zero-sized sparse matrices unsupported
-    Ae = AA[ieq, :] if len(ieq) else None
-    if len(ilt) or len(igt) or len(ibx):
-        idxs = [(1, ilt), (-1, igt), (1, ibx), (-1, ibx)]
-        Ai = vstack([sig * AA[idx, :] for sig, idx in idxs if len(idx)])
-    else:
-        Ai = None
-    be = uu[ieq, :]
-    bi = r_[uu[ilt], -ll[igt], uu[ibx], -ll[ibx]]
+            if (dhn is None) and (Ai is None):
+                dh = None
+            elif dhn is None:
+                dh = Ai.T
+            elif Ae is None:
+                dh = dhn
+            else:
+                dh = hstack([dhn, Ai.T])
 
-    # evaluate cost f(x0) and constraints g(x0), h(x0)
-    x = x0
-    f, df, _ = f_fcn(x)                 # cost
-    f = f * opt["cost_mult"]
-    df = df * opt["cost_mult"]
-    if nonlinear:
-        hn, gn, dhn, dgn = gh_fcn(x)        # non-linear constraints
-        h = hn if Ai is None else r_[hn, Ai * x - bi] # inequality constraints
-        g = gn if Ae is None else r_[gn, Ae * x - be] # equality constraints
-
-        if (dhn is None) and (Ai is None):
-            dh = None
-        elif dhn is None:
-            dh = Ai.T
-        elif Ae is None:
-            dh = dhn
-        else:
-            dh = hstack([dhn, Ai.T])
-
-        if (dgn is None) and (Ae is None):
-            dg = None
-        elif dgn is None:
-            dg = Ae.T
-        elif Ae is None:
-            dg = dgn
+            if (dgn is None) and (Ae is None):
+                dg = None
+            elif dgn is None:
+                dg = Ae.T
+            elif Ae is None:
+                dg = dgn
+            else:
+                dg = hstack([dgn, Ae.T])
         else:
-            dg = hstack([dgn, Ae.T])
-    else:
-        h = -bi if Ai is None else Ai * x - bi        # inequality constraints
-        g = -be if Ae is None else Ae * x - be        # equality constraints
-        dh = None if Ai is None else Ai.T     # 1st derivative of inequalities
-        dg = None if Ae is None else Ae.T     # 1st derivative of equalities
+            h = -bi if Ai is None else Ai * x - bi    # inequality constraints
+            g = -be if Ae is None else Ae * x - be    # equality constraints
+            dh = None if Ai is None else Ai.T # 1st derivative of inequalities
+            dg = None if Ae is None else Ae.T # 1st derivative of equalities
+        return f, df, g, h, dg, dh
+
+    ev0 = evaluate(x0)
+    _, _, g, h, _, _ = ev0
 
     # some dimensions
     neq = g.shape[0]           # number of equality constraints
-    niq = h.shape[0]           # number of inequality constraints
-    neqnln = gn.shape[0]       # number of non-linear equality constraints
-    niqnln = hn.shape[0]       # number of non-linear inequality constraints
-    nlt = len(ilt)             # number of upper bounded linear inequalities
-    ngt = len(igt)             # number of lower bounded linear inequalities
-    nbx = len(ibx)             # number of doubly bounded linear inequalities
+    neqnln = neq - be.shape[0] # number of non-linear equality constraints
+    niqnln = h.shape[0] - bi.shape[0] # number of non-linear inequalities
 
-    # initialize gamma, lam, mu, z, e
-    gamma = 1                  # barrier coefficient
-    lam = zeros(neq)
-    z = z0 * ones(niq)
-    mu = z0 * ones(niq)
-    k = flatnonzero(h < -z0)
-    z[k] = -h[k]
-    k = flatnonzero((gamma / z) > z0)
-    mu[k] = gamma / z[k]
-    e = ones(niq)
-
-    # check tolerance
-    f0 = f
-#    if opt["step_control"]:
-#        L = f + lam.T * g + mu.T * (h + z) - gamma * sum(log(z))
-
-    Lx = df
-    Lx = Lx + dg * lam if dg is not None else Lx
-    Lx = Lx + dh * mu  if dh is not None else Lx
-
-    gnorm = norm(g, Inf) if len(g) else 0.0
-    lam_norm = norm(lam, Inf) if len(lam) else 0.0
-    mu_norm = norm(mu, Inf) if len(mu) else 0.0
-    feascond = \
-        max([gnorm, max(h)]) / (1 + max([norm(x, Inf), norm(z, Inf)]))
-    gradcond = \
-        norm(Lx, Inf) / (1 + max([lam_norm, mu_norm]))
-    compcond = dot(z, mu) / (1 + norm(x, Inf))
-    costcond = absolute(f - f0) / (1 + absolute(f0))
-
-    # save history
-    hist[i] = {'feascond': feascond, 'gradcond': gradcond,
-        'compcond': compcond, 'costcond': costcond, 'gamma': gamma,
-        'stepsize': 0, 'obj': f / opt["cost_mult"], 'alphap': 0, 'alphad': 0}
-
-    if opt["verbose"]:
-#        s = '-sc' if opt["step_control"] else ''
-#        version, date = '1.0b2', '24-Mar-2010'
-#        print 'Python Interior Point Solver - PIPS%s, Version %s, %s' % \
-#                    (s, version, date)
-        print " it    objective   step size   feascond     gradcond     " \
-              "compcond     costcond  "
-        print "----  ------------ --------- ------------ ------------ " \
-              "------------ ------------"
-        print "%3d  %12.8g %10s %12g %12g %12g %12g" % \
-            (i, (f / opt["cost_mult"]), "",
-             feascond, gradcond, compcond, costcond)
-
-    if feascond < opt["feastol"] and gradcond < opt["gradtol"] and \
-        compcond < opt["comptol"] and costcond < opt["costtol"]:
-        converged = True
-        if opt["verbose"]:
-            print "Converged!"
-
-    # do Newton iterations
-    while (not converged and i < opt["max_it"]):
-        # update iteration counter
-        i += 1
-
-        # compute update step
-        lmbda = {"eqnonlin": lam[range(neqnln)],
-                 "ineqnonlin": mu[range(niqnln)]}
+    def kkt_matrix(x, lam, z, mu, dg, dh):
+        # reduced KKT matrix with the Hessian of the Lagrangian at x
         if nonlinear:
             if hess_fcn is None:
                 print "pips: Hessian evaluation via finite differences " \
                       "not yet implemented.\nPlease provide " \
                       "your own hessian evaluation function."
+            lmbda = {"eqnonlin": lam[:neqnln], "ineqnonlin": mu[:niqnln]}
             Lxx = hess_fcn(x, lmbda)
         else:
             _, _, d2f = f_fcn(x)      # cost
             Lxx = d2f * opt["cost_mult"]
         rz = range(len(z))
-        zinvdiag = csr_matrix((1.0 / z, (rz, rz))) if len(z) else None
-        rmu = range(len(mu))
-        mudiag = csr_matrix((mu, (rmu, rmu))) if len(mu) else None
-        dh_zinv = None if dh is None else dh * zinvdiag
-        M = Lxx if dh is None else Lxx + dh_zinv * mudiag * dh.T
-        N = Lx if dh is None else Lx + dh_zinv * (mudiag * h + gamma * e)
-
-        Ab = M if dg is None else vstack([
+        M = Lxx if dh is None else \
+            Lxx + dh * csr_matrix((mu / z, (rz, rz))) * dh.T
+        return M if dg is None else vstack([
             hstack([M, dg]),
             hstack([dg.T, csr_matrix((neq, neq))])
         ])
-        bb = r_[-N, -g]
-
-        dxdlam = spsolve(Ab.tocsr(), bb)
-
-        dx = dxdlam[:nx]
-        dlam = dxdlam[nx:nx + neq]
-        dz = -h - z if dh is None else -h - z - dh.T * dx
-        dmu = -mu if dh is None else -mu + zinvdiag * (gamma * e - mudiag * dz)
 
-        # optional step-size control
-#        sc = False
-        if opt["step_control"]:
-            raise NotImplementedError
-#            x1 = x + dx
-#
-#            # evaluate cost, constraints, derivatives at x1
-#            f1, df1 = ipm_f(x1)          # cost
-#            f1 = f1 * opt["cost_mult"]
-#            df1 = df1 * opt["cost_mult"]
-#            gn1, hn1, dgn1, dhn1 = ipm_gh(x1) # non-linear constraints
-#            g1 = gn1 if Ai is None else r_[gn1, Ai * x1 - bi] # ieq constraints
-#            h1 = hn1 if Ae is None else r_[hn1, Ae * x1 - be] # eq constraints
-#            dg1 = dgn1 if Ai is None else r_[dgn1, Ai.T]      # 1st der of ieq
-#            dh1 = dhn1 if Ae is None else r_[dhn1, Ae.T]      # 1st der of eqs
-#
-#            # check tolerance
-#            Lx1 = df1 + dh1 * lam + dg1 * mu
-#            feascond1 = max([ norm(h1, Inf), max(g1) ]) / \
-#                (1 + max([ norm(x1, Inf), norm(z, Inf) ]))
-#            gradcond1 = norm(Lx1, Inf) / \
-#                (1 + max([ norm(lam, Inf), norm(mu, Inf) ]))
-#
-#            if feascond1 > feascond and gradcond1 > gradcond:
-#                sc = True
-#        if sc:
-#            alpha = 1.0
-#            for j in range(opt["max_red"]):
-#                dx1 = alpha * dx
-#                x1 = x + dx1
-#                f1 = ipm_f(x1)             # cost
-#                f1 = f1 * opt["cost_mult"]
-#                gn1, hn1 = ipm_gh(x1)              # non-linear constraints
-#                g1 = r_[gn1, Ai * x1 - bi]         # inequality constraints
-#                h1 = r_[hn1, Ae * x1 - be]         # equality constraints
-#                L1 = f1 + lam.H * h1 + mu.H * (g1 + z) - gamma * sum(log(z))
-#                if opt["verbose"]:
-#                    logger.info("\n   %3d            %10.f" % (-j, norm(dx1)))
-#                rho = (L1 - L) / (Lx.H * dx1 + 0.5 * dx1.H * Lxx * dx1)
-#                if rho > rho_min and rho < rho_max:
-#                    break
-#                else:
-#                    alpha = alpha / 2.0
-#            dx = alpha * dx
-#            dz = alpha * dz
-#            dlam = alpha * dlam
-#            dmu = alpha * dmu
+    return _ipm(x0, ev0, evaluate, kkt_matrix, opt, lmbda0, nA,
+                ieq, igt, ilt, ibx, neqnln, niqnln)
 
-        # do the update
-        k = flatnonzero(dz < 0.0)
-        alphap = min([xi * min(z[k] / -dz[k]), 1]) if len(k) else 1.0
-        k = flatnonzero(dmu < 0.0)
-        alphad = min([xi * min(mu[k] / -dmu[k]), 1]) if len(k) else 1.0
-        x = x + alphap * dx
-        z = z + alphap * dz
-        lam = lam + alphad * dlam
-        mu = mu + alphad * dmu
-        if niq > 0:
-            gamma = sigma * dot(z, mu) / niq
+#------------------------------------------------------------------------------
+#  Newton iterations:
+#------------------------------------------------------------------------------
 
-        # evaluate cost, constraints, derivatives
-        f, df, _ = f_fcn(x)             # cost
-        f = f * opt["cost_mult"]
-        df = df * opt["cost_mult"]
-        if nonlinear:
-            hn, gn, dhn, dgn = gh_fcn(x)                   # nln constraints
-#            g = gn if Ai is None else r_[gn, Ai * x - bi] # ieq constraints
-#            h = hn if Ae is None else r_[hn, Ae * x - be] # eq constraints
-            h = hn if Ai is None else r_[hn, Ai * x - bi] # ieq constr
-            g = gn if Ae is None else r_[gn, Ae * x - be]  # eq constr
+def _ipm(x, ev, evaluate, kkt_matrix, opt, lmbda0, nA, ieq, igt, ilt, ibx,
+         neqnln=0, niqnln=0):
+    """Performs the Newton iterations of the primal-dual interior point method
+    from M{x} and returns the solution dictionary described for L{pips}.
+
+    The problem is given by C{evaluate(x)}, which returns the scaled cost,
+    its gradient, the equality and inequality constraints and their
+    Jacobians, C{(f, df, g, h, dg, dh)}, and C{ev} is its value at M{x}.
+    C{kkt_matrix(x, lam, z, mu, dg, dh)} returns the reduced KKT matrix of
+    the Newton system for the current iterate.  The first C{neqnln} equality
+    and C{niqnln} inequality constraints are non-linear and the remainder
+    are the linear constraints and variable bounds split by
+    L{_split_constraints}.
+    """
+    # constants
+    xi = 0.99995
+    sigma = 0.1
+    z0 = 1
+    alpha_min = 1e-8
+#    rho_min = 0.95
+#    rho_max = 1.05
+    mu_threshold = 1e-5
 
-            if (dhn is None) and (Ai is None):
-                dh = None
-            elif dhn is None:
-                dh = Ai.T
-            elif Ae is None:
-                dh = dhn
-            else:
-                dh = hstack([dhn, Ai.T])
+    f, df, g, h, dg, dh = ev
+    nx = len(x)
+    neq = g.shape[0]           # number of equality constraints
+    niq = h.shape[0]           # number of inequality constraints
 
-            if (dgn is None) and (Ae is None):
-                dg = None
-            elif dgn is None:
-                dg = Ae.T
-            elif Ae is None:
-                dg = dgn
-            else:
-                dg = hstack([dgn, Ae.T])
-        else:
-            h = -bi if Ai is None else Ai * x - bi    # inequality constraints
-            g = -be if Ae is None else Ae * x - be    # equality constraints
-            # 1st derivatives are constant, still dh = Ai.T, dg = Ae.T
+    # initialize gamma, lam, mu, z, e
+    e = ones(niq)
+    if lmbda0 is None:
+        gamma = 1              # barrier coefficient
+        lam = zeros(neq)
+        z = z0 * ones(niq)
+        mu = z0 * ones(niq)
+        k = flatnonzero(h < -z0)
+        z[k] = -h[k]
+        k = flatnonzero((gamma / z) > z0)
+        mu[k] = gamma / z[k]
+    else:
+        lam, z, mu = _warm_start(lmbda0, h, nx, nA, ieq, igt, ilt, ibx,
+            opt["cost_mult"], opt["warm_gamma"], neqnln, niqnln)
+        gamma = sigma * dot(z, mu) / niq if niq > 0 else 1
 
+    # do Newton iterations
+    i = 0                       # iteration counter
+    converged = False           # flag
+    eflag = False               # exit flag
+    hist = {}
+    f0 = f
+    alphap = alphad = 0
+    dx = zeros(nx)
+    while True:
         Lx = df
         Lx = Lx + dg * lam if dg is not None else Lx
         Lx = Lx + dh * mu  if dh is not None else Lx
 
+        # check tolerance
         gnorm = norm(g, Inf) if len(g) else 0.0
+        hmax = max(h) if len(h) else 0.0
         lam_norm = norm(lam, Inf) if len(lam) else 0.0
         mu_norm = norm(mu, Inf) if len(mu) else 0.0
-        feascond = \
-            max([gnorm, max(h)]) / (1+max([norm(x, Inf), norm(z, Inf)]))
-        gradcond = \
-            norm(Lx, Inf) / (1 + max([lam_norm, mu_norm]))
+        z_norm = norm(z, Inf) if len(z) else 0.0
+        feascond = max([gnorm, hmax]) / (1 + max([norm(x, Inf), z_norm]))
+        gradcond = norm(Lx, Inf) / (1 + max([lam_norm, mu_norm]))
         compcond = dot(z, mu) / (1 + norm(x, Inf))
         costcond = float(absolute(f - f0) / (1 + absolute(f0)))
 
+        # save history
         hist[i] = {'feascond': feascond, 'gradcond': gradcond,
             'compcond': compcond, 'costcond': costcond, 'gamma': gamma,
             'stepsize': norm(dx), 'obj': f / opt["cost_mult"],
             'alphap': alphap, 'alphad': alphad}
 
         if opt["verbose"]:
+            if i == 0:
+                print " it    objective   step size   feascond     " \
+                      "gradcond     compcond     costcond  "
+                print "----  ------------ --------- ------------ " \
+                      "------------ ------------ ------------"
             print "%3d  %12.8g %10.5g %12g %12g %12g %12g" % \
                 (i, (f / opt["cost_mult"]), norm(dx), feascond, gradcond,
                  compcond, costcond)
@@ -527,21 +385,55 @@ def pips(f_fcn, x0, A=None, l=None, u=None, xmin=None, xmax=None,
             converged = True
             if opt["verbose"]:
                 print "Converged!"
+            break
+        elif i > 0 and (any(isnan(x)) or (alphap < alpha_min) or
+                (alphad < alpha_min) or (gamma < EPS) or (gamma > 1.0 / EPS)):
+            if opt["verbose"]:
+                print "Numerically failed."
+            eflag = -1
+            break
+        elif i >= opt["max_it"]:
+            if opt["verbose"]:
+                print "Did not converge in %d iterations." % i
+            break
+        f0 = f
+
+        # update iteration counter
+        i += 1
+
+        # optional step-size control
+        if opt["step_control"]:
+            raise NotImplementedError
+
+        # compute update step
+        Ab = kkt_matrix(x, lam, z, mu, dg, dh)
+
+        if opt["mehrotra"] and niq > 0:
+            dx, dlam, dz, dmu = _predictor_corrector(Ab, Lx, g, h, z, mu, dh,
+                nx, neq, opt["max_gondzio"])
         else:
-            if any(isnan(x)) or (alphap < alpha_min) or \
-                (alphad < alpha_min) or (gamma < EPS) or (gamma > 1.0 / EPS):
-                if opt["verbose"]:
-                    print "Numerically failed."
-                eflag = -1
-                break
-            f0 = f
+            N = Lx if dh is None else Lx + dh * ((mu * h + gamma * e) / z)
+            dxdlam = splu(Ab.tocsc()).solve(r_[-N, -g])
 
-#            if opt["step_control"]:
-#                L = f + dot(lam, g) + dot(mu * (h + z)) - gamma * sum(log(z))
+            dx = dxdlam[:nx]
+            dlam = dxdlam[nx:nx + neq]
+            dz = -h - z if dh is None else -h - z - dh.T * dx
+            dmu = -mu if dh is None else -mu + (gamma * e - mu * dz) / z
 
-    if opt["verbose"]:
-        if not converged:
-            print "Did not converge in %d iterations." % i
+        # do the update
+        k = flatnonzero(dz < 0.0)
+        alphap = min([xi * min(z[k] / -dz[k]), 1]) if len(k) else 1.0
+        k = flatnonzero(dmu < 0.0)
+        alphad = min([xi * min(mu[k] / -dmu[k]), 1]) if len(k) else 1.0
+        x = x + alphap * dx
+        z = z + alphap * dz
+        lam = lam + alphad * dlam
+        mu = mu + alphad * dmu
+        if niq > 0:
+            gamma = sigma * dot(z, mu) / niq
+
+        # evaluate cost, constraints, derivatives
+        f, df, g, h, dg, dh = evaluate(x)
 
     # package results
     if eflag != -1:
@@ -551,10 +443,8 @@ def pips(f_fcn, x0, A=None, l=None, u=None, xmin=None, xmax=None,
         message = 'Did not converge'
     elif eflag == 1:
         message = 'Converged'
-    elif eflag == -1:
-        message = 'Numerically failed'
     else:
-        raise
+        message = 'Numerically failed'
 
     output = {"iterations": i, "history": hist, "message": message}
 
@@ -567,43 +457,105 @@ def pips(f_fcn, x0, A=None, l=None, u=None, xmin=None, xmax=None,
     mu = mu / opt["cost_mult"]
 
     # re-package multipliers into struct
-    lam_lin = lam[neqnln:neq]           # lambda for linear constraints
-    mu_lin = mu[niqnln:niq]             # mu for linear constraints
-    kl = flatnonzero(lam_lin < 0.0)     # lower bound binding
-    ku = flatnonzero(lam_lin > 0.0)     # upper bound binding
-
-    mu_l = zeros(nx + nA)
-    mu_l[ieq[kl]] = -lam_lin[kl]
-    mu_l[igt] = mu_lin[nlt:nlt + ngt]
-    mu_l[ibx] = mu_lin[nlt + ngt + nbx:nlt + ngt + nbx + nbx]
-
-    mu_u = zeros(nx + nA)
-    mu_u[ieq[ku]] = lam_lin[ku]
-    mu_u[ilt] = mu_lin[:nlt]
-    mu_u[ibx] = mu_lin[nlt + ngt:nlt + ngt + nbx]
-
-    lmbda = {'mu_l': mu_l[nx:], 'mu_u': mu_u[nx:],
-             'lower': mu_l[:nx], 'upper': mu_u[:nx]}
+    lmbda = _linear_multipliers(lam[neqnln:neq], mu[niqnln:niq], nx, nA,
+                                ieq, igt, ilt, ibx)
 
     if niqnln > 0:
         lmbda['ineqnonlin'] = mu[:niqnln]
     if neqnln > 0:
         lmbda['eqnonlin'] = lam[:neqnln]
 
-#    lmbda = {"eqnonlin": lam[:neqnln], 'ineqnonlin': mu[:niqnln],
-#             "mu_l": mu_l[nx:], "mu_u": mu_u[nx:],
-#             "lower": mu_l[:nx], "upper": mu_u[:nx]}
-
     solution =  {"x": x, "f": f, "converged": converged,
                  "lmbda": lmbda, "output": output}
 
     return solution
 
+#------------------------------------------------------------------------------
+#  Predictor-corrector step:
+#------------------------------------------------------------------------------
+
+def _predictor_corrector(Ab, Lx, g, h, z, mu, dh, nx, neq, max_gondzio=0):
+    """Returns the Newton direction (dx, dlam, dz, dmu) computed using
+    Mehrotra's predictor-corrector method with up to C{max_gondzio} multiple
+    centrality corrections.
+
+    The reduced KKT matrix C{Ab} depends only upon the current iterate, so it
+    is factorized once and the factors are used for the affine-scaling
+    (predictor) step, the combined centering-corrector step and each of the
+    Gondzio corrections.
+
+    See also:
+      - S. Mehrotra, "On the Implementation of a Primal-Dual Interior Point
+        Method", SIAM Journal on Optimization, Vol. 2, No. 4, 1992,
+        pp. 575-601.
+      - J. Gondzio, "Multiple centrality corrections in a primal-dual method
+        for linear programming", Computational Optimization and Applications,
+        Vol. 6, No. 2, 1996, pp. 137-156.
+    """
+    niq = len(z)
+    solve = splu(Ab.tocsc()).solve
+    zinv = 1.0 / z
+
+    def direction(rd, rg, rp, rc):
+        # Solve the Newton system for dual residual rd, equality residual rg,
+        # inequality residual rp (h + z) and complementarity target rc
+        # (mu*dz + z*dmu = rc).
+        N = rd + dh * (zinv * (rc + mu * rp))
+        dxdlam = solve(r_[-N, -rg])
+        dx = dxdlam[:nx]
+        dz = -rp - dh.T * dx
+        dmu = zinv * (rc - mu * dz)
+        return dx, dxdlam[nx:nx + neq], dz, dmu
+
+    # predictor (affine-scaling) step
+    rp = h + z
+    dx, dlam, dz, dmu = direction(Lx, g, rp, -z * mu)
+    alphap = _max_step(z, dz)
+    alphad = _max_step(mu, dmu)
+    mu_cur = dot(z, mu) / niq
+    mu_aff = dot(z + alphap * dz, mu + alphad * dmu) / niq
+    target = mu_cur * (mu_aff / mu_cur)**3
+
+    # corrector step, with second order term from the predictor
+    rc = target - z * mu - dz * dmu
+    step = direction(Lx, g, rp, rc)
+
+    # Gondzio's multiple centrality corrections
+    zeros_x, zeros_g, zeros_h = zeros(nx), zeros(neq), zeros(niq)
+    for _ in range(max_gondzio):
+        dx, dlam, dz, dmu = step
+        alpha = min(_max_step(z, dz), _max_step(mu, dmu))
+        if alpha >= 1.0:
+            break
+        alpha_t = min(1.0, alpha + 0.1)
+        v = (z + alpha_t * dz) * (mu + alpha_t * dmu)
+        # project the trial complementarity products onto the box
+        # [0.1 * target, 10 * target] around the central path
+        t = maximum(0.1 * target - v, 0.0) + minimum(10.0 * target - v, 0.0)
+        t = maximum(t, -10.0 * target)
+        corr = direction(zeros_x, zeros_g, zeros_h, t)
+        trial = tuple([s + c for s, c in zip(step, corr)])
+        alpha_n = min(_max_step(z, trial[2]), _max_step(mu, trial[3]))
+        if alpha_n < alpha + 0.01:
+            break
+        step = trial
+
+    return step
+
+
+def _max_step(v, dv):
+    """Returns the largest step length, no greater than one, that keeps
+    M{v + alpha * dv} non-negative.
+    """
+    k = flatnonzero(dv < 0.0)
+    return min([min(v[k] / -dv[k]), 1.0]) if len(k) else 1.0
+
 #------------------------------------------------------------------------------
 #  "qps_pips" function:
 #------------------------------------------------------------------------------
 
-def qps_pips(H, c, A, l, u, xmin=None, xmax=None, x0=None, opt=None):
+def qps_pips(H, c, A, l, u, xmin=None, xmax=None, x0=None, opt=None,
+             lmbda0=None):
     """Uses the Python Interior Point Solver (PIPS) to solve the following
     QP (quadratic programming) problem::
 
@@ -687,7 +639,22 @@ def qps_pips(H, c, A, l, u, xmin=None, xmax=None, x0=None, opt=None):
                     same value must also be passed to the Hessian evaluation
                     function so that it can appropriately scale the objective
                     function term in the Hessian of the Lagrangian.
+                  - C{mehrotra} (False) - set to True to compute each step
+                    with Mehrotra's predictor-corrector method, reusing one
+                    factorization of the KKT matrix for all of the solves
+                  - C{max_gondzio} (0) - maximum number of Gondzio centrality
+                    corrections per iteration if C{mehrotra} is on
+                  - C{warm_gamma} (1e-4) - minimum barrier coefficient to
+                    which the complementarity products are re-centred when
+                    warm-starting
     @type opt: dict
+    @param lmbda0: Optional multipliers from a previous solution, as given by
+                   its C{lmbda} dictionary, with which to warm-start the
+                   method from C{x0}.  The slack variables are taken from the
+                   constraint values at C{x0}.  Multipliers for linear
+                   constraints appended since the previous solution are
+                   taken to be zero.
+    @type lmbda0: dict
 
     @rtype: dict
     @return: The solution dictionary has the following keys:
@@ -771,7 +738,354 @@ def qps_pips(H, c, A, l, u, xmin=None, xmax=None, x0=None, opt=None):
 #    l = -Inf * ones(b.shape[0])
 #    l[:N] = b[:N]
 
-    return pips(qp_f, x0, A, l, u, xmin, xmax, opt=opt)
+    return pips(qp_f, x0, A, l, u, xmin, xmax, opt=opt, lmbda0=lmbda0)
+
+#------------------------------------------------------------------------------
+#  "qpips" function:
+#------------------------------------------------------------------------------
+
+def qpips(H, c, A, l, u, xmin=None, xmax=None, x0=None, opt=None,
+          lmbda0=None):
+    """Primal-dual interior point method for QP (quadratic programming) and
+    LP (linear programming) problems of the same form as L{qps_pips}::
+
+            min 1/2 x'*H*x + C'*x
+             x
+
+    subject to::
+
+            l <= A*x <= u       (linear constraints)
+            xmin <= x <= xmax   (variable bounds)
+
+    Where L{qps_pips} wraps the general NLP solver, L{pips}, in callbacks
+    that evaluate the objective function, this solver makes use of C{H}, C{c}
+    and C{A} being constant.  The constraint Jacobians and the sparsity
+    structure of the KKT matrix are computed once, so each iteration need
+    only refill the numerical values of the barrier term and factorize the
+    matrix.  The sequence of iterates is otherwise that of L{qps_pips}.
+
+    See also L{pips}.
+
+    Example from U{http://www.uc.edu/sashtml/iml/chap8/sect12.htm}:
+
+        >>> from numpy import array, zeros, Inf
+        >>> from scipy.sparse import csr_matrix
+        >>> H = csr_matrix(array([[1003.1,  4.3,     6.3,     5.9],
+        ...                       [4.3,     2.2,     2.1,     3.9],
+        ...                       [6.3,     2.1,     3.5,     4.8],
+        ...                       [5.9,     3.9,     4.8,     10 ]]))
+        >>> c = zeros(4)
+        >>> A = csr_matrix(array([[1,       1,       1,       1   ],
+        ...                       [0.17,    0.11,    0.10,    0.18]]))
+        >>> l = array([1, 0.10])
+        >>> u = array([1, Inf])
+        >>> xmin = zeros(4)
+        >>> xmax = None
+        >>> x0 = array([1, 0, 0, 1])
+        >>> solution = qpips(H, c, A, l, u, xmin, xmax, x0)
+        >>> round(solution["f"], 11) == 1.09666678128
+        True
+        >>> solution["converged"]
+        True
+        >>> solution["output"]["iterations"]
+        10
+        >>> l = array([1, 0.11])
+        >>> warm = qpips(H, c, A, l, u, xmin, xmax, solution["x"],
+        ...              lmbda0=solution["lmbda"])
+        >>> warm["converged"]
+        True
+        >>> warm["output"]["iterations"] < solution["output"]["iterations"]
+        True
+
+    All parameters are optional except C{H}, C{C}, C{A} and C{L}.
+    @param H: Quadratic cost coefficients.
+    @type H: csr_matrix
+    @param c: vector of linear cost coefficients
+    @type c: array
+    @param A: Optional linear constraints.
+    @type A: csr_matrix
+    @param l: Optional linear constraints. Default values are M{-Inf}.
+    @type l: array
+    @param u: Optional linear constraints. Default values are M{Inf}.
+    @type u: array
+    @param xmin: Optional lower bounds on the M{x} variables, defaults are
+                 M{-Inf}.
+    @type xmin: array
+    @param xmax: Optional upper bounds on the M{x} variables, defaults are
+                 M{Inf}.
+    @type xmax: array
+    @param x0: Starting value of optimization vector M{x}.
+    @type x0: array
+    @param opt: optional options dictionary with the keys described for
+                L{qps_pips}
+    @type opt: dict
+    @param lmbda0: Optional multipliers from a previous solution with which
+                   to warm-start the method, as for L{qps_pips}.
+    @type lmbda0: dict
+
+    @rtype: dict
+    @return: The solution dictionary described for L{qps_pips}.
+
+    @license: Apache License version 2.0
+    """
+    if H is None or H.nnz == 0:
+        if A is not None:
+            nx = A.shape[1]
+        elif xmin is not None and len(xmin) > 0:
+            nx = xmin.shape[0]
+        elif xmax is not None and len(xmax) > 0:
+            nx = xmax.shape[0]
+        else:
+            raise ValueError, "LP problem must include constraints or " \
+                "variable bounds"
+        H = csr_matrix((nx, nx))
+    else:
+        nx = H.shape[0]
+    nA = A.shape[0] if A is not None else 0
+
+    # default argument values
+    l = -Inf * ones(nA) if l is None else l
+    u =  Inf * ones(nA) if u is None else u
+    xmin = -Inf * ones(nx) if xmin is None else xmin
+    xmax =  Inf * ones(nx) if xmax is None else xmax
+    c = zeros(nx) if c is None else c
+    x0 = zeros(nx) if x0 is None else x0
+
+    opt = _default_options({} if opt is None else opt)
+
+    # scaled cost coefficients
+    HH = csr_matrix(H) * opt["cost_mult"]
+    cc = c * opt["cost_mult"]
+
+    # add var limits to linear constraints and split them up
+    ieq, igt, ilt, ibx, Ae, Ai, be, bi = \
+        _split_constraints(nx, A, l, u, xmin, xmax)
+
+    # constant 1st derivatives and structure of the KKT matrix
+    dg = None if Ae is None else Ae.T.tocsr()
+    dh = None if Ai is None else Ai.T.tocsr()
+    kkt = _KKTMatrix(HH, Ae, Ai)
+
+    def evaluate(x):
+        # evaluate cost f(x) and constraints g(x), h(x)
+        f = 0.5 * dot(x, HH * x) + dot(cc, x)
+        df = HH * x + cc
+        h = -bi if Ai is None else Ai * x - bi
+        g = -be if Ae is None else Ae * x - be
+        return f, df, g, h, dg, dh
+
+    def kkt_matrix(x, lam, z, mu, dg, dh):
+        # only the barrier term of the KKT matrix changes between iterations
+        return kkt.matrix(mu / z)
+
+    return _ipm(x0, evaluate(x0), evaluate, kkt_matrix, opt, lmbda0, nA,
+                ieq, igt, ilt, ibx)
+
+#------------------------------------------------------------------------------
+#  "_KKTMatrix" class:
+#------------------------------------------------------------------------------
+
+class _KKTMatrix(object):
+    """Reduced KKT matrix of a QP with constant Hessian and constraints::
+
+            [ H + Ai'*diag(d)*Ai   Ae' ]
+            [ Ae                   0   ]
+
+    The sparsity structure is determined upon initialisation, along with the
+    position in the compressed column data of each term of M{Ai'*diag(d)*Ai},
+    so that the matrix for a given scaling vector M{d} is obtained by
+    refilling the numerical values only.
+    """
+
+    def __init__(self, H, Ae, Ai):
+        """Initialises a new _KKTMatrix instance.
+        """
+        nx = H.shape[0]
+        neq = 0 if Ae is None else Ae.shape[0]
+        n = nx + neq
+
+        # Constant terms.
+        Hc = H.tocoo()
+        rows, cols, vals = [Hc.row], [Hc.col], [Hc.data]
+        if Ae is not None:
+            Aec = Ae.tocoo()
+            rows.extend([Aec.col, nx + Aec.row])
+            cols.extend([nx + Aec.row, Aec.col])
+            vals.extend([Aec.data, Aec.data])
+        nconst = sum([len(v) for v in vals])
+
+        # A term, Ai[r, j] * d[r] * Ai[r, k], for each pair of non-zeros
+        # in each row of Ai.
+        if Ai is not None:
+            Ai = csr_matrix(Ai)
+            nnz_row = diff(Ai.indptr)
+            row = repeat(arange(Ai.shape[0]), nnz_row)
+            npair = nnz_row[row]
+            p = repeat(arange(Ai.nnz), npair)
+            q = Ai.indptr[row[p]] + arange(len(p)) - \
+                repeat(cumsum(npair) - npair, npair)
+            rows.append(Ai.indices[p])
+            cols.append(Ai.indices[q])
+            #: Product of the pair of Ai values for each barrier term.
+            self._w = Ai.data[p] * Ai.data[q]
+            #: Row of Ai and index of the scaling vector for each term.
+            self._r = row[p]
+        else:
+            self._w = zeros(0)
+            self._r = zeros(0, int)
+
+        # Compressed column structure.
+        keys, pos = unique(r_[tuple(cols)].astype(int64) * n +
+                           r_[tuple(rows)], return_inverse=True)
+        #: Row indices of the compressed column storage.
+        self._indices = (keys % n).astype(int32)
+        #: Column pointers of the compressed column storage.
+        self._indptr = searchsorted(keys // n, arange(n + 1)).astype(int32)
+        #: Constant values in compressed column order.
+        self._const = bincount(pos[:nconst], r_[tuple(vals)], len(keys))
+        #: Position in the compressed column data of each barrier term.
+        self._pos = pos[nconst:]
+        #: Dimensions of the matrix.
+        self.shape = (n, n)
+
+
+    def matrix(self, d):
+        """Returns the KKT matrix in compressed column format for the given
+        barrier term scaling vector, typically M{mu/z}.
+        """
+        data = self._const + \
+            bincount(self._pos, self._w * d[self._r], len(self._const))
+        return csc_matrix((data, self._indices, self._indptr), self.shape)
+
+#------------------------------------------------------------------------------
+#  Utility functions:
+#------------------------------------------------------------------------------
+
+def _default_options(opt):
+    """Sets default values for any options not in the given dictionary.
+    """
+    if not opt.has_key("feastol"):
+        opt["feastol"] = 1e-06
+    if not opt.has_key("gradtol"):
+        opt["gradtol"] = 1e-06
+    if not opt.has_key("comptol"):
+        opt["comptol"] = 1e-06
+    if not opt.has_key("costtol"):
+        opt["costtol"] = 1e-06
+    if not opt.has_key("max_it"):
+        opt["max_it"] = 150
+    if not opt.has_key("max_red"):
+        opt["max_red"] = 20
+    if not opt.has_key("step_control"):
+        opt["step_control"] = False
+    if not opt.has_key("cost_mult"):
+        opt["cost_mult"] = 1
+    if not opt.has_key("verbose"):
+        opt["verbose"] = False
+    if not opt.has_key("mehrotra"):
+        opt["mehrotra"] = False
+    if not opt.has_key("max_gondzio"):
+        opt["max_gondzio"] = 0
+    if not opt.has_key("warm_gamma"):
+        opt["warm_gamma"] = 1e-04
+    return opt
+
+
+def _split_constraints(nx, A, l, u, xmin, xmax):
+    """Adds the variable limits to the linear constraints and splits them
+    into equality constraints, M{Ae*x = be}, and inequality constraints,
+    M{Ai*x <= bi}.  Returns the indexes of the equality, lower bounded,
+    upper bounded and doubly bounded rows of M{[I; A]} along with C{Ae},
+    C{Ai}, C{be} and C{bi}.
+    """
+    # add var limits to linear constraints
+    eyex = eye(nx, nx, format="csr")
+    AA = eyex if A is None else vstack([eyex, A], "csr")
+    ll = r_[xmin, l]
+    uu = r_[xmax, u]
+
+    # split up linear constraints
+    ieq = flatnonzero( absolute(uu - ll) <= EPS )
+    igt = flatnonzero( (uu >=  1e10) & (ll > -1e10) )
+    ilt = flatnonzero( (ll <= -1e10) & (uu <  1e10) )
+    ibx = flatnonzero( (absolute(uu - ll) > EPS) & (uu < 1e10) & (ll > -1e10) )
+    # zero-sized sparse matrices unsupported
+    Ae = AA[ieq, :] if len(ieq) else None
+    if len(ilt) or len(igt) or len(ibx):
+        idxs = [(1, ilt), (-1, igt), (1, ibx), (-1, ibx)]
+        Ai = vstack([sig * AA[idx, :] for sig, idx in idxs if len(idx)])
+    else:
+        Ai = None
+    be = uu[ieq]
+    bi = r_[uu[ilt], -ll[igt], uu[ibx], -ll[ibx]]
+
+    return ieq, igt, ilt, ibx, Ae, Ai, be, bi
+
+
+def _linear_multipliers(lam_lin, mu_lin, nx, nA, ieq, igt, ilt, ibx):
+    """Returns a dictionary of the multipliers on the lower and upper limits
+    of the linear constraints and variable bounds.
+    """
+    nlt = len(ilt)             # number of upper bounded linear inequalities
+    ngt = len(igt)             # number of lower bounded linear inequalities
+    nbx = len(ibx)             # number of doubly bounded linear inequalities
+
+    kl = flatnonzero(lam_lin < 0.0)     # lower bound binding
+    ku = flatnonzero(lam_lin > 0.0)     # upper bound binding
+
+    mu_l = zeros(nx + nA)
+    mu_l[ieq[kl]] = -lam_lin[kl]
+    mu_l[igt] = mu_lin[nlt:nlt + ngt]
+    mu_l[ibx] = mu_lin[nlt + ngt + nbx:nlt + ngt + nbx + nbx]
+
+    mu_u = zeros(nx + nA)
+    mu_u[ieq[ku]] = lam_lin[ku]
+    mu_u[ilt] = mu_lin[:nlt]
+    mu_u[ibx] = mu_lin[nlt + ngt:nlt + ngt + nbx]
+
+    return {'mu_l': mu_l[nx:], 'mu_u': mu_u[nx:],
+            'lower': mu_l[:nx], 'upper': mu_u[:nx]}
+
+
+def _warm_start(lmbda0, h, nx, nA, ieq, igt, ilt, ibx, cost_mult, gamma_min,
+                neqnln=0, niqnln=0):
+    """Returns the equality multipliers, slack variables and inequality
+    multipliers, (lam, z, mu), with which to start from a previous solution.
+
+    The complementarity products of the slacks, taken from the values of the
+    inequality constraints, C{h}, and the multipliers are re-centred so that
+    none is smaller than the larger of their average and C{gamma_min}.  For
+    each pair, the variable furthest from its bound is kept and the other is
+    moved off of its bound.
+    """
+    def pad(v, n):
+        v = asarray(v, float)[:n]
+        return r_[v, zeros(n - len(v))]
+    lower = r_[pad(lmbda0["lower"], nx), pad(lmbda0["mu_l"], nA)] * cost_mult
+    upper = r_[pad(lmbda0["upper"], nx), pad(lmbda0["mu_u"], nA)] * cost_mult
+    eqnonlin = pad(lmbda0.get("eqnonlin", []), neqnln) * cost_mult
+    ineqnonlin = pad(lmbda0.get("ineqnonlin", []), niqnln) * cost_mult
+
+    lam = r_[eqnonlin, upper[ieq] - lower[ieq]]
+    mu = maximum(r_[ineqnonlin, upper[ilt], lower[igt], upper[ibx],
+                    lower[ibx]], 0.0)
+    z = maximum(-h, 0.0)
+
+    niq = len(z)
+    if niq == 0:
+        return lam, z, mu
+
+    gamma = max([dot(z, mu) / niq, gamma_min])
+    s = sqrt(gamma)
+    k = flatnonzero(z >= mu)
+    z[k] = maximum(z[k], s)
+    mu[k] = maximum(mu[k], gamma / z[k])
+    k = flatnonzero(z < mu)
+    mu[k] = maximum(mu[k], s)
+    z[k] = maximum(z[k], gamma / mu[k])
+
+    return lam, z, mu
+
 
 
 if __name__ == "__main__":
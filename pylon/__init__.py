@@ -23,9 +23,15 @@ from util import CaseReport
 from dc_pf import DCPF
 from ac_pf import NewtonPF, FastDecoupledPF, XB, BX
 
-from opf import OPF, UDOPF
+from opf import OPF, UDOPF, MultiPeriodOPF, ParametricOPF
+from lmp import LMPDecomposition
+from admm import ADMMOPF
 
-from estimator import StateEstimator, Measurement
-from estimator import PF, PT, QF, QT, PG, QG, VM, VA
+from estimator import StateEstimator, FastDecoupledEstimator, Measurement
+from estimator import TrackingStateEstimator, BadDataDetector
+from estimator import PMUStateEstimator, MeasurementSet
+from estimator import PF, PT, QF, QT, PG, QG, VM, VA, VPH, IFPH, ITPH
+from observability import ObservabilityAnalysis
+from area_se import MultiAreaStateEstimator
 
 # EOF -------------------------------------------------------------------------
@@ -0,0 +1,478 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines an optimal power flow decomposed by area and coordinated using
+the alternating direction method of multipliers (ADMM).
+
+See also:
+    - S. Boyd, N. Parikh, E. Chu, B. Peleato and J. Eckstein, "Distributed
+      Optimization and Statistical Learning via the Alternating Direction
+      Method of Multipliers", Foundations and Trends in Machine Learning,
+      3(1), 2011
+    - B. H. Kim and R. Baldick, "Coarse-grained distributed optimal power
+      flow", IEEE Transactions on Power Systems, 12(2), 1997
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import logging
+
+from copy import deepcopy
+from time import time
+
+from numpy import \
+    finfo, array, zeros, ones, r_, pi, Inf, sqrt, dot, bincount
+
+from scipy.sparse import csr_matrix
+
+from case import Case, REFERENCE, PQ
+from generator import Generator, POLYNOMIAL
+from opf import OPF
+from solver import DCOPFSolver, PIPSSolver
+from util import PinnedPool
+
+#------------------------------------------------------------------------------
+#  Logging:
+#------------------------------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+#------------------------------------------------------------------------------
+#  Constants:
+#------------------------------------------------------------------------------
+
+BUS_ATTRS = ["v_angle", "v_magnitude", "p_lmbda", "q_lmbda", "mu_vmin",
+             "mu_vmax"]
+BRANCH_ATTRS = ["p_from", "p_to", "q_from", "q_to", "mu_s_from", "mu_s_to"]
+GENERATOR_ATTRS = ["p", "q", "mu_pmin", "mu_pmax", "mu_qmin", "mu_qmax"]
+
+EPS = finfo(float).eps
+
+#------------------------------------------------------------------------------
+#  "ADMMOPF" class:
+#------------------------------------------------------------------------------
+
+class ADMMOPF(OPF):
+    """ Solves optimal power flow by decomposing the case into the areas
+    given by the C{area} attribute of each bus.
+
+    The subproblem of each area contains the buses of the area, the branches
+    connected to them and a copy of each bus at the far end of a tie line.
+    Power balance is not enforced at the copies, which each have a generator
+    of zero cost and unlimited output, but the voltage angles (and, for AC
+    OPF, magnitudes) of every copy of a boundary bus are required to agree.
+    The consensus constraints are relaxed using the augmented Lagrangian and
+    the areas are coordinated by ADMM.  Each iteration the area subproblems
+    are solved, warm-started from their last solution, by the DC or AC OPF
+    solver in a pool of processes, with each area held by the same process
+    throughout.  The penalty parameter is adjusted to balance the primal
+    and dual residuals.
+    """
+
+    def __init__(self, case, dc=True, ignore_ang_lim=True, opt=None,
+                 processes=None):
+        """ Initialises a new ADMMOPF instance.
+        """
+        super(ADMMOPF, self).__init__(case, dc, ignore_ang_lim, opt)
+
+        #: Number of processes in which the area subproblems are solved.
+        #: The areas are solved in turn if 1 or using a process for each
+        #: area if None.
+        self.processes = processes
+
+        #: Initial penalty parameter of the consensus constraints ($/hr per
+        #: radian or p.u. squared).
+        self.rho = 1e4
+
+        #: Maximum number of ADMM iterations.
+        self.max_it = 1000
+
+        #: Convergence tolerance on the primal and dual residuals (radians
+        #: or p.u.).
+        self.tol = 1e-5
+
+        #: The penalty parameter is multiplied or divided by C{rho_tau} if
+        #: the primal residual exceeds the dual residual, or the converse,
+        #: by a factor of C{rho_mu}.
+        self.rho_mu = 10.0
+        self.rho_tau = 2.0
+
+        #: Number of iterations during which the penalty parameter is
+        #: adjusted.  It is then held constant to avoid oscillation.
+        self.rho_it = 50
+
+
+    def solve(self, compare=False):
+        """ Solves the decomposed OPF, sets the results on the case and
+        returns a results dictionary with the total generation cost, the
+        primal and dual residuals and penalty parameter of each iteration
+        and the wall time.  If C{compare} is set, the monolithic OPF is
+        also solved, using a copy of the case, and its cost and wall time
+        are included.
+        """
+        t0 = time()
+
+        case = self.case
+        areas, boundary = self._partition(case)
+        na, nbb = len(areas), len(boundary)
+
+        logger.info("Solving OPF by ADMM with %d areas and %d boundary "
+                    "buses [%s]." % (na, nbb, case.name))
+
+        # Consensus values of the angle and magnitude of each boundary bus.
+        z = array([b.v_angle * pi / 180.0 for b in boundary])
+        if not self.dc:
+            z = r_[z, [b.v_magnitude for b in boundary]]
+        nz = len(z)
+
+        # Number of copies of each consensus value.
+        count = zeros(nz)
+        for a in areas:
+            count += bincount(a.iz, minlength=nz)
+
+        # Scaled dual variables of the copies in each area.
+        u = [zeros(len(a.iz)) for a in areas]
+        x0 = [None] * na
+        lmbda0 = [None] * na
+
+        if self.processes != 1:
+            pool = PinnedPool(areas, self.processes)
+        else:
+            pool = None
+
+        try:
+            rho = self.rho
+            primal, dual, penalty = [], [], []
+            converged = False
+            for i in range(self.max_it):
+                args = [(z[a.iz] - u[k], rho, x0[k], lmbda0[k])
+                        for k, a in enumerate(areas)]
+                if pool is not None:
+                    results = pool.map("solve", args)
+                else:
+                    results = [a.solve(*arg) for a, arg in zip(areas, args)]
+
+                for k, result in enumerate(results):
+                    if result["converged"]:
+                        x0[k], lmbda0[k] = result["x"], result["lmbda"]
+                    else:
+                        logger.warning("Area %s subproblem did not converge." %
+                                       areas[k].area)
+
+                # Average of the copies of each boundary value.
+                z_prev = z
+                total = zeros(nz)
+                for a, result, uk in zip(areas, results, u):
+                    total += bincount(a.iz, result["xb"] + uk, minlength=nz)
+                z = total / count
+
+                # Primal residual, change in the consensus values and the norms
+                # of the copies, consensus values and scaled duals.
+                r2, s2, x2, z2, u2 = 0.0, 0.0, 0.0, 0.0, 0.0
+                for k, (a, result) in enumerate(zip(areas, results)):
+                    rk = result["xb"] - z[a.iz]
+                    dz = z[a.iz] - z_prev[a.iz]
+                    u[k] += rk
+                    r2 += dot(rk, rk)
+                    s2 += dot(dz, dz)
+                    x2 += dot(result["xb"], result["xb"])
+                    z2 += dot(z[a.iz], z[a.iz])
+                    u2 += dot(u[k], u[k])
+                r, s = sqrt(r2), sqrt(s2)
+
+                primal.append(r)
+                dual.append(rho * s)
+                penalty.append(rho)
+
+                logger.debug("ADMM iteration %d: primal %.3e, dual %.3e, rho "
+                             "%.3e." % (i + 1, r, rho * s, rho))
+
+                if (r < self.tol) and (s < self.tol) and \
+                        all([result["converged"] for result in results]):
+                    converged = True
+                    break
+
+                # Balance the residuals relative to the norms of the copies
+                # and of the multipliers, rho * u, which are independent of
+                # the units of the cost.
+                r_rel = r / max(sqrt(x2), sqrt(z2), EPS)
+                s_rel = s / max(sqrt(u2), EPS)
+                if i >= self.rho_it:
+                    pass
+                elif r_rel > self.rho_mu * s_rel:
+                    rho *= self.rho_tau
+                    u = [uk / self.rho_tau for uk in u]
+                elif s_rel > self.rho_mu * r_rel:
+                    rho /= self.rho_tau
+                    u = [uk * self.rho_tau for uk in u]
+
+        finally:
+            if pool is not None:
+                pool.close()
+
+        # Results of each area are set on the components it owns.
+        case.reset()
+        for a, result in zip(areas, results):
+            a.set_results(case, result)
+
+        elapsed = time() - t0
+
+        solution = {"converged": converged, "iterations": i + 1,
+                    "f": sum([r["f"] for r in results]),
+                    "primal_residual": array(primal),
+                    "dual_residual": array(dual), "rho": array(penalty),
+                    "elapsed": elapsed}
+
+        if converged:
+            logger.info("ADMM OPF converged in %d iterations (%.3fs)." %
+                        (i + 1, elapsed))
+        else:
+            logger.error("ADMM OPF did not converge in %d iterations "
+                         "(primal residual %.3e)." % (i + 1, primal[-1]))
+
+        if compare:
+            t1 = time()
+            opf = OPF(deepcopy(case), self.dc, self.ignore_ang_lim,
+                      dict(self.opt))
+            monolithic = opf.solve()
+            solution["monolithic"] = {"f": monolithic["f"],
+                                      "converged": monolithic["converged"],
+                                      "elapsed": time() - t1}
+            logger.info("Monolithic OPF solved in %.3fs, cost difference "
+                        "%.3e." % (time() - t1, solution["f"] -
+                                   monolithic["f"]))
+
+        return solution
+
+
+    def _partition(self, case):
+        """ Returns the subproblem of each area and the boundary buses.
+        """
+        buses = case.connected_buses
+        branches = case.online_branches
+        ids = sorted(set([b.area for b in buses]))
+
+        ties = [l for l in branches if l.from_bus.area != l.to_bus.area]
+        boundary = [b for b in buses if [l for l in ties
+                    if (l.from_bus is b) or (l.to_bus is b)]]
+
+        refs = [b for b in buses if b.type == REFERENCE]
+        ref = refs[0] if refs else buses[0]
+
+        # Generator costs of zero with the same number of coefficients as
+        # the others.
+        gpol = [g for g in case.generators if g.pcost_model == POLYNOMIAL]
+        nc = len(gpol[0].p_cost) if gpol else 3
+        p_cap = sum([abs(g.p_max) + abs(g.p_min) for g in case.generators] +
+                    [abs(b.p_demand) for b in buses])
+        q_cap = sum([abs(g.q_max) + abs(g.q_min) for g in case.generators] +
+                    [abs(b.q_demand) for b in buses])
+
+        areas = []
+        for area in ids:
+            own = [b for b in buses if b.area == area]
+            ghosts = [b for b in boundary if (b.area != area) and
+                      [l for l in ties if (l.from_bus in own and
+                       l.to_bus is b) or (l.to_bus in own and
+                       l.from_bus is b)]]
+            ln = [l for l in branches
+                  if (l.from_bus in own) or (l.to_bus in own)]
+            gn = [g for g in case.generators if g.bus in own]
+
+            local = deepcopy((own + ghosts, ln, gn))
+            bs, ln_local, gn_local = local
+
+            for b in bs[len(own):]:
+                b.type = PQ
+                b.p_demand = b.q_demand = 0.0
+                b.g_shunt = b.b_shunt = 0.0
+                gn_local.append(Generator(b, name="ghost_%s" % b.name,
+                    p=0.0, p_max=p_cap, p_min=-p_cap, q=0.0, q_max=q_cap,
+                    q_min=-q_cap, v_magnitude=b.v_magnitude,
+                    p_cost=(0.0,) * nc))
+
+            # Areas without the reference bus have a free reference angle.
+            relax = ref not in own
+            if relax:
+                for b in bs[:len(own)]:
+                    if b.type == REFERENCE:
+                        b.type = PQ
+                bs[0].type = REFERENCE
+
+            sub = Case("%s_%s" % (case.name, area), case.base_mva, bs,
+                       ln_local, gn_local)
+            sub.index_buses()
+
+            # Copies of the boundary buses and their consensus indexes.
+            own_b = [b for b in own if b in boundary]
+            ib = [own.index(b) for b in own_b] + \
+                 [len(own) + j for j in range(len(ghosts))]
+            iz = [boundary.index(b) for b in own_b + ghosts]
+            if not self.dc:
+                iz = iz + [len(boundary) + j for j in iz]
+
+            # Branches are owned by the area of the from bus.
+            il = [i for i, l in enumerate(ln) if l.from_bus in own]
+
+            areas.append(_Area(area, sub, self.dc, self.ignore_ang_lim,
+                dict(self.opt), [bs[j] for j in ib], array(iz, dtype=int),
+                relax, [case.buses.index(b) for b in own],
+                [(case.branches.index(ln[i]), i) for i in il],
+                [case.generators.index(g) for g in gn]))
+
+        return areas, boundary
+
+#------------------------------------------------------------------------------
+#  "_Area" class:
+#------------------------------------------------------------------------------
+
+class _Area(object):
+    """ Defines the OPF subproblem of an area.
+    """
+
+    def __init__(self, area, case, dc, ignore_ang_lim, opt, copies, iz,
+                 relax, ib, il, ig):
+        """ Initialises a new _Area instance.
+        """
+        #: Area identifier.
+        self.area = area
+
+        #: Case of the buses, branches and generators of the area and the
+        #: copies of the neighbouring boundary buses.
+        self.case = case
+
+        self.dc = dc
+        self.ignore_ang_lim = ignore_ang_lim
+        self.opt = opt
+
+        #: Copies of the boundary buses in the area case.
+        self.copies = copies
+
+        #: Index of the consensus value of each boundary angle and magnitude.
+        self.iz = iz
+
+        #: The reference angle is not fixed.
+        self.relax = relax
+
+        # Indexes of the buses, branches (with their index in the area case)
+        # and generators of the area in the full case.
+        self._ib, self._il, self._ig = ib, il, ig
+
+        # OPF with the retained model, built when first solved.
+        self._opf = None
+
+
+    def solve(self, c, rho, x0=None, lmbda0=None):
+        """ Solves the area OPF with the boundary values penalised by
+        C{rho/2 * ||x - c||^2} and returns a dictionary with the boundary
+        values, generation cost and results of the area.
+        """
+        if self._opf is None:
+            self._opf = OPF(self.case, self.dc, self.ignore_ang_lim,
+                            self.opt, persistent=True)
+            om = self._opf._construct_opf_model(self.case)
+            Va = om.get_var("Va")
+            if self.relax:
+                om.update_var("Va", vl=-Inf * ones(Va.N),
+                              vu=Inf * ones(Va.N))
+            ix = [Va.i1 + b._i for b in self.copies]
+            if not self.dc:
+                ix = ix + [om.get_var("Vm").i1 + b._i for b in self.copies]
+            self._ix = array(ix, dtype=int)
+
+        om = self._opf.om
+        om._penalty = (self._ix, c, rho)
+
+        solver_klass = _ADMMDCOPFSolver if self.dc else _ADMMPIPSSolver
+        s = self._opf.solve(solver_klass, x0, lmbda0)
+
+        case = self.case
+        n_own = len(self._ib)
+        ng = len(self._ig)
+        return {"converged": s["converged"], "x": s["x"],
+                "lmbda": s["lmbda"], "xb": s["x"][self._ix],
+                "f": sum([g.total_cost() for g in case.generators[:ng]]),
+                "buses": [[getattr(b, a) for a in BUS_ATTRS]
+                          for b in case.buses[:n_own]],
+                "branches": [[getattr(case.branches[i], a)
+                              for a in BRANCH_ATTRS] for _, i in self._il],
+                "generators": [[getattr(g, a) for a in GENERATOR_ATTRS]
+                               for g in case.generators[:ng]]}
+
+
+    def set_results(self, case, result):
+        """ Sets the results of the area on the components of the full case.
+        """
+        for i, values in zip(self._ib, result["buses"]):
+            for a, v in zip(BUS_ATTRS, values):
+                setattr(case.buses[i], a, v)
+        for (i, _), values in zip(self._il, result["branches"]):
+            for a, v in zip(BRANCH_ATTRS, values):
+                setattr(case.branches[i], a, v)
+        for i, values in zip(self._ig, result["generators"]):
+            for a, v in zip(GENERATOR_ATTRS, values):
+                setattr(case.generators[i], a, v)
+
+#------------------------------------------------------------------------------
+#  Area subproblem solvers:
+#------------------------------------------------------------------------------
+
+class _ADMMDCOPFSolver(DCOPFSolver):
+    """ Solves DC OPF with a quadratic penalty on the deviation of the
+    variables C{ix} from C{c}, given by the C{_penalty} attribute of the
+    model.
+    """
+
+    def _objective(self, gn, ipol, ipwl, nw, ny, nxyz, base_mva):
+        HH, CC, C0 = super(_ADMMDCOPFSolver, self)._objective(gn, ipol,
+            ipwl, nw, ny, nxyz, base_mva)
+
+        ix, c, rho = self.om._penalty
+        HH = HH + csr_matrix((rho * ones(len(ix)), (ix, ix)), HH.shape)
+        CC = array(CC, dtype=float).flatten()
+        CC[ix] -= rho * c
+        C0 = C0 + 0.5 * rho * dot(c, c)
+
+        return HH, CC, C0
+
+
+class _ADMMPIPSSolver(PIPSSolver):
+    """ Solves AC OPF with a quadratic penalty on the deviation of the
+    variables C{ix} from C{c}, given by the C{_penalty} attribute of the
+    model.
+    """
+
+    def _f(self, x, user_data=None):
+        ix, c, rho = self.om._penalty
+        f = super(_ADMMPIPSSolver, self)._f(x, user_data)
+        return f + 0.5 * rho * dot(x[ix] - c, x[ix] - c)
+
+
+    def _df(self, x, user_data=None):
+        ix, c, rho = self.om._penalty
+        df = super(_ADMMPIPSSolver, self)._df(x, user_data)
+        df[ix] += rho * (x[ix] - c)
+        return df
+
+
+    def _d2f(self, x):
+        ix, _, rho = self.om._penalty
+        d2f = super(_ADMMPIPSSolver, self)._d2f(x)
+        return d2f + csr_matrix((rho * ones(len(ix)), (ix, ix)), d2f.shape)
+
+# EOF -------------------------------------------------------------------------
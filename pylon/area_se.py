@@ -0,0 +1,381 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines a state estimator decomposed by area.
+
+See also:
+    - A. Gomez-Exposito, A. de la Villa Jaen, C. Gomez-Quiles, P. Rousseaux
+      and T. Van Cutsem, "A taxonomy of multi-area state estimation
+      methods", Electric Power Systems Research, 81(4), 2011
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import logging
+
+from time import time
+
+from numpy import \
+    array, zeros, ones, r_, angle, abs, exp, Inf, linalg, flatnonzero, \
+    bincount, cumsum, split, dot, arange, ix_
+
+from scipy.sparse import csr_matrix
+from scipy.sparse.linalg import splu
+
+from estimator import StateEstimator, _MeasurementJacobian, TYPES, PG
+from util import PinnedPool
+
+#------------------------------------------------------------------------------
+#  Logging:
+#------------------------------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+#------------------------------------------------------------------------------
+#  "MultiAreaStateEstimator" class:
+#------------------------------------------------------------------------------
+
+class MultiAreaStateEstimator(StateEstimator):
+    """ Weighted least squares state estimation decomposed into the areas
+    given by the C{area} attribute of each bus.
+
+    The boundary buses are the ends of the tie lines between areas.  Each
+    measurement belongs to the area of its bus, or of the from bus of its
+    branch, so that it depends on the state of the internal buses of at
+    most one area.  The measurement Jacobian of each area has columns only
+    for the state of its own buses and of the boundary buses of the
+    neighbouring areas to which they are connected.
+
+    Each Gauss-Newton iteration, the areas receive the voltages of those
+    buses, form and factorise the gain matrix of their internal states and
+    eliminate them, in a pool of processes.  The coordinator solves the
+    Schur complement system of the boundary states and recovers the
+    internal state updates.  Each area is held by the same process until
+    the areas are formed again, for a new measurement Jacobian, or L{close}
+    is called.
+
+    This is a distributed solution of the central problem, not a
+    hierarchical estimator: the iterates are those of L{StateEstimator}, so
+    the estimate is the same, but no area gives a local estimate, each
+    iteration is a synchronous exchange with every area and the estimate
+    fails if any area fails.
+    """
+
+    def __init__(self, case, measurements, sigma=None, v_mag_guess=None,
+                 max_iter=100, tolerance=1e-05, verbose=True,
+                 pseudo_sigma=0.1, processes=None):
+        """ Initialises a new MultiAreaStateEstimator instance.
+        """
+        super(MultiAreaStateEstimator, self).__init__(case, measurements,
+            sigma, v_mag_guess, max_iter, tolerance, verbose, pseudo_sigma)
+
+        #: Number of processes in which the areas are solved.  The areas
+        #: are solved in turn if 1 or using a process for each area if None.
+        self.processes = processes
+
+        # Area subproblems, the columns of the boundary states and the
+        # measurement Jacobian for which they were formed.
+        self._areas = None
+        self._ib = None
+        self._areas_jac = None
+
+        # Processes holding the areas.
+        self._pool = None
+
+        # Local and coordination wall times of the last estimation.
+        self._timings = {}
+
+
+    def run(self):
+        """ Solves the state estimation problem and returns the solution of
+        L{StateEstimator} with the time spent by each area ("area_elapsed")
+        and by the coordinator ("coordination_elapsed").
+        """
+        solution = super(MultiAreaStateEstimator, self).run()
+        solution.update(self._timings)
+
+        return solution
+
+
+    def close(self):
+        """ Stops the processes holding the areas.
+        """
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+
+
+    def _setup(self, Ybus, Yf, Yt):
+        """ Returns the measurement Jacobian and partitions the measurements
+        and state between the areas.
+        """
+        jac = super(MultiAreaStateEstimator, self)._setup(Ybus, Yf, Yt)
+
+        if self._areas_jac is not jac:
+            self.close()
+            self._areas, self._ib = self._partition(Ybus, Yf, Yt)
+            self._areas_jac = jac
+
+        return jac
+
+
+    def _partition(self, Ybus, Yf, Yt):
+        """ Returns the subproblem of each area and the columns of the
+        boundary states.
+        """
+        buses = self.case.connected_buses
+        branches = self.case.online_branches
+        nonref = array(self._nonref, dtype=int)
+        npvpq = len(nonref)
+        n = len(buses)
+
+        f = array([l.from_bus._i for l in branches], dtype=int)
+        t = array([l.to_bus._i for l in branches], dtype=int)
+        Sd = array([complex(b.p_demand, b.q_demand) for b in buses]) / \
+            self.case.base_mva
+        Ybus, Yf, Yt = csr_matrix(Ybus), csr_matrix(Yf), csr_matrix(Yt)
+
+        ids = sorted(set([b.area for b in buses]))
+        bus_area = array([ids.index(b.area) for b in buses], dtype=int)
+
+        tie = bus_area[f] != bus_area[t]
+        boundary = zeros(n, dtype=bool)
+        boundary[f[tie]] = boundary[t[tie]] = True
+
+        # Position of the state of each bus in the boundary states.
+        pos = flatnonzero(boundary[nonref])
+        jpos = -ones(n, dtype=int)
+        jpos[nonref[pos]] = arange(len(pos))
+        ib = r_[pos, npvpq + pos]
+
+        # Area of each estimated measurement.
+        flow = self._types < TYPES.index(PG)
+        m_area = zeros(len(self._types), dtype=int)
+        m_area[~flow] = bus_area[self._index[~flow]]
+        m_area[flow] = bus_area[array(f, dtype=int)[self._index[flow]]]
+
+        areas = []
+        for a, area in enumerate(ids):
+            rows = flatnonzero(m_area == a)
+            types = self._types[rows]
+            idx = split(self._index[rows],
+                        cumsum(bincount(types, minlength=len(TYPES)))[:-1])
+
+            # The buses of the area and the ends of its tie lines, with
+            # their local indexes.
+            ties = tie & ((bus_area[f] == a) | (bus_area[t] == a))
+            local = (bus_area == a)
+            local[f[ties]] = local[t[ties]] = True
+            ix = flatnonzero(local)
+            loc = -ones(n, dtype=int)
+            loc[ix] = arange(len(ix))
+
+            # Bus measurements are indexed locally and branch measurements
+            # by the rows of the local branch admittance matrices.
+            idx = [loc[i] if k >= TYPES.index(PG) else i
+                   for k, i in enumerate(idx)]
+            lnonref = nonref[local[nonref]]
+            jac = _MeasurementJacobian(Ybus[ix, :][:, ix], Yf[:, ix],
+                Yt[:, ix], loc[f], loc[t], loc[lnonref], Sd[ix], idx)
+
+            # Local columns of the internal and boundary states and their
+            # positions in the state and boundary state vectors.
+            nl = len(lnonref)
+            internal = flatnonzero(~boundary[lnonref])
+            bound = flatnonzero(boundary[lnonref])
+            gpos = flatnonzero(local[nonref])[internal]
+
+            areas.append(_Area(area, jac, rows, ix,
+                               r_[internal, nl + internal],
+                               r_[bound, nl + bound],
+                               r_[gpos, npvpq + gpos],
+                               r_[jpos[lnonref[bound]],
+                                  len(pos) + jpos[lnonref[bound]]]))
+
+        logger.info("State estimation with %d areas and %d boundary buses." %
+                    (len(ids), boundary.sum()))
+
+        return areas, ib
+
+
+    def _estimate(self, jac, V, z, w):
+        """ Returns the estimated voltages and measurements, the convergence
+        flag and the number of Gauss-Newton iterations.
+        """
+        areas = self._areas
+        nonref = self._nonref
+        npvpq = len(nonref)
+        nb = len(self._ib)
+
+        if (self.processes != 1) and (self._pool is None):
+            self._pool = PinnedPool(areas, self.processes)
+        pool = self._pool
+
+        Va = angle(V)
+        Vm = abs(V)
+        z_est = zeros(len(z))
+        area_elapsed = zeros(len(areas))
+        coordination_elapsed = 0.0
+
+        converged = False
+        i = 0
+
+        try:
+            measurements = [(z[a.rows], w[a.rows]) for a in areas]
+            if pool is not None:
+                pool.map("set_measurements", measurements)
+            else:
+                for a, m in zip(areas, measurements):
+                    a.set_measurements(*m)
+
+            while (not converged) and (i < self.max_iter):
+                i += 1
+
+                # Elimination of the internal states of each area.
+                if pool is not None:
+                    results = pool.map("solve", [(V[a.buses],)
+                                                 for a in areas])
+                else:
+                    results = [a.solve(V[a.buses]) for a in areas]
+
+                t0 = time()
+
+                # Schur complement system of the boundary states.
+                S = zeros((nb, nb))
+                g = zeros(nb)
+                Fb = zeros(nb)
+                normF = 0.0
+                for k, (a, result) in enumerate(zip(areas, results)):
+                    S[ix_(a.jb, a.jb)] += result["S"]
+                    g[a.jb] += result["g"]
+                    Fb[a.jb] += result["Fb"]
+                    normF = max(normF, result["normF"])
+                    z_est[a.rows] = result["z_est"]
+                    area_elapsed[k] += result["elapsed"]
+
+                normF = max(normF, linalg.norm(Fb, Inf))
+
+                if self.verbose:
+                    logger.info("Iteration [%d]: Norm of mismatch: %.3f" %
+                                (i, normF))
+                if normF < self.tolerance:
+                    converged = True
+
+                dx = zeros(2 * npvpq)
+                if nb:
+                    dx[self._ib] = dxb = linalg.solve(S, g)
+                else:
+                    dxb = zeros(0)
+                for a, result in zip(areas, results):
+                    dx[a.ja] = result["y"] - dot(result["X"], dxb[a.jb])
+
+                # Update voltage.
+                Va[nonref] = Va[nonref] + dx[:npvpq]
+                Vm[nonref] = Vm[nonref] + dx[npvpq:]
+
+                V = Vm * exp(1j * Va)
+                Va = angle(V)
+                Vm = abs(V)
+
+                coordination_elapsed += time() - t0
+        except:
+            # The processes are not left running if estimation fails.
+            self.close()
+            raise
+
+        self._timings = {"area_elapsed": area_elapsed,
+                         "coordination_elapsed": coordination_elapsed}
+
+        return V, z_est, converged, i
+
+#------------------------------------------------------------------------------
+#  "_Area" class:
+#------------------------------------------------------------------------------
+
+class _Area(object):
+    """ Defines the state estimation subproblem of an area.
+    """
+
+    def __init__(self, area, jac, rows, buses, ia, ib, ja, jb):
+        """ Initialises a new _Area instance.
+        """
+        #: Area identifier.
+        self.area = area
+
+        #: Jacobian of the measurements of the area, with respect to the
+        #: state of its buses.
+        self.jac = jac
+
+        #: Positions of the measurements of the area in the estimate.
+        self.rows = rows
+
+        #: Indexes of the buses of the area and the ends of its tie lines.
+        self.buses = buses
+
+        #: Columns of the internal and boundary states in the Jacobian.
+        self.ia, self.ib = ia, ib
+
+        #: Positions of the internal states in the state vector and of the
+        #: boundary states in the boundary state vector.
+        self.ja, self.jb = ja, jb
+
+        #: Measured values and weights of the area.
+        self.z = zeros(len(rows))
+        self.w = ones(len(rows))
+
+
+    def set_measurements(self, z, w):
+        """ Sets the measured values and weights of the area.
+        """
+        self.z, self.w = z, w
+
+
+    def solve(self, V):
+        """ Eliminates the internal states from the normal equations of the
+        area at the given voltages of its buses.  Returns a dictionary with
+        the Schur complement, "S", and right hand side, "g", of the boundary
+        states and the internal state update, "y - X * dxb", in terms of the
+        boundary state update.
+        """
+        t0 = time()
+
+        z_est, H = self.jac.evaluate(V)
+        wr = self.w * (self.z - z_est)
+        W = csr_matrix((self.w, (range(len(wr)), range(len(wr)))),
+                       (len(wr), len(wr)))
+
+        H = H.tocsc()
+        Ha, Hb = H[:, self.ia], H[:, self.ib]
+        Fa, Fb = Ha.T * wr, Hb.T * wr
+        Gab = (Ha.T * W * Hb).toarray()
+        Gbb = (Hb.T * W * Hb).toarray()
+
+        if len(self.ia):
+            lu = splu((Ha.T * W * Ha).tocsc())
+            X = lu.solve(Gab)
+            y = lu.solve(Fa)
+        else:
+            X = zeros((0, len(self.ib)))
+            y = zeros(0)
+
+        return {"S": Gbb - dot(Gab.T, X), "g": Fb - dot(Gab.T, y),
+                "X": X, "y": y, "Fb": Fb,
+                "normF": linalg.norm(Fa, Inf) if len(Fa) else 0.0,
+                "z_est": z_est, "elapsed": time() - t0}
+
+# EOF -------------------------------------------------------------------------
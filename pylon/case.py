@@ -26,9 +26,11 @@ import logging
 import copy
 
 from numpy import \
-    array, angle, pi, exp, ones, r_, complex64, conj, int32
+    array, angle, pi, exp, ones, r_, complex64, conj, int32, zeros, arange, \
+    absolute, where, nan
 
 from scipy.sparse import csc_matrix, csr_matrix
+from scipy.sparse.linalg import splu
 
 from util import _Named, _Serializable
 
@@ -541,6 +543,136 @@ class Case(_Named, _Serializable):
 
     Bdc = property(makeBdc)
 
+    #--------------------------------------------------------------------------
+    #  Builds the DC transfer and line outage distribution factors:
+    #--------------------------------------------------------------------------
+
+    def makePTDF(self, buses=None, branches=None, slack=None,
+                 monitored=None, factors=None):
+        """ Returns the DC power transfer distribution factor matrix which
+        relates the real power flow at the from end of each branch to the
+        real power injection at each bus, with the slack bus absorbing the
+        injections.
+
+        Based on makePTDF.m from MATPOWER by Ray Zimmerman, developed at
+        PSERC Cornell. See U{http://www.pserc.cornell.edu/matpower/} for more
+        information.
+
+        @param slack: Index of the slack bus, the first reference bus by
+                      default.
+        @param monitored: Indexes of the branches for which the rows of the
+                          matrix are computed, all by default.
+        @param factors: Factorisation of the bus susceptance matrix, as
+                        returned by L{factorBdc}, computed if not given.
+        @return: Branch by bus matrix of transfer distribution factors.
+        @rtype: array
+        """
+        buses = self.connected_buses if buses is None else buses
+        branches = self.online_branches if branches is None else branches
+
+        nb = len(buses)
+        if monitored is None:
+            monitored = arange(len(branches))
+
+        if factors is None:
+            factors = self.factorBdc(buses, branches, slack)
+        Bf, lu, noslack = factors
+
+        # Solve B' * H' = Bf' for the rows of H at the non-slack buses.
+        H = zeros((len(monitored), nb))
+        if len(monitored):
+            H[:, noslack] = lu.solve(
+                Bf[monitored, :][:, noslack].T.toarray(), "T").T
+
+        return H
+
+
+    def factorBdc(self, buses=None, branches=None, slack=None):
+        """ Returns the branch susceptance matrix, the sparse LU
+        factorisation of the bus susceptance matrix with the row and column
+        of the slack bus removed and the indexes of the other buses.
+
+        @param slack: Index of the slack bus, the first reference bus by
+                      default.
+        @rtype: tuple
+        """
+        buses = self.connected_buses if buses is None else buses
+        branches = self.online_branches if branches is None else branches
+
+        noslack = self._noslack(buses, slack)
+
+        B, Bf, _, _ = self.makeBdc(buses, branches)
+        lu = splu(csc_matrix(B)[noslack, :][:, noslack])
+
+        return Bf, lu, noslack
+
+
+    def makeLODF(self, buses=None, branches=None, outages=None, PTDF=None,
+                 factors=None):
+        """ Returns the DC line outage distribution factors which relate the
+        change in real power flow in each branch to the pre-outage flow in
+        each outaged branch.  The flow in the outaged branch falls to zero,
+        so the factor relating an outage to its own branch is -1.  The
+        factors are computed by sparse factorisation of the bus susceptance
+        matrix, if the PTDF matrix is not given, so the memory required is
+        proportional to the number of outages.
+
+        Based on makeLODF.m from MATPOWER by Ray Zimmerman, developed at
+        PSERC Cornell. See U{http://www.pserc.cornell.edu/matpower/} for more
+        information.
+
+        @param outages: Indexes of the branch outages, all by default.
+        @param factors: Factorisation of the bus susceptance matrix, as
+                        returned by L{factorBdc}, computed if not given.
+        @return: Branch by outage matrix of line outage distribution factors.
+                 Columns for outages that split the network are NaN.
+        @rtype: array
+        """
+        buses = self.connected_buses if buses is None else buses
+        branches = self.online_branches if branches is None else branches
+
+        nb = len(buses)
+        nl = len(branches)
+
+        outages = arange(nl) if outages is None else array(outages, dtype=int)
+        no = len(outages)
+        io = arange(no)
+
+        f = array([br.from_bus._i for br in branches], dtype=int)[outages]
+        t = array([br.to_bus._i for br in branches], dtype=int)[outages]
+        # Bus-branch incidence matrix of the outaged branches.
+        Cft = csc_matrix((r_[ones(no), -ones(no)], (r_[f, t], r_[io, io])),
+                         (nb, no))
+
+        # Transfer distribution factors for the flow in each outaged branch.
+        if PTDF is None:
+            if factors is None:
+                factors = self.factorBdc(buses, branches)
+            Bf, lu, noslack = factors
+            H = Bf[:, noslack] * lu.solve(Cft[noslack, :].toarray())
+        else:
+            H = (Cft.T * PTDF.T).T
+
+        h = H[outages, io]
+        island = absolute(1.0 - h) < 1e-10
+
+        LODF = H / where(island, 1.0, 1.0 - h)
+        LODF[outages, io] = -1.0
+        LODF[:, island] = nan
+
+        return LODF
+
+
+    def _noslack(self, buses, slack=None):
+        """ Returns the indexes of the buses other than the slack bus, the
+        first reference bus by default.
+        """
+        if slack is None:
+            refs = [i for i, b in enumerate(buses) if b.type == REFERENCE]
+            slack = refs[0] if refs else 0
+
+        return array([i for i in range(len(buses)) if i != slack], dtype=int)
+
     #--------------------------------------------------------------------------
     #  Partial derivative of power injection w.r.t. voltage:
     #--------------------------------------------------------------------------
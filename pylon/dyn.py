@@ -31,8 +31,9 @@ from time import time
 
 from numpy import \
     array, zeros, ones, exp, conj, pi, angle, abs, sin, cos, c_, r_, \
-    flatnonzero, finfo
+    flatnonzero, finfo, minimum, maximum, where, linalg, Inf, arange
 
+from scipy.sparse import spdiags, csc_matrix, identity
 from scipy.sparse.linalg import spsolve, splu
 
 from pylon import NewtonPF
@@ -51,6 +52,9 @@ logger = logging.getLogger(__name__)
 
 EPS = finfo(float).eps
 
+# Time within which a step ends at an event or the stop time (s).
+EVENT_TOL = 1e-09
+
 CLASSICAL = "classical"
 FOURTH_ORDER = "fourth_order"
 
@@ -60,6 +64,16 @@ IEEE_DC1A = "IEEE DC1A"
 CONST_POWER = "constant power"
 GENERAL_IEEE = "IEEE general speed-governing system"
 
+# Parameters of each type of generator, exciter and governor model.
+GENERATOR_PARAMS = {CLASSICAL: ["h", "d", "x", "x_tr", "xd", "xd_tr"],
+    FOURTH_ORDER: ["h", "d", "xd", "xq", "xd_tr", "xq_tr", "td", "tq"]}
+EXCITER_PARAMS = {CONST_EXCITATION: [],
+    IEEE_DC1A: ["ka", "ta", "ke", "te", "kf", "tf", "aex", "bex", "ur_min",
+                "ur_max"]}
+GOVERNOR_PARAMS = {CONST_POWER: [],
+    GENERAL_IEEE: ["k", "t1", "t2", "t3", "p_up", "p_down", "p_max",
+                   "p_min"]}
+
 BUS_CHANGE = "bus change"
 BRANCH_CHANGE = "branch change"
 
@@ -95,6 +109,35 @@ class DynamicCase(_Named, _Serializable):
         #: Stoptime of the simulation (s).
         self.stoptime = stoptime
 
+        #: Bus and branch parameter change events.
+        self.events = []
+
+
+    def tabulate(self):
+        """ Builds the parameter tables of the generator, exciter and
+        governor models.  Each table holds the rows of the state matrices,
+        which are in the order of the dynamic generators, and the parameter
+        arrays of the components with one type of model.
+        """
+        generators = self.dyn_generators
+        row = dict([(id(g.generator), i) for i, g in enumerate(generators)])
+
+        self._generators = dict([(model, _ParameterTable(
+            [g for g in generators if g.model == model],
+            [i for i, g in enumerate(generators) if g.model == model],
+            params)) for model, params in GENERATOR_PARAMS.iteritems()])
+
+        self._exciters = dict([(model, _ParameterTable(
+            [e for e in self.exciters if e.model == model],
+            [row[id(e.generator)] for e in self.exciters if e.model == model],
+            params)) for model, params in EXCITER_PARAMS.iteritems()])
+
+        self._governors = dict([(model, _ParameterTable(
+            [g for g in self.governors if g.model == model],
+            [row[id(g.generator)] for g in self.governors
+             if g.model == model], params))
+            for model, params in GOVERNOR_PARAMS.iteritems()])
+
 
     def getAugYbus(self, U0, gbus):
         """ Based on AugYbus.m from MatDyn by Stijn Cole, developed at
@@ -113,20 +156,18 @@ class DynamicCase(_Named, _Serializable):
         # Steady-state bus voltages.
 
         # Calculate equivalent load admittance
-        Sd = array([self.case.s_demand(bus) for bus in buses])
+        Sd = array([self.case.s_demand(bus) for bus in buses]) / \
+            self.case.base_mva
         Yd = conj(Sd) / abs(U0)**2
 
-        xd_tr = array([g.xd_tr for g in self.dyn_generators])
-
         # Calculate equivalent generator admittance.
-        Yg = zeros(nb)
-        Yg[gbus] = 1 / (j * xd_tr)
+        gbus = array(gbus, dtype=int)
+        Yg = zeros(nb, dtype=complex)
+        for p in self._generators.itervalues():
+            Yg[gbus[p.rows]] = 1 / (j * p.xd_tr)
 
         # Add equivalent load and generator admittance to Ybus matrix
-        for i in range(nb):
-            Ybus[i, i] = Ybus[i, i] + Yg[i] + Yd[i]
-
-        return Ybus
+        return Ybus + spdiags(Yg + Yd, 0, nb, nb)
 
 
     def generatorInit(self, U0):
@@ -134,48 +175,49 @@ class DynamicCase(_Named, _Serializable):
         Katholieke Universiteit Leuven. See U{http://www.esat.kuleuven.be/
         electa/teaching/matdyn/} for more information.
 
+        @param U0: Generator terminal voltages.
+
         @rtype: tuple
         @return: Initial generator conditions.
         """
         j = 0 + 1j
         generators = self.dyn_generators
+        base_mva = self.case.base_mva
 
         Efd0 = zeros(len(generators))
         Xgen0 = zeros((len(generators), 4))
 
-        typ1 = [g._i for g in generators if g.model == CLASSICAL]
-        typ2 = [g._i for g in generators if g.model == FOURTH_ORDER]
+        Sg = array([complex(g.generator.p, g.generator.q)
+                    for g in generators])
 
         # Generator type 1: classical model
-        x_tr = array([g.x_tr for g in generators])
+        p = self._generators[CLASSICAL]
+        typ1 = p.rows
 
         omega0 = ones(len(typ1)) * 2 * pi * self.freq
 
         # Initial machine armature currents.
-        Sg = array([g.p + j * g.q for g in generators])
-        Ia0 = conj(Sg[typ1]) / conj(U0) / self.base_mva
+        Ia0 = conj(Sg[typ1]) / conj(U0[typ1]) / base_mva
 
         # Initial Steady-state internal EMF.
-        Eq_tr0 = U0[typ1] + j * x_tr * Ia0
+        Eq_tr0 = U0[typ1] + j * p.x_tr * Ia0
         delta0 = angle(Eq_tr0)
         Eq_tr0 = abs(Eq_tr0)
 
-        Xgen0[typ1, :] = c_[delta0, omega0, Eq_tr0]
+        Xgen0[typ1, :3] = c_[delta0, omega0, Eq_tr0]
 
         # Generator type 2: 4th order model
-        xd = array([g.xd for g in generators])
-        xq = array([g.xq for g in generators])
-        xd_tr = array([g.xd_tr for g in generators])
-        xq_tr = array([g.xq_tr for g in generators])
+        p = self._generators[FOURTH_ORDER]
+        typ2 = p.rows
 
         omega0 = ones(len(typ2)) * 2 * pi * self.freq
 
         # Initial machine armature currents.
-        Ia0 = conj(Sg[typ2]) / conj(U0[typ2]) / self.base_mva
+        Ia0 = conj(Sg[typ2]) / conj(U0[typ2]) / base_mva
         phi0 = angle(Ia0)
 
         # Initial Steady-state internal EMF.
-        Eq0 = U0[typ2] + j * xq * Ia0
+        Eq0 = U0[typ2] + j * p.xq * Ia0
         delta0 = angle(Eq0)
 
         # Machine currents in dq frame.
@@ -183,11 +225,11 @@ class DynamicCase(_Named, _Serializable):
         Iq0 =  abs(Ia0) * cos(delta0 - phi0)
 
         # Field voltage.
-        Efd0[typ2] = abs(Eq0) - (xd - xq) * Id0
+        Efd0[typ2] = abs(Eq0) - (p.xd - p.xq) * Id0
 
         # Initial Transient internal EMF.
-        Eq_tr0 = Efd0[typ2] + (xd - xd_tr) * Id0
-        Ed_tr0 = -(xq - xq_tr) * Iq0
+        Eq_tr0 = Efd0[typ2] + (p.xd - p.xd_tr) * Id0
+        Ed_tr0 = -(p.xq - p.xq_tr) * Iq0
 
         Xgen0[typ2, :] = c_[delta0, omega0, Eq_tr0, Ed_tr0]
 
@@ -203,45 +245,39 @@ class DynamicCase(_Named, _Serializable):
         Katholieke Universiteit Leuven. See U{http://www.esat.kuleuven.be/
         electa/teaching/matdyn/} for more information.
 
+        @param Xexc: Initial field voltages.
+        @param Vexc: Generator terminal voltage magnitudes.
+
         @rtype: tuple
         @return: Exciter initial conditions.
         """
-        exciters = self.exciters
-
-        Xexc0 = zeros(Xexc.shape)
-        Pexc0 = zeros(len(exciters))
+        ng = len(self.dyn_generators)
 
-        typ1 = [e.generator._i for e in exciters if e.model ==CONST_EXCITATION]
-        typ2 = [e.generator._i for e in exciters if e.model == IEEE_DC1A]
+        Xexc0 = zeros((ng, 3))
+        Pexc0 = zeros((ng, 12))
 
         # Exciter type 1: constant excitation
-        Efd0 = Xexc[typ1, 0]
+        typ1 = self._exciters[CONST_EXCITATION].rows
+
+        Efd0 = Xexc[typ1]
         Xexc0[typ1, 0] = Efd0
 
         # Exciter type 2: IEEE DC1A
-        Efd0 = Xexc[typ2, 0]
-        Ka = array([e.ka for e in exciters])
-        Ta = array([e.ta for e in exciters])
-        Ke = array([e.ke for e in exciters])
-        Te = array([e.te for e in exciters])
-        Kf = array([e.kf for e in exciters])
-        Tf = array([e.tf for e in exciters])
-        Aex = array([e.aex for e in exciters])
-        Bex = array([e.bex for e in exciters])
-        Ur_min = array([e.ur_min for e in exciters])
-        Ur_max = array([e.ur_max for e in exciters])
-
-        U = Vexc[typ2, 0]
+        p = self._exciters[IEEE_DC1A]
+        typ2 = p.rows
+
+        Efd0 = Xexc[typ2]
+        U = Vexc[typ2]
 
         Uf = zeros(len(typ2))
-        Ux = Aex * exp(Bex * Efd0)
-        Ur = Ux + Ke * Efd0
-        Uref2 = U + (Ux + Ke * Efd0) / Ka - U
+        Ux = p.aex * exp(p.bex * Efd0)
+        Ur = Ux + p.ke * Efd0
+        Uref2 = U + (Ux + p.ke * Efd0) / p.ka - U
         Uref = U
 
         Xexc0[typ2, :] = c_[Efd0, Uf, Ur]
-        Pexc0[typ2, :] = c_[Ka, Ta, Ke, Te, Kf, Tf, Aex, Bex,
-                            Ur_min, Ur_max, Uref, Uref2]
+        Pexc0[typ2, :] = c_[p.ka, p.ta, p.ke, p.te, p.kf, p.tf, p.aex, p.bex,
+                            p.ur_min, p.ur_max, Uref, Uref2]
 
         # Exciter type 3:
 
@@ -255,43 +291,39 @@ class DynamicCase(_Named, _Serializable):
         Katholieke Universiteit Leuven. See U{http://www.esat.kuleuven.be/
         electa/teaching/matdyn/} for more information.
 
+        @param Xgov: Initial mechanical powers.
+        @param Vgov: Initial generator speeds.
+
         @rtype: tuple
         @return: Initial governor conditions.
         """
-        governors = self.governors
+        ng = len(self.dyn_generators)
 
-        Xgov0 = zeros(Xgov.shape)
-        Pgov0 = zeros(len(governors))
-
-        typ1 = [g.generator._i for g in governors if g.model == CONST_POWER]
-        typ2 = [g.generator._i for g in governors if g.model == GENERAL_IEEE]
+        Xgov0 = zeros((ng, 4))
+        Pgov0 = zeros((ng, 9))
 
         # Governor type 1: constant power
-        Pm0 = Xgov[typ1, 0]
+        typ1 = self._governors[CONST_POWER].rows
+
+        Pm0 = Xgov[typ1]
         Xgov0[typ1, 0] = Pm0
 
         # Governor type 2: IEEE general speed-governing system
-        Pm0 = Xgov[typ2, 0]
+        p = self._governors[GENERAL_IEEE]
+        typ2 = p.rows
 
-        K = array([g.k for g in governors])
-        T1 = array([g.t1 for g in governors])
-        T2 = array([g.t2 for g in governors])
-        T3 = array([g.t3 for g in governors])
-        Pup = array([g.p_up for g in governors])
-        Pdown = array([g.p_down for g in governors])
-        Pmax = array([g.p_max for g in governors])
-        Pmin = array([g.p_min for g in governors])
-
-        omega0 = Vgov[typ2, 0]
+        Pm0 = Xgov[typ2]
+        omega0 = Vgov[typ2]
 
         zz0 = Pm0
         PP0 = Pm0
 
-        P0 = K * (2 * pi * self.freq - omega0)
-        xx0 = T1 * (1 - T2 / T1) * (2 * pi * self.freq - omega0)
+        P0 = p.k * (2 * pi * self.freq - omega0)
+        xx0 = p.t1 * (1 - p.t2 / p.t1) * (2 * pi * self.freq - omega0)
 
         Xgov0[typ2, :] = c_[Pm0, P0, xx0, zz0]
-        Pgov0[typ2, :] = c_[K, T1, T2, T3, Pup, Pdown, Pmax, Pmin, PP0]
+        Pgov0[typ2, :] = c_[p.k, p.t1, p.t2, p.t3, p.p_up, p.p_down,
+                            p.p_max, p.p_min, PP0]
 
         # Governor type 3:
 
@@ -311,33 +343,29 @@ class DynamicCase(_Named, _Serializable):
         @rtype: tuple
         @return: Currents and electric power of generators.
         """
-        generators = self.dyn_generators
-
         # Initialise.
-        ng = len(generators)
+        ng = len(Xg)
         Id = zeros(ng)
         Iq = zeros(ng)
         Pe = zeros(ng)
 
-        typ1 = [g._i for g in generators if g.model == CLASSICAL]
-        typ2 = [g._i for g in generators if g.model == FOURTH_ORDER]
-
         # Generator type 1: classical model
+        p = self._generators[CLASSICAL]
+        typ1 = p.rows
+
         delta = Xg[typ1, 0]
         Eq_tr = Xg[typ1, 2]
 
-        xd = array([g.xd for g in generators])
-
         Pe[typ1] = \
-            1 / xd * abs(U[typ1]) * abs(Eq_tr) * sin(delta - angle(U[typ1]))
+            1 / p.xd * abs(U[typ1]) * abs(Eq_tr) * sin(delta - angle(U[typ1]))
 
         # Generator type 2: 4th order model
-        delta = Xg[typ1, 0]
-        Eq_tr = Xg[typ1, 2]
-        Ed_tr = Xg[typ1, 3]
+        p = self._generators[FOURTH_ORDER]
+        typ2 = p.rows
 
-        xd_tr = array([g.xd_tr for g in generators])
-        xq_tr = array([g.xq_tr for g in generators])
+        delta = Xg[typ2, 0]
+        Eq_tr = Xg[typ2, 2]
+        Ed_tr = Xg[typ2, 3]
 
         theta = angle(U)
 
@@ -345,12 +373,12 @@ class DynamicCase(_Named, _Serializable):
         vd = -abs(U[typ2]) * sin(delta - theta[typ2])
         vq =  abs(U[typ2]) * cos(delta - theta[typ2])
 
-        Id[typ2] =  (vq - Eq_tr) / xd_tr
-        Iq[typ2] = -(vd - Ed_tr) / xq_tr
+        Id[typ2] =  (vq - Eq_tr) / p.xd_tr
+        Iq[typ2] = -(vd - Ed_tr) / p.xq_tr
 
         Pe[typ2] = \
             Eq_tr * Iq[typ2] + Ed_tr * Id[typ2] + \
-            (xd_tr - xq_tr) * Id[typ2] * Iq[typ2]
+            (p.xd_tr - p.xq_tr) * Id[typ2] * Iq[typ2]
 
         return Id, Iq, Pe
 
@@ -363,37 +391,34 @@ class DynamicCase(_Named, _Serializable):
         @rtype: array
         @return: Bus voltages.
         """
-        generators = self.dyn_generators
         j = 0 + 1j
 
         ng = len(gbus)
-        Igen = zeros(ng)
+        Igen = zeros(ng, dtype=complex)
 
-        s = len(augYbus_solver)
-        Ig = zeros(s)
-
-        # Define generator types.
-        typ1 = [g._i for g in generators if g.model == CLASSICAL]
-        typ2 = [g._i for g in generators if g.model == FOURTH_ORDER]
+        s = augYbus_solver.shape[0]
+        Ig = zeros(s, dtype=complex)
 
         # Generator type 1: classical model
+        p = self._generators[CLASSICAL]
+        typ1 = p.rows
+
         delta = Xgen[typ1, 0]
         Eq_tr = Xgen[typ1, 2]
 
-        xd_tr = array([g.xd_tr for g in generators])[typ1]
-
         # Calculate generator currents
-        Igen[typ1] = (Eq_tr * exp(j * delta)) / (j * xd_tr)
+        Igen[typ1] = (Eq_tr * exp(j * delta)) / (j * p.xd_tr)
 
         # Generator type 2: 4th order model
+        p = self._generators[FOURTH_ORDER]
+        typ2 = p.rows
+
         delta = Xgen[typ2, 0]
         Eq_tr = Xgen[typ2, 2]
         Ed_tr = Xgen[typ2, 3]
 
-        xd_tr = array([g.xd_tr for g in generators])[typ2] # Pgen(type2,8)
-
         # Calculate generator currents. (Padiyar, p.417.)
-        Igen[typ2] = (Eq_tr + j * Ed_tr) * exp(j * delta) / (j * xd_tr)
+        Igen[typ2] = (Eq_tr + j * Ed_tr) * exp(j * delta) / (j * p.xd_tr)
 
         # Calculations --------------------------------------------------------
 
@@ -413,48 +438,34 @@ class DynamicCase(_Named, _Serializable):
         Universiteit Leuven. See U{http://www.esat.kuleuven.be/electa/teaching/
         matdyn/} for more information.
         """
-        exciters = self.exciters
-
         F = zeros(Xexc.shape)
 
-        typ1 = [e.generator._i for e in exciters if e.model ==CONST_EXCITATION]
-        typ2 = [e.generator._i for e in exciters if e.model == IEEE_DC1A]
-
         # Exciter type 1: constant excitation
+        typ1 = self._exciters[CONST_EXCITATION].rows
+
         F[typ1, :] = 0.0
 
         # Exciter type 2: IEEE DC1A
+        p = self._exciters[IEEE_DC1A]
+        typ2 = p.rows
+
         Efd = Xexc[typ2, 0]
         Uf = Xexc[typ2, 1]
         Ur = Xexc[typ2, 2]
 
-        Ka = Pexc[typ2, 0]
-        Ta = Pexc[typ2, 1]
-        Ke = Pexc[typ2, 2]
-        Te = Pexc[typ2, 3]
-        Kf = Pexc[typ2, 4]
-        Tf = Pexc[typ2, 5]
-        Aex = Pexc[typ2, 6]
-        Bex = Pexc[typ2, 7]
-        Ur_min = Pexc[typ2, 8]
-        Ur_max = Pexc[typ2, 9]
         Uref = Pexc[typ2, 10]
         Uref2 = Pexc[typ2, 11]
 
-        U = Vexc[typ2, 1]
+        U = Vexc[typ2]
 
-        Ux = Aex * exp(Bex * Efd)
-        dUr = 1 / Ta * (Ka * (Uref - U + Uref2 - Uf) - Ur)
-        dUf = 1 / Tf * (Kf / Te * (Ur - Ux - Ke * Efd) - Uf)
+        Ux = p.aex * exp(p.bex * Efd)
+        dUr = 1 / p.ta * (p.ka * (Uref - U + Uref2 - Uf) - Ur)
+        dUf = 1 / p.tf * (p.kf / p.te * (Ur - Ux - p.ke * Efd) - Uf)
 
-        if sum(flatnonzero(Ur > Ur_max)) >= 1:
-            Ur2 = Ur_max
-        elif sum(flatnonzero(Ur < Ur_max)) >= 1:
-            Ur2 = Ur_min
-        else:
-            Ur2 = Ur
+        # Regulator output limits.
+        Ur2 = minimum(maximum(Ur, p.ur_min), p.ur_max)
 
-        dEfd = 1 / Te * (Ur2 - Ux - Ke * Efd)
+        dEfd = 1 / p.te * (Ur2 - Ux - p.ke * Efd)
         F[typ2, :] = c_[dEfd, dUf, dUr]
 
         # Exciter type 3:
@@ -471,55 +482,40 @@ class DynamicCase(_Named, _Serializable):
         Universiteit Leuven. See U{http://www.esat.kuleuven.be/electa/teaching/
         matdyn/} for more information.
         """
-        governors = self.governors
         omegas = 2 * pi * self.freq
 
         F = zeros(Xgov.shape)
 
-        typ1 = [g.generator._i for g in governors if g.model == CONST_POWER]
-        typ2 = [g.generator._i for g in governors if g.model == GENERAL_IEEE]
-
         # Governor type 1: constant power
+        typ1 = self._governors[CONST_POWER].rows
+
         F[typ1, 0] = 0
 
         # Governor type 2: IEEE general speed-governing system
+        p = self._governors[GENERAL_IEEE]
+        typ2 = p.rows
+
         Pm = Xgov[typ2, 0]
         P = Xgov[typ2, 1]
         x = Xgov[typ2, 2]
         z = Xgov[typ2, 3]
 
-        K = Pgov[typ2, 0]
-        T1 = Pgov[typ2, 1]
-        T2 = Pgov[typ2, 2]
-        T3 = Pgov[typ2, 3]
-        Pup = Pgov[typ2, 4]
-        Pdown = Pgov[typ2, 5]
-        Pmax = Pgov[typ2, 6]
-        Pmin = Pgov[typ2, 7]
         P0 = Pgov[typ2, 8]
 
-        omega = Vgov[typ2, 0]
-
-        dx = K * (-1 / T1 * x + (1 - T2 / T1) * (omega - omegas))
-        dP = 1 / T1 * x + T2 / T1 * (omega - omegas)
+        omega = Vgov[typ2]
 
-        y = 1 / T3 * (P0 - P - Pm)
+        dx = p.k * (-1 / p.t1 * x + (1 - p.t2 / p.t1) * (omega - omegas))
+        dP = 1 / p.t1 * x + p.t2 / p.t1 * (omega - omegas)
 
-        y2 = y
+        y = 1 / p.t3 * (P0 - P - Pm)
 
-        if sum(flatnonzero(y > Pup)) >= 1:
-            y2 = (1 - flatnonzero(y > Pup)) * y2 + flatnonzero(y > Pup) * Pup
-        if sum(flatnonzero(y < Pdown)) >= 1:
-            y2 = (1 - flatnonzero(y<Pdown)) * y2 + flatnonzero(y<Pdown) * Pdown
+        # Ramp limits.
+        y2 = minimum(maximum(y, p.p_down), p.p_up)
 
         dz = y2
 
-        dPm = y2
-
-        if sum(flatnonzero(z > Pmax)) >= 1:
-            dPm = (1 - flatnonzero(z > Pmax)) * dPm + flatnonzero(z > Pmax) * 0
-        if sum(flatnonzero(z < Pmin)) >= 1:
-            dPm = (1 - flatnonzero(z < Pmin)) * dPm + flatnonzero(z < Pmin) * 0
+        # Turbine output limits.
+        dPm = where((z > p.p_max) | (z < p.p_min), 0.0, y2)
 
         F[typ2, :] = c_[dPm, dP, dx, dz]
 
@@ -536,44 +532,36 @@ class DynamicCase(_Named, _Serializable):
         Based on Generator.m from MatDyn by Stijn Cole, developed at Katholieke
         Universiteit Leuven. See U{http://www.esat.kuleuven.be/electa/teaching/
         matdyn/} for more information.
+
+        @param Vgen: Generator currents and electric power, c_[Id, Iq, Pe].
         """
-        generators = self.dyn_generators
         omegas = 2 * pi * self.freq
 
         F = zeros(Xgen.shape)
 
-        typ1 = [g._i for g in generators if g.model == CLASSICAL]
-        typ2 = [g._i for g in generators if g.model == FOURTH_ORDER]
-
         # Generator type 1: classical model
+        p = self._generators[CLASSICAL]
+        typ1 = p.rows
+
         omega = Xgen[typ1, 1]
         Pm0 = Xgov[typ1, 0]
 
-        H = array([g.h for g in generators])[typ1]
-        D = array([g.d for g in generators])[typ1]
-
         Pe = Vgen[typ1, 2]
 
-        ddelta = omega = omegas
-        domega = pi * self.freq / H * (-D * (omega - omegas) + Pm0 - Pe)
+        ddelta = omega - omegas
+        domega = pi * self.freq / p.h * (-p.d * (omega - omegas) + Pm0 - Pe)
         dEq = zeros(len(typ1))
 
-        F[typ1, :] = c_[ddelta, domega, dEq]
+        F[typ1, :3] = c_[ddelta, domega, dEq]
 
         # Generator type 2: 4th order model
+        p = self._generators[FOURTH_ORDER]
+        typ2 = p.rows
+
         omega = Xgen[typ2, 1]
         Eq_tr = Xgen[typ2, 2]
         Ed_tr = Xgen[typ2, 3]
 
-        H = array([g.h for g in generators])
-        D = array([g.d for g in generators])
-        xd = array([g.xd for g in generators])
-        xq = array([g.xq for g in generators])
-        xd_tr = array([g.xd_tr for g in generators])
-        xq_tr = array([g.xq_tr for g in generators])
-        Td0_tr = array([g.td for g in generators])
-        Tq0_tr = array([g.tq for g in generators])
-
         Id = Vgen[typ2, 0]
         Iq = Vgen[typ2, 1]
         Pe = Vgen[typ2, 2]
@@ -582,9 +570,9 @@ class DynamicCase(_Named, _Serializable):
         Pm = Xgov[typ2, 0]
 
         ddelta = omega - omegas
-        domega = pi * self.freq / H * (-D * (omega - omegas) + Pm - Pe)
-        dEq = 1 / Td0_tr * (Efd - Eq_tr + (xd - xd_tr) * Id)
-        dEd = 1 / Tq0_tr * (-Ed_tr - (xq - xq_tr) * Iq)
+        domega = pi * self.freq / p.h * (-p.d * (omega - omegas) + Pm - Pe)
+        dEq = 1 / p.td * (Efd - Eq_tr + (p.xd - p.xd_tr) * Id)
+        dEd = 1 / p.tq * (-Ed_tr - (p.xq - p.xq_tr) * Iq)
 
         F[typ2, :] = c_[ddelta, domega, dEq, dEd]
 
@@ -594,6 +582,25 @@ class DynamicCase(_Named, _Serializable):
 
         return F
 
+#------------------------------------------------------------------------------
+#  "_ParameterTable" class:
+#------------------------------------------------------------------------------
+
+class _ParameterTable(object):
+    """ Defines the parameters of the components with one type of model as
+    arrays.
+    """
+
+    def __init__(self, components, rows, names):
+        """ Initialises a new _ParameterTable instance.
+        """
+        #: Rows of the components in the state matrices.
+        self.rows = array(rows, dtype=int)
+
+        for name in names:
+            setattr(self, name, array([getattr(c, name) for c in components],
+                                      dtype=float))
+
 #------------------------------------------------------------------------------
 #  "DynamicSolver" class:
 #------------------------------------------------------------------------------
@@ -612,20 +619,25 @@ class DynamicSolver(object):
     """
 
     def __init__(self, dyn_case, method=None, tol=1e-04,
-                 minstep=1e-03, maxstep=1e02, verbose=True, plot=True):
+                 minstep=1e-03, maxstep=1e02, verbose=True, plot=False):
 
         #: Dynamic case.
         self.dyn_case = dyn_case
 
         #: Integration method.
         self.method = ModifiedEuler() if method is None else method
+        self.method.dyn_case = dyn_case
+        if isinstance(self.method, RungeKuttaFehlberg):
+            self.method.tol = tol
+            self.method.maxstep = maxstep
 
         #: Specify the tolerance of the error. This argument is only used for
         #: the Runge-Kutta Fehlberg and Higham and Hall methods.
         self.tol = tol
 
         #: Sets the minimum step size. Only used by the adaptive step size
-        #: algorithms: Runge-Kutta Fehlberg and Higham and Hall methods.
+        #: algorithms: Runge-Kutta Fehlberg and Higham and Hall methods, and
+        #: when the steps of the trapezoidal rule are halved.
         self.minstep = minstep
 
         #: Sets the maximal step size. Only used by the adaptive step size
@@ -638,6 +650,9 @@ class DynamicSolver(object):
         #: Draw plot?
         self.plot = plot
 
+        # Parameter tables of the generator, exciter and governor models.
+        dyn_case.tabulate()
+
 
     def solve(self):
         """ Runs dynamic simulation.
@@ -658,10 +673,13 @@ class DynamicSolver(object):
                    - C{failed} - failed steps
                    - C{time} - time points
         """
+        if self.plot:
+            raise NotImplementedError("Plotting is not implemented.")
+
         t0 = time()
-        buses = self.dyn_case.buses
+        buses = self.dyn_case.case.connected_buses
 
-        solution = NewtonPF(self.case).solve()
+        solution = NewtonPF(self.dyn_case.case).solve()
 
         if not solution["converged"]:
             logger.error("Power flow did not converge. Exiting...")
@@ -673,7 +691,7 @@ class DynamicSolver(object):
         if self.verbose:
             logger.info("Constructing augmented admittance matrix...")
 
-        gbus = [g.bus._i for g in self.dyn_generators]
+        gbus = [g.generator.bus._i for g in self.dyn_case.dyn_generators]
         ng = len(gbus)
 
         Um = array([bus.v_magnitude for bus in buses])
@@ -682,17 +700,17 @@ class DynamicSolver(object):
         U00 = U0
 
         augYbus = self.dyn_case.getAugYbus(U0, gbus)
-        augYbus_solver = splu(augYbus)
+        augYbus_solver = splu(augYbus.tocsc())
 
         # Calculate initial machine state.
         if self.verbose:
             logger.info("Calculating initial state...")
 
-        Efd0, Xgen0 = self.dyn_case.generatorInit(U0)
+        Efd0, Xgen0 = self.dyn_case.generatorInit(U0[gbus])
         omega0 = Xgen0[:, 1]
 
-        Id0, Iq0, Pe0 = self.dyn_case.machineCurrents(Xgen0, U0)
-        Vgen0 = r_[Id0, Iq0, Pe0]
+        Id0, Iq0, Pe0 = self.dyn_case.machineCurrents(Xgen0, U0[gbus])
+        Vgen0 = c_[Id0, Iq0, Pe0]
 
         # Exciter initial conditions.
         Vexc0 = abs(U0[gbus])
@@ -709,15 +727,15 @@ class DynamicSolver(object):
         Fgen0 = self.dyn_case.generator(Xgen0, Xexc0, Xgov0, Vgen0)
 
         # Check Generator Steady-state
-        if sum(abs(Fgen0)) > 1e-06:
+        if abs(Fgen0).sum() > 1e-06:
             logger.error("Generator not in steady-state. Exiting...")
             return {}
         # Check Exciter Steady-state
-        if sum(abs(Fexc0)) > 1e-06:
+        if abs(Fexc0).sum() > 1e-06:
             logger.error("Exciter not in steady-state. Exiting...")
             return {}
         # Check Governor Steady-state
-        if sum(abs(Fgov0)) > 1e-06:
+        if abs(Fgov0).sum() > 1e-06:
             logger.error("Governor not in steady-state. Exiting...")
             return {}
 
@@ -726,228 +744,134 @@ class DynamicSolver(object):
 
         # Initialization of main stability loop.
         t = -0.02 # simulate 0.02s without applying events
-        erst = False
-        failed = False
-        eulerfailed = False
+        failed = 0
 
         stoptime = self.dyn_case.stoptime
 
-        if (isinstance(self.method, RungeKuttaFehlberg) or
-            isinstance(self.method, RungeKuttaHighamHall)):
+        adaptive = isinstance(self.method, RungeKuttaFehlberg)
+        if adaptive:
             stepsize = self.minstep
         else:
             stepsize = self.dyn_case.stepsize
 
+        events = sorted(self.dyn_case.events, key=lambda e: e.time)
         ev = 0
-        eventhappened = False
-        i = 0
 
-        # Allocate memory for variables.
-        if self.verbose:
-            logger.info("Allocating memory...")
-
-        chunk = 5000
-        time = zeros(chunk)
-        time[0, :] = t
-        errest = zeros(chunk)
-        errest[0, :] = erst
-        stepsizes = zeros(chunk)
-        stepsizes[0, :] = stepsize
-
-        # System variables
-        voltages = zeros(chunk)
-        voltages[0, :] = U0.H
-
-        # Generator
-        angles = zeros((chunk, ng))
-        angles[0, :] = Xgen0[:, 0] * 180.0 / pi
-        speeds = zeros((chunk, ng))
-        speeds[0, :] = Xgen0[:, 0] / 2 * pi * self.dyn_case.freq
-        Eq_tr = zeros((chunk, ng))
-        Eq_tr[0, :] = Xgen0[:, 2]
-        Ed_tr = zeros((chunk, ng))
-        Ed_tr[0, :] = Xgen0[:, 3]
-
-        # Exciter and governor
-        Efd = zeros((chunk, ng))
-        Efd[0, :] = Efd0[:, 0]
-        PM = zeros((chunk, ng))
-        PM[0, :] = Pm0[:, 0]
+        # Saved values.
+        times = [t]
+        stepsizes = [stepsize]
+        errest = [0.0]
+        voltages = [U0]
+        angles = [Xgen0[:, 0] * 180.0 / pi]
+        speeds = [Xgen0[:, 1] / (2 * pi * self.dyn_case.freq)]
+        Eq_tr = [Xgen0[:, 2]]
+        Ed_tr = [Xgen0[:, 3]]
+        Efd = [Xexc0[:, 0]]
+        PM = [Xgov0[:, 0]]
+
+        def save():
+            times.append(t)
+            stepsizes.append(stepsize)
+            errest.append(getattr(self.method, "errest", 0.0))
+            voltages.append(U0)
+            angles.append(Xgen0[:, 0] * 180.0 / pi)
+            speeds.append(Xgen0[:, 1] / (2 * pi * self.dyn_case.freq))
+            Eq_tr.append(Xgen0[:, 2])
+            Ed_tr.append(Xgen0[:, 3])
+            Efd.append(Xexc0[:, 0])
+            PM.append(Xgov0[:, 0])
 
         # Main stability loop.
-        while t < stoptime + stepsize:
+        i = 0
+        while t < stoptime - EVENT_TOL:
             i += 1
             if i % 45 == 0 and self.verbose:
-                logger.info("%6.2f%% completed." % t / stoptime * 100)
+                logger.info("%6.2f%% completed." % (t / stoptime * 100))
+
+            # End exactly at the next event or at the stop time.
+            if ev < len(events) and t + stepsize > events[ev].time:
+                stepsize = events[ev].time - t
+            if t + stepsize > stoptime:
+                stepsize = stoptime - t
 
             # Numerical Method.
-            Xgen0, self.Pgen0, Vgen0, Xexc0, Pexc0, Vexc0, Xgov0, Pgov0, \
-                Vgov0, U0, t, newstepsize = self.method.solve(t, Xgen0,
-                    self.Pgen0, Vgen0, Xexc0, Pexc0, Vexc0, Xgov0, Pgov0,
-                    Vgov0, augYbus_solver, gbus, stepsize)
-
-#            if self.method == MODIFIED_EULER:
-#                solver = ModifiedEuler(t, Xgen0, self.Pgen0, Vgen0, Xexc0,
-#                                       Pexc0, Vexc0, Xgov0, Pgov0, Vgov0,
-#                                       augYbus_solver, gbus, stepsize)
-#
-#                Xgen0, self.Pgen0, Vgen0, Xexc0, Pexc0, Vexc0, Xgov0, Pgov0,
-#                Vgov0, U0, t, newstepsize = solver.solve()
-#            elif self.method == RUNGE_KUTTA:
-#                pass
-#            elif self.method == RUNGE_KUTTA_FEHLBERG:
-#                pass
-#            elif self.method == HIGHAM_HALL:
-#                pass
-#            elif self.method == MODIFIED_EULER2:
-#                pass
-#            else:
-#                raise ValueError
-
-            if eulerfailed:
-                logger.info("No solution found. Exiting... ")
+            Xgen1, _, Vgen1, Xexc1, _, Vexc1, Xgov1, _, Vgov1, U1, _, \
+                newstepsize = self.method.solve(t, Xgen0, None, Vgen0, Xexc0,
+                    Pexc0, Vexc0, Xgov0, Pgov0, Vgov0, augYbus_solver, gbus,
+                    stepsize)
+
+            if getattr(self.method, "eulerfailed", False):
+                logger.error("No solution found. Exiting...")
                 return {}
 
-            if failed:
-                t = t - stepsize
+            # Steps rejected by the adaptive methods, or in which the
+            # implicit methods do not converge, are repeated with the new
+            # step size.
+            if getattr(self.method, "failed", False):
+                failed += 1
+                if newstepsize < self.minstep:
+                    logger.error("No solution found with minimum step size. "
+                                 "Exiting...")
+                    return {}
+                stepsize = newstepsize
+                continue
 
-            # End exactly at stop time.
-            if t + newstepsize > stoptime:
-                newstepsize = stoptime - t
-            elif stepsize < self.minstep:
-                logger.info("No solution found with minimum step size. Exiting... ")
-                return {}
+            Xgen0, Vgen0, Xexc0, Vexc0, Xgov0, Vgov0, U0 = \
+                Xgen1, Vgen1, Xexc1, Vexc1, Xgov1, Vgov1, U1
 
-            # Allocate new memory chunk if matrices are full.
-            if i > time.shape[0]:
-                time = zeros(chunk)
-                errest = zeros(chunk)
-                stepsize = zeros(chunk)
-                voltages = zeros(chunk)
-                angles = zeros((chunk, ng))
-                speeds = zeros((chunk, ng))
-                Eq_tr = zeros((chunk, ng))
-                Ed_tr = zeros((chunk, ng))
-                Efd = zeros((chunk, ng))
-                PM = zeros((chunk, ng))
-
-            # Save values.
-            stepsizes[i, :] = stepsize
-            errest[i, :] = erst
-            time[i, :] = t
-
-            voltages[i, :] = U0
-
-            # Exciters
-            Efd[i, :] = Xexc0[:, 0]
-            # TODO: Set Efd to zero when using classical generator model.
-
-            # Governors
-            PM[i, :] = Xgov0[:, 0]
-
-            # Generators
-            angles[i, :] = Xgen0[:, 0] * 180.0 / pi
-            speeds[i, :] = Xgen0[:, 1] * (2 * pi * self.dyn_case.freq)
-            Eq_tr[i, :] = Xgen0[:, 2]
-            Ed_tr[i, :] = Xgen0[:, 3]
-
-            # Adapt step size if event will occur in next step.
-            if (len(self.events) > 0 and ev <= len(self.events) and
-                isinstance(self.method, RungeKuttaFehlberg) and
-                isinstance(self.method, RungeKutta)):
-
-                if t + newstepsize >= self.events[ev].t:
-                    if self.events[ev] - t < newstepsize:
-                        newstepsize = self.events[ev].t - t
-
-            # Check for events.
-            if len(self.events) > 0 and ev <= len(self.events):
-                for event in self.events:
-                    if (abs(t - self.events[ev].t) > 10 * EPS or
-                        ev > len(self.events)):
-                        break
-                    else:
-                        eventhappened = True
-
-                    event.obj.set_attr(event.param, event.newval)
-
-                    ev += 1
-
-                if eventhappened:
-                    # Refactorise.
-                    self.dyn_case.getAugYbus(U00, gbus)
-                    U0 = self.dyn_case.solveNetwork(Xgen0, self.Pgen0,
-                                                    augYbus_solver, gbus)
-
-                    Id0, Iq0, Pe0 = self.dyn_case.machineCurrents(Xgen0,
-                                                                  self.Pgen0,
-                                                                  U0[gbus])
-                    Vgen0 = r_[Id0, Iq0, Pe0]
-                    Vexc0 = abs(U0[gbus])
-
-                    # Decrease stepsize after event occured.
-                    if (isinstance(self.method, RungeKuttaFehlberg) or
-                        isinstance(self.method, RungeKuttaHighamHall)):
-
-                        newstepsize = self.minstepsize
-
-                    # If event occurs, save values at t- and t+.
-                    i += 1
-
-                    # Save values
-                    stepsize[i, :] = stepsize.T
-                    errest[i, :] = erst.T
-                    time[i, :] = t
-
-                    voltages[i, :] = U0.T
-
-                    # Exciters.
-                    # Set Efd to zero when using classical generator model.
-#                    Efd[i, :] = Xexc0[:, 1] * (flatnonzero(genmodel > 1))
-
-                    # Governors.
-                    PM[i, :] = Xgov0[:, 1]
-
-                    # Generators.
-                    angles[i, :] = Xgen0[:, 0] * 180.0 / pi
-                    speeds[i, :] = Xgen0[:, 1] / (2.0 * pi * self.freq)
-                    Eq_tr[i, :] = Xgen0[:, 2]
-                    Ed_tr[i, :] = Xgen0[:, 3]
-
-                    eventhappened = False
-
-            # Advance time
-            stepsize = newstepsize
             t += stepsize
+            save()
+
+            # Apply the events at this instant.
+            eventhappened = False
+            while ev < len(events) and events[ev].time - t < EVENT_TOL:
+                event = events[ev]
+                if isinstance(event, BusChange):
+                    setattr(event.bus, event.param, event.newval)
+                else:
+                    setattr(event.branch, event.param, event.newval)
+                eventhappened = True
+                ev += 1
+
+            if eventhappened:
+                # Refactorise.  The implicit methods refactorise their
+                # iteration matrix for the new network.
+                augYbus = self.dyn_case.getAugYbus(U00, gbus)
+                augYbus_solver = splu(augYbus.tocsc())
+                U0 = self.dyn_case.solveNetwork(Xgen0, augYbus_solver, gbus)
+
+                Id0, Iq0, Pe0 = self.dyn_case.machineCurrents(Xgen0, U0[gbus])
+                Vgen0 = c_[Id0, Iq0, Pe0]
+                Vexc0 = abs(U0[gbus])
+
+                # Decrease stepsize after event occured.
+                if adaptive:
+                    newstepsize = self.minstep
+
+                # If event occurs, save values at t- and t+.
+                save()
+
+            # Next step size.
+            if adaptive:
+                stepsize = newstepsize
+            else:
+                stepsize = self.dyn_case.stepsize
 
         # End of main stability loop ------------------------------------------
 
         # Output --------------------------------------------------------------
 
         if self.verbose:
-            logger.info("100%% completed")
+            logger.info("100% completed")
             elapsed = time() - t0
             logger.info("Simulation completed in %5.2f seconds." % elapsed)
 
-        # Save only the first i elements.
-        angles = angles[0:i, :]
-        speeds = speeds[0:i, :]
-        Eq_tr = Eq_tr[0:i, :]
-        Ed_tr = Ed_tr[0:i, :]
-
-        Efd = Efd[0:i, :]
-        PM = PM[0:i, :]
-
-        voltages = voltages[0:i, :]
-
-        stepsize = stepsize[0:i, :]
-        errest = errest[0:i, :]
-        time = time[0:i, :]
-
-        if self.plot:
-            raise NotImplementedError
-
-        return {}
+        return {"angles": array(angles), "speeds": array(speeds),
+                "eq_tr": array(Eq_tr), "ed_tr": array(Ed_tr),
+                "efd": array(Efd), "pm": array(PM),
+                "voltages": array(voltages), "stepsize": array(stepsizes),
+                "errest": array(errest), "failed": failed,
+                "time": array(times)}
 
 #------------------------------------------------------------------------------
 #  "ModifiedEuler" class:
@@ -961,6 +885,11 @@ class ModifiedEuler(object):
     matdyn/} for more information.
     """
 
+    def __init__(self, dyn_case=None):
+        #: Dynamic case.
+        self.dyn_case = dyn_case
+
+
     def solve(self, t, Xgen0, Pgen, Vgen0, Xexc0, Pexc, Vexc0, Xgov0, Pgov,
             Vgov0, augYbus_solver, gbus, stepsize):
         case = self.dyn_case
@@ -969,51 +898,51 @@ class ModifiedEuler(object):
 
         # Exciters.
         dFexc0 = case.exciter(Xexc0, Pexc, Vexc0)
-        Xexc1 = Xexc0 + case.stepsize * dFexc0
+        Xexc1 = Xexc0 + stepsize * dFexc0
 
         # Governors.
         dFgov0 = case.governor(Xgov0, Pgov, Vgov0)
-        Xgov1 = Xgov0 + case.stepsize * dFgov0
+        Xgov1 = Xgov0 + stepsize * dFgov0
 
         # Generators.
-        dFgen0 = case.generator(Xgen0, Xexc1, Xgov1, Pgen,Vgen0)
-        Xgen1 = Xgen0 + case.stepsize * dFgen0
+        dFgen0 = case.generator(Xgen0, Xexc0, Xgov0, Vgen0)
+        Xgen1 = Xgen0 + stepsize * dFgen0
 
         # Calculate system voltages.
-        U1 = case.solveNetwork(Xgen1, Pgen, augYbus_solver,gbus)
+        U1 = case.solveNetwork(Xgen1, augYbus_solver, gbus)
 
         # Calculate machine currents and power.
-        Id1, Iq1, Pe1 = case.machineCurrents(Xgen1, Pgen, U1[gbus])
+        Id1, Iq1, Pe1 = case.machineCurrents(Xgen1, U1[gbus])
 
         # Update variables that have changed.
         Vexc1 = abs(U1[gbus])
-        Vgen1 = r_[Id1, Iq1, Pe1]
-        Vgov1 = Xgen1[:, 2]
+        Vgen1 = c_[Id1, Iq1, Pe1]
+        Vgov1 = Xgen1[:, 1]
 
         # Second Euler step ---------------------------------------------------
 
         # Exciters.
         dFexc1 = case.exciter(Xexc1, Pexc, Vexc1)
-        Xexc2 = Xexc0 + case.stepsize / 2 * (dFexc0 + dFexc1)
+        Xexc2 = Xexc0 + stepsize / 2 * (dFexc0 + dFexc1)
 
         # Governors.
         dFgov1 = case.governor(Xgov1, Pgov, Vgov1)
-        Xgov2 = Xgov0 + case.stepsize / 2 * (dFgov0 + dFgov1)
+        Xgov2 = Xgov0 + stepsize / 2 * (dFgov0 + dFgov1)
 
         # Generators.
-        dFgen1 = case.generator(Xgen1, Xexc2, Xgov2, Pgen, Vgen1)
-        Xgen2 = Xgen0 + case.stepsize / 2 * (dFgen0 + dFgen1)
+        dFgen1 = case.generator(Xgen1, Xexc1, Xgov1, Vgen1)
+        Xgen2 = Xgen0 + stepsize / 2 * (dFgen0 + dFgen1)
 
         # Calculate system voltages.
-        U2 = case.solveNetwork(Xgen2, Pgen, augYbus_solver, gbus)
+        U2 = case.solveNetwork(Xgen2, augYbus_solver, gbus)
 
         # Calculate machine currents and power.
-        Id2, Iq2, Pe2 = case.machineCurrents(Xgen2, Pgen, U2[gbus])
+        Id2, Iq2, Pe2 = case.machineCurrents(Xgen2, U2[gbus])
 
         # Update variables that have changed.
-        Vgen2 = r_[Id2, Iq2, Pe2]
+        Vgen2 = c_[Id2, Iq2, Pe2]
         Vexc2 = abs(U2[gbus])
-        Vgov2 = Xgen2[:, 2]
+        Vgov2 = Xgen2[:, 1]
 
         return Xgen2, Pgen, Vgen2, Xexc2, Pexc, Vexc2, \
             Xgov2, Pgov, Vgov2, U2, t, stepsize
@@ -1030,10 +959,13 @@ class RungeKutta(object):
     matdyn/} for more information.
     """
 
-    def __init__(self):
+    def __init__(self, dyn_case=None):
+        #: Dynamic case.
+        self.dyn_case = dyn_case
+
         #: Runge-Kutta coefficients.
         self._a = array([0.0, 0.0, 0.0, 0.0, 1.0/2.0, 0.0, 0.0, 0.0, 0.0,
-                         1.0/2.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0])
+                         1.0/2.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0]).reshape(4, 4)
         #: Runge-Kutta coefficients.
         self._b = array([1.0/6.0, 2.0/6.0, 2.0/6.0, 1.0/6.0])
         # self._c = array([0.0, 1.0/2.0, 1.0/2.0, 1.0]) # not used
@@ -1042,154 +974,56 @@ class RungeKutta(object):
     def solve(self, t, Xgen0, Pgen, Vgen0, Xexc0, Pexc, Vexc0, Xgov0, Pgov,
             Vgov0, augYbus_solver, gbus, stepsize):
 
-        Xexc1, Vexc1, Kexc1, Xgov1, Vgov1, Kgov1, Xgen1, Vgen1, Kgen1, _ = \
-            self._k1()
-
-        Xexc2, Vexc2, Kexc2, Xgov2, Vgov2, Kgov2, Xgen2, Vgen2, Kgen2, _ = \
-            self._k2(Xexc1, Vexc1, Kexc1, Xgov1, Vgov1, Kgov1, Xgen1, Vgen1,
-                Kgen1)
-
-        Xexc3, Vexc3, Kexc3, Xgov3, Vgov3, Kgov3, Xgen3, Vgen3, Kgen3, _ = \
-            self._k3(Xexc2, Vexc2, Kexc2, Kexc1, Xgov2, Vgov2, Kgov2, Kgov1,
-                Xgen2, Vgen2, Kgen2, Kgen1)
+        Xgen4, Vgen4, Xexc4, Vexc4, Xgov4, Vgov4, U4, _ = self._stages(
+            self._b, Xgen0, Vgen0, Xexc0, Pexc, Vexc0, Xgov0, Pgov, Vgov0,
+            augYbus_solver, gbus, stepsize)
 
-        Xexc4, Vexc4, _, Xgov4, Vgov4, _, Xgen4, Vgen4, _, U4 = \
-            self._k4(Xexc3, Vexc3, Kexc3, Kexc2, Kexc1, Xgov3, Vgov3, Kgov3,
-                Kgov2, Kgov1, Xgen3, Vgen3, Kgen3, Kgen2, Kgen1)
+        return Xgen4, Pgen, Vgen4, Xexc4, Pexc, Vexc4, \
+            Xgov4, Pgov, Vgov4, U4, t, stepsize
 
-        return Xgen4, Vgen4, Xexc4, Vexc4, Xgov4, Vgov4, U4
 
+    def _stages(self, b, Xgen0, Vgen0, Xexc0, Pexc, Vexc0, Xgov0, Pgov, Vgov0,
+                augYbus_solver, gbus, stepsize):
+        """ Evaluates the stages of the method.  The state after each stage
+        is found with the next row of the coefficients, or with b after the
+        last stage, and the network is solved for it.
 
-    def _k1(self, Xexc0, Pexc, Vexc0, Xgov0, Pgov, Vgov0, Xgen0, Pgen, Vgen0,
-            augYbus_solver, gbus):
-        case = self.dyn_case
-        a = self._a
-
-        # Exciters.
-        Kexc1 = case.exciter(Xexc0, Pexc, Vexc0)
-        Xexc1 = Xexc0 + case.stepsize * a[1, 0] * Kexc1
-
-        # Governors
-        Kgov1 = case.governor(Xgov0, Pgov, Vgov0)
-        Xgov1 = Xgov0 + case.stepsize * a[1, 0] * Kgov1
-
-        # Generators.
-        Kgen1 = case.generator(Xgen0, Xexc1, Xgov1, Pgen, Vgen0)
-        Xgen1 = Xgen0 + case.stepsize * a[1, 0] * Kgen1
-
-        # Calculate system voltages.
-        U1 = case.solveNetwork(Xgen1, Pgen, augYbus_solver, gbus)
-
-        # Calculate machine currents and power.
-        Id1, Iq1, Pe1 = case.machineCurrents(Xgen1, Pgen, U1[gbus])
-
-        # Update variables that have changed
-        Vexc1 = abs(U1[gbus])
-        Vgen1 = r_[Id1, Iq1, Pe1];
-        Vgov1 = Xgen1[:, 1]
-
-        return Xexc1, Vexc1, Kexc1, Xgov1, Vgov1, Kgov1, Xgen1, Vgen1, Kgen1,U1
-
-
-    def _k2(self, Xexc1, Xexc0, Pexc, Vexc1, Kexc1, Xgov1, Xgov0, Pgov, Vgov1,
-            Kgov1, Xgen1, Xgen0, Pgen, Vgen1, Kgen1, augYbus_solver, gbus):
-        case = self.dyn_case
-        a = self._a
-
-        # Exciters.
-        Kexc2 = case.exciter(Xexc1, Pexc, Vexc1)
-        Xexc2 = Xexc0 + case.stepsize * (a[2, 0] * Kexc1 + a[2, 1] *Kexc2)
-
-        # Governors.
-        Kgov2 = case.governor(Xgov1, Pgov, Vgov1)
-        Xgov2 = Xgov0 + case.stepsize * (a[2, 0] * Kgov1 + a[2, 1] *Kgov2)
-
-        # Generators.
-        Kgen2 = case.generator(Xgen1, Xexc2, Xgov2, Pgen, Vgen1)
-        Xgen2 = Xgen0 + case.stepsize * (a[2, 0] * Kgen1 + a[2, 1] *Kgen2)
-
-        # Calculate system voltages.
-        U2 = case.solveNetwork(Xgen2, Pgen, augYbus_solver,gbus)
-
-        # Calculate machine currents and power.
-        Id2, Iq2, Pe2 = case.machineCurrents(Xgen2, Pgen, U2[gbus])
-
-        # Update variables that have changed
-        Vexc2 = abs(U2[gbus])
-        Vgen2 = r_[Id2, Iq2, Pe2]
-        Vgov2 = Xgen2[:, 1]
-
-        return Xexc2, Vexc2, Kexc2, Xgov2, Vgov2, Kgov2, Xgen2, Vgen2, Kgen2,U2
-
-
-    def _k3(self, Xexc2, Xexc0, Pexc, Vexc2, Kexc2, Kexc1, Xgov2, Xgov0, Pgov,
-            Vgov2, Kgov2, Kgov1, Xgen2, Xgen0, Pgen, Vgen2, Kgen2, Kgen1,
-            augYbus_solver, gbus):
+        @return: The state, generator, exciter and governor inputs and bus
+            voltages after the last stage and the derivatives, K, of the
+            generator, exciter and governor states at each stage.
+        """
         case = self.dyn_case
         a = self._a
+        s = len(b)
 
-        # Exciters.
-        Kexc3 = case.exciter(Xexc2, Pexc, Vexc2)
-        Xexc3 = Xexc0 + case.stepsize * \
-            (a[3, 0] * Kexc1 + a[3, 1] * Kexc2 + a[3, 2] * Kexc3)
-
-        # Governors.
-        Kgov3 = case.governor(Xgov2, Pgov, Vgov2)
-        Xgov3 = Xgov0 + case.stepsize * \
-            (a[3,0] * Kgov1 + a[3, 1] * Kgov2 + a[3, 2] * Kgov3)
-
-        # Generators.
-        Kgen3 = case.generator(Xgen2, Xexc3, Xgov3, Pgen, Vgen2)
-        Xgen3 = Xgen0 + case.stepsize * \
-            (a[3, 0] * Kgen1 + a[3, 1] * Kgen2 + a[3, 2] * Kgen3)
-
-        # Calculate system voltages.
-        U3 = case.solveNetwork(Xgen3, Pgen, augYbus_solver,gbus)
-
-        # Calculate machine currents and power
-        Id3, Iq3, Pe3 = case.machineCurrents(Xgen3, Pgen, U3[gbus])
-
-        # Update variables that have changed.
-        Vexc3 = abs(U3[gbus])
-        Vgen3 = r_[Id3, Iq3, Pe3]
-        Vgov3 = Xgen3[:, 1]
-
-        return Xexc3, Vexc3, Kexc3, Xgov3, Vgov3, Kgov3, Xgen3, Vgen3, Kgen3,U3
-
+        Xgen, Vgen, Xexc, Vexc, Xgov, Vgov = \
+            Xgen0, Vgen0, Xexc0, Vexc0, Xgov0, Vgov0
+        Kgen, Kexc, Kgov = [], [], []
 
-    def _k4(self, Xexc3, Xexc0, Pexc, Vexc3, Kexc3, Kexc2, Kexc1, Xgov3, Xgov0,
-            Pgov, Vgov3, Kgov3, Kgov2, Kgov1, Xgen3, Xgen0, Pgen, Vgen3, Kgen3,
-            Kgen2, Kgen1, augYbus_solver, gbus):
-        case = self.dyn_case
-        b = self._b
-
-        # Exciters.
-        Kexc4 = case.exciter(Xexc3, Pexc, Vexc3)
-        Xexc4 = Xexc0 + case.stepsize * \
-            (b[0] * Kexc1 + b[1] * Kexc2 + b[2] * Kexc3 + b[3] * Kexc4)
+        for k in range(s):
+            coeffs = a[k + 1, :k + 1] if k < s - 1 else b
 
-        # Governors.
-        Kgov4 = case.governor(Xgov3, Pgov, Vgov3)
-        Xgov4 = Xgov0 + case.stepsize * \
-            (b[0] * Kgov1 + b[1] * Kgov2 + b[2] * Kgov3 + b[3] * Kgov4)
+            # Exciters, governors and generators.
+            Kexc.append(case.exciter(Xexc, Pexc, Vexc))
+            Kgov.append(case.governor(Xgov, Pgov, Vgov))
+            Kgen.append(case.generator(Xgen, Xexc, Xgov, Vgen))
 
-        # Generators.
-        Kgen4 = case.generator(Xgen3, Xexc4, Xgov4, Pgen, Vgen3)
-        Xgen4 = Xgen0 + case.stepsize * \
-            (b[0] * Kgen1 + b[1] * Kgen2 + b[2] * Kgen3 + b[3] * Kgen4)
+            Xexc = Xexc0 + stepsize * _combine(coeffs, Kexc)
+            Xgov = Xgov0 + stepsize * _combine(coeffs, Kgov)
+            Xgen = Xgen0 + stepsize * _combine(coeffs, Kgen)
 
-        # Calculate system voltages.
-        U4 = case.solveNetwork(Xgen4, Pgen, augYbus_solver,gbus)
+            # Calculate system voltages.
+            U = case.solveNetwork(Xgen, augYbus_solver, gbus)
 
-        # Calculate machine currents and power.
-        Id4, Iq4, Pe4 = case.machineCurrents(Xgen4, Pgen, U4[gbus])
+            # Calculate machine currents and power.
+            Id, Iq, Pe = case.machineCurrents(Xgen, U[gbus])
 
-        # Update variables that have changed
-        Vexc4 = abs(U4[gbus])
-        Vgen4 = r_[Id4, Iq4, Pe4]
-        Vgov4 = Xgen4[:, 1]
+            # Update variables that have changed.
+            Vexc = abs(U[gbus])
+            Vgen = c_[Id, Iq, Pe]
+            Vgov = Xgen[:, 1]
 
-        return Xexc4, Vexc4, Kexc4, Xgov4, Vgov4, Kgov4, Xgen4, Vgen4, Kgen4,U4
+        return Xgen, Vgen, Xexc, Vexc, Xgov, Vgov, U, (Kgen, Kexc, Kgov)
 
 #------------------------------------------------------------------------------
 #  "RungeKuttaFehlberg" class:
@@ -1203,18 +1037,28 @@ class RungeKuttaFehlberg(RungeKutta):
     teaching/matdyn/} for more information.
     """
 
-    def __init__(self, t, Xgen0, Pgen, Vgen0, Xexc0, Pexc, Vexc0, Xgov0, Pgov,
-            Vgov0, augYbus_solver, gbus, stepsize):
+    def __init__(self, dyn_case=None, tol=1e-04, maxstep=1e02):
+        super(RungeKuttaFehlberg, self).__init__(dyn_case)
 
-        super(self, RungeKuttaFehlberg).__init__(t, Xgen0, Pgen, Vgen0, Xexc0,
-            Pexc, Vexc0, Xgov0, Pgov, Vgov0, augYbus_solver, gbus, stepsize)
+        #: Tolerance of the error estimate.
+        self.tol = tol
+
+        #: Maximum step size.
+        self.maxstep = maxstep
+
+        #: Error estimate of the last step.
+        self.errest = 0.0
+
+        #: Was the last step rejected?
+        self.failed = False
 
         #: Runge-Kutta coefficients
         self._a = array([0.0, 0.0, 0.0, 0.0, 0.0, 1.0/4.0, 0.0, 0.0, 0.0, 0.0,
                          3.0/32.0, 9.0/32.0, 0.0, 0.0, 0.0, 1932.0/2197.0,
                          -7200.0/2197.0, 7296.0/2197.0, 0.0, 0.0, 439.0/216.0,
                          -8.0, 3680.0/513.0, -845.0/4104.0, 0.0, -8.0/27.0,
-                         2.0, -3544.0/2565.0, 1859.0/4104.0, -11.0/40.0])
+                         2.0, -3544.0/2565.0, 1859.0/4104.0,
+                         -11.0/40.0]).reshape(6, 5)
         #: Runge-Kutta coefficients.
         self._b1 = array([25.0/216.0, 0.0, 1408.0/2565.0, 2197.0/4104.0,
                           -1.0/5.0, 0.0])
@@ -1224,338 +1068,46 @@ class RungeKuttaFehlberg(RungeKutta):
         # c = array([0.0, 1.0/4.0, 3.0/8.0, 12.0/13.0, 1.0, 1.0/2.0,])#not used
 
 
-    def solve(self):
-        case = self.dyn_case
+    def solve(self, t, Xgen0, Pgen, Vgen0, Xexc0, Pexc, Vexc0, Xgov0, Pgov,
+            Vgov0, augYbus_solver, gbus, stepsize):
+        """ Takes a step if the error estimate is within the tolerance and
+        returns the state at its end and the next step size.  Otherwise, the
+        step is rejected, the initial state is returned with a smaller step
+        size and the C{failed} flag is set.
+        """
         b2 = self._b2
 
-        accept = False
-        facmax = 4
-        failed = False
-
-        i = 0
-        while accept == False:
-            i += 1
-
-            Xexc1, Vexc1, Kexc1, Xgov1, Vgov1, Kgov1, Xgen1, Vgen1, Kgen1, _ =\
-                self._k1()
-
-            Xexc2, Vexc2, Kexc2, Xgov2, Vgov2, Kgov2, Xgen2, Vgen2, Kgen2, _ =\
-                self._k2(Xexc1, Vexc1, Kexc1, Xgov1, Vgov1, Kgov1, Xgen1,
-                    Vgen1, Kgen1)
-
-            Xexc3, Vexc3, Kexc3, Xgov3, Vgov3, Kgov3, Xgen3, Vgen3, Kgen3, _ =\
-                self._k3(Xexc2, Vexc2, Kexc2, Kexc1, Xgov2, Vgov2, Kgov2,
-                    Kgov1, Xgen2, Vgen2, Kgen2, Kgen1)
-
-            Xexc4, Vexc4, Kexc4, Xgov4, Vgov4, Kgov4, Xgen4, Vgen4, Kgen4, _ =\
-                self._k4(Xexc3, Vexc3, Kexc3, Kexc2, Kexc1, Xgov3, Vgov3,
-                    Kgov3, Kgov2, Kgov1, Xgen3, Vgen3, Kgen3, Kgen2, Kgen1)
-
-            Xexc5, Vexc5, Kexc5, Xgov5, Vgov5, Kgov5, Xgen5, Vgen5, Kgen5, _ =\
-                self._k5(Xexc4, Vexc4, Kexc4, Kexc3, Kexc2, Kexc1, Xgov4,
-                    Vgov4, Kgov4, Kgov3, Kgov2, Kgov1, Xgen4, Vgen4, Kgen4,
-                    Kgen3, Kgen2, Kgen1)
-
-            Xexc6, Vexc6, Kexc6, Xgov6, Vgov6, Kgov6, Xgen6, Vgen6, Kgen6, U6=\
-                self._k6(Xexc5, Vexc5, Kexc5, Kexc4, Kexc3, Kexc2, Kexc1,
-                    Xgov5, Vgov5, Kgov5, Kgov4, Kgov3, Kgov2, Kgov1, Xgen5,
-                    Vgen5, Kgen5, Kgen4, Kgen3, Kgen2, Kgen1)
-
-            # Second, higher order solution.
-            Xexc62 = self.Xexc0 + case.stepsize * \
-                (b2[0] * Kexc1 + b2[1] * Kexc2 + b2[2] * Kexc3 + \
-                b2[3] * Kexc4 + b2[4] * Kexc5 + b2[5] * Kexc6)
-            Xgov62 = self.Xgov0 + case.stepsize * \
-                (b2[0] * Kgov1 + b2[1] * Kgov2 + b2[2] * Kgov3 + \
-                b2[3] * Kgov4 + b2[4] * Kgov5 + b2[5] * Kgov6)
-            Xgen62 = self.Xgen0 + case.stepsize * \
-                (b2[0] * Kgen1 + b2[1] * Kgen2 + b2[2] * Kgen3 + \
-                b2[3] * Kgen4 + b2[4] * Kgen5 + b2[5] * Kgen6)
-
-            # Error estimate.
-            Xexc = abs((Xexc62 - Xexc6).T)
-            Xgov = abs((Xgov62 - Xgov6).T)
-            Xgen = abs((Xgen62 - Xgen6).T)
-            errest = max( r_[max(max(Xexc)), max(max(Xgov)), max(max(Xgen))] )
-
-            if errest < EPS:
-                errest = EPS
-
-            q = 0.84 * (self.tol / errest)^(1.0/4.0)
-
-            if errest < self.tol:
-                accept = True
-                U0 = U6
-                Vgen0 = Vgen6;
-                Vgov0 = Vgov6
-                Vexc0 = Vexc6
-
-                Xgen0 = Xgen6
-                Xexc0 = Xexc6
-                Xgov0 = Xgov6
-
-                Pgen0 = self.Pgen
-                Pexc0 = self.Pexc
-                Pgov0 = self.Pgov
-
-#                t = t0
-            else:
-                failed += 1
-                facmax = 1
-
-#                t = t0
-                Pgen0 = self.Pgen
-                Pexc0 = self.Pexc
-                Pgov0 = self.Pgov
-
-                stepsize = min(max(q, 0.1), facmax) * case.stepsize
-                return
-
-            stepsize = min(max(q, 0.1), facmax) * case.stepsize
-
-            if stepsize > self.maxstepsize:
-                stepsize = self.maxstepsize
-
-        return Xgen0, Pgen0, Vgen0, Xexc0, Pexc0, Vexc0, Xgov0, Pgov0, Vgov0, \
-            U0, errest, failed, self.t, stepsize
-
-
-    def _k4(self, Xexc3, Vexc3, Kexc3, Kexc2, Kexc1, Xgov3, Vgov3, Kgov3,
-            Kgov2, Kgov1, Xgen3, Vgen3, Kgen3, Kgen2, Kgen1):
-        # Overrides the standard Runge-Kutta K4 method.
-        case = self.dyn_case
-        a = self._a
-
-        # Exciters.
-        Kexc4 = case.exciter(Xexc3, self.Pexc, Vexc3)
-        Xexc4 = self.Xexc0 + case.stepsize * \
-            (a[4, 0] * Kexc1 + a[4, 1] * Kexc2 + a[4, 2] * Kexc3 +
-             a[4, 3] * Kexc4)
-
-        # Governors.
-        Kgov4 = case.governor(Xgov3, self.Pgov, Vgov3)
-        Xgov4 = self.Xgov0 + case.stepsize * \
-            (a[4, 0] * Kgov1 + a[4, 1] * Kgov2 + a[4, 2] * Kgov3 +
-             a[4, 3] * Kgov4)
-
-        # Generators.
-        Kgen4 = case.generator(Xgen3, Xexc4, Xgov4, self.Pgen, Vgen3)
-        Xgen4 = self.Xgen0 + case.stepsize * \
-            (a[4, 0] * Kgen1 + a[4, 1] * Kgen2 + a[4, 2] * Kgen3 +
-             a[4, 3] * Kgen4)
-
-        # Calculate system voltages.
-        U4 = case.solveNetwork(Xgen4, self.Pgen, self.augYbus_solver,self.gbus)
-
-        # Calculate machine currents and power.
-        Id4, Iq4, Pe4 = case.machineCurrents(Xgen4, self.Pgen, U4[self.gbus])
-
-        # Update variables that have changed
-        Vexc4 = abs(U4[self.gbus])
-        Vgen4 = r_[Id4, Iq4, Pe4]
-        Vgov4 = Xgen4[:, 1]
-
-        return Xexc4, Vexc4, Kexc4, Xgov4, Vgov4, Kgov4, Xgen4, Vgen4, Kgen4,U4
-
-
-    def _k5(self, Xexc4, Vexc4, Kexc4, Kexc3, Kexc2, Kexc1, Xgov4, Vgov4,Kgov4,
-            Kgov3, Kgov2, Kgov1, Xgen4, Vgen4, Kgen4, Kgen3, Kgen2, Kgen1):
-        case = self.dyn_case
-        a = self._a
-
-        # Exciters.
-        Kexc5 = case.exciter(Xexc4, self.Pexc, Vexc4)
-        Xexc5 = self.Xexc0 + case.stepsize * \
-            (a[5, 0] * Kexc1 + a[5, 1] * Kexc2 + a[5, 2] * Kexc3 + \
-            a[5, 3] * Kexc4 + a[5, 4] * Kexc5)
-
-        # Governors.
-        Kgov5 = case.governor(Xgov4, self.Pgov, Vgov4)
-        Xgov5 = self.Xgov0 + case.stepsize * \
-            (a[5, 0] * Kgov1 + a[5, 1] * Kgov2 + a[5, 2] * Kgov3 + \
-            a[5, 3] * Kgov4 + a[5, 4] * Kgov5)
-
-        # Generators.
-        Kgen5 = case.generator(Xgen4, Xexc5, Xgov5, self.Pgen, Vgen4)
-        Xgen5 = self.Xgen0 + case.stepsize * \
-            (a[5, 0] * Kgen1 + a[5, 1] * Kgen2 + a[5, 2] * Kgen3 + \
-            a[5, 3] * Kgen4 + a[5, 4] * Kgen5)
-
-        # Calculate system voltages.
-        U5 = case.solveNetwork(Xgen5, self.Pgen, self.augYbus_solver,
-                               self.gbus)
-
-        # Calculate machine currents and power.
-        Id5, Iq5, Pe5 = case.machineCurrents(Xgen5, self.Pgen,
-                                             U5[self.gbus])
-
-        # Update variables that have changed.
-        Vexc5 = abs(U5[self.gbus])
-        Vgen5 = r_[Id5, Iq5, Pe5]
-        Vgov5 = Xgen5[:, 1]
+        Xgen, Vgen, Xexc, Vexc, Xgov, Vgov, U, K = self._stages(self._b1,
+            Xgen0, Vgen0, Xexc0, Pexc, Vexc0, Xgov0, Pgov, Vgov0,
+            augYbus_solver, gbus, stepsize)
+        Kgen, Kexc, Kgov = K
 
-        return Xexc5, Vexc5, Kexc5, Xgov5, Vgov5, Kgov5, Xgen5, Vgen5, Kgen5,U5
+        # Second, higher order solution.
+        Xexc2 = Xexc0 + stepsize * _combine(b2, Kexc)
+        Xgov2 = Xgov0 + stepsize * _combine(b2, Kgov)
+        Xgen2 = Xgen0 + stepsize * _combine(b2, Kgen)
 
+        # Error estimate.
+        errest = max(abs(Xexc2 - Xexc).max(), abs(Xgov2 - Xgov).max(),
+                     abs(Xgen2 - Xgen).max(), EPS)
+        self.errest = errest
 
-    def _k6(self, Xexc5, Vexc5, Kexc5, Kexc4, Kexc3, Kexc2, Kexc1, Xgov5,
-            Vgov5, Kgov5, Kgov4, Kgov3, Kgov2, Kgov1, Xgen5, Vgen5, Kgen5,
-            Kgen4, Kgen3, Kgen2, Kgen1):
-        case = self.dyn_case
-        b1 = self._b1
+        q = 0.84 * (self.tol / errest)**(1.0 / 4.0)
 
-        # Exciters.
-        Kexc6 = case.exciter(Xexc5, self.Pexc, Vexc5)
-        Xexc6 = self.Xexc0 + case.stepsize * \
-            (b1[0] * Kexc1 + b1[1] * Kexc2 + b1[2] * Kexc3 + \
-            b1[3] * Kexc4 + b1[4] * Kexc5 + b1[5] * Kexc6)
+        if errest < self.tol:
+            self.failed = False
+            newstepsize = min(min(max(q, 0.1), 4) * stepsize, self.maxstep)
 
-        # Governors.
-        Kgov6 = case.governor(Xgov5, self.Pgov, Vgov5)
-        Xgov6 = self.Xgov0 + case.stepsize * \
-            (b1[0] * Kgov1 + b1[1] * Kgov2 + b1[2] * Kgov3 + \
-            b1[3] * Kgov4 + b1[4] * Kgov5 + b1[5] * Kgov6)
-
-        # Generators.
-        Kgen6 = case.generator(Xgen5, Xexc6, Xgov6, self.Pgen, Vgen5)
-        Xgen6 = self.Xgen0 + case.stepsize * \
-            (b1[0] * Kgen1 + b1[1] * Kgen2 + b1[2] * Kgen3 + \
-            b1[3] * Kgen4 + b1[4] * Kgen5 + b1[5] * Kgen6)
-
-        # Calculate system voltages.
-        U6 = case.solveNetwork(Xgen6, self.Pgen, self.augYbus_solver,
-                               self.gbus)
-
-        # Calculate machine currents and power.
-        Id6, Iq6, Pe6 = case.machineCurrents(Xgen6, self.Pgen,
-                                             U6[self.gbus])
+            return Xgen, Pgen, Vgen, Xexc, Pexc, Vexc, \
+                Xgov, Pgov, Vgov, U, t, newstepsize
+        else:
+            self.failed = True
+            newstepsize = min(max(q, 0.1), 1) * stepsize
 
-        # Update variables that have changed.
-        Vexc6 = abs(U6[self.gbus])
-        Vgen6 = r_[Id6, Iq6, Pe6]
-        Vgov6 = Xgen6[:, 1]
+            U0 = self.dyn_case.solveNetwork(Xgen0, augYbus_solver, gbus)
 
-        return Xexc6, Vexc6, Kexc6, Xgov6, Vgov6, Kgov6, Xgen6, Vgen6, Kgen6,U6
-
-#            # K1 --------------------------------------------------------------
-#
-#            # Exciters.
-#            Kexc1 = case.exciter(self.Xexc0, self.Pexc, self.Vexc0)
-#            Xexc1 = self.Xexc0 + case.stepsize * a[1, 0] * Kexc1
-#
-#            # Governors.
-#            Kgov1 = case.governor(self.Xgov0, self.Pgov, self.Vgov0)
-#            Xgov1 = self.Xgov0 + case.stepsize * a[1, 0] * Kgov1
-#
-#            # Generators.
-#            Kgen1 = case.generator(self.Xgen0, Xexc1, Xgov1, self.Pgen,
-#                                   self.Vgen0)
-#            Xgen1 = self.Xgen0 + case.stepsize * a[1, 0] * Kgen1
-#
-#            # Calculate system voltages.
-#            U1 = case.solveNetwork(Xgen1, self.Pgen, self.augYbus_solver,
-#                                   self.gbus)
-#
-#            # Calculate machine currents and power.
-#            Id1, Iq1, Pe1 = case.machineCurrents(Xgen1, self.Pgen,
-#                                                 U1[self.gbus])
-#
-#            # Update variables that have changed.
-#            Vexc1 = abs(U1[self.gbus])
-#            Vgen1 = r_[Id1, Iq1, Pe1]
-#            Vgov1 = Xgen1[:, 1]
-#
-#            # K2 --------------------------------------------------------------
-#
-#            # Exciters.
-#            Kexc2 = case.exciter(Xexc1, self.Pexc, Vexc1)
-#            Xexc2 = self.Xexc0 + case.stepsize * \
-#                (a[2, 0] * Kexc1 + a[2, 1] * Kexc2)
-#
-#            # Governors.
-#            Kgov2 = case.governor(Xgov1, self.Pgov, Vgov1)
-#            Xgov2 = self.Xgov0 + case.stepsize * \
-#                (a[2, 0] * Kgov1 + a[2, 1] * Kgov2)
-#
-#            # Generators.
-#            Kgen2 = case.generator(Xgen1, Xexc2, Xgov2, self.Pgen, Vgen1)
-#            Xgen2 = self.Xgen0 + case.stepsize * \
-#                (a[2, 0] * Kgen1 + a[2, 1] * Kgen2)
-#
-#            # Calculate system voltages.
-#            U2 = case.solveNetwork(Xgen2, self.Pgen, self.augYbus_solver,
-#                                   self.gbus)
-#
-#            # Calculate machine currents and power.
-#            Id2, Iq2, Pe2  = case.machineCurrents(Xgen2, self.Pgen,
-#                                                  U2[self.gbus])
-#
-#            # Update variables that have changed
-#            Vexc2 = abs(U2[self.gbus])
-#            Vgen2 = r_[Id2, Iq2, Pe2]
-#            Vgov2 = Xgen2[:, 1]
-#
-#            # K3 --------------------------------------------------------------
-#
-#            # Exciters.
-#            Kexc3 = case.exciter(Xexc2, self.Pexc, Vexc2)
-#            Xexc3 = self.Xexc0 + case.stepsize * \
-#                (a[3, 0] * Kexc1 + a[3, 1] * Kexc2 + a[3, 2] * Kexc3)
-#
-#            # Governors.
-#            Kgov3 = case.governor(Xgov2, self.Pgov, Vgov2)
-#            Xgov3 = self.Xgov0 + case.stepsize * \
-#                (a[3, 0] * Kgov1 + a[3, 1] * Kgov2 + a[3, 2] * Kgov3)
-#
-#            # Generators.
-#            Kgen3 = case.generator(Xgen2, Xexc3, Xgov3, self.Pgen, Vgen2)
-#            Xgen3 = self.Xgen0 + case.stepsize * \
-#                (a[3, 0] * Kgen1 + a[3, 1] * Kgen2 + a[3, 2] * Kgen3)
-#
-#            # Calculate system voltages
-#            U3 = case.solveNetwork(Xgen3, self.Pgen, self.augYbus_solver,
-#                                   self.gbus)
-#
-#            # Calculate machine currents and power.
-#            Id3, Iq3, Pe3 = case.machineCurrents(Xgen3, self.Pgen,
-#                                                 U3[self.gbus])
-#
-#            # Update variables that have changed
-#            Vexc3 = abs(U3[self.gbus])
-#            Vgen3 = r_[Id3, Iq3, Pe3]
-#            Vgov3 = Xgen3[:, 1]
-#
-#            # K4 --------------------------------------------------------------
-#
-#            # Exciters.
-#            Kexc4 = case.exciter(Xexc3, self.Pexc, Vexc3)
-#            Xexc4 = self.Xexc0 + case.stepsize * \
-#                (a[4, 0] * Kexc1 + a[4, 1] * Kexc2 + a[4, 2] * Kexc3 +
-#                 a[4, 3] * Kexc4)
-#
-#            # Governors.
-#            Kgov4 = case.governor(Xgov3, self.Pgov, Vgov3)
-#            Xgov4 = self.Xgov0 + case.stepsize * \
-#                (a[4, 0] * Kgov1 + a[4, 1] * Kgov2 + a[4, 2] * Kgov3 +
-#                 a[4, 3] * Kgov4)
-#
-#            # Generators.
-#            Kgen4 = case.generator(Xgen3, Xexc4, Xgov4, self.Pgen, Vgen3)
-#            Xgen4 = self.Xgen0 + case.stepsize * \
-#                (a[4, 0] * Kgen1 + a[4, 1] * Kgen2 + a[4, 2] * Kgen3 +
-#                 a[4, 3] * Kgen4)
-#
-#            # Calculate system voltages.
-#            U4 = case.solveNetwork(Xgen4, self.Pgen, self.augYbus_solver,
-#                                   self.gbus)
-#
-#            # Calculate machine currents and power.
-#            Id4, Iq4, Pe4 = case.machineCurrents(Xgen4, self.Pgen,
-#                                                 U4[self.gbus])
-#
-#            # Update variables that have changed.
-#            Vexc4 = abs(U4[self.gbus])
-#            Vgen4 = r_[Id4, Iq4, Pe4]
-#            Vgov4 = Xgen4[:, 1]
+            return Xgen0, Pgen, Vgen0, Xexc0, Pexc, Vexc0, \
+                Xgov0, Pgov, Vgov0, U0, t, newstepsize
 
 #------------------------------------------------------------------------------
 #  "RungeKuttaHighamHall" class:
@@ -1569,11 +1121,8 @@ class RungeKuttaHighamHall(RungeKuttaFehlberg):
     teaching/matdyn/} for more information.
     """
 
-    def __init__(self, t, Xgen0, Pgen, Vgen0, Xexc0, Pexc, Vexc0, Xgov0, Pgov,
-            Vgov0, augYbus_solver, gbus, stepsize):
-
-        super(self, RungeKuttaHighamHall).__init__(t, Xgen0, Pgen, Vgen0,Xexc0,
-            Pexc, Vexc0, Xgov0, Pgov, Vgov0, augYbus_solver, gbus, stepsize)
+    def __init__(self, dyn_case=None, tol=1e-04, maxstep=1e02):
+        super(RungeKuttaHighamHall, self).__init__(dyn_case, tol, maxstep)
 
         #: Runge-Kutta coefficients.
         self._a = array([0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 2.0/9.0, 0.0, 0.0, 0.0,
@@ -1582,7 +1131,7 @@ class RungeKuttaHighamHall(RungeKuttaFehlberg):
                          -27.0/100.0, 78.0/125.0, 8.0/125.0, 0.0, 0.0,
                          -11.0/20.0, 27.0/20.0, 12.0/5.0, -36.0/5.0, 5.0, 0.0,
                          1.0/12.0, 0.0, 27.0/32.0, -4.0/3.0, 125.0/96.0,
-                         5.0/48.0])
+                         5.0/48.0]).reshape(7, 6)
         #: Runge-Kutta coefficients.
         self._b1 = array([1.0/12.0, 0.0, 27.0/32.0, -4.0/3.0, 125.0/96.0,
                           5.0/48.0, 0.0])
@@ -1591,326 +1140,321 @@ class RungeKuttaHighamHall(RungeKuttaFehlberg):
                           1.0/24.0, 1.0/10.0,])
         # c = array([0.0, 2.0/9.0, 1.0/3.0, 1.0/2.0, 3.0/5.0, 1.0, 1.0,])
 
+#------------------------------------------------------------------------------
+#  "ModifiedEuler2" class:
+#------------------------------------------------------------------------------
 
-    def solve(self):
-        case = self.dyn_case
-        b2 = self._b2
+class ModifiedEuler2(object):
+    """ Modified Euler ODE solver with check on interface errors.
 
-        accept = False
-        facmax = 4
-        failed = False
+    Based on ModifiedEuler2.m from MatDyn by Stijn Cole, developed at
+    Katholieke Universiteit Leuven. See U{http://www.esat.kuleuven.be/electa/
+    teaching/matdyn/} for more information.
+    """
 
-        i = 0
-        while accept == False:
-            i += 1
+    def __init__(self, dyn_case=None, tol=1e-04, maxit=20):
+        #: Dynamic case.
+        self.dyn_case = dyn_case
 
-            Xexc1, Vexc1, Kexc1, Xgov1, Vgov1, Kgov1, Xgen1, Vgen1, Kgen1, _ =\
-                self._k1()
-
-            Xexc2, Vexc2, Kexc2, Xgov2, Vgov2, Kgov2, Xgen2, Vgen2, Kgen2, _ =\
-                self._k2(Xexc1, Vexc1, Kexc1, Xgov1, Vgov1, Kgov1, Xgen1,
-                    Vgen1, Kgen1)
-
-            Xexc3, Vexc3, Kexc3, Xgov3, Vgov3, Kgov3, Xgen3, Vgen3, Kgen3, _ =\
-                self._k3(Xexc2, Vexc2, Kexc2, Kexc1, Xgov2, Vgov2, Kgov2,
-                    Kgov1, Xgen2, Vgen2, Kgen2, Kgen1)
-
-            Xexc4, Vexc4, Kexc4, Xgov4, Vgov4, Kgov4, Xgen4, Vgen4, Kgen4, _ =\
-                self._k4(Xexc3, Vexc3, Kexc3, Kexc2, Kexc1, Xgov3, Vgov3,
-                    Kgov3, Kgov2, Kgov1, Xgen3, Vgen3, Kgen3, Kgen2, Kgen1)
-
-            Xexc5, Vexc5, Kexc5, Xgov5, Vgov5, Kgov5, Xgen5, Vgen5, Kgen5, _ =\
-                self._k5(Xexc4, Vexc4, Kexc4, Kexc3, Kexc2, Kexc1, Xgov4,
-                    Vgov4, Kgov4, Kgov3, Kgov2, Kgov1, Xgen4, Vgen4, Kgen4,
-                    Kgen3, Kgen2, Kgen1)
-
-            Xexc6, Vexc6, Kexc6, Xgov6, Vgov6, Kgov6, Xgen6, Vgen6, Kgen6, _ =\
-                self._k6(Xexc5, Vexc5, Kexc5, Kexc4, Kexc3, Kexc2, Kexc1,
-                    Xgov5, Vgov5, Kgov5, Kgov4, Kgov3, Kgov2, Kgov1, Xgen5,
-                    Vgen5, Kgen5, Kgen4, Kgen3, Kgen2, Kgen1)
-
-            Xexc7, _, Kexc7, Xgov7, _, Kgov7, Xgen7, _, Kgen7, U7 = \
-                self._k6(Xexc6, Vexc6, Kexc6, Kexc5, Kexc4, Kexc3, Kexc2,
-                    Kexc1, Xgov6, Vgov6, Kgov6, Kgov5, Kgov4, Kgov3, Kgov2,
-                    Kgov1, Xgen6, Vgen6, Kgen6, Kgen5, Kgen4, Kgen3, Kgen2,
-                    Kgen1)
-
-            # Second, higher order solution.
-            Xexc72 = self.Xexc0 + case.stepsize * \
-                (b2[0] * Kexc1 + b2[1] * Kexc2 + b2[2] * Kexc3 +
-                 b2[3] * Kexc4 + b2[4] * Kexc5 + b2[5] * Kexc6 + b2[6] * Kexc7)
-            Xgov72 = self.Xgov0 + case.stepsize * \
-                (b2[0] * Kgov1 + b2[1] * Kgov2 + b2[2] * Kgov3 +
-                 b2[3] * Kgov4 + b2[4] * Kgov5 + b2[5] * Kgov6 + b2[6] * Kgov7)
-            Xgen72 = self.Xgen0 + case.stepsize * \
-                (b2[0] * Kgen1 + b2[1] * Kgen2 + b2[2] * Kgen3 +
-                 b2[3] * Kgen4 + b2[4] * Kgen5 + b2[5] * Kgen6 + b2[6] * Kgen7)
-
-            # Error estimate
-            Xexc = abs((Xexc72 - Xexc7).T)
-            Xgov = abs((Xgov72 - Xgov7).T)
-            Xgen = abs((Xgen72 - Xgen7).T)
-            errest = max( r_[max(max(Xexc)), max(max(Xgov)), max(max(Xgen))] )
-
-            if errest < EPS:
-                errest = EPS
-
-            q = 0.84 * (self.tol / errest)^(1.0 / 4.0)
+        #: Tolerance of the interface errors.
+        self.tol = tol
 
-            if errest < self.tol:
-                accept = True
-                U0 = U7
-                Vgen0 = Vgen6;
-                Vgov0 = Vgov6
-                Vexc0 = Vexc6
+        #: Maximum number of corrector iterations.
+        self.maxit = maxit
 
-                Xgen0 = Xgen6
-                Xexc0 = Xexc6
-                Xgov0 = Xgov6
+        #: Did the corrector iterations of the last step fail to converge?
+        self.eulerfailed = False
 
-                Pgen0 = self.Pgen
-                Pexc0 = self.Pexc
-                Pgov0 = self.Pgov
 
-#                t = t0
-            else:
-                failed += 1
-                facmax = 1
+    def solve(self, t, Xgen0, Pgen, Vgen0, Xexc0, Pexc, Vexc0, Xgov0, Pgov,
+            Vgov0, augYbus_solver, gbus, stepsize):
+        case = self.dyn_case
 
-#                t = t0
-                Pgen0 = self.Pgen
-                Pexc0 = self.Pexc
-                Pgov0 = self.Pgov
+        self.eulerfailed = False
 
-                stepsize = min(max(q, 0.1), facmax) * case.stepsize
-                return
+        # First Prediction Step -----------------------------------------------
 
-            stepsize = min(max(q, 0.1), facmax) * case.stepsize
+        # Exciters.
+        dFexc0 = case.exciter(Xexc0, Pexc, Vexc0)
+        Xexc_new = Xexc0 + stepsize * dFexc0
 
-            if stepsize > self.maxstepsize:
-                stepsize = self.maxstepsize
+        # Governor.
+        dFgov0 = case.governor(Xgov0, Pgov, Vgov0)
+        Xgov_new = Xgov0 + stepsize * dFgov0
 
-        return Xgen0, Pgen0, Vgen0, Xexc0, Pexc0, Vexc0, Xgov0, Pgov0, Vgov0, \
-            U0, errest, failed, self.t, stepsize
+        # Generators.
+        dFgen0 = case.generator(Xgen0, Xexc0, Xgov0, Vgen0)
+        Xgen_new = Xgen0 + stepsize * dFgen0
 
+        Vexc_new = Vexc0
+        Vgov_new = Vgov0
+        Vgen_new = Vgen0
 
-    def _k6(self, Xexc5, Vexc5, Kexc5, Kexc4, Kexc3, Kexc2, Kexc1, Xgov5,
-            Vgov5, Kgov5, Kgov4, Kgov3, Kgov2, Kgov1, Xgen5, Vgen5, Kgen5,
-            Kgen4, Kgen3, Kgen2, Kgen1):
-        # Overrides the K6 method from the Runge-Kutta Fehlberg solver.
-        case = self.dyn_case
-        a = self._a
+        for i in range(self.maxit):
+            Xexc_old = Xexc_new
+            Xgov_old = Xgov_new
+            Xgen_old = Xgen_new
 
-        # Exciters.
-        Kexc6 = case.exciter(Xexc5, self.Pexc, Vexc5)
-        Xexc6 = self.Xexc0 + case.stepsize * \
-            (a[6, 0] * Kexc1 + a[6, 1] * Kexc2 + a[6, 2] * Kexc3 + \
-            a[6, 3] * Kexc4 + a[6, 4] * Kexc5 + a[6, 5] * Kexc6)
+            Vexc_old = Vexc_new
+            Vgov_old = Vgov_new
+            Vgen_old = Vgen_new
 
-        # Governors.
-        Kgov6 = case.governor(Xgov5, self.Pgov, Vgov5)
-        Xgov6 = self.Xgov0 + case.stepsize * \
-            (a[6, 0] * Kgov1 + a[6, 1] * Kgov2 + a[6, 2] * Kgov3 + \
-            a[6, 3] * Kgov4 + a[6, 4] * Kgov5 + a[6, 5] * Kgov6)
+            # Calculate system voltages
+            U_new = case.solveNetwork(Xgen_new, augYbus_solver, gbus)
 
-        # Generators.
-        Kgen6 = case.generator(Xgen5, Xexc6, Xgov6, self.Pgen, Vgen5)
-        Xgen6 = self.Xgen0 + case.stepsize * \
-            (a[6, 0] * Kgen1 + a[6, 1] * Kgen2 + a[6, 2] * Kgen3 + \
-            a[6, 3] * Kgen4 + a[6, 4] * Kgen5 + a[6, 5] * Kgen6)
+            # Calculate machine currents and power.
+            Id_new, Iq_new, Pe_new = case.machineCurrents(Xgen_new,
+                                                          U_new[gbus])
 
-        # Calculate system voltages.
-        U6 = case.solveNetwork(Xgen6, self.Pgen, self.augYbus_solver,
-                               self.gbus)
+            # Update variables that have changed.
+            Vgen_new = c_[Id_new, Iq_new, Pe_new]
+            Vexc_new = abs(U_new[gbus])
+            Vgov_new = Xgen_new[:, 1]
 
-        # Calculate machine currents and power.
-        Id6, Iq6, Pe6 = case.machineCurrents(Xgen6, self.Pgen,
-                                             U6[self.gbus])
+            # Correct the prediction, and find new values of x ----------------
 
-        # Update variables that have changed.
-        Vexc6 = abs(U6[self.gbus])
-        Vgen6 = r_[Id6, Iq6, Pe6]
-        Vgov6 = Xgen6[:, 1]
+            # Exciters.
+            dFexc1 = case.exciter(Xexc_old, Pexc, Vexc_new)
+            Xexc_new = Xexc0 + stepsize / 2.0 * (dFexc0 + dFexc1)
 
-        return Xexc6, Vexc6, Kexc6, Xgov6, Vgov6, Kgov6, Xgen6, Vgen6, Kgen6,U6
+            # Governors.
+            dFgov1 = case.governor(Xgov_old, Pgov, Vgov_new)
+            Xgov_new = Xgov0 + stepsize / 2.0 * (dFgov0 + dFgov1)
 
+            # Generators.
+            dFgen1 = case.generator(Xgen_old, Xexc_old, Xgov_old, Vgen_new)
+            Xgen_new = Xgen0 + stepsize / 2.0 * (dFgen0 + dFgen1)
 
-    def _k7(self, Xexc6, Vexc6, Kexc6, Kexc5, Kexc4, Kexc3, Kexc2, Kexc1,
-            Xgov6, Vgov6, Kgov6, Kgov5, Kgov4, Kgov3, Kgov2, Kgov1, Xgen6,
-            Vgen6, Kgen6, Kgen5, Kgen4, Kgen3, Kgen2, Kgen1):
-        case = self.dyn_case
-        b1 = self.b1
+            # Calculate error.
+            errest = max(abs(Vexc_new - Vexc_old).max(),
+                         abs(Vgov_new - Vgov_old).max(),
+                         abs(Vgen_new - Vgen_old).max(),
+                         abs(Xexc_new - Xexc_old).max(),
+                         abs(Xgov_new - Xgov_old).max(),
+                         abs(Xgen_new - Xgen_old).max())
 
-        # Exciters.
-        Kexc7 = case.exciter(Xexc6, self.Pexc, Vexc6)
-        Xexc7 = self.Xexc0 + case.stepsize * \
-            (b1[0] * Kexc1 + b1[1] * Kexc2 + b1[2] * Kexc3 + b1[3] * Kexc4 +
-             b1[4] * Kexc5 + b1[5] * Kexc6 + b1[6] * Kexc7)
+            if errest < self.tol:
+                break # solution found
+        else:
+            self.eulerfailed = True
 
-        # Governors.
-        Kgov7 = case.governor(Xgov6, self.Pgov, Vgov6)
-        Xgov7 = self.Xgov0 + case.stepsize * \
-            (b1[0]* Kgov1 + b1[1] * Kgov2 + b1[2] * Kgov3 + b1[3] * Kgov4 +
-             b1[4] * Kgov5 + b1[5] * Kgov6 + b1[6] * Kgov7)
+        return Xgen_new, Pgen, Vgen_new, Xexc_new, Pexc, Vexc_new, \
+            Xgov_new, Pgov, Vgov_new, U_new, t, stepsize
 
-        # Generators.
-        Kgen7 = case.generator(Xgen6, Xexc7, Xgov7, self.Pgen, Vgen6)
-        Xgen7 = self.Xgen0 + case.stepsize * \
-            (b1[0] * Kgen1 + b1[1] * Kgen2 + b1[2] * Kgen3 + b1[3] * Kgen4 +
-             b1[4] * Kgen5 + b1[5] * Kgen6 + b1[6] * Kgen7)
+#------------------------------------------------------------------------------
+#  "Trapezoidal" class:
+#------------------------------------------------------------------------------
 
-        # Calculate system voltages.
-        U7 = case.solveNetwork(Xgen7, self.Pgen, self.augYbus_solver,
-                               self.gbus)
+class Trapezoidal(object):
+    """ Implicit trapezoidal rule ODE solver.
+
+    The generator, exciter and governor states at the end of each step are
+    solved simultaneously, with the network equations, by Newton's method.
+    The network is solved with the factorised augmented admittance matrix
+    each time the derivatives are evaluated.  The Newton method is very
+    dishonest: the iteration matrix, I - h/2 * J, is formed by finite
+    differences and factorised only after a change of step size or of the
+    network, or if the previous step converged slowly, and is otherwise
+    reused.  If the iterations do not converge the step is rejected: the
+    initial state is returned with half the step size and the C{failed}
+    flag is set.  The trapezoidal rule is A-stable, so
+    the step size is not limited by the stiff exciter and governor time
+    constants.
+    """
 
-        # Calculate machine currents and power.
-        Id7, Iq7, Pe7 = case.machineCurrents(Xgen7, self.Pgen, U7[self.gbus])
+    def __init__(self, dyn_case=None, tolerance=1e-06, max_iter=20,
+                 slow_iter=6):
+        #: Dynamic case.
+        self.dyn_case = dyn_case
 
-        # Update variables that have changed
-        Vexc7 = abs(U7[self.gbus])
-        Vgen7 = r_[Id7, Iq7, Pe7]
-        Vgov7 = Xgen7[:, 1]
+        #: Convergence tolerance of the Newton iterations.
+        self.tolerance = tolerance
 
-        return Xexc7, Vexc7, Kexc7, Xgov7, Vgov7, Kgov7, Xgen7, Vgen7, Kgen7,U7
+        #: Maximum number of Newton iterations in a step.
+        self.max_iter = max_iter
 
-#------------------------------------------------------------------------------
-#  "ModifiedEuler2" class:
-#------------------------------------------------------------------------------
+        #: Number of Newton iterations after which the iteration matrix is
+        #: refactorised for the next step.
+        self.slow_iter = slow_iter
 
-class ModifiedEuler2(object):
-    """ Modified Euler ODE solver with check on interface errors.
+        #: Did the Newton iterations of the last step fail to converge?
+        self.failed = False
+
+        #: Number of factorisations of the iteration matrix.
+        self.factorisations = 0
+
+        # Factorised iteration matrix and the step size and network for
+        # which it was formed.
+        self._lu = None
+        self._stepsize = None
+        self._network = None
 
-    Based on ModifiedEuler2.m from MatDyn by Stijn Cole, developed at
-    Katholieke Universiteit Leuven. See U{http://www.esat.kuleuven.be/electa/
-    teaching/matdyn/} for more information.
-    """
 
-    def __init__(self, t, Xgen0, Pgen, Vgen0, Xexc0, Pexc, Vexc0, Xgov0, Pgov,
+    def refactorise(self):
+        """ Forces the iteration matrix to be factorised at the next step.
+        """
+        self._lu = None
+
+
+    def solve(self, t, Xgen0, Pgen, Vgen0, Xexc0, Pexc, Vexc0, Xgov0, Pgov,
             Vgov0, augYbus_solver, gbus, stepsize):
+        shapes = [Xgen0.shape, Xexc0.shape, Xgov0.shape]
+        x0 = r_[Xgen0.ravel(), Xexc0.ravel(), Xgov0.ravel()]
 
-        self.dyn_case = None
+        def f(x):
+            return self._derivatives(x, shapes, Pexc, Pgov, augYbus_solver,
+                                     gbus)
 
-        self.t = t
-        self.Xgen0
-        self.Pgen
-        self.Vgen0
-        self.Xexc0
-        self.Pexc
-        self.Vexc0
-        self.Xgov0
-        self.Pgov
-        self.Vgov0
-        self.augYbus_solver
-        self.gbus
-        self.stepsize
+        F0 = f(x0)[0]
+        self.failed = False
 
+        fresh = (self._lu is None or stepsize != self._stepsize or
+                 augYbus_solver is not self._network)
+        if fresh:
+            self._factorise(f, x0, F0, stepsize, shapes)
+            self._network = augYbus_solver
 
-    def solve(self):
-        case = self.dyn_case
+        # The state at the start of the step is the predictor, as an
+        # explicit predictor is unstable for the stiff states.
+        x1 = x0.copy()
 
-        eulerfailed = False
+        converged = False
+        i = 0
+        while True:
+            F1, Vgen1, Vexc1, Vgov1, U1 = f(x1)
+            G = x1 - x0 - stepsize / 2.0 * (F0 + F1)
+            if linalg.norm(G, Inf) < self.tolerance:
+                converged = True
+                break
+            if i == self.max_iter:
+                break
+            i += 1
 
-        # First Prediction Step -----------------------------------------------
+            # Refactorise at the current iterate if the iterations with the
+            # reused matrix are slow.
+            if i == self.slow_iter and not fresh:
+                self._factorise(f, x1, F1, stepsize, shapes)
+                fresh = True
 
-        # Exciters.
-        dFexc0 = case.exciter(self.Xexc0, self.Pexc, self.Vexc0)
-        Xexc_new = self.Xexc0 + case.stepsize * dFexc0
+            x1 = x1 - self._lu.solve(G)
 
-        # Governor.
-        dFgov0 = case.governor(self.Xgov0, self.Pgov, self.Vgov0)
-        Xgov_new = self.Xgov0 + case.stepsize * dFgov0
+        if not converged:
+            logger.warning("Newton iterations did not converge at t = %.4f, "
+                           "halving the step size." % t)
+            self.failed = True
+            self._lu = None
 
-        # Generators.
-        dFgen0 = case.generator(self.Xgen0, Xexc_new, Xgov_new, self.Pgen,
-                                self.Vgen0)
-        Xgen_new = self.Xgen0 + case.stepsize * dFgen0
+            U0 = self.dyn_case.solveNetwork(Xgen0, augYbus_solver, gbus)
 
-        Vexc_new = self.Vexc0
-        Vgov_new = self.Vgov0
-        Vgen_new = self.Vgen0
+            return Xgen0, Pgen, Vgen0, Xexc0, Pexc, Vexc0, \
+                Xgov0, Pgov, Vgov0, U0, t, stepsize / 2.0
+        elif i >= self.slow_iter:
+            self._lu = None
 
-        for i in range(self.maxit):
-            Xexc_old = Xexc_new
-            Xgov_old = Xgov_new
-            Xgen_old = Xgen_new
+        Xgen1, Xexc1, Xgov1 = self._unpack(x1, shapes)
 
-            Vexc_old = Vexc_new
-            Vgov_old = Vgov_new
-            Vgen_old = Vgen_new
+        return Xgen1, Pgen, Vgen1, Xexc1, Pexc, Vexc1, \
+            Xgov1, Pgov, Vgov1, U1, t, stepsize
 
-            # Calculate system voltages
-            U_new = case.solveNetwork(Xgen_new, self.Pgen, self.augYbus_solver,
-                                      self.gbus)
 
-            # Calculate machine currents and power.
-            Id_new, Iq_new, Pe_new = case.machineCurrents(Xgen_new, self.Pgen,
-                                                          U_new[self.gbus])
+    def _derivatives(self, x, shapes, Pexc, Pgov, augYbus_solver, gbus):
+        """ Returns the derivatives of the state vector, the generator,
+        exciter and governor inputs and the bus voltages.
+        """
+        case = self.dyn_case
+        Xgen, Xexc, Xgov = self._unpack(x, shapes)
 
-            # Update variables that have changed.
-            Vgen_new = r_[Id_new, Iq_new, Pe_new]
-            Vexc_new = abs(U_new[self.gbus])
-            Vgov_new = Xgen_new[:,1]
+        # Calculate system voltages.
+        U = case.solveNetwork(Xgen, augYbus_solver, gbus)
 
-            # Correct the prediction, and find new values of x ----------------
+        # Calculate machine currents and power.
+        Id, Iq, Pe = case.machineCurrents(Xgen, U[gbus])
 
-            # Exciters.
-            dFexc1 = case.exciter(Xexc_old, self.Pexc, Vexc_new)
-            Xexc_new = self.Xexc0 + case.stepsize / 2.0 * (dFexc0 + dFexc1)
+        Vgen = c_[Id, Iq, Pe]
+        Vexc = abs(U[gbus])
+        Vgov = Xgen[:, 1]
 
-            # Governors.
-            dFgov1 = case.governor(Xgov_old, self.Pgov, Vgov_new)
-            Xgov_new = self.Xgov0 + case.stepsize / 2.0 * (dFgov0 + dFgov1)
+        F = r_[case.generator(Xgen, Xexc, Xgov, Vgen).ravel(),
+               case.exciter(Xexc, Pexc, Vexc).ravel(),
+               case.governor(Xgov, Pgov, Vgov).ravel()]
 
-            # Generators.
-            dFgen1 = case.generator(Xgen_old, Xexc_new, Xgov_new, self.Pgen,
-                                    Vgen_new)
-            Xgen_new = self.Xgen0 + case.stepsize / 2.0 * (dFgen0 + dFgen1)
+        return F, Vgen, Vexc, Vgov, U
 
-            # Calculate error.
-            Xexc_d = abs((Xexc_new - Xexc_old).T)
-            Xgov_d = abs((Xgov_new - Xgov_old).T)
-            Xgen_d = abs((Xgen_new - Xgen_old).T)
 
-            Vexc_d = abs((Vexc_new - Vexc_old).T)
-            Vgov_d = abs((Vgov_new - Vgov_old).T)
-            Vgen_d = abs((Vgen_new - Vgen_old).T)
+    def _factorise(self, f, x, F, stepsize, shapes):
+        """ Forms the sparse iteration matrix at x by forward differences
+        and factorises it.  The states in each group of L{_column_groups}
+        are perturbed together.
+        """
+        n = len(x)
+        rows, cols, vals = [], [], []
+        for group, patterns in self._column_groups(shapes):
+            dx = math.sqrt(EPS) * maximum(abs(x[group]), 1.0)
+            xj = x.copy()
+            xj[group] += dx
+            dF = f(xj)[0] - F
+            for j, h, pattern in zip(group, dx, patterns):
+                if pattern is None:
+                    pattern = flatnonzero(dF)
+                rows.append(pattern)
+                cols.append(ones(len(pattern), dtype=int) * j)
+                vals.append(dF[pattern] / h)
+
+        J = csc_matrix((r_[tuple(vals)], (r_[tuple(rows)], r_[tuple(cols)])),
+                       (n, n))
+
+        self._lu = splu((identity(n, format="csc") -
+                         stepsize / 2.0 * J).tocsc())
+        self._stepsize = stepsize
+        self.factorisations += 1
+
+
+    def _column_groups(self, shapes):
+        """ Returns groups of state indexes that may be perturbed together
+        when forming the iteration matrix, with the indexes of the
+        derivatives that each state may change, or None for all of them.
+
+        The rotor angles and transient voltages change the network solution,
+        and so the derivatives of all machines, and are perturbed one at a
+        time.  The speed, exciter and governor states change only the
+        derivatives of their own machine, so each of these states is
+        perturbed for all machines together.  The unused transient voltage
+        of the classical machines is not perturbed.
+        """
+        (ng, kgen), (_, kexc), (_, kgov) = shapes
+        gen = arange(ng * kgen).reshape(ng, kgen)
+        exc = ng * kgen + arange(ng * kexc).reshape(ng, kexc)
+        gov = ng * (kgen + kexc) + arange(ng * kgov).reshape(ng, kgov)
 
-            errest = max( r_[max(max(Vexc_d)), max(max(Vgov_d)), max(max(Vgen_d)), max(max(Xexc_d)), max(max(Xgov_d)), max(max(Xgen_d))] )
+        classical = set(self.dyn_case._generators[CLASSICAL].rows)
 
-            if errest < self.tol:
-                break    # solution found
-            else:
-                if i == self.maxit:
-                    U0 = U_new
-                    Vexc0 = Vexc_new
-                    Vgov0 = Vgov_new
-                    Vgen0 = Vgen_new
-                    Xgen0 = Xgen_new
-                    Xexc0 = Xexc_new
-                    Xgov0 = Xgov_new
-                    Pgen0 = self.Pgen
-                    Pexc0 = self.Pexc
-                    Pgov0 = self.Pgov
-                    eulerfailed = True
-                    return Xgen0, Pgen0, Vgen0, Xexc0, Pexc0, Vexc0, Xgov0, \
-                        Pgov0, Vgov0, U0, self.t, eulerfailed, case.stepsize
-        # Update
-        U0 = U_new
-
-        Vexc0 = Vexc_new
-        Vgov0 = Vgov_new
-        Vgen0 = Vgen_new
-
-        Xgen0 = Xgen_new
-        Xexc0 = Xexc_new
-        Xgov0 = Xgov_new
-
-        Pgen0 = self.Pgen
-        Pexc0 = self.Pexc
-        Pgov0 = self.Pgov
-
-        return Xgen0, Pgen0, Vgen0, Xexc0, Pexc0, Vexc0, Xgov0, Pgov0, Vgov0, \
-            U0, self.t, eulerfailed, case.stepsize
+        groups = []
+        for m in range(ng):
+            for k in [0, 2, 3]:
+                if k == 3 and m in classical:
+                    continue
+                groups.append((gen[m, k:k + 1], [None]))
+
+        own = [r_[gen[m], exc[m], gov[m]] for m in range(ng)]
+        groups.append((gen[:, 1], own))
+        for k in range(kexc):
+            groups.append((exc[:, k], own))
+        for k in range(kgov):
+            groups.append((gov[:, k], own))
+
+        return groups
+
+
+    def _unpack(self, x, shapes):
+        """ Returns the generator, exciter and governor state matrices.
+        """
+        matrices = []
+        i = 0
+        for shape in shapes:
+            n = shape[0] * shape[1]
+            matrices.append(x[i:i + n].reshape(shape))
+            i += n
+        return matrices
 
 #------------------------------------------------------------------------------
 #  "DynamicGenerator" class:
@@ -2125,4 +1669,18 @@ class BranchChange(object):
         #: New parameter value.
         self.newval = newval
 
+#------------------------------------------------------------------------------
+#  Runge-Kutta stages:
+#------------------------------------------------------------------------------
+
+def _combine(coeffs, K):
+    """ Returns the sum of the stage derivatives in K weighted by the
+    coefficients.
+    """
+    X = zeros(K[0].shape)
+    for c, Kj in zip(coeffs, K):
+        if c != 0.0:
+            X += c * Kj
+    return X
+
 # EOF -------------------------------------------------------------------------
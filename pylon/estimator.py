@@ -30,12 +30,17 @@ import logging
 from time import time
 
 from numpy import \
-    array, pi, angle, abs, ones, exp, linalg, conj, zeros, r_, Inf
+    array, pi, angle, abs, ones, exp, linalg, conj, zeros, r_, Inf, \
+    asarray, arange, flatnonzero, where, diff, repeat, cumsum, unique, \
+    bincount, sqrt, dot, searchsorted, minimum, maximum, split, isnan, \
+    nan, genfromtxt, atleast_1d
+
+from scipy.stats import chi2
 
 from scipy.sparse import \
-    csr_matrix, vstack, hstack
+    csr_matrix, csc_matrix, vstack
 
-from scipy.sparse.linalg import spsolve
+from scipy.sparse.linalg import spsolve, splu
 
 from case import PV, PQ
 
@@ -58,6 +63,16 @@ QG = "Qg"
 VA = "Va"
 VM = "Vm"
 
+VPH = "Vph" # Measurement of the voltage phasor at a bus.
+IFPH = "Ifph" # Measurement of the current phasor at a branch from end.
+ITPH = "Itph"
+
+# Order of the measurement types in z, H and the measurement variances.
+TYPES = [PF, PT, QF, QT, PG, QG, VM, VA]
+
+# Order of the phasor measurement types in the measurement variances.
+PHASOR_TYPES = [VPH, IFPH, ITPH]
+
 CASE_GUESS = "case guess"
 FLAT_START = "flat start"
 FROM_INPUT = "from input"
@@ -78,7 +93,8 @@ class StateEstimator(object):
     #--------------------------------------------------------------------------
 
     def __init__(self, case, measurements, sigma=None, v_mag_guess=None,
-                 max_iter=100, tolerance=1e-05, verbose=True):
+                 max_iter=100, tolerance=1e-05, verbose=True,
+                 pseudo_sigma=0.1):
         """ Initialises a new StateEstimator instance.
         """
         #: Case whose state is to be estimated.
@@ -102,6 +118,17 @@ class StateEstimator(object):
         #: Log progress information.
         self.verbose = verbose
 
+        #: Standard deviation of the pseudo-measurements that are added if
+        #: the case is not observable.  None if they are not to be added.
+        self.pseudo_sigma = pseudo_sigma
+
+        # Measurement Jacobian and the layout for which it was built.
+        self._jac = None
+        self._layout = None
+
+        # Pseudo-measurements that make the case observable.
+        self._pseudo = []
+
     #--------------------------------------------------------------------------
     #  Run the state estimator:
     #--------------------------------------------------------------------------
@@ -110,151 +137,76 @@ class StateEstimator(object):
         """ Solves a state estimation problem.
         """
         case = self.case
-        baseMVA = case.base_mva
         buses = self.case.connected_buses
-        branches = case.online_branches
         generators = case.online_generators
-        meas = self.measurements
         # Update indices.
         self.case.index_buses()
         self.case.index_branches()
 
-        # Index buses.
-#        ref = [b._i for b in buses if b.type == REFERENCE]
-        pv  = [b._i for b in buses if b.type == PV]
-        pq  = [b._i for b in buses if b.type == PQ]
-
         # Build admittance matrices.
         Ybus, Yf, Yt = case.Y
 
+        # Measurement Jacobian for the measurement set and topology.
+        jac = self._setup(Ybus, Yf, Yt)
+
         # Prepare initial guess.
         V0 = self.getV0(self.v_mag_guess, buses, generators)
 
         # Start the clock.
         t0 = time()
 
-        # Initialise SE.
-        converged = False
-        i = 0
-        V = V0
-        Va = angle(V0)
-        Vm = abs(V0)
+        # Form measurement vector in the order of the estimated measurements.
+        z = self._sorted_values()
 
-        nb = Ybus.shape[0]
-        f = [b.from_bus._i for b in branches]
-        t = [b.to_bus._i for b in branches]
-        nonref = pv + pq
+        # Measurement weights, the diagonal of R inverse.
+        sigma_squared = self._sigma_vector()**2
+        w = 1.0 / sigma_squared
 
-        # Form measurement vector.
-        z = array([m.value for m in meas])
+        V, z_est, converged, i = self._estimate(jac, V0, z, w)
 
-        # Form measurement index vectors.
-        idx_zPf = [m.b_or_l._i for m in meas if m.type == PF]
-        idx_zPt = [m.b_or_l._i for m in meas if m.type == PT]
-        idx_zQf = [m.b_or_l._i for m in meas if m.type == QF]
-        idx_zQt = [m.b_or_l._i for m in meas if m.type == QT]
-        idx_zPg = [m.b_or_l._i for m in meas if m.type == PG]
-        idx_zQg = [m.b_or_l._i for m in meas if m.type == QG]
-        idx_zVm = [m.b_or_l._i for m in meas if m.type == VM]
-        idx_zVa = [m.b_or_l._i for m in meas if m.type == VA]
-
-        def col(seq):
-            return [[k] for k in seq]
+        # Weighted sum squares of error.
+        error_sqrsum = sum((z - z_est)**2 / sigma_squared)
 
-        # Create inverse of covariance matrix with all measurements.
-#        full_scale = 30
-#        sigma = [
-#            0.02 * abs(Sf)      + 0.0052 * full_scale * ones(nbr,1),
-#            0.02 * abs(St)      + 0.0052 * full_scale * ones(nbr,1),
-#            0.02 * abs(Sbus)    + 0.0052 * full_scale * ones(nb,1),
-#            0.2 * pi/180 * 3*ones(nb,1),
-#            0.02 * abs(Sf)      + 0.0052 * full_scale * ones(nbr,1),
-#            0.02 * abs(St)      + 0.0052 * full_scale * ones(nbr,1),
-#            0.02 * abs(Sbus)    + 0.0052 * full_scale * ones(nb,1),
-#            0.02 * abs(V0)      + 0.0052 * 1.1 * ones(nb,1),
-#        ] ./ 3
+        # Update case with solution.
+        case.pf_solution(Ybus, Yf, Yt, V)
+
+        # Stop the clock.
+        elapsed = time() - t0
 
-        # Get R inverse matrix.
-        sigma_vector = r_[
-            self.sigma[0] * ones(len(idx_zPf)),
-            self.sigma[1] * ones(len(idx_zPt)),
-            self.sigma[2] * ones(len(idx_zQf)),
-            self.sigma[3] * ones(len(idx_zQt)),
-            self.sigma[4] * ones(len(idx_zPg)),
-            self.sigma[5] * ones(len(idx_zQg)),
-            self.sigma[6] * ones(len(idx_zVm)),
-            self.sigma[7] * ones(len(idx_zVa))
-        ]
-        sigma_squared = sigma_vector**2
-
-        rsig = range(len(sigma_squared))
-        Rinv = csr_matrix((1.0 / sigma_squared, (rsig, rsig)))
+        if self.verbose and converged:
+            print "State estimation converged in: %.3fs (%d iterations)" % \
+            (elapsed, i)
+#            self.output_solution(sys.stdout, z, z_est)
+
+        solution = {"V": V, "converged": converged, "iterations": i,
+                    "z": z, "z_est": z_est, "error_sqrsum": error_sqrsum,
+                    "elapsed": elapsed}
+
+        return solution
+
+
+    def _estimate(self, jac, V, z, w):
+        """ Returns the estimated voltages and measurements, the convergence
+        flag and the number of Gauss-Newton iterations.
+        """
+        nonref = self._nonref
+        npvpq = len(nonref)
+        Va = angle(V)
+        Vm = abs(V)
+
+        converged = False
+        i = 0
 
         # Do Newton iterations.
         while (not converged) and (i < self.max_iter):
             i += 1
 
-            # Compute estimated measurement.
-            Sfe = V[f] * conj(Yf * V)
-            Ste = V[t] * conj(Yt * V)
-            # Compute net injection at generator buses.
-            gbus = [g.bus._i for g in generators]
-            Sgbus = V[gbus] * conj(Ybus[gbus, :] * V)
-            # inj S + local Sd
-            Sd = array([complex(b.p_demand, b.q_demand) for b in buses])
-            Sgen = (Sgbus * baseMVA + Sd) / baseMVA
-
-            z_est = r_[
-                Sfe[idx_zPf].real,
-                Ste[idx_zPt].real,
-                Sfe[idx_zQf].imag,
-                Ste[idx_zQt].imag,
-                Sgen[idx_zPg].real,
-                Sgen[idx_zQg].imag,
-                abs(V[idx_zVm]),
-                angle(V[idx_zVa])
-            ]
-
-            # Get H matrix.
-            dSbus_dVm, dSbus_dVa = case.dSbus_dV(Ybus, V)
-            dSf_dVa, dSf_dVm, dSt_dVa, dSt_dVm, _, _ = case.dSbr_dV(Yf, Yt,V)
-
-            # Get sub-matrix of H relating to line flow.
-            dPF_dVa = dSf_dVa.real # from end
-            dQF_dVa = dSf_dVa.imag
-            dPF_dVm = dSf_dVm.real
-            dQF_dVm = dSf_dVm.imag
-            dPT_dVa = dSt_dVa.real # to end
-            dQT_dVa = dSt_dVa.imag
-            dPT_dVm = dSt_dVm.real
-            dQT_dVm = dSt_dVm.imag
-            # Get sub-matrix of H relating to generator output.
-            dPG_dVa = dSbus_dVa[gbus, :].real
-            dQG_dVa = dSbus_dVa[gbus, :].imag
-            dPG_dVm = dSbus_dVm[gbus, :].real
-            dQG_dVm = dSbus_dVm[gbus, :].imag
-            # Get sub-matrix of H relating to voltage angle.
-            dVa_dVa = csr_matrix((ones(nb), (range(nb), range(nb))))
-            dVa_dVm = csr_matrix((nb, nb))
-            # Get sub-matrix of H relating to voltage magnitude.
-            dVm_dVa = csr_matrix((nb, nb))
-            dVm_dVm = csr_matrix((ones(nb), (range(nb), range(nb))))
-
-            h = [(col(idx_zPf), dPF_dVa, dPF_dVm),
-                 (col(idx_zQf), dQF_dVa, dQF_dVm),
-                 (col(idx_zPt), dPT_dVa, dPT_dVm),
-                 (col(idx_zQt), dQT_dVa, dQT_dVm),
-                 (col(idx_zPg), dPG_dVa, dPG_dVm),
-                 (col(idx_zQg), dQG_dVa, dQG_dVm),
-                 (col(idx_zVm), dVm_dVa, dVm_dVm),
-                 (col(idx_zVa), dVa_dVa, dVa_dVm)]
-
-            H = vstack([hstack([dVa[idx, nonref], dVm[idx, nonref]])
-                        for idx, dVa, dVm in h if len(idx) > 0 ])
+            # Compute estimated measurements and the H matrix.
+            z_est, H = jac.evaluate(V)
 
             # Compute update step.
-            J = H.T * Rinv * H
-            F = H.T * Rinv * (z - z_est) # evalute F(x)
+            J = jac.gain(w)
+            F = H.T * (w * (z - z_est)) # evalute F(x)
             dx = spsolve(J, F)
 
             # Check for convergence.
@@ -267,8 +219,6 @@ class StateEstimator(object):
                 converged = True
 
             # Update voltage.
-            npvpq = len(nonref)
-
             Va[nonref] = Va[nonref] + dx[:npvpq]
             Vm[nonref] = Vm[nonref] + dx[npvpq:2 * npvpq]
 
@@ -276,25 +226,111 @@ class StateEstimator(object):
             Va = angle(V)
             Vm = abs(V)
 
-        # Weighted sum squares of error.
-        error_sqrsum = sum((z - z_est)**2 / sigma_squared)
+        return V, z_est, converged, i
 
-        # Update case with solution.
-        case.pf_solution(Ybus, Yf, Yt, V)
 
-        # Stop the clock.
-        elapsed = time() - t0
+    def _setup(self, Ybus, Yf, Yt):
+        """ Returns the measurement Jacobian.  It is cached for as long as
+        the measurement set and the topology of the case are unchanged.
+        """
+        buses = self.case.connected_buses
+        branches = self.case.online_branches
+        self._ms = ms = _measurement_set(self.measurements)
+
+        layout = (ms.types.tostring(), ms.index.tostring(),
+                  tuple([(l.from_bus._i, l.to_bus._i) for l in branches]),
+                  tuple([b.type for b in buses]))
+
+        if self._layout == layout:
+            return self._jac
+
+        # Complete the measurement set with pseudo-measurements of the
+        # generation at buses if the case is not observable.  If it is, the
+        # analysis costs one sparse factorisation of the unit admittance
+        # gain matrix of each sub-problem, as islands are only searched for
+        # after a zero pivot.
+        self._pseudo = []
+        if self.pseudo_sigma is not None:
+            from pylon.observability import ObservabilityAnalysis
+            self._pseudo = ObservabilityAnalysis(self.case,
+                ms).pseudo_measurements(self.pseudo_sigma)
+            if self._pseudo:
+                logger.warning("Case not observable, %d pseudo-measurements "
+                               "added." % len(self._pseudo))
+        self._ps = ps = MeasurementSet.from_measurements(self._pseudo)
 
-        if self.verbose and converged:
-            print "State estimation converged in: %.3fs (%d iterations)" % \
-            (elapsed, i)
-#            self.output_solution(sys.stdout, z, z_est)
+        # Index buses.
+#        ref = [b._i for b in buses if b.type == REFERENCE]
+        pv  = [b._i for b in buses if b.type == PV]
+        pq  = [b._i for b in buses if b.type == PQ]
+        self._nonref = pv + pq
 
-        solution = {"V": V, "converged": converged, "iterations": i,
-                    "z": z, "z_est": z_est, "error_sqrsum": error_sqrsum,
-                    "elapsed": elapsed}
+        f = [b.from_bus._i for b in branches]
+        t = [b.to_bus._i for b in branches]
 
-        return solution
+        # Position of each estimated measurement in the measurements,
+        # followed by the pseudo-measurements, grouped by type.
+        types = r_[ms.types, ps.types]
+        self._order = order = types.argsort(kind="mergesort")
+        self._types = types[order]
+        self._index = r_[ms.index, ps.index][order]
+
+        # Form measurement index vectors.
+        counts = bincount(types, minlength=len(TYPES))
+        idx = split(self._index, cumsum(counts)[:-1])
+
+        # Demands are fixed for the estimation.
+        Sd = array([complex(b.p_demand, b.q_demand) for b in buses])
+
+        # Sparsity patterns of H and of the gain matrix.
+        self._jac = _MeasurementJacobian(Ybus, Yf, Yt, f, t, self._nonref,
+                                         Sd / self.case.base_mva, idx)
+        self._layout = layout
+
+        return self._jac
+
+
+    def _sorted_values(self):
+        """ Returns the measured values in the order of the estimates.
+        """
+        return r_[self._ms.values, self._ps.values][self._order]
+
+
+    def _measurement(self, k):
+        """ Returns the k-th estimated measurement.  The position in the
+        MeasurementSet is returned for measurements that are not given as
+        Measurement objects.
+        """
+        p = self._order[k]
+        n = len(self._ms)
+        if p >= n:
+            return self._pseudo[p - n]
+        elif isinstance(self.measurements, MeasurementSet):
+            return p
+        else:
+            return self.measurements[p]
+
+
+    def _sigma_vector(self):
+        """ Returns the standard deviation of each measurement.
+        """
+        # Create inverse of covariance matrix with all measurements.
+#        full_scale = 30
+#        sigma = [
+#            0.02 * abs(Sf)      + 0.0052 * full_scale * ones(nbr,1),
+#            0.02 * abs(St)      + 0.0052 * full_scale * ones(nbr,1),
+#            0.02 * abs(Sbus)    + 0.0052 * full_scale * ones(nb,1),
+#            0.2 * pi/180 * 3*ones(nb,1),
+#            0.02 * abs(Sf)      + 0.0052 * full_scale * ones(nbr,1),
+#            0.02 * abs(St)      + 0.0052 * full_scale * ones(nbr,1),
+#            0.02 * abs(Sbus)    + 0.0052 * full_scale * ones(nb,1),
+#            0.02 * abs(V0)      + 0.0052 * 1.1 * ones(nb,1),
+#        ] ./ 3
+
+        sigma = r_[self._ms.sigma, self._ps.sigma][self._order]
+        default = asarray(self.sigma, dtype=float)[self._types]
+
+        return where(isnan(sigma), default, sigma)
 
 
     def getV0(self, v_mag_guess, buses, generators, type=CASE_GUESS):
@@ -337,20 +373,631 @@ class StateEstimator(object):
         fd.write("\n")
         fd.write(sep)
 
-        c = 0
-        for t in [PF, PT, QF, QT, PG, QG, VM, VA]:
-            for meas in self.measurements:
-                if meas.type == t:
-                    n = meas.b_or_l.name[:col_width].ljust(col_width)
-                    fd.write(t.ljust(col_width) + " ")
-                    fd.write(n + " ")
-                    fd.write("%11.5f " % z[c])
-                    fd.write("%11.5f\n" % z_est[c])
-#                    fd.write("%s\t%s\t%.3f\t%.3f\n" % (t, n, z[c], z_est[c]))
-                    c += 1
+        buses = self.case.connected_buses
+        branches = self.case.online_branches
+        for c in range(len(z)):
+            t = TYPES[self._types[c]]
+            elm = branches if t in [PF, PT, QF, QT] else buses
+            n = elm[self._index[c]].name[:col_width].ljust(col_width)
+            fd.write(t.ljust(col_width) + " ")
+            fd.write(n + " ")
+            fd.write("%11.5f " % z[c])
+            fd.write("%11.5f\n" % z_est[c])
 
         fd.write("\nWeighted sum of error squares = %.4f\n" % error_sqrsum)
 
+#------------------------------------------------------------------------------
+#  "FastDecoupledEstimator" class:
+#------------------------------------------------------------------------------
+
+class FastDecoupledEstimator(StateEstimator):
+    """ Fast decoupled weighted least squares state estimation.
+
+    The voltage angles and magnitudes are updated in turn, the P-Va and
+    Q-Vm sub-problems, with the diagonal blocks of the gain matrix at flat
+    start.  The blocks are factorised once and reused for all iterations
+    and for later runs with the same measurement set, variances and
+    topology.  The right hand sides are the gradient of the full problem,
+    so the estimate is that of L{StateEstimator}, but convergence is slow
+    for branches with high R/X ratios.
+    """
+
+    def __init__(self, case, measurements, sigma=None, v_mag_guess=None,
+                 max_iter=100, tolerance=1e-05, verbose=True,
+                 pseudo_sigma=0.1):
+        """ Initialises a new FastDecoupledEstimator instance.
+        """
+        super(FastDecoupledEstimator, self).__init__(case, measurements,
+            sigma, v_mag_guess, max_iter, tolerance, verbose, pseudo_sigma)
+
+        # Factors of the P-Va and Q-Vm gain matrices and the Jacobian and
+        # weights from which they were formed.
+        self._lu = None
+        self._lu_jac = None
+        self._lu_w = None
+
+
+    def _estimate(self, jac, V, z, w):
+        """ Returns the estimated voltages and measurements, the convergence
+        flag and the number of iterations.
+        """
+        nonref = self._nonref
+        npvpq = len(nonref)
+        luP, luQ = self._factorise(jac, w)
+
+        Va = angle(V)
+        Vm = abs(V)
+
+        converged = False
+        i = 0
+
+        while i < self.max_iter:
+            i += 1
+
+            # P-Va half iteration.
+            z_est, H = jac.evaluate(V)
+            F = H.T * (w * (z - z_est))
+
+            normF = linalg.norm(F, Inf)
+            if self.verbose:
+                logger.info("Iteration [%d]: Norm of mismatch: %.3f" %
+                            (i, normF))
+            if normF < self.tolerance:
+                converged = True
+                break
+
+            Va[nonref] = Va[nonref] + luP.solve(F[:npvpq])
+            V = Vm * exp(1j * Va)
+
+            # Q-Vm half iteration.
+            z_est, H = jac.evaluate(V)
+            F = H.T * (w * (z - z_est))
+
+            Vm[nonref] = Vm[nonref] + luQ.solve(F[npvpq:])
+            V = Vm * exp(1j * Va)
+
+        return V, z_est, converged, i
+
+
+    def _factorise(self, jac, w):
+        """ Returns the factors of the gain matrices of the P-Va and Q-Vm
+        sub-problems, formed at flat start.
+        """
+        if (self._lu_jac is jac) and (len(self._lu_w) == len(w)) and \
+                (self._lu_w == w).all():
+            return self._lu
+
+        npvpq = len(self._nonref)
+        _, H0 = jac.evaluate(ones(jac.nb, dtype=complex))
+
+        nm = H0.shape[0]
+        W = csr_matrix((w, (arange(nm), arange(nm))), (nm, nm))
+
+        lu = []
+        for cols in [slice(0, npvpq), slice(npvpq, 2 * npvpq)]:
+            Hs = H0[:, cols]
+            lu.append(splu(csc_matrix(Hs.T * W * Hs)))
+
+        self._lu = tuple(lu)
+        self._lu_jac = jac
+        self._lu_w = w.copy()
+
+        return self._lu
+
+#------------------------------------------------------------------------------
+#  "TrackingStateEstimator" class:
+#------------------------------------------------------------------------------
+
+class TrackingStateEstimator(FastDecoupledEstimator):
+    """ Tracking state estimation for a stream of measurement snapshots.
+
+    The estimator is configured once with the case and the measurement
+    layout, a list of (bus or branch, type) pairs or a L{MeasurementSet}
+    whose values are ignored.  Each snapshot of values
+    is given as an array in the order of the layout.  The estimation starts
+    from the last converged estimate and uses the measurement Jacobian and
+    gain matrix factors of the layout, so no objects are created for each
+    snapshot and the case is not updated.
+    """
+
+    def __init__(self, case, layout, sigma=None, max_iter=100,
+                 tolerance=1e-05, verbose=False, pseudo_sigma=0.1):
+        """ Initialises a new TrackingStateEstimator instance.
+        """
+        case.index_buses()
+        case.index_branches()
+
+        if not isinstance(layout, MeasurementSet):
+            layout = MeasurementSet([typ for _, typ in layout],
+                                    [b_or_l._i for b_or_l, _ in layout],
+                                    zeros(len(layout)))
+
+        super(TrackingStateEstimator, self).__init__(case, layout,
+            sigma, None, max_iter, tolerance, verbose, pseudo_sigma)
+
+        Ybus, Yf, Yt = case.Y
+        self._setup(Ybus, Yf, Yt)
+
+        # Measurement weights.
+        self._w = 1.0 / self._sigma_vector()**2
+
+        #: Last converged estimate of the bus voltages.
+        self.V = self.getV0(None, case.connected_buses,
+                            case.online_generators)
+
+
+    def update(self, z):
+        """ Returns the state estimate for a snapshot of measured values,
+        given in the order of the layout.  The residuals are returned in
+        the same order.
+        """
+        t0 = time()
+
+        z = r_[asarray(z, dtype=float), self._ps.values][self._order]
+
+        V, z_est, converged, i = self._estimate(self._jac, self.V, z, self._w)
+
+        if converged:
+            self.V = V
+        else:
+            logger.warning("State estimation did not converge in %d "
+                           "iterations." % i)
+
+        r = z - z_est
+        residuals = zeros(len(r))
+        residuals[self._order] = r
+        residuals = residuals[:len(self._ms)]
+
+        solution = {"V": V, "converged": converged, "iterations": i,
+                    "residuals": residuals,
+                    "error_sqrsum": sum(self._w * r**2),
+                    "elapsed": time() - t0}
+
+        return solution
+
+#------------------------------------------------------------------------------
+#  "BadDataDetector" class:
+#------------------------------------------------------------------------------
+
+class BadDataDetector(object):
+    """ Detects bad data with the chi-square test of the weighted sum of
+    squared residuals and identifies it with the largest normalized residual
+    test.  The measurement with the largest normalized residual is removed,
+    by setting its weight to zero so that the measurement Jacobian is not
+    rebuilt, and the state is estimated again from the last estimate until
+    the chi-square test is passed.
+
+    The normalized residual of measurement i is::
+
+        |r_i| / sqrt(sigma_i^2 - H_i*inv(G)*H_i')
+
+    and only the entries of inv(G) at the non-zeros of the gain matrix, G,
+    are computed from its factors (Takahashi).
+    """
+
+    def __init__(self, estimator, confidence=0.99, threshold=3.0,
+                 max_removals=10):
+        """ Initialises a new BadDataDetector instance.
+        """
+        #: State estimator for the case and measurements.
+        self.estimator = estimator
+
+        #: Confidence level of the chi-square test.
+        self.confidence = confidence
+
+        #: Normalized residuals above which a measurement is bad.
+        self.threshold = threshold
+
+        #: Maximum number of measurements removed.
+        self.max_removals = max_removals
+
+
+    def run(self):
+        """ Returns the state estimate after the removal of bad data.  The
+        solution includes the list of "bad" measurements, as positions for
+        a L{MeasurementSet}, and the normalized residuals, "r_norm", in the
+        order of the estimated measurements, that are zero for removed and
+        critical measurements.
+        """
+        se = self.estimator
+        case = se.case
+        case.index_buses()
+        case.index_branches()
+        Ybus, Yf, Yt = case.Y
+
+        t0 = time()
+
+        jac = se._setup(Ybus, Yf, Yt)
+        z = se._sorted_values()
+        sigma_squared = se._sigma_vector()**2
+        w = 1.0 / sigma_squared
+        nx = 2 * len(se._nonref)
+
+        V = se.getV0(se.v_mag_guess, case.connected_buses,
+                     case.online_generators)
+        bad = []
+        iterations = 0
+        detected = False
+        error_sqrsum = Inf
+        r_norm = zeros(len(z))
+
+        while True:
+            V, z_est, converged, i = se._estimate(jac, V, z, w)
+            iterations += i
+            if not converged:
+                logger.error("State estimation did not converge.")
+                break
+
+            r = z - z_est
+            error_sqrsum = sum(w * r**2)
+
+            # Chi-square test with a degree of freedom for each redundant
+            # measurement.
+            dof = (w > 0.0).sum() - nx
+            if dof < 1:
+                break
+            limit = chi2.ppf(self.confidence, dof)
+            detected = error_sqrsum > limit
+            logger.info("Weighted sum of squared residuals: %.3f "
+                        "(limit %.3f)" % (error_sqrsum, limit))
+
+            r_norm = self.normalized_residuals(jac, V, w, r, sigma_squared)
+            if not detected:
+                break
+
+            k = r_norm.argmax()
+            if (r_norm[k] < self.threshold) or \
+                    (len(bad) == self.max_removals):
+                break
+
+            logger.info("Removing bad measurement [%s %d]: %.3f" %
+                        (TYPES[se._types[k]], se._index[k], r_norm[k]))
+            bad.append(se._measurement(k))
+            w[k] = 0.0
+
+        case.pf_solution(Ybus, Yf, Yt, V)
+
+        solution = {"V": V, "converged": converged,
+                    "iterations": iterations, "z": z, "z_est": z_est,
+                    "error_sqrsum": error_sqrsum, "detected": detected,
+                    "bad": bad, "r_norm": r_norm, "elapsed": time() - t0}
+
+        return solution
+
+
+    def normalized_residuals(self, jac, V, w, r, sigma_squared):
+        """ Returns the normalized residuals at the given estimate.
+        """
+        jac.evaluate(V)
+        G = jac.gain(w)
+        omega = sigma_squared - jac.projection_diag(_sparse_inverse(G))
+
+        # Removed and critical measurements have no normalized residual.
+        valid = (w > 0.0) & (omega > 1e-6 * sigma_squared)
+        r_norm = zeros(len(r))
+        r_norm[valid] = abs(r[valid]) / sqrt(omega[valid])
+
+        return r_norm
+
+#------------------------------------------------------------------------------
+#  "PMUStateEstimator" class:
+#------------------------------------------------------------------------------
+
+class PMUStateEstimator(object):
+    """ Linear state estimation from voltage and current phasor
+    measurements.
+
+    The measurements are linear in the bus voltages, z = A*V, where the
+    rows of A are unit vectors for voltage phasors and rows of Yf and Yt
+    for branch current phasors.  The voltages are estimated directly by
+    weighted least squares::
+
+        V = inv(A'*W*A) * A'*W*z
+
+    The complex gain matrix A'*W*A is factorised once, when the estimator
+    is initialised, so each frame of phasor values requires a sparse
+    product and a pair of triangular solves.
+    """
+
+    def __init__(self, case, measurements, sigma=None):
+        """ Initialises a new PMUStateEstimator instance.
+        """
+        #: Case whose state is to be estimated.
+        self.case = case
+
+        #: Phasor measurements for the case.
+        self.measurements = measurements
+
+        #: Standard deviations of VPH, IFPH and ITPH measurements.
+        self.sigma = ones(3) if sigma is None else sigma
+
+        case.index_buses()
+        case.index_branches()
+        _, Yf, Yt = case.Y
+        nb = len(case.connected_buses)
+        Yf, Yt = csr_matrix(Yf), csr_matrix(Yt)
+
+        rows = []
+        for m in measurements:
+            if m.type == VPH:
+                rows.append(csr_matrix(([1.0], ([0], [m.b_or_l._i])), (1, nb)))
+            elif m.type == IFPH:
+                rows.append(Yf[m.b_or_l._i, :])
+            elif m.type == ITPH:
+                rows.append(Yt[m.b_or_l._i, :])
+            else:
+                raise ValueError, "Not a phasor measurement [%s]." % m.type
+        A = vstack(rows, "csr")
+
+        # Measurement weights.
+        sigma = array([self.sigma[PHASOR_TYPES.index(m.type)]
+                       for m in measurements])
+        self._w = w = 1.0 / sigma**2
+        nm = len(w)
+        W = csr_matrix((w, (arange(nm), arange(nm))), (nm, nm))
+
+        #: Measurement matrix.
+        self.A = A
+
+        # Weighted transpose of A and the factors of the gain matrix.
+        self._AW = A.conj().T * W
+        self._lu = splu(csc_matrix(self._AW * A))
+
+
+    def run(self):
+        """ Estimates the state from the values of the measurements and
+        updates the case.
+        """
+        z = array([m.value for m in self.measurements], dtype=complex)
+        solution = self.update(z)
+
+        Ybus, Yf, Yt = self.case.Y
+        self.case.pf_solution(Ybus, Yf, Yt, solution["V"])
+
+        return solution
+
+
+    def update(self, z):
+        """ Returns the state estimate for a frame of phasor values, given
+        in the order of the measurements.
+        """
+        t0 = time()
+
+        z = asarray(z, dtype=complex)
+        V = self._lu.solve(self._AW * z)
+
+        r = z - self.A * V
+        solution = {"V": V, "z": z, "residuals": r,
+                    "error_sqrsum": sum(self._w * abs(r)**2),
+                    "elapsed": time() - t0}
+
+        return solution
+
+#------------------------------------------------------------------------------
+#  "_MeasurementJacobian" class:
+#------------------------------------------------------------------------------
+
+class _MeasurementJacobian(object):
+    """ Evaluates the measurement functions and their Jacobian, H, with
+    respect to the voltage angles and magnitudes at the non-reference buses.
+
+    The row of each flow or injection measurement is::
+
+        S_r = V[h_r] * conj(Y[r, :] * V)
+
+    where Y is the stacked rows of Yf, Yt and Ybus for the measurements and
+    h_r is the from, to or measured bus.  Generation is measured as the
+    injection plus the demand at the bus.  The derivatives of S_r are
+    non-zero only at the non-zeros of Y[r, :] and at h_r, so the structure
+    of H and of the gain matrix, H'*W*H, is computed once for the
+    measurement set and topology and only their values are filled in each
+    iteration.
+    """
+
+    def __init__(self, Ybus, Yf, Yt, f, t, nonref, Sd, idx):
+        """ Initialises a new _MeasurementJacobian instance.
+
+        @param Sd: Demand at each bus (p.u.).
+        @param idx: Indexes of the PF, PT, QF, QT, PG, QG, VM and VA
+                    measurements.
+        """
+        #: Number of buses.
+        self.nb = nb = Ybus.shape[0]
+
+        f, t = asarray(f, dtype=int), asarray(t, dtype=int)
+        iPf, iPt, iQf, iQt, iPg, iQg, iVm, iVa = \
+            [asarray(ix, dtype=int) for ix in idx]
+
+        # Stacked rows of the flow and injection measurements.
+        Ybus, Yf, Yt = csr_matrix(Ybus), csr_matrix(Yf), csr_matrix(Yt)
+        self._Y = Y = vstack([Yf[iPf, :], Yt[iPt, :], Yf[iQf, :], Yt[iQt, :],
+            Ybus[iPg, :], Ybus[iQg, :]], "csr")
+        ns = Y.shape[0]
+
+        self._home = home = r_[f[iPf], t[iPt], f[iQf], t[iQt], iPg, iQg]
+        self._imag = r_[zeros(len(iPf) + len(iPt), bool),
+                        ones(len(iQf) + len(iQt), bool),
+                        zeros(len(iPg), bool), ones(len(iQg), bool)]
+        self._offset = r_[zeros(len(iPf) + len(iPt) + len(iQf) + len(iQt)),
+                          Sd[iPg], Sd[iQg]]
+        self._iVm, self._iVa = iVm, iVa
+
+        #: Rows of the active power and voltage angle measurements.
+        self.p_rows = flatnonzero(r_[~self._imag, zeros(len(iVm), bool),
+                                     ones(len(iVa), bool)])
+        #: Rows of the reactive power and voltage magnitude measurements.
+        self.q_rows = flatnonzero(r_[self._imag, ones(len(iVm), bool),
+                                     zeros(len(iVa), bool)])
+
+        # Non-zeros of the derivatives of each row of S.
+        Yc = Y.tocoo()
+        D = csr_matrix((ones(Y.nnz + ns), (r_[Yc.row, arange(ns)],
+                                           r_[Yc.col, home])), (ns, nb))
+        D.sum_duplicates()
+        D = D.tocoo()
+        self._r, self._c = D.row, D.col
+        self._y = asarray(Y[D.row, D.col]).flatten()
+        self._diag = D.col == home[D.row]
+
+        # Columns of H for the angle and magnitude at each bus.
+        npvpq = len(nonref)
+        jVa = -ones(nb, dtype=int)
+        jVa[nonref] = arange(npvpq)
+        jVm = -ones(nb, dtype=int)
+        jVm[nonref] = npvpq + arange(npvpq)
+
+        self._kVa = kVa = flatnonzero(jVa[D.col] >= 0)
+        self._kVm = kVm = flatnonzero(jVm[D.col] >= 0)
+        mVm = flatnonzero(jVm[iVm] >= 0)
+        mVa = flatnonzero(jVa[iVa] >= 0)
+
+        hr = r_[D.row[kVa], D.row[kVm], ns + mVm, ns + len(iVm) + mVa]
+        hc = r_[jVa[D.col[kVa]], jVm[D.col[kVm]], jVm[iVm[mVm]],
+                jVa[iVa[mVa]]]
+        nz = len(hr)
+        nm = ns + len(iVm) + len(iVa)
+        nx = 2 * npvpq
+
+        # Position in H of each value, in the order above.
+        self.H = H = csr_matrix((arange(1, nz + 1, dtype=float), (hr, hc)),
+                                (nm, nx))
+        self._perm = H.data.astype(int) - 1
+
+        # Values of H that do not depend on V.
+        self._h = zeros(nz)
+        self._h[len(kVa) + len(kVm):] = 1.0
+
+        # Each non-zero of the gain matrix is a sum of the products of pairs
+        # of values in the rows of H.
+        nH = diff(H.indptr)
+        row = repeat(arange(nm), nH)
+        cnt = nH[row]
+        start = cumsum(cnt) - cnt
+        self._P = P = repeat(arange(nz), cnt)
+        self._Q = Q = repeat(H.indptr[row], cnt) + arange(cnt.sum()) - \
+            repeat(start, cnt)
+        self._row = row[P]
+
+        keys, T = unique(H.indices[P] * nx + H.indices[Q],
+                         return_inverse=True)
+        self.G = csc_matrix((arange(1, len(keys) + 1, dtype=float),
+                             (keys // nx, keys % nx)), (nx, nx))
+        pos = zeros(len(keys), dtype=int)
+        pos[self.G.data.astype(int) - 1] = arange(len(keys))
+        self._T = pos[T]
+
+
+    def evaluate(self, V):
+        """ Returns the estimated measurements and H at the given voltages.
+        """
+        r, c, y, d = self._r, self._c, self._y, self._diag
+        Vnorm = V / abs(V)
+
+        I = self._Y * V
+        Vh = V[self._home]
+        S = Vh * conj(I) + self._offset
+        z_est = r_[where(self._imag, S.imag, S.real),
+                   abs(V[self._iVm]), angle(V[self._iVa])]
+
+        Ic, Vr = conj(I[r]), Vh[r]
+        dVa = 1j * Vr * (d * Ic - conj(y) * conj(V[c]))
+        dVm = Vr * conj(y) * conj(Vnorm[c]) + d * Ic * Vnorm[c]
+        imag = self._imag[r]
+
+        kVa, kVm = self._kVa, self._kVm
+        h = self._h
+        h[:len(kVa)] = where(imag[kVa], dVa[kVa].imag, dVa[kVa].real)
+        h[len(kVa):len(kVa) + len(kVm)] = \
+            where(imag[kVm], dVm[kVm].imag, dVm[kVm].real)
+        self.H.data[:] = h[self._perm]
+
+        return z_est, self.H
+
+
+    def gain(self, w):
+        """ Returns the gain matrix, H'*diag(w)*H, for the last evaluated H.
+        """
+        h = self.H.data
+        self.G.data[:] = bincount(self._T, w[self._row] * h[self._P] *
+                                  h[self._Q], len(self.G.data))
+        return self.G
+
+
+    def projection_diag(self, Z):
+        """ Returns the diagonal of H*inv(G)*H' for the last evaluated H,
+        given the entries of inv(G) at the non-zeros of G.
+        """
+        h = self.H.data
+        return bincount(self._row, h[self._P] * h[self._Q] * Z[self._T],
+                        self.H.shape[0])
+
+#------------------------------------------------------------------------------
+#  Sparse inverse:
+#------------------------------------------------------------------------------
+
+def _sparse_inverse(G):
+    """ Returns the entries of the inverse of the symmetric positive
+    definite matrix G at the non-zeros of G.
+
+    G is factorised with symmetric permutations as P*G*P' = L*D*L' and the
+    entries of Z = inv(P*G*P') at the non-zeros of L + L' are found column
+    by column from the last, using::
+
+        Z[j, i] = -sum_k Z[j, k] * L[k, i]           for j > i
+        Z[i, i] = 1 / D[i] - sum_k L[k, i] * Z[k, i]
+
+    where k are the rows of the non-zeros of L below the diagonal in column
+    i (Takahashi, Fagan and Chen, 1973).
+    """
+    G = csc_matrix(G)
+    n = G.shape[0]
+
+    # Zeros are dropped by the factorisation, but the entries of the inverse
+    # are needed at the whole pattern of G, so they are perturbed.
+    Gp = G.copy()
+    Gp.data[Gp.data == 0.0] = 1e-30 * abs(Gp.data).max()
+
+    lu = splu(Gp, permc_spec="MMD_AT_PLUS_A", diag_pivot_thresh=0.0,
+              options={"SymmetricMode": True})
+    perm = lu.perm_c
+    if (lu.perm_r != perm).any():
+        raise ValueError, "Gain matrix factorisation is not symmetric."
+
+    L = lu.L.tocsc()
+    L.sort_indices()
+    d = lu.U.diagonal()
+
+    # Rows and values of the lower triangle of each column of Z.
+    Zrows, Zvals = [None] * n, [None] * n
+    Zdiag = zeros(n)
+    for i in range(n - 1, -1, -1):
+        rows = L.indices[L.indptr[i]:L.indptr[i + 1]]
+        vals = L.data[L.indptr[i]:L.indptr[i + 1]]
+        J, l = rows[rows > i], vals[rows > i]
+
+        # Entries of Z in the rows and columns J.
+        ZJ = zeros((len(J), len(J)))
+        for a, k in enumerate(J):
+            ZJ[a, a] = Zdiag[k]
+            if a + 1 < len(J):
+                rk = Zrows[k]
+                pos = searchsorted(rk, J[a + 1:])
+                ZJ[a + 1:, a] = ZJ[a, a + 1:] = Zvals[k][pos]
+
+        Zrows[i] = J
+        Zvals[i] = -dot(ZJ, l)
+        Zdiag[i] = 1.0 / d[i] - dot(l, Zvals[i])
+
+    # Map the non-zeros of G to the lower triangle of Z.
+    Gc = G.tocoo()
+    pr, pc = perm[Gc.row], perm[Gc.col]
+    lo, hi = minimum(pr, pc), maximum(pr, pc)
+
+    cols = repeat(arange(n), [len(J) for J in Zrows])
+    Zl = csc_matrix((r_[tuple(Zvals)], (r_[tuple(Zrows)], cols)), (n, n))
+
+    return where(lo == hi, Zdiag[lo], asarray(Zl[hi, lo]).flatten())
+
 #------------------------------------------------------------------------------
 #  "Measurement" class:
 #------------------------------------------------------------------------------
@@ -359,7 +1006,7 @@ class Measurement(object):
     """ Defines a measurement at a bus or a branch.
     """
 
-    def __init__(self, bus_or_line, type, value):
+    def __init__(self, bus_or_line, type, value, sigma=None):
         """ Initialises a new Measurement instance.
         """
         #: Bus or branch component at which the measure was made.
@@ -371,4 +1018,112 @@ class Measurement(object):
         #: Measurement value.
         self.value = value
 
+        #: Standard deviation of the measurement.  The variance of the
+        #: measurement type is used if None.
+        self.sigma = sigma
+
+#------------------------------------------------------------------------------
+#  "MeasurementSet" class:
+#------------------------------------------------------------------------------
+
+class MeasurementSet(object):
+    """ Defines a set of measurements stored as arrays.  The type of each
+    measurement is coded by its position in TYPES and the bus or branch by
+    its index.  The variance of the measurement type is used where the
+    standard deviation is not a number.
+    """
+
+    def __init__(self, types, index, values, sigma=None):
+        """ Initialises a new MeasurementSet instance.
+
+        @param types: Type codes or names of the measurement types.
+        @param index: Indexes of the buses or branches.
+        """
+        #: Type code of each measurement, its position in TYPES.
+        self.types = _type_codes(types)
+
+        #: Index of the bus or branch of each measurement.
+        self.index = asarray(index, dtype=int)
+
+        #: Measurement values.
+        self.values = asarray(values, dtype=float)
+
+        #: Standard deviation of each measurement.
+        self.sigma = nan * ones(len(self.values)) if sigma is None \
+            else asarray(sigma, dtype=float)
+
+        n = len(self.types)
+        if not (len(self.index) == len(self.values) == len(self.sigma) == n):
+            raise ValueError, "Measurement arrays of unequal length."
+
+
+    def __len__(self):
+        """ Returns the number of measurements.
+        """
+        return len(self.values)
+
+
+    @classmethod
+    def from_measurements(cls, measurements):
+        """ Returns a set of the given L{Measurement} objects.  The buses
+        and branches of the case must be indexed.
+        """
+        return cls([m.type for m in measurements],
+                   [m.b_or_l._i for m in measurements],
+                   [m.value for m in measurements],
+                   [nan if m.sigma is None else m.sigma
+                    for m in measurements])
+
+
+    @classmethod
+    def read_csv(cls, file_or_filename):
+        """ Returns a set read from comma separated values with a header row
+        and columns "type", "index", "value" and, optionally, "sigma".
+        Empty standard deviations select the variance of the type.
+        """
+        data = atleast_1d(genfromtxt(file_or_filename, delimiter=",",
+            names=True, dtype=None, case_sensitive="lower", autostrip=True,
+            converters={"sigma": lambda s: float(s.strip() or nan)},
+            encoding=None))
+
+        sigma = data["sigma"] if "sigma" in data.dtype.names else None
+
+        return cls(data["type"], data["index"], data["value"], sigma)
+
+#------------------------------------------------------------------------------
+#  Measurement set functions:
+#------------------------------------------------------------------------------
+
+def _type_codes(types):
+    """ Returns the position in TYPES of each measurement type.
+    """
+    types = asarray(types)
+    if len(types) == 0:
+        return zeros(0, dtype=int)
+    elif types.dtype.kind in "iu":
+        codes = types.astype(int)
+        valid = (codes >= 0) & (codes < len(TYPES))
+    else:
+        names = array(TYPES)
+        sorter = names.argsort()
+        pos = minimum(searchsorted(names, types, sorter=sorter),
+                      len(TYPES) - 1)
+        codes = sorter[pos]
+        valid = names[codes] == types
+
+    if not valid.all():
+        raise ValueError, "Unknown measurement type [%s]." % \
+            types[flatnonzero(~valid)[0]]
+
+    return codes
+
+
+def _measurement_set(measurements):
+    """ Returns the measurements as a L{MeasurementSet}.
+    """
+    if isinstance(measurements, MeasurementSet):
+        return measurements
+    else:
+        return MeasurementSet.from_measurements(measurements)
+
 # EOF -------------------------------------------------------------------------
@@ -0,0 +1,183 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines a DC OPF solver for linear programs using HiGHS.
+
+HiGHS is accessed through C{scipy.optimize.linprog}, which provides the
+dual values required for nodal prices from SciPy version 1.7.  See
+U{http://www.highs.dev/} for more information.
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import logging
+
+import scipy
+
+from numpy import \
+    Inf, r_, zeros, flatnonzero, absolute, maximum, where, finfo
+
+from scipy.sparse import csr_matrix, vstack
+from scipy.optimize import linprog
+
+from solver import DCOPFSolver
+
+#------------------------------------------------------------------------------
+#  Constants:
+#------------------------------------------------------------------------------
+
+EPS = finfo(float).eps
+
+#: Does C{linprog} provide the HiGHS methods and their dual values?
+HAVE_HIGHS = [int(v) for v in scipy.__version__.split(".")[:2]] >= [1, 7]
+
+#------------------------------------------------------------------------------
+#  Logging:
+#------------------------------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+#------------------------------------------------------------------------------
+#  "HiGHSSolver" class:
+#------------------------------------------------------------------------------
+
+class HiGHSSolver(DCOPFSolver):
+    """ Solves DC optimal power flow with linear or piecewise linear costs
+    using the HiGHS simplex and interior point solvers.  Problems with
+    quadratic costs are passed to the interior point solver of the
+    parent class.
+
+    The Lagrange multipliers are returned in the same form as those from
+    PIPS, so bus nodal prices and branch flow limit shadow prices are set
+    identically.
+    """
+
+    def __init__(self, om, opt=None, method="highs"):
+        """ Initialises a new HiGHSSolver instance.
+        """
+        if not HAVE_HIGHS:
+            raise ImportError, "HiGHS solver requires SciPy 1.7 or later."
+
+        super(HiGHSSolver, self).__init__(om, opt)
+
+        #: HiGHS method: "highs" (automatic selection), "highs-ds" (dual
+        #: simplex) or "highs-ipm" (interior point).
+        self.method = method
+
+    #--------------------------------------------------------------------------
+    #  DCOPFSolver interface:
+    #--------------------------------------------------------------------------
+
+    def _run_opf(self, HH, CC, AA, ll, uu, xmin, xmax, x0, opt):
+        """ Solves the linear program using HiGHS.
+        """
+        if HH.nnz > 0:
+            logger.info("Quadratic costs present, solving using PIPS.")
+            return super(HiGHSSolver, self)._run_opf(HH, CC, AA, ll, uu,
+                                                     xmin, xmax, x0, opt)
+
+        verbose = opt.has_key("verbose") and opt["verbose"]
+
+        return lp_highs(CC, AA, ll, uu, xmin, xmax, x0, self.method, verbose)
+
+#------------------------------------------------------------------------------
+#  "lp_highs" function:
+#------------------------------------------------------------------------------
+
+def lp_highs(c, A, l, u, xmin, xmax, x0=None, method="highs", verbose=False):
+    """ Uses HiGHS to solve the LP (linear programming) problem::
+
+            min C'*x
+             x
+
+    subject to::
+
+            l <= A*x <= u       (linear constraints)
+            xmin <= x <= xmax   (variable bounds)
+
+    Limits with a magnitude of 1e10 or more are treated as infinite.
+
+    @param x0: Returned as the solution vector if HiGHS fails to find a
+               solution.
+    @rtype: dict
+    @return: Solution dictionary with the same keys as that returned by
+             L{pips.qps_pips}.  The multipliers on the equality constraints
+             and the fixed variables are split by sign into C{mu_l}/C{mu_u}
+             and C{lower}/C{upper}, as by PIPS.
+    """
+    nx = len(c)
+    A = csr_matrix(A)
+    nA = A.shape[0]
+
+    # Split the constraints into equality rows and finite upper and lower
+    # limits, l <= A*x is given to linprog as -A*x <= -l.
+    ieq = flatnonzero( absolute(u - l) <= EPS )
+    iu = flatnonzero( (absolute(u - l) > EPS) & (u < 1e10) )
+    il = flatnonzero( (absolute(u - l) > EPS) & (l > -1e10) )
+
+    if len(iu) or len(il):
+        A_ub = vstack([A[iu, :], -A[il, :]], "csr")
+        b_ub = r_[u[iu], -l[il]]
+    else:
+        A_ub = b_ub = None
+    if len(ieq):
+        A_eq = A[ieq, :]
+        b_eq = u[ieq]
+    else:
+        A_eq = b_eq = None
+
+    lb = where(xmin > -1e10, xmin, -Inf)
+    ub = where(xmax < 1e10, xmax, Inf)
+
+    res = linprog(c, A_ub=A_ub, b_ub=b_ub, A_eq=A_eq, b_eq=b_eq,
+                  bounds=list(zip(lb, ub)), method=method,
+                  options={"disp": verbose})
+
+    converged = res.status == 0
+
+    # The marginals are the sensitivities of the objective function value
+    # to the right-hand sides and bounds.
+    mu_l = zeros(nA)
+    mu_u = zeros(nA)
+    lower = zeros(nx)
+    upper = zeros(nx)
+    if converged:
+        if len(ieq):
+            lam = -res.eqlin.marginals
+            mu_u[ieq] = maximum(lam, 0.0)
+            mu_l[ieq] = maximum(-lam, 0.0)
+        if len(iu) or len(il):
+            mu = -res.ineqlin.marginals
+            mu_u[iu] = mu[:len(iu)]
+            mu_l[il] = mu[len(iu):]
+        lam = -(res.lower.marginals + res.upper.marginals)
+        upper = maximum(lam, 0.0)
+        lower = maximum(-lam, 0.0)
+        x = res.x
+    else:
+        logger.error("HiGHS: %s" % res.message)
+        x = zeros(nx) if x0 is None else x0
+
+    lmbda = {"mu_l": mu_l, "mu_u": mu_u, "lower": lower, "upper": upper}
+
+    output = {"iterations": res.nit, "history": {}, "message": res.message}
+
+    return {"x": x, "f": res.fun if converged else Inf,
+            "converged": converged, "lmbda": lmbda, "output": output}
+
+# EOF -------------------------------------------------------------------------
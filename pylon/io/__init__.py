@@ -34,6 +34,7 @@ from rst import ReSTWriter
 #from excel import ExcelWriter
 #from excel import CSVWriter
 from dot import DotWriter
+from qps import QPSReader, QPSWriter
 
 #from rdf_io import RDFReader, RDFWriter
 
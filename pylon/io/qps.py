@@ -0,0 +1,438 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines classes for writing and reading quadratic programs in the QPS
+format, the MPS format with a QUADOBJ section for the quadratic objective
+terms, of the problem solved by L{pips.qps_pips}::
+
+        min 1/2 x'*H*x + c'*x
+         x
+
+    subject to::
+
+        l <= A*x <= u       (linear constraints)
+        xmin <= x <= xmax   (variable bounds)
+
+Problems are written in free format, with names that contain no spaces, so
+that they may be read by other solvers for comparison.  Both free and fixed
+format files are read, provided that names do not contain spaces.
+
+See also:
+    - I. Maros and C. Meszaros, "A Repository of Convex Quadratic
+      Programming Problems", Optimization Methods and Software, 11, 1999
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import os.path
+import logging
+
+from numpy import array, zeros, ones, Inf, isinf, asarray, float64
+
+from scipy.sparse import csr_matrix, coo_matrix, tril
+
+#------------------------------------------------------------------------------
+#  Logging:
+#------------------------------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+#------------------------------------------------------------------------------
+#  Constants:
+#------------------------------------------------------------------------------
+
+OBJECTIVE = "obj"
+
+#------------------------------------------------------------------------------
+#  "QPSWriter" class:
+#------------------------------------------------------------------------------
+
+class QPSWriter(object):
+    """ Writes a quadratic or linear program to file in QPS format.
+    """
+
+    def __init__(self, H, c, A, l, u, xmin=None, xmax=None, c0=0.0,
+                 name=None, row_names=None, col_names=None):
+        """ Initialises a new QPSWriter instance.
+        """
+        c = asarray(c, dtype=float64).flatten()
+        nx = len(c)
+
+        #: Quadratic cost coefficients, may be None for an LP.
+        self.H = csr_matrix((nx, nx)) if H is None else csr_matrix(H)
+
+        #: Linear cost coefficients.
+        self.c = c
+
+        #: Linear constraint coefficients and limits.
+        self.A = csr_matrix((0, nx)) if A is None else csr_matrix(A)
+        self.l = asarray(l, dtype=float64)
+        self.u = asarray(u, dtype=float64)
+
+        #: Variable bounds.
+        self.xmin = -Inf * ones(nx) if xmin is None else \
+            asarray(xmin, dtype=float64)
+        self.xmax = Inf * ones(nx) if xmax is None else \
+            asarray(xmax, dtype=float64)
+
+        #: Constant term of the objective function.
+        self.c0 = c0
+
+        #: Problem name.
+        self.name = "pylon" if name is None else name.replace(" ", "_")
+
+        #: Names of the constraints and variables.
+        nA = self.A.shape[0]
+        self.row_names = ["R%d" % i for i in range(nA)] \
+            if row_names is None else row_names
+        self.col_names = ["C%d" % j for j in range(nx)] \
+            if col_names is None else col_names
+
+
+    def write(self, file_or_filename):
+        """ Writes the problem to file.
+        """
+        if isinstance(file_or_filename, basestring):
+            fname = os.path.basename(file_or_filename)
+            logger.info("Writing QPS file [%s]." % fname)
+
+            file = None
+            try:
+                file = open(file_or_filename, "wb")
+            except Exception, detail:
+                logger.error("Error opening %s." % detail)
+            finally:
+                if file is not None:
+                    self._write_data(file)
+                    file.close()
+        else:
+            file = file_or_filename
+            self._write_data(file)
+
+        return file
+
+
+    def _write_data(self, file):
+        self.write_rows(file)
+        self.write_columns(file)
+        self.write_rhs(file)
+        self.write_ranges(file)
+        self.write_bounds(file)
+        self.write_quadobj(file)
+        file.write("ENDATA\n")
+
+
+    def write_rows(self, file):
+        """ Writes the name of the problem and the type of each constraint.
+        The limits of each constraint are given by the right hand side and
+        range values.  Unbounded constraints are written as free rows.
+        """
+        file.write("NAME %s\n" % self.name)
+        file.write("ROWS\n")
+        file.write(" N %s\n" % OBJECTIVE)
+        for name, l, u in zip(self.row_names, self.l, self.u):
+            if l == u:
+                file.write(" E %s\n" % name)
+            elif isinf(l) and isinf(u):
+                file.write(" N %s\n" % name)
+            elif isinf(l):
+                file.write(" L %s\n" % name)
+            else:
+                file.write(" G %s\n" % name)
+
+
+    def write_columns(self, file):
+        """ Writes the objective and constraint coefficients of each
+        variable.
+        """
+        file.write("COLUMNS\n")
+        AT = self.A.T.tocsr()
+        for j, name in enumerate(self.col_names):
+            file.write(" %s %s %s\n" % (name, OBJECTIVE, _num(self.c[j])))
+            for k in range(AT.indptr[j], AT.indptr[j + 1]):
+                if AT.data[k] != 0.0:
+                    file.write(" %s %s %s\n" % (name,
+                        self.row_names[AT.indices[k]], _num(AT.data[k])))
+
+
+    def write_rhs(self, file):
+        """ Writes the constraint limits.  The constant term of the
+        objective is written as the negated right hand side of the objective
+        row.
+        """
+        file.write("RHS\n")
+        if self.c0 != 0.0:
+            file.write(" RHS %s %s\n" % (OBJECTIVE, _num(-self.c0)))
+        for name, l, u in zip(self.row_names, self.l, self.u):
+            if isinf(l) and isinf(u):
+                continue
+            rhs = u if isinf(l) else l
+            if rhs != 0.0:
+                file.write(" RHS %s %s\n" % (name, _num(rhs)))
+
+
+    def write_ranges(self, file):
+        """ Writes the range of each constraint with finite, unequal limits.
+        """
+        file.write("RANGES\n")
+        for name, l, u in zip(self.row_names, self.l, self.u):
+            if (l != u) and not (isinf(l) or isinf(u)):
+                file.write(" RNG %s %s\n" % (name, _num(u - l)))
+
+
+    def write_bounds(self, file):
+        """ Writes the variable bounds.  Lower bounds of zero are only
+        written when the upper bound is negative.
+        """
+        file.write("BOUNDS\n")
+        for name, lo, up in zip(self.col_names, self.xmin, self.xmax):
+            if lo == up:
+                file.write(" FX BND %s %s\n" % (name, _num(lo)))
+            elif isinf(lo) and isinf(up):
+                file.write(" FR BND %s\n" % name)
+            else:
+                if isinf(lo):
+                    file.write(" MI BND %s\n" % name)
+                elif (lo != 0.0) or (up < 0.0):
+                    file.write(" LO BND %s %s\n" % (name, _num(lo)))
+                if not isinf(up):
+                    file.write(" UP BND %s %s\n" % (name, _num(up)))
+
+
+    def write_quadobj(self, file):
+        """ Writes the coefficients of the lower triangle of H.
+        """
+        if self.H.nnz == 0:
+            return
+        file.write("QUADOBJ\n")
+        L = tril(self.H).tocsc()
+        L.sum_duplicates()
+        for j in range(L.shape[1]):
+            for k in range(L.indptr[j], L.indptr[j + 1]):
+                if L.data[k] != 0.0:
+                    file.write(" %s %s %s\n" % (self.col_names[L.indices[k]],
+                        self.col_names[j], _num(L.data[k])))
+
+#------------------------------------------------------------------------------
+#  "QPSReader" class:
+#------------------------------------------------------------------------------
+
+class QPSReader(object):
+    """ Reads a quadratic or linear program from an MPS or QPS file.  The
+    quadratic objective terms may be given in a QUADOBJ section (lower
+    triangle) or a QMATRIX or QSECTION section (full matrix).  Integer
+    markers are ignored.
+    """
+
+    def __init__(self):
+        """ Initialises a new QPSReader instance.
+        """
+        #: Name of the last problem read.
+        self.name = None
+
+        #: Constant term of the objective function of the last problem.
+        self.c0 = 0.0
+
+        #: Names of the constraints and variables of the last problem.
+        self.row_names = []
+        self.col_names = []
+
+
+    def read(self, file_or_filename):
+        """ Reads the problem and returns a dictionary of the arguments of
+        L{pips.qps_pips}: "H", "c", "A", "l", "u", "xmin" and "xmax".
+        """
+        if isinstance(file_or_filename, basestring):
+            fname = os.path.basename(file_or_filename)
+            logger.info("Reading QPS file [%s]." % fname)
+
+            file = None
+            try:
+                file = open(file_or_filename, "rb")
+            except:
+                logger.error("Error opening %s." % fname)
+                return None
+            finally:
+                if file is not None:
+                    problem = self._parse(file)
+                    file.close()
+        else:
+            file = file_or_filename
+            problem = self._parse(file)
+
+        return problem
+
+
+    def _parse(self, file):
+        self.name, self.c0 = None, 0.0
+        obj = None
+        maximise = False
+        rows, types = {}, []
+        cols = {}
+        c, Ai, Aj, Av = {}, [], [], []
+        rhs, ranges = {}, {}
+        lo, up = {}, {}
+        Hi, Hj, Hv = [], [], []
+        self.row_names, self.col_names = [], []
+
+        def col(name):
+            if not cols.has_key(name):
+                cols[name] = len(self.col_names)
+                self.col_names.append(name)
+            return cols[name]
+
+        section = None
+        for line in file:
+            if (not line.strip()) or line.startswith("*"):
+                continue
+            fields = line.split()
+            if not line[0].isspace():
+                section = fields[0].upper()
+                if section == "NAME":
+                    self.name = fields[1] if len(fields) > 1 else ""
+                elif section == "OBJSENSE" and len(fields) > 1:
+                    maximise = fields[1].upper() in ["MAX", "MAXIMIZE"]
+                elif section == "ENDATA":
+                    break
+                continue
+
+            if section == "OBJSENSE":
+                maximise = fields[0].upper() in ["MAX", "MAXIMIZE"]
+
+            elif section == "ROWS":
+                kind, name = fields[0].upper(), fields[1]
+                if kind == "N" and obj is None:
+                    obj = name
+                else:
+                    rows[name] = len(self.row_names)
+                    self.row_names.append(name)
+                    types.append(kind)
+
+            elif section == "COLUMNS":
+                if "'MARKER'" in fields:
+                    continue
+                j = col(fields[0])
+                for name, v in zip(fields[1::2], fields[2::2]):
+                    if name == obj:
+                        c[j] = float(v)
+                    else:
+                        Ai.append(rows[name])
+                        Aj.append(j)
+                        Av.append(float(v))
+
+            elif section in ["RHS", "RANGES"]:
+                # The set name is optional.
+                pairs = fields[1:] if len(fields) % 2 else fields
+                for name, v in zip(pairs[0::2], pairs[1::2]):
+                    if section == "RANGES":
+                        ranges[rows[name]] = float(v)
+                    elif name == obj:
+                        self.c0 = -float(v)
+                    else:
+                        rhs[rows[name]] = float(v)
+
+            elif section == "BOUNDS":
+                kind = fields[0].upper()
+                nv = 0 if kind in ["FR", "MI", "PL", "BV"] else 1
+                j = col(fields[len(fields) - 1 - nv])
+                v = float(fields[-1]) if nv else 0.0
+                if kind == "UP":
+                    up[j] = v
+                    if v < 0.0 and not lo.has_key(j):
+                        logger.warning("Negative upper bound with no lower "
+                                       "bound, the lower bound is -Inf [%s]." %
+                                       self.col_names[j])
+                        lo[j] = -Inf
+                elif kind in ["LO", "LI"]:
+                    lo[j] = v
+                elif kind in ["UI"]:
+                    up[j] = v
+                elif kind == "FX":
+                    lo[j] = up[j] = v
+                elif kind == "FR":
+                    lo[j], up[j] = -Inf, Inf
+                elif kind == "MI":
+                    lo[j] = -Inf
+                elif kind == "PL":
+                    up[j] = Inf
+                elif kind == "BV":
+                    lo[j], up[j] = 0.0, 1.0
+
+            elif section == "QUADOBJ":
+                i, j, v = col(fields[0]), col(fields[1]), float(fields[2])
+                Hi.append(i); Hj.append(j); Hv.append(v)
+                if i != j:
+                    Hi.append(j); Hj.append(i); Hv.append(v)
+
+            elif section in ["QMATRIX", "QSECTION"]:
+                Hi.append(col(fields[0]))
+                Hj.append(col(fields[1]))
+                Hv.append(float(fields[2]))
+
+        nx, nA = len(self.col_names), len(self.row_names)
+
+        cc = zeros(nx)
+        for j, v in c.items():
+            cc[j] = v
+        A = coo_matrix((Av, (Ai, Aj)), (nA, nx)).tocsr()
+        H = coo_matrix((Hv, (Hi, Hj)), (nx, nx)).tocsr()
+        if maximise:
+            H, cc, self.c0 = -H, -cc, -self.c0
+
+        # Constraint limits from the row types, right hand sides and ranges.
+        l, u = zeros(nA), zeros(nA)
+        for i, kind in enumerate(types):
+            b = rhs.get(i, 0.0)
+            r = ranges.get(i)
+            if kind == "N":
+                l[i], u[i] = -Inf, Inf
+            elif kind == "E":
+                l[i] = u[i] = b
+                if r is not None:
+                    if r >= 0.0:
+                        u[i] = b + r
+                    else:
+                        l[i] = b + r
+            elif kind == "L":
+                l[i], u[i] = -Inf, b
+                if r is not None:
+                    l[i] = b - abs(r)
+            elif kind == "G":
+                l[i], u[i] = b, Inf
+                if r is not None:
+                    u[i] = b + abs(r)
+
+        xmin, xmax = zeros(nx), Inf * ones(nx)
+        for j, v in lo.items():
+            xmin[j] = v
+        for j, v in up.items():
+            xmax[j] = v
+
+        return {"H": H, "c": cc, "A": A, "l": l, "u": u,
+                "xmin": xmin, "xmax": xmax}
+
+#------------------------------------------------------------------------------
+#  Number formatting:
+#------------------------------------------------------------------------------
+
+def _num(v):
+    """ Returns the shortest string that is read as the given value.
+    """
+    return repr(float(v))
+
+# EOF -------------------------------------------------------------------------
@@ -0,0 +1,270 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines the decomposition of locational marginal prices into energy,
+congestion and loss components.
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import logging
+
+from numpy import \
+    array, zeros, atleast_2d, flatnonzero, absolute, asarray, exp, pi, \
+    conj, r_, zeros_like
+
+from scipy.sparse import csr_matrix, vstack, hstack
+from scipy.sparse.linalg import splu
+
+from case import REFERENCE
+
+#------------------------------------------------------------------------------
+#  Logging:
+#------------------------------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+#------------------------------------------------------------------------------
+#  "LMPDecomposition" class:
+#------------------------------------------------------------------------------
+
+class LMPDecomposition(object):
+    """ Decomposes the nodal prices of solved OPF periods into energy,
+    congestion and loss components::
+
+        p_lmbda = energy + congestion + loss
+
+    The energy component is the price at the reference bus.  The congestion
+    component at each bus is the sum of the branch flow limit multipliers
+    weighted by the sensitivities of the branch flows to injection at the
+    bus, withdrawn at the reference bus.  The loss component is the energy
+    price weighted by the marginal loss factor of the bus::
+
+        loss = -energy * dPloss/dP
+
+    For DC OPF solutions the sensitivities are the power transfer
+    distribution factors and the loss component is zero.  The factorisation
+    of the bus susceptance matrix is computed once and the factors of each
+    constrained branch are cached, so a batch of periods is decomposed using
+    matrix products.  For AC OPF solutions the loss factors and the
+    sensitivities of the apparent power flows are computed from the power
+    flow Jacobian at the bus voltages of each period, with the voltage
+    magnitude fixed at buses with on-line generators.
+
+    The residual, C{p_lmbda - energy - congestion - loss}, accounts for
+    binding voltage and reactive power limits and a warning is logged if it
+    is greater than the tolerance.
+    """
+
+    def __init__(self, case, buses=None, branches=None, ref=None, dc=True,
+                 tol=1e-3):
+        """ Initialises a new LMPDecomposition instance.
+        """
+        #: Case for which prices are decomposed.
+        self.case = case
+
+        #: Decompose DC OPF prices (True) or AC OPF prices (False).
+        self.dc = dc
+
+        #: Tolerance on the residual of the decomposition ($/MWh).
+        self.tol = tol
+
+        #: Buses for which prices are given, the connected buses by default.
+        self.buses = case.connected_buses if buses is None else buses
+
+        #: Branches for which flow limit multipliers are given, the on-line
+        #: branches by default.
+        self.branches = case.online_branches if branches is None else \
+            branches
+
+        #: Index of the reference bus for the energy component, the first
+        #: reference bus by default.
+        if ref is None:
+            refs = [i for i, b in enumerate(self.buses)
+                    if b.type == REFERENCE]
+            ref = refs[0] if refs else 0
+        self.ref = ref
+
+        nb = len(self.buses)
+        self._noslack = array([i for i in range(nb) if i != ref], dtype=int)
+
+        if dc:
+            self._factors = self._indexed(case.factorBdc, self.buses,
+                                          self.branches, ref)
+        else:
+            self._Y, self._Yf, self._Yt = \
+                self._indexed(case.getYbus, self.buses, self.branches)
+
+            # Voltage magnitudes are fixed at buses with on-line generators.
+            gbus = [g.bus for g in case.online_generators]
+            ig = set([i for i, b in enumerate(self.buses) if b in gbus])
+            self._pv = array([i for i in self._noslack if i in ig], int)
+            self._pq = array([i for i in self._noslack if i not in ig], int)
+
+        # Transfer distribution factors of each branch.
+        self._ptdf = {}
+
+
+    def decompose(self, p_lmbda=None, mu_s_from=None, mu_s_to=None, V=None):
+        """ Returns a dictionary of the "energy", "congestion", "loss" and
+        "residual" components of the nodal prices ($/MWh) at each bus
+        (columns) in each period (rows).  The prices, multipliers and
+        voltages are taken from the case if not given.
+
+        @param p_lmbda: Nodal prices at each bus in each period.
+        @param mu_s_from: Multipliers of the branch flow limits at the from
+                          end of each branch in each period.
+        @param mu_s_to: Multipliers of the branch flow limits at the to end
+                        of each branch in each period.
+        @param V: Complex bus voltages in each period (AC only).
+        """
+        if p_lmbda is None:
+            p_lmbda = [b.p_lmbda for b in self.buses]
+        if mu_s_from is None:
+            mu_s_from = [l.mu_s_from for l in self.branches]
+        if mu_s_to is None:
+            mu_s_to = [l.mu_s_to for l in self.branches]
+
+        p_lmbda = atleast_2d(asarray(p_lmbda, float))
+        mu_f = atleast_2d(asarray(mu_s_from, float))
+        mu_t = atleast_2d(asarray(mu_s_to, float))
+
+        nt = p_lmbda.shape[0]
+        if p_lmbda.shape[1] != len(self.buses):
+            raise ValueError, "Prices for %d buses, expected %d." % \
+                (p_lmbda.shape[1], len(self.buses))
+        for mu in [mu_f, mu_t]:
+            if mu.shape != (nt, len(self.branches)):
+                raise ValueError, "Multipliers of shape %s, expected %s." % \
+                    (mu.shape, (nt, len(self.branches)))
+
+        # Only branches constrained in some period contribute.
+        il = flatnonzero(absolute(r_[mu_f, mu_t]).max(axis=0) > 0.0)
+
+        energy = p_lmbda[:, [self.ref]].repeat(p_lmbda.shape[1], axis=1)
+
+        if self.dc:
+            congestion = -(mu_f - mu_t)[:, il].dot(self.ptdf(il))
+            loss = zeros_like(p_lmbda)
+        else:
+            if V is None:
+                V = [b.v_magnitude * exp(1j * b.v_angle * pi / 180.0)
+                     for b in self.buses]
+            V = atleast_2d(asarray(V, complex))
+            if V.shape != p_lmbda.shape:
+                raise ValueError, "Voltages of shape %s, expected %s." % \
+                    (V.shape, p_lmbda.shape)
+
+            congestion = zeros_like(p_lmbda)
+            loss = zeros_like(p_lmbda)
+            for t in range(nt):
+                LF, Hf, Ht = self.loss_factors(V[t], il)
+                congestion[t, :] = -mu_f[t, il].dot(Hf) - mu_t[t, il].dot(Ht)
+                loss[t, :] = -energy[t, :] * LF
+
+        residual = p_lmbda - energy - congestion - loss
+        if len(residual) and absolute(residual).max() > self.tol:
+            logger.warning("Residual of LMP decomposition %.3g $/MWh." %
+                           absolute(residual).max())
+
+        return {"energy": energy, "congestion": congestion, "loss": loss,
+                "residual": residual}
+
+
+    def loss_factors(self, V, il=None):
+        """ Returns the marginal loss factors of the buses and the
+        sensitivities of the apparent power flows at the from and to ends of
+        the given branches to injection at each bus, withdrawn at the
+        reference bus, for the given complex bus voltages.
+        """
+        case = self.case
+        il = [] if il is None else list(il)
+        ref, pv, pq = self.ref, self._pv, self._pq
+        pvpq = r_[pv, pq]
+        nb, npvpq = len(self.buses), len(pvpq)
+
+        dS_dVm, dS_dVa = case.dSbus_dV(self._Y, V)
+        dS_dVm, dS_dVa = dS_dVm.tocsc(), dS_dVa.tocsc()
+
+        J = vstack([
+            hstack([dS_dVa[pvpq, :][:, pvpq].real,
+                    dS_dVm[pvpq, :][:, pq].real]),
+            hstack([dS_dVa[pq, :][:, pvpq].imag,
+                    dS_dVm[pq, :][:, pq].imag])], "csc")
+        lu = splu(J)
+
+        # Sensitivities of the total losses, the sum of bus injections.
+        dL = r_[asarray(dS_dVa.real.sum(axis=0)).ravel()[pvpq],
+                asarray(dS_dVm.real.sum(axis=0)).ravel()[pq]]
+
+        LF = zeros(nb)
+        LF[pvpq] = lu.solve(dL, "T")[:npvpq]
+
+        Hf, Ht = zeros((len(il), nb)), zeros((len(il), nb))
+        if il:
+            branches = [self.branches[l] for l in il]
+            dSf_dVa, dSf_dVm, dSt_dVa, dSt_dVm, Sf, St = \
+                self._indexed(case.dSbr_dV, self._Yf[il, :], self._Yt[il, :],
+                              V, self.buses, branches)
+            for H, dVa, dVm, S in [(Hf, dSf_dVa, dSf_dVm, Sf),
+                                   (Ht, dSt_dVa, dSt_dVm, St)]:
+                # Derivatives of the flow magnitudes, |S|.
+                A = absolute(S)
+                A[A == 0.0] = 1.0
+                D = csr_matrix((conj(S) / A, (range(len(il)),
+                                             range(len(il)))))
+                dA = hstack([(D * dVa).real[:, pvpq], (D * dVm).real[:, pq]])
+                H[:, pvpq] = lu.solve(dA.T.toarray(), "T")[:npvpq, :].T
+
+        return LF, Hf, Ht
+
+
+    def ptdf(self, il):
+        """ Returns the rows of the power transfer distribution factor
+        matrix for the given branch indexes.
+        """
+        il = asarray(il, dtype=int)
+        nb = len(self.buses)
+
+        new = [l for l in set(il) if not self._ptdf.has_key(l)]
+        if new:
+            H = self.case.makePTDF(self.buses, self.branches, monitored=new,
+                                   factors=self._factors)
+            for i, l in enumerate(new):
+                self._ptdf[l] = H[i, :]
+
+        if len(il):
+            return array([self._ptdf[l] for l in il])
+        else:
+            return zeros((0, nb))
+
+
+    def _indexed(self, func, *args):
+        """ Returns the result of calling func with the buses indexed in
+        the order of the decomposition.  The previous indexes of the buses
+        are restored, so that the indexing of the case is not changed.
+        """
+        indexes = [b._i for b in self.buses]
+        self.case.index_buses(self.buses)
+        try:
+            return func(*args)
+        finally:
+            for b, i in zip(self.buses, indexes):
+                b._i = i
+
+# EOF -------------------------------------------------------------------------
@@ -0,0 +1,324 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines numerical observability analysis for state estimation.
+
+References:
+    A. Monticelli and F.F. Wu, "Network Observability: Identification of
+    Observable Islands and Measurement Placement", IEEE Transactions on
+    Power Apparatus and Systems, Vol. PAS-104, No. 5, May 1985.
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import logging
+
+from numpy import array, zeros, ones, r_, arange, abs, unique, argsort
+
+from scipy.sparse import csr_matrix, csc_matrix, identity, vstack
+from scipy.sparse.csgraph import connected_components
+from scipy.sparse.linalg import splu
+
+from case import PV, PQ
+from estimator import Measurement, PF, PT, QF, QT, PG, QG, VA, VM, TYPES
+from estimator import _measurement_set
+
+#------------------------------------------------------------------------------
+#  Logging:
+#------------------------------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+#------------------------------------------------------------------------------
+#  Constants:
+#------------------------------------------------------------------------------
+
+ACTIVE = "P" # The decoupled P-Va sub-problem.
+REACTIVE = "Q" # The decoupled Q-Vm sub-problem.
+
+# Branch flow, bus injection and bus state measurement types of each
+# sub-problem.
+MODEL_TYPES = {ACTIVE: ((PF, PT), PG, VA), REACTIVE: ((QF, QT), QG, VM)}
+
+#------------------------------------------------------------------------------
+#  "ObservabilityAnalysis" class:
+#------------------------------------------------------------------------------
+
+class ObservabilityAnalysis(object):
+    """ Numerical observability analysis of a measurement set.
+
+    The P-Va and Q-Vm sub-problems are analysed in turn with a linear model
+    of the measurements in which all branches have unit admittance.  The
+    gain matrix of the model is factorised with zero pivot detection and
+    the branches with flow in the null space of the gain matrix are
+    removed, together with the injection measurements at their ends, until
+    none remain.  The observable islands are then the components of the
+    remaining network.  Pseudo-measurements of the injection at boundary
+    buses are placed by triangular factorisation of the island reduced
+    injection matrix, so that a minimal set connects the islands.
+
+    The voltage angles and magnitudes of the buses that are not PV or PQ
+    buses are not estimated and count as measured.
+    """
+
+    #--------------------------------------------------------------------------
+    #  "object" interface:
+    #--------------------------------------------------------------------------
+
+    def __init__(self, case, measurements, tolerance=1e-08):
+        """ Initialises a new ObservabilityAnalysis instance.
+        """
+        #: Case for which the measurement set is analysed.
+        self.case = case
+
+        #: Measurements available for state estimation, a list of
+        #: L{Measurement} objects or a L{MeasurementSet}.
+        self.measurements = measurements
+
+        #: Relative tolerance for zero pivots and null space flows.
+        self.tolerance = tolerance
+
+    #--------------------------------------------------------------------------
+    #  Public interface:
+    #--------------------------------------------------------------------------
+
+    def islands(self, model=ACTIVE):
+        """ Returns the observable islands of the P-Va or Q-Vm sub-problem,
+        as lists of buses, and the list of unobservable branches.  The
+        islands in which the state is referenced to a measured or fixed bus
+        are first.
+        """
+        buses = self.case.connected_buses
+        branches = self.case.online_branches
+        label, anchored, obs, _ = self._analyse(model)
+
+        islands = [[b for i, b in enumerate(buses) if label[i] == k]
+                   for k in anchored + [k for k in range(max(label) + 1)
+                                        if k not in anchored]]
+        unobservable = [l for k, l in enumerate(branches) if not obs[k]]
+
+        return islands, unobservable
+
+
+    def observable(self):
+        """ Returns True if the state of all buses may be estimated.
+        """
+        for model in [ACTIVE, REACTIVE]:
+            label, anchored, _, _ = self._analyse(model)
+            if len(anchored) <= max(label):
+                return False
+        return True
+
+
+    def pseudo_measurements(self, sigma=None):
+        """ Returns a minimal list of pseudo-measurements of the generation at
+        buses that make the case observable.  The demand at each bus is that
+        of the case, so the values are the scheduled output of the online
+        generators at the bus, in per-unit.
+        """
+        base_mva = self.case.base_mva
+        generators = self.case.online_generators
+
+        pseudo = []
+        for model in [ACTIVE, REACTIVE]:
+            typ = MODEL_TYPES[model][1]
+            for bus in self._placement(model):
+                g = [g for g in generators if g.bus is bus]
+                if typ == PG:
+                    value = sum([g.p for g in g]) / base_mva
+                else:
+                    value = sum([g.q for g in g]) / base_mva
+                pseudo.append(Measurement(bus, typ, value, sigma))
+
+        if pseudo:
+            logger.info("Pseudo-measurements placed: %s" % ", ".join(
+                ["%s %s" % (m.type, m.b_or_l.name) for m in pseudo]))
+
+        return pseudo
+
+    #--------------------------------------------------------------------------
+    #  Protected interface:
+    #--------------------------------------------------------------------------
+
+    def _analyse(self, model):
+        """ Returns the island of each bus, the anchored islands, a flag for
+        each branch that is True if its flow is observable and the indexes
+        of the buses with injection measurements.
+        """
+        self.case.index_buses()
+        self.case.index_branches()
+        buses = self.case.connected_buses
+        branches = self.case.online_branches
+        nb = len(buses)
+        nl = len(branches)
+
+        f = array([l.from_bus._i for l in branches], dtype=int)
+        t = array([l.to_bus._i for l in branches], dtype=int)
+
+        flows, injection, state = MODEL_TYPES[model]
+        meas = _measurement_set(self.measurements)
+        code = lambda typ: meas.types == TYPES.index(typ)
+        mf = _unique(meas.index[code(flows[0]) | code(flows[1])])
+        mi = _unique(meas.index[code(injection)])
+
+        # The state of buses that are not PV or PQ buses is fixed.
+        ms = _unique(list(meas.index[code(state)]) +
+                     [b._i for b in buses if b.type not in [PV, PQ]])
+
+        # Incidence matrix of the buses and branches.
+        Cft = csr_matrix((r_[ones(nl), -ones(nl)],
+                          (r_[arange(nl), arange(nl)], r_[f, t])), (nl, nb))
+
+        obs = ones(nl, dtype=bool)
+        active = mi
+        while True:
+            # Branch flows and bus injections of the unit admittance model
+            # with the unobservable branches removed.
+            A = csr_matrix((obs * 1.0, (arange(nl), arange(nl))), (nl, nl))
+            Af = A * Cft
+            H = vstack([Af[mf, :], (Af.T * Af)[active, :],
+                         csr_matrix((ones(len(ms)), (arange(len(ms)), ms)),
+                                    (len(ms), nb))], format="csr")
+
+            G = (H.T * H).tocsc()
+            theta = _null_space_vector(G, self.tolerance)
+
+            # Flows of the branches in the null space.
+            flow = abs(Cft * theta)
+            scale = max(abs(theta).max(), 1.0)
+            new = obs & (flow > self.tolerance * scale * 1e2)
+            if not new.any():
+                break
+
+            obs = obs & ~new
+            # Injections at the ends of unobservable branches are unusable.
+            ends = set(r_[f[~obs], t[~obs]])
+            active = array([i for i in active if i not in ends], dtype=int)
+
+        # Components of the network of observable branches.
+        C = csr_matrix((ones(obs.sum()), (f[obs], t[obs])), (nb, nb))
+        _, label = connected_components(C, directed=False)
+
+        anchored = list(unique(label[ms])) if len(ms) else []
+
+        return label, anchored, obs, mi
+
+
+    def _placement(self, model):
+        """ Returns the buses at which pseudo-measurements of the injection
+        are to be placed for the P-Va or Q-Vm sub-problem.
+        """
+        buses = self.case.connected_buses
+        branches = self.case.online_branches
+        label, anchored, obs, mi = self._analyse(model)
+
+        free = [k for k in range(max(label) + 1) if k not in anchored]
+        if not free:
+            return []
+        col = dict([(k, j) for j, k in enumerate(free)])
+
+        # Island reduced rows of the injection at each boundary bus.  The
+        # measured injections that were discarded are used first.
+        rows = {}
+        for l in branches:
+            i, j = l.from_bus._i, l.to_bus._i
+            if label[i] == label[j]:
+                continue
+            for a, b in [(i, j), (j, i)]:
+                row = rows.setdefault(a, zeros(len(free)))
+                if label[a] in col:
+                    row[col[label[a]]] += 1.0
+                if label[b] in col:
+                    row[col[label[b]]] -= 1.0
+
+        candidates = [i for i in mi if i in rows] + \
+                     [i for i in sorted(rows.keys()) if i not in mi]
+
+        # Gaussian elimination of the candidate rows with the rows already
+        # chosen as pivots.
+        basis = []
+        placed = []
+        for i in candidates:
+            row = rows[i].copy()
+            for p, v in basis:
+                if row[p] != 0.0:
+                    row = row - row[p] * v
+            p = abs(row).argmax()
+            if abs(row[p]) <= self.tolerance:
+                continue
+            basis.append((p, row / row[p]))
+            if i not in mi:
+                placed.append(buses[i])
+            if len(basis) == len(free):
+                break
+
+        if len(basis) < len(free):
+            logger.error("The islands of %d buses can not be made observable "
+                "with injection pseudo-measurements." %
+                sum([(label == k).sum() for k in free]))
+
+        return placed
+
+#------------------------------------------------------------------------------
+#  Null space of the gain matrix:
+#------------------------------------------------------------------------------
+
+def _unique(indexes):
+    """ Returns the sorted unique indexes as an integer array.
+    """
+    return array(sorted(set(indexes)), dtype=int)
+
+
+def _null_space_vector(G, tolerance):
+    """ Returns a vector in the null space of the symmetric positive
+    semidefinite matrix G.  G is factorised as P*G*P' = L*D*L' with zero
+    pivot detection.  The variables at the zero pivots are set to distinct
+    integers and the remaining equations are solved for the others.
+    """
+    G = csc_matrix(G)
+    n = G.shape[0]
+    if n == 0:
+        return zeros(0)
+
+    # The diagonal is perturbed so that the factorisation of a singular
+    # matrix does not fail, by much less than the zero pivot tolerance.
+    scale = max(abs(G.diagonal()).max(), 1.0)
+    Gp = (G + identity(n, format="csc") * tolerance * scale * 1e-6).tocsc()
+
+    lu = splu(Gp, permc_spec="MMD_AT_PLUS_A", diag_pivot_thresh=0.0,
+              options={"SymmetricMode": True})
+    if (lu.perm_r != lu.perm_c).any():
+        raise ValueError, "Gain matrix factorisation is not symmetric."
+
+    # Variables at the zero pivots of the elimination order.
+    zero = argsort(lu.perm_c)[abs(lu.U.diagonal()) <= tolerance * scale]
+
+    x = zeros(n)
+    if len(zero) == 0:
+        return x
+    x[zero] = arange(len(zero)) + 1.0
+
+    rest = ones(n, dtype=bool)
+    rest[zero] = False
+    if rest.any():
+        Gr = G[rest, :].tocsc()
+        x[rest] = splu(Gr[:, rest].tocsc()).solve(-(Gr[:, zero] * x[zero]))
+
+    return x
+
+# EOF -------------------------------------------------------------------------
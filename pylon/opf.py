@@ -29,16 +29,22 @@ import logging
 import random
 
 from time import time
+from multiprocessing import Pool
 
 from numpy import \
-    array, pi, diff, Inf, ones, r_, float64, zeros, arctan2, sin, cos
+    array, pi, diff, Inf, ones, r_, float64, zeros, arctan2, sin, cos, arange, \
+    delete, tile, atleast_2d, isnan, absolute, nonzero, newaxis, setdiff1d, \
+    flatnonzero, asarray, concatenate, dot
 
-from scipy.sparse import lil_matrix, csr_matrix, hstack
+from scipy.sparse import \
+    lil_matrix, csr_matrix, hstack, vstack, block_diag, \
+    eye as speye
+from scipy.sparse.linalg import splu
 
 from util import _Named, fair_max
 from case import REFERENCE
-from generator import PW_LINEAR
-from solver import DCOPFSolver, PIPSSolver
+from generator import POLYNOMIAL, PW_LINEAR
+from solver import DCOPFSolver, PIPSSolver, PTDFSolver
 
 #------------------------------------------------------------------------------
 #  Logging:
@@ -46,6 +52,13 @@ from solver import DCOPFSolver, PIPSSolver
 
 logger = logging.getLogger(__name__)
 
+#------------------------------------------------------------------------------
+#  Constants:
+#------------------------------------------------------------------------------
+
+LOAD = "load"
+PRICE = "price"
+
 #------------------------------------------------------------------------------
 #  "OPF" class:
 #------------------------------------------------------------------------------
@@ -57,7 +70,9 @@ class OPF(object):
     Cornell. See U{http://www.pserc.cornell.edu/matpower/} for more info.
     """
 
-    def __init__(self, case, dc=True, ignore_ang_lim=True, opt=None):
+    def __init__(self, case, dc=True, ignore_ang_lim=True, opt=None,
+                 warm_start=False, persistent=False, scopf=False,
+                 contingencies=None, ptdf=False, presolve=False):
         """ Initialises a new OPF instance.
         """
         #: Case under optimisation.
@@ -72,18 +87,176 @@ class OPF(object):
         #: Solver options (See pips.py for futher details).
         self.opt = {} if opt is None else opt
 
+        #: Retain the solution of each call to solve() and use it to
+        #: warm-start the next.
+        self.warm_start = warm_start
+
+        #: Optimisation vector and multipliers of the last solution.
+        self._x0 = None
+        self._lmbda0 = None
+
+        #: Keep the OPF model between calls to solve().  Changes to
+        #: generator costs, limits, bus demands and branch ratings must then
+        #: be applied using update_costs(), update_var_bounds() and
+        #: update_constraint_bounds().
+        self.persistent = persistent
+
+        #: OPF model retained when persistent.
+        self.om = None
+
+        # Buses, branches and generators from which the retained model was
+        # built.
+        self._components = None
+
+        #: Secure the DC OPF solution against the outage of each of the
+        #: contingency branches.  Post-contingency flows are limited by the
+        #: emergency rating, rate_c, or by rate_a if it is not set.
+        self.scopf = scopf
+
+        #: Branches whose outage is considered.  All online branches by
+        #: default.
+        self.contingencies = contingencies
+
+        #: Maximum number of times post-contingency constraints are added
+        #: and the OPF re-solved.
+        self.scopf_max_it = 10
+
+        #: Eliminate the bus voltage angles from the DC formulation using
+        #: the power transfer distribution factors.  The model has a single
+        #: power balance constraint and flow limits are added only for
+        #: branches found to exceed their rating.
+        self.ptdf = ptdf
+
+        #: Remove fixed variables and redundant constraints from the DC
+        #: OPF problem before solving and restore the solution after.
+        self.presolve = presolve
+
+        #: Tolerance on branch flows when screening for violations (p.u.).
+        self.flow_tol = 1e-5
+
+        #: Number of outages screened at once.
+        self.scopf_block = 500
+
     #--------------------------------------------------------------------------
     #  Public interface:
     #--------------------------------------------------------------------------
 
-    def solve(self, solver_klass=None):
+    def solve(self, solver_klass=None, x0=None, lmbda0=None):
         """ Solves an optimal power flow and returns a results dictionary.
+
+        The solver may be warm-started from the optimisation vector, C{x0},
+        and the multipliers, C{lmbda0}, of a previous solution (the "x" and
+        "lmbda" values of its results dictionary).  The slack variables are
+        computed from the constraints at C{x0} and the complementarity
+        conditions are re-centred (See pips.py for further details).  If
+        C{warm_start} is set, the last converged solution is used unless
+        C{x0} is given.  A cold start is made if the problem dimensions
+        have changed.
         """
         # Start the clock.
         t0 = time()
 
         # Build an OPF model with variables and constraints.
-        om = self._construct_opf_model(self.case)
+        if self.persistent and self._model_current():
+            om = self.om
+            self.case.reset()
+            self.case.index_buses(self._components[0])
+        else:
+            om = self._construct_opf_model(self.case)
+
+        return self._solve_model(om, solver_klass, x0, lmbda0, t0)
+
+
+    def update_costs(self):
+        """ Updates the piecewise linear cost variables and constraints of
+        the retained model from the generator cost functions.  Polynomial
+        costs are taken from the generators when solving.
+        """
+        if not self._model_current():
+            return
+        om = self.om
+        gn = self._pwl1_to_poly(self._components[2])
+
+        y, ycon = self._pwl_gen_costs(gn, self.case.base_mva)
+
+        if ycon is not None:
+            om.set_var(y)
+            om.set_constraint(ycon)
+        elif "y" in [v.name for v in om.vars]:
+            om.remove_constraint("ycon")
+            om.remove_var("y")
+
+
+    def update_var_bounds(self):
+        """ Updates the initial values and limits of the optimisation
+        variables of the retained model from the case.
+        """
+        if not self._model_current():
+            return
+        om = self.om
+        bs, _, gn = self._components
+        base_mva = self.case.base_mva
+
+        refs = [bus._i for bus in bs if bus.type == REFERENCE]
+        variables = [self._get_voltage_angle_var(refs, bs),
+                     self._get_pgen_var(gn, base_mva)]
+        if self.dc and self.ptdf:
+            variables = variables[1:]
+        elif not self.dc:
+            variables.extend([self._get_voltage_magnitude_var(bs, gn),
+                              self._get_qgen_var(gn, base_mva)])
+
+        for var in variables:
+            om.update_var(var.name, var.v0, var.vl, var.vu)
+
+
+    def update_constraint_bounds(self):
+        """ Updates the bounds of the linear constraints of the retained
+        model from the bus demands, branch ratings and angle difference
+        limits of the case.  The network matrices are not rebuilt.
+        """
+        if not self._model_current():
+            return
+        om = self.om
+        bs, ln, gn = self._components
+        base_mva = self.case.base_mva
+
+        if self.dc and self.ptdf:
+            om._bmis = self._power_mismatch_rhs(bs, om._Pbusinj, base_mva)
+            om.set_constraint(self._power_balance_ptdf(gn, om._bmis))
+            self._set_monitored_branches(om, ln, om._ia)
+
+            # Post-contingency flow limits depend upon the demand.
+            for con in [c for c in om.lin_constraints
+                        if c.name.startswith("Pc")]:
+                om.remove_constraint(con.name)
+            return
+        elif self.dc:
+            bmis = self._power_mismatch_rhs(bs, om._Pbusinj, base_mva)
+            om.update_lin_constraint("Pmis", bmis, bmis)
+
+            il = self._flow_limited_branches(ln)
+            if (len(il) == len(om._il)) and all(il == om._il):
+                rate_a = array([l.rate_a / base_mva for l in ln])
+                om.update_lin_constraint("Pf", u=rate_a[il] - om._Pfinj[il])
+                om.update_lin_constraint("Pt", u=rate_a[il] + om._Pfinj[il])
+            else:
+                for con in self._branch_flow_dc(ln, om._Bf, om._Pfinj,
+                                                base_mva):
+                    om.set_constraint(con)
+                om._il = il
+        else:
+            om.set_constraint(self._const_pf_constraints(gn, base_mva))
+
+        om.set_constraint(self._voltage_angle_diff_limit(bs, ln))
+
+    #--------------------------------------------------------------------------
+    #  Private interface:
+    #--------------------------------------------------------------------------
+
+    def _solve_model(self, om, solver_klass, x0, lmbda0, t0):
+        """ Solves the given OPF model and returns a results dictionary.
+        """
         if om is None:
             return {"converged": False, "output": {"message": "No Ref Bus."}}
 
@@ -91,27 +264,233 @@ class OPF(object):
 #        if self.opt["verbose"]:
 #            print '\nPYLON Version %s, %s', "0.4.2", "April 2010"
         if solver_klass is not None:
-            result = solver_klass(om, opt=self.opt).solve()
+            solver = solver_klass(om, opt=self.opt)
+        elif self.dc and self.ptdf:
+            solver = PTDFSolver(om, opt=self.opt)
         elif self.dc:
 #            if self.opt["verbose"]:
 #                print ' -- DC Optimal Power Flow\n'
-            result = DCOPFSolver(om, opt=self.opt).solve()
+            solver = DCOPFSolver(om, opt=self.opt)
         else:
 #            if self.opt["verbose"]:
 #                print ' -- AC Optimal Power Flow\n'
-            result = PIPSSolver(om, opt=self.opt).solve()
+            solver = PIPSSolver(om, opt=self.opt)
+
+        if x0 is None and self.warm_start:
+            x0, lmbda0 = self._x0, self._lmbda0
+        solver.x0, solver.lmbda0 = x0, lmbda0
+        solver.presolve = self.presolve
+
+        result = solver.solve()
+
+        if not result["converged"] and x0 is not None:
+            logger.info("Warm-started OPF failed to converge, solving from "
+                        "a cold start.")
+            solver.x0 = solver.lmbda0 = None
+            result = solver.solve()
+
+        if self.dc and self.ptdf and result["converged"]:
+            result = self._solve_monitored(om, solver, result)
+
+        if self.scopf and result["converged"]:
+            result = self._solve_secure(om, solver, result)
+
+        if self.warm_start and result["converged"]:
+            self._x0, self._lmbda0 = result["x"], result["lmbda"]
 
         result["elapsed"] = time() - t0
 
         if self.opt.has_key("verbose"):
             if self.opt["verbose"]:
                 logger.info("OPF completed in %.3fs." % result["elapsed"])
+                if result["output"].has_key("iterations"):
+                    logger.info("Solver iterations: %d" %
+                                result["output"]["iterations"])
 
         return result
 
-    #--------------------------------------------------------------------------
-    #  Private interface:
-    #--------------------------------------------------------------------------
+
+    def _model_current(self):
+        """ Returns True if a model has been retained and the buses,
+        branches and generators from which it was built are unchanged.
+        """
+        if self.om is None:
+            return False
+
+        case = self.case
+        components = (case.connected_buses, case.online_branches,
+                      case.online_generators)
+
+        for old, new in zip(self._components, components):
+            if (len(old) != len(new)) or \
+                [c for c, d in zip(old, new) if c is not d]:
+                return False
+        return True
+
+
+    def _solve_secure(self, om, solver, result):
+        """ Screens the solution for flows exceeding their limit after the
+        outage of a contingency branch, adds constraints on the violated
+        post-contingency flows and re-solves, warm-started from the last
+        solution, until the solution is secure.  Post-contingency flows are
+        computed using line outage distribution factors.  Outages that
+        split the network are not considered.
+        """
+        if not self.dc:
+            logger.error("SCOPF requires the DC formulation.")
+            return result
+
+        bs, ln, _ = om._components
+        base_mva = self.case.base_mva
+
+        rating = self._post_contingency_ratings(ln, base_mva)
+        if self.contingencies is None:
+            ik = arange(len(ln))
+        else:
+            ik = array([ln.index(l) for l in self.contingencies if l in ln],
+                       dtype=int)
+
+        # The network is unchanged, so the bus susceptance matrix is
+        # factorised once for screening every block of outages.
+        factors = self.case.factorBdc(bs, ln)
+
+        added = set()
+        n_con = 0
+        for _ in range(self.scopf_max_it):
+            F = array([l.p_from for l in ln]) / base_mva
+
+            il, kl, lodf = self._screen_contingencies(bs, ln, F, rating, ik,
+                                                      factors)
+            new = [i for i, lk in enumerate(zip(il, kl)) if lk not in added]
+            if not new:
+                break
+            il, kl, lodf = il[new], kl[new], lodf[new]
+            added.update(zip(il, kl))
+            n = len(il)
+
+            # Pc = Pf[l] + LODF[l, k] * Pf[k]
+            Al, Fl, vs = self._flow_rows(om, il)
+            Ak, Fk, _ = self._flow_rows(om, kl)
+            D = csr_matrix((lodf, (arange(n), arange(n))), (n, n))
+            A = Al + D * Ak
+            Pcinj = Fl + lodf * Fk
+
+            names = [c.name for c in om.lin_constraints]
+            i = 0
+            while "Pc%d" % i in names:
+                i += 1
+            om.add_constraint(LinearConstraint("Pc%d" % i, A,
+                -rating[il] - Pcinj, rating[il] - Pcinj, vs))
+            n_con += n
+
+            logger.info("Adding %d post-contingency flow constraints." % n)
+
+            result = self._resolve(solver, result)
+            if not result["converged"]:
+                break
+        else:
+            logger.warning("Solution not secure after %d SCOPF iterations." %
+                           self.scopf_max_it)
+
+        result["contingency_constraints"] = n_con
+
+        return result
+
+
+    def _solve_monitored(self, om, solver, result):
+        """ Adds the flow limits of branches with flows exceeding their
+        rating to the PTDF formulation and re-solves, warm-started from the
+        last solution, until no flow limit is violated.
+        """
+        _, ln, _ = om._components
+        base_mva = self.case.base_mva
+
+        il = self._flow_limited_branches(ln)
+        rate_a = array([l.rate_a for l in ln]) / base_mva
+
+        while True:
+            F = array([l.p_from for l in ln]) / base_mva
+            iv = il[absolute(F[il]) > rate_a[il] + self.flow_tol]
+            iv = setdiff1d(iv, om._ia)
+            if len(iv) == 0:
+                break
+
+            logger.info("Adding flow limits for %d branches." % len(iv))
+
+            self._set_monitored_branches(om, ln, r_[om._ia, iv])
+
+            result = self._resolve(solver, result)
+            if not result["converged"]:
+                break
+
+        return result
+
+
+    def _resolve(self, solver, result):
+        """ Re-solves a modified model, warm-started from the last result,
+        or from a cold start if that fails to converge.
+        """
+        solver.x0, solver.lmbda0 = result["x"], result["lmbda"]
+        result = solver.solve()
+        if not result["converged"]:
+            solver.x0 = solver.lmbda0 = None
+            result = solver.solve()
+        return result
+
+
+    def _flow_rows(self, om, il):
+        """ Returns the coefficients, A, and constant terms, Finj, relating
+        the real power flows in branches, il, to the optimisation variables
+        (Pf = A * x + Finj) and the names of the variable sets.
+        """
+        if self.ptdf:
+            H = self._ptdf_rows(om, il)
+            return csr_matrix(H) * om._Cg, om._Pfinj[il] + H.dot(om._bmis), \
+                ["Pg"]
+        else:
+            return om._Bf[il, :], om._Pfinj[il], ["Va"]
+
+
+    def _screen_contingencies(self, buses, branches, F, rating, ik,
+                              factors):
+        """ Returns the indexes of the branches with flows exceeding their
+        limit after the outage of a contingency branch, the indexes of the
+        outaged branches and the line outage distribution factors relating
+        them.  Outages are screened in blocks to limit the memory required,
+        using the given factorisation of the bus susceptance matrix.
+        """
+        il, kl, lodf = [], [], []
+        for j in range(0, len(ik), self.scopf_block):
+            ko = ik[j:j + self.scopf_block]
+            LODF = self.case.makeLODF(buses, branches, ko, factors=factors)
+
+            # Outages that split the network are not considered.
+            connected = ~isnan(LODF[0, :])
+            ko, LODF = ko[connected], LODF[:, connected]
+
+            Fc = F[:, newaxis] + LODF * F[ko][newaxis, :]
+            l, o = nonzero(absolute(Fc) > rating[:, newaxis] + self.flow_tol)
+
+            il.extend(l)
+            kl.extend(ko[o])
+            lodf.extend(LODF[l, o])
+
+        return array(il, dtype=int), array(kl, dtype=int), array(lodf)
+
+
+    def _post_contingency_ratings(self, branches, base_mva):
+        """ Returns the post-contingency flow limit of each branch (p.u.).
+        The emergency rating is used if set and the long term rating
+        otherwise.  Branches without limits are given an infinite rating.
+        """
+        rating = Inf * ones(len(branches))
+        for i, l in enumerate(branches):
+            if 0.0 < l.rate_c < 1e10:
+                rating[i] = l.rate_c / base_mva
+            elif 0.0 < l.rate_a < 1e10:
+                rating[i] = l.rate_a / base_mva
+        return rating
+
 
     def _construct_opf_model(self, case):
         """ Returns an OPF model.
@@ -139,7 +518,21 @@ class OPF(object):
         Va = self._get_voltage_angle_var(refs, bs)
         Pg = self._get_pgen_var(gn, base_mva)
 
-        if self.dc: # DC model.
+        if self.dc and self.ptdf: # Compact DC model.
+            B, Bf, Pbusinj, Pfinj = self.case.makeBdc(bs, ln)
+
+            # Power balance constraint (sum(Pg) = sum(Pd)).
+            bmis = self._power_mismatch_rhs(bs, Pbusinj, base_mva)
+            Pbal = self._power_balance_ptdf(gn, bmis)
+
+            # Flow limits of monitored branches, initially none.
+            Pf = LinearConstraint("Pf", zeros((0, len(gn))), array([]),
+                                  array([]), ["Pg"])
+
+            if not self.ignore_ang_lim:
+                logger.warning("Branch angle difference limits are ignored "
+                               "by the PTDF formulation.")
+        elif self.dc: # DC model.
             # Get the susceptance matrices and phase shift injection vectors.
             B, Bf, Pbusinj, Pfinj = self.case.makeBdc(bs, ln)
 
@@ -163,7 +556,10 @@ class OPF(object):
         # Branch voltage angle difference limits.
         ang = self._voltage_angle_diff_limit(bs, ln)
 
-        if self.dc:
+        if self.dc and self.ptdf:
+            vars = [Pg]
+            constraints = [Pbal, Pf]
+        elif self.dc:
             vars = [Va, Pg]
             constraints = [Pmis, Pf, Pt, ang]
         else:
@@ -186,6 +582,17 @@ class OPF(object):
         if self.dc: # user data
             opf._Bf = Bf
             opf._Pfinj = Pfinj
+            opf._Pbusinj = Pbusinj
+            opf._il = self._flow_limited_branches(ln)
+            if self.ptdf:
+                self._ptdf_model_data(opf, bs, ln, gn, bmis)
+        else:
+            opf._Ybus, opf._Yf, opf._Yt = case.Y
+        opf._components = (bs, ln, gn)
+
+        if self.persistent:
+            self.om = opf
+            self._components = opf._components
 
         return opf
 
@@ -301,12 +708,74 @@ class OPF(object):
 
         Amis = hstack([B, neg_Cg], format="csr")
 
-        Pd = array([bus.p_demand for bus in buses])
+        bmis = self._power_mismatch_rhs(buses, Pbusinj, base_mva)
+
+        return LinearConstraint("Pmis", Amis, bmis, bmis, ["Va", "Pg"])
+
+
+    def _power_mismatch_rhs(self, buses, Pbusinj, base_mva, Pd=None):
+        """ Returns the right-hand side of the power mismatch constraint for
+        the given demand (MW) at each bus, that of the buses by default.
+        """
+        if Pd is None:
+            Pd = array([bus.p_demand for bus in buses])
         Gs = array([bus.g_shunt for bus in buses])
 
-        bmis = -(Pd - Gs) / base_mva - Pbusinj
+        return -(Pd - Gs) / base_mva - Pbusinj
 
-        return LinearConstraint("Pmis", Amis, bmis, bmis, ["Va", "Pg"])
+
+    def _power_balance_ptdf(self, generators, bmis):
+        """ Returns the system power balance constraint (sum(Pg) = sum(Pd)).
+        """
+        Abal = csr_matrix(-ones((1, len(generators))))
+        return LinearConstraint("Pbal", Abal, array([sum(bmis)]),
+                                array([sum(bmis)]), ["Pg"])
+
+
+    def _ptdf_model_data(self, om, buses, branches, generators, bmis):
+        """ Adds the data used by the PTDF formulation to the OPF model.
+        The real power flows are related to the generator set-points by
+        Pf = H * (Cg * Pg + bmis) + Pfinj, where the rows of the transfer
+        distribution factor matrix, H, are found using the factorisation of
+        the bus susceptance matrix from L{Case.factorBdc}.
+        """
+        nb, ng = len(buses), len(generators)
+        ref = [i for i, b in enumerate(buses) if b.type == REFERENCE][0]
+
+        gen_bus = array([g.bus._i for g in generators])
+
+        om._Cg = csr_matrix((ones(ng), (gen_bus, range(ng))), (nb, ng))
+        om._bmis = bmis
+        om._factors = self.case.factorBdc(buses, branches, ref)
+        om._Va_ref = buses[ref].v_angle * pi / 180.0
+        om._ia = array([], dtype=int)
+        om._Hf = zeros((0, nb))
+
+
+    def _ptdf_rows(self, om, il):
+        """ Returns the rows of the transfer distribution factor matrix for
+        branches, il.
+        """
+        buses, branches, _ = om._components
+        return self.case.makePTDF(buses, branches, monitored=il,
+                                  factors=om._factors)
+
+
+    def _set_monitored_branches(self, om, branches, ia):
+        """ Sets the flow limit constraint of the PTDF formulation for the
+        monitored branches, ia.
+        """
+        base_mva = self.case.base_mva
+        ia = array(ia, dtype=int)
+        rate_a = array([l.rate_a / base_mva for l in branches])[ia]
+
+        H = self._ptdf_rows(om, ia)
+        A = csr_matrix(H) * om._Cg
+        Finj = om._Pfinj[ia] + H.dot(om._bmis)
+
+        om._ia, om._Hf = ia, H
+        om.set_constraint(LinearConstraint("Pf", A, -rate_a - Finj,
+                                           rate_a - Finj, ["Pg"]))
 
 
     def _branch_flow_dc(self, branches, Bf, Pfinj, base_mva):
@@ -315,7 +784,7 @@ class OPF(object):
         Pf = Bf * Va + Pfinj.
         """
         # Indexes of constrained lines.
-        il = array([i for i,l in enumerate(branches) if 0.0 < l.rate_a < 1e10])
+        il = self._flow_limited_branches(branches)
         lpf = -Inf * ones(len(il))
         rate_a = array([l.rate_a / base_mva for l in branches])
         upf = rate_a[il] - Pfinj[il]
@@ -327,6 +796,13 @@ class OPF(object):
         return Pf, Pt
 
 
+    def _flow_limited_branches(self, branches):
+        """ Returns the indexes of branches with flow limits.
+        """
+        return array([i for i,l in enumerate(branches) if 0.0 < l.rate_a < 1e10],
+                     dtype=int)
+
+
     def _const_pf_constraints(self, gn, base_mva):
         """ Returns a linear constraint enforcing constant power factor for
         dispatchable loads.
@@ -537,8 +1013,23 @@ class UDOPF(OPF):
         version 3.2, U{http://www.pserc.cornell.edu/matpower/}, Sept, 2007
     """
 
+    def __init__(self, case, dc=True, ignore_ang_lim=True, opt=None,
+                 processes=1):
+        """ Initialises a new UDOPF instance.
+        """
+        super(UDOPF, self).__init__(case, dc, ignore_ang_lim, opt)
+
+        #: Number of processes in which the candidates of each stage are
+        #: evaluated.  The candidates are evaluated in turn if 1 or using
+        #: a process for each CPU if None.  The solution does not depend
+        #: upon the number of processes.
+        self.processes = processes
+
+
     def solve(self, solver_klass=None):
         """ Solves the combined unit decommitment / optimal power flow problem.
+        Each candidate OPF is warm-started from the best solution of the
+        previous stage.
         """
         case = self.case
         generators = case.online_generators
@@ -602,83 +1093,89 @@ class UDOPF(OPF):
         overall_online = [g.online for g in case.generators]
         # The objective function value is the total system cost.
         overall_cost = solution["f"]
+        # Solution from which to warm-start the candidates.
+        overall_x, overall_lmbda = solution["x"], solution["lmbda"]
+        overall_mu_pmin = [g.mu_pmin for g in case.generators]
 
         # Best case for this stage.
         stage_online = overall_online
         stage_cost = overall_cost
 
-        # Shutdown at most one generator per stage.
-        while True:
-            # 4. Form a candidate list of generators with minimum
-            # generation limits binding.
+        # Evaluate the candidates of each stage in a pool of processes,
+        # each with a copy of the case.
+        if self.processes != 1:
+            pool = Pool(self.processes, _init_candidate_worker, (self,))
+        else:
+            pool = None
 
-            # Activate generators according to the stage best.
-            for i, generator in enumerate(case.generators):
-                generator.online = stage_online[i]
+        # Shutdown at most one generator per stage.
+        try:
+            while True:
+                # 4. Form a candidate list of generators with minimum
+                # generation limits binding.
 
-            # Get candidates for shutdown. Lagrangian multipliers are often
-            # very small so we round to four decimal places.
-            candidates = [g for g in case.online_generators if \
-                          (round(g.mu_pmin, 4) > 0.0) and (g.p_min > 0.0)]
+                # Get candidates for shutdown. Lagrangian multipliers are often
+                # very small so we round to four decimal places.
+                candidates = [i for i, g in enumerate(case.generators)
+                              if stage_online[i] and g.p_min > 0.0 and \
+                              (round(overall_mu_pmin[i], 4) > 0.0)]
 
-            if len(candidates) == 0:
-                break
+                if len(candidates) == 0:
+                    break
 
-            # Assume no improvement during this stage.
-            done = True
+                # Assume no improvement during this stage.
+                done = True
 
-            i_stage += 1
-            logger.debug("De-commitment stage %d." % i_stage)
+                i_stage += 1
+                logger.debug("De-commitment stage %d." % i_stage)
 
-            for candidate in candidates:
                 # 5. For each generator on the candidate list, solve an OPF to
                 # find the total system cost with the generator shut down.
-
-                # Activate generators according to the stage best.
-                for i, generator in enumerate(case.generators):
-                    generator.online = stage_online[i]
-
-                # Shutdown candidate generator.
-                candidate.online = False
-
-                logger.debug("Solving OPF with generator '%s' shutdown." %
-                    candidate.name)
-
-                # Run OPF.
-                solution = super(UDOPF, self).solve(solver_klass)
-
-                # Compare total system costs for improvement.
-                if solution["converged"] == True \
-                    and (solution["f"] < overall_cost):
-                    logger.debug("System cost improvement: $%.3f ($%.3f)" %
-                                 (stage_cost - solution["f"], solution["f"]))
-                    # 6. Replace the current best solution with this one if
-                    # it has a lower cost.
-                    overall_online = [g.online for g in case.generators]
-                    overall_cost = solution["f"]
-                    best_candidate = candidate
-                    # Check for further decommitment.
-                    done = False
+                args = [(stage_online, overall_x, overall_lmbda, i,
+                         solver_klass) for i in candidates]
+                if pool is not None:
+                    results = pool.map(_solve_candidate, args)
                 else:
-                    logger.debug("Candidate OPF failed [%s]." %
-                                 solution["output"]["message"])
-
-                # Reactivate the candidate before deactivating the next.
-#                candidate.online = True
+                    results = [self._solve_candidate(*arg) for arg in args]
+
+                for i, result in zip(candidates, results):
+                    converged, f, x, lmbda, mu_pmin, message = result
+
+                    # Compare total system costs for improvement.  The first
+                    # candidate of equal least cost is selected.
+                    if converged and (f < overall_cost):
+                        logger.debug("System cost improvement: $%.3f ($%.3f)" %
+                                     (stage_cost - f, f))
+                        # 6. Replace the current best solution with this one if
+                        # it has a lower cost.
+                        overall_online = list(stage_online)
+                        overall_online[i] = False
+                        overall_cost = f
+                        overall_x, overall_lmbda = x, lmbda
+                        overall_mu_pmin = mu_pmin
+                        best_candidate = case.generators[i]
+                        # Check for further decommitment.
+                        done = False
+                    else:
+                        logger.debug("Candidate OPF failed [%s]." % message)
 
-            if done:
-                # Decommits at this stage did not help.
-                break
-            else:
-                # 7. If any of the candidate solutions produced an improvement,
-                # return to step 3.
+                if done:
+                    # Decommits at this stage did not help.
+                    break
+                else:
+                    # 7. If any of the candidate solutions produced an
+                    # improvement, return to step 3.
 
-                # Shutting something else down helps, so let's keep going.
-                logger.info("Shutting down generator '%s'.",
-                            best_candidate.name)
+                    # Shutting something else down helps, so let's keep going.
+                    logger.info("Shutting down generator '%s'.",
+                                best_candidate.name)
 
-                stage_online = overall_online
-                stage_cost = overall_cost
+                    stage_online = overall_online
+                    stage_cost = overall_cost
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
 
         # 8. Use the best overall solution as the final solution.
         for i, generator in enumerate(case.generators):
@@ -686,7 +1183,8 @@ class UDOPF(OPF):
 
         # One final solve using the best case to ensure all results are
         # up-to-date.
-        solution = super(UDOPF, self).solve(solver_klass)
+        solution = super(UDOPF, self).solve(solver_klass, overall_x,
+                                            overall_lmbda)
 
         logger.debug("UDOPF system cost: $%.3f" % solution["f"])
 
@@ -699,6 +1197,583 @@ class UDOPF(OPF):
 
         return solution
 
+
+    def _solve_candidate(self, stage_online, x, lmbda, i, solver_klass=None):
+        """ Solves an OPF with the generator of index C{i} shut down,
+        warm-started from the given solution with the generators of the
+        stage on-line.  Returns a tuple of the convergence flag, objective
+        function value, solution, multipliers, minimum generation limit
+        multipliers of all generators and solver message.
+        """
+        case = self.case
+
+        t0 = time()
+
+        # Activate generators according to the stage best and shutdown the
+        # candidate generator.
+        for online, generator in zip(stage_online, case.generators):
+            generator.online = online
+        case.generators[i].online = False
+
+        logger.debug("Solving OPF with generator '%s' shutdown." %
+                     case.generators[i].name)
+
+        om = self._construct_opf_model(case)
+        x0, lmbda0 = self._drop_generator(om, x, lmbda, case.generators[i])
+
+        solution = self._solve_model(om, solver_klass, x0, lmbda0, t0)
+
+        return (solution["converged"], solution["f"], solution["x"],
+                solution["lmbda"], [g.mu_pmin for g in case.generators],
+                solution["output"]["message"])
+
+
+    def _drop_generator(self, om, x, lmbda, generator):
+        """ Returns the solution and multipliers of a model that also
+        included the given generator with the variables and cost constraints
+        of the generator removed, from which to warm-start the given model.
+        """
+        _, _, gn = om._components
+
+        # Generators of the model that included the generator.
+        gn = [g for g in self.case.generators
+              if (g is generator) or (g in gn)]
+        k = gn.index(generator)
+
+        # Variables and linear constraints before those of the piecewise
+        # linear costs are one generator larger.
+        names = [v.name for v in om.vars]
+        ix = [om.get_var("Pg").i1 + k]
+        if not self.dc:
+            ix.append(om.get_var("Qg").i1 + 1 + k)
+
+        irow = []
+        if generator.pcost_model == PW_LINEAR:
+            gpwl = [g for g in gn if g.pcost_model == PW_LINEAR]
+            j = gpwl.index(generator)
+            if "y" in names:
+                y1 = om.get_var("y").i1 + len(ix)
+                ycon1 = om.get_lin_constraint("ycon").i1
+            else:
+                y1 = om.var_N + len(ix)
+                ycon1 = om.lin_N
+            ix.append(y1 + j)
+
+            # Rows of the cost constraints for each segment of the generator.
+            i1 = int(ycon1) + sum([len(g.p_cost) - 1 for g in gpwl[:j]])
+            irow = range(i1, i1 + len(generator.p_cost) - 1)
+
+        ix, irow = array(ix, dtype=int), array(irow, dtype=int)
+
+        x0 = delete(x, ix)
+        lmbda0 = dict(lmbda)
+        for key in ["lower", "upper"]:
+            lmbda0[key] = delete(lmbda[key], ix)
+        for key in ["mu_l", "mu_u"]:
+            lmbda0[key] = delete(lmbda[key], irow)
+
+        return x0, lmbda0
+
+#------------------------------------------------------------------------------
+#  Candidate evaluation processes:
+#------------------------------------------------------------------------------
+
+# UDOPF instance holding the copy of the case in a worker process.
+_candidate_opf = None
+
+def _init_candidate_worker(udopf):
+    """ Initialises a process for evaluating candidate decommitments.
+    """
+    global _candidate_opf
+    _candidate_opf = udopf
+
+
+def _solve_candidate(args):
+    """ Evaluates a candidate decommitment in a worker process.
+    """
+    return _candidate_opf._solve_candidate(*args)
+
+#------------------------------------------------------------------------------
+#  "MultiPeriodOPF" class:
+#------------------------------------------------------------------------------
+
+class MultiPeriodOPF(OPF):
+    """ Solves DC optimal power flow over a sequence of periods, each with
+    its own bus demands, subject to limits on the change in output of each
+    generator between consecutive periods.
+
+    The variables and linear constraints of a single period are repeated in
+    a block-diagonal model, with sets named by period (e.g. "Pg0", "Pmis0"),
+    and the problem is solved in a single call to the QP or LP routine of
+    the solver.
+    """
+
+    def __init__(self, case, demand, ramp_up=None, ramp_down=None,
+                 ignore_ang_lim=True, opt=None):
+        """ Initialises a new MultiPeriodOPF instance.
+        """
+        super(MultiPeriodOPF, self).__init__(case, True, ignore_ang_lim, opt)
+
+        #: Active power demand (MW) at each bus (columns) in each period
+        #: (rows).
+        self.demand = demand
+
+        #: Maximum increase in the output (MW) of each generator between
+        #: consecutive periods.  Output changes are not limited if None.
+        self.ramp_up = ramp_up
+
+        #: Maximum decrease in the output (MW) of each generator between
+        #: consecutive periods.  Equal to the maximum increase if None.
+        self.ramp_down = ramp_down
+
+
+    def solve(self, solver_klass=DCOPFSolver):
+        """ Solves the multi-period OPF and returns a results dictionary with
+        the on-line generator outputs (MW), connected bus voltage angles
+        (degrees) and nodal prices ($/MWh), the on-line branch flow limit
+        multipliers and the ramp limit multipliers in each period.  The
+        solver class (e.g. L{DCOPFSolver} or L{highs.HiGHSSolver}) determines
+        the objective function of each period and the routine used to solve
+        the problem.  The results of
+        the last period are set on the case.
+        """
+        t0 = time()
+
+        case = self.case
+        base_mva = case.base_mva
+        demand = atleast_2d(self.demand)
+        nt = demand.shape[0]
+
+        # Model, objective function and initial point of a single period.
+        om = self._construct_opf_model(case)
+        bs, ln, gn = om._components
+        solver = solver_klass(om, opt=self.opt)
+
+        ipol, ipwl, _, _, nw, ny, nxyz = solver._dimension_data(bs, ln, gn)
+        HH, CC, C0 = solver._objective(gn, ipol, ipwl, nw, ny, nxyz, base_mva)
+        _, xmin, xmax = solver._var_bounds()
+        x0 = solver._initial_interior_point(bs, gn, xmin, xmax, ny)
+
+        mom = self._multi_period_model(om, demand)
+        AA, ll, uu = mom.linear_constraints()
+
+        s = solver._run_opf(block_diag([HH] * nt, "csr"), tile(CC, nt), AA,
+                            ll, uu, tile(xmin, nt), tile(xmax, nt),
+                            tile(x0, nt), self.opt)
+        s["f"] = s["f"] + nt * C0
+
+        # Set the results of each period on the case in turn.
+        x, lmbda = s["x"], s["lmbda"]
+        nx, nA = om.var_N, om.lin_N
+        Va_v, Pg_v = om.get_var("Va"), om.get_var("Pg")
+        Va, p_lmbda = zeros((nt, len(bs))), zeros((nt, len(bs)))
+        Pg = zeros((nt, len(gn)))
+        mu_s_from, mu_s_to = zeros((nt, len(ln))), zeros((nt, len(ln)))
+        for t in range(nt):
+            xt = x[t * nx:(t + 1) * nx]
+            lmbda_t = {"mu_l": lmbda["mu_l"][t * nA:(t + 1) * nA],
+                       "mu_u": lmbda["mu_u"][t * nA:(t + 1) * nA],
+                       "lower": lmbda["lower"][t * nx:(t + 1) * nx],
+                       "upper": lmbda["upper"][t * nx:(t + 1) * nx]}
+
+            solver._update_case(bs, ln, gn, base_mva, om._Bf, om._Pfinj,
+                                xt[Va_v.i1:Va_v.iN + 1],
+                                xt[Pg_v.i1:Pg_v.iN + 1], lmbda_t)
+
+            Va[t, :] = [b.v_angle for b in bs]
+            p_lmbda[t, :] = [b.p_lmbda for b in bs]
+            Pg[t, :] = [g.p for g in gn]
+            mu_s_from[t, :] = [l.mu_s_from for l in ln]
+            mu_s_to[t, :] = [l.mu_s_to for l in ln]
+
+        # Multipliers on the ramp limits between each pair of periods.
+        mu_ramp_up = zeros((nt - 1, len(gn)))
+        mu_ramp_down = zeros((nt - 1, len(gn)))
+        for t in range(1, nt):
+            if "ramp%d" % t in [c.name for c in mom.lin_constraints]:
+                ramp = mom.get_lin_constraint("ramp%d" % t)
+                mu_ramp_up[t - 1, :] = \
+                    lmbda["mu_u"][ramp.i1:ramp.iN + 1] / base_mva
+                mu_ramp_down[t - 1, :] = \
+                    lmbda["mu_l"][ramp.i1:ramp.iN + 1] / base_mva
+
+        s["Pg"] = Pg
+        s["Va"] = Va
+        s["p_lmbda"] = p_lmbda
+        s["mu_s_from"] = mu_s_from
+        s["mu_s_to"] = mu_s_to
+        s["mu_ramp_up"] = mu_ramp_up
+        s["mu_ramp_down"] = mu_ramp_down
+
+        s["elapsed"] = time() - t0
+
+        if self.opt.has_key("verbose") and self.opt["verbose"]:
+            logger.info("Multi-period OPF (%d periods) completed in %.3fs." %
+                        (nt, s["elapsed"]))
+
+        return s
+
+
+    def _multi_period_model(self, om, demand):
+        """ Returns a model with the variables and linear constraints of the
+        given single period model for each period and the ramp limits.
+        """
+        case = self.case
+        base_mva = case.base_mva
+        bs, _, gn = om._components
+        nt = demand.shape[0]
+
+        ib = array([case.buses.index(b) for b in bs])
+        ig = array([case.generators.index(g) for g in gn])
+
+        mom = OPFModel(case)
+        for t in range(nt):
+            mom.add_vars([Variable("%s%d" % (v.name, t), v.N, v.v0, v.vl, v.vu)
+                          for v in om.vars])
+
+        for t in range(nt):
+            bmis = self._power_mismatch_rhs(bs, om._Pbusinj, base_mva,
+                                            demand[t, ib])
+            for con in om.lin_constraints:
+                l, u = (bmis, bmis) if con.name == "Pmis" else (con.l, con.u)
+                mom.add_constraint(LinearConstraint("%s%d" % (con.name, t),
+                    con.A, l, u, ["%s%d" % (vs, t) for vs in con.vs]))
+
+        if self.ramp_up is not None:
+            ng = len(gn)
+            ru = array(self.ramp_up, dtype=float64)[ig] / base_mva
+            if self.ramp_down is None:
+                rd = ru
+            else:
+                rd = array(self.ramp_down, dtype=float64)[ig] / base_mva
+
+            Ar = hstack([-speye(ng, ng), speye(ng, ng)], "csr")
+            for t in range(1, nt):
+                mom.add_constraint(LinearConstraint("ramp%d" % t, Ar, -rd, ru,
+                                                ["Pg%d" % (t - 1), "Pg%d" % t]))
+
+        return mom
+
+#------------------------------------------------------------------------------
+#  "ParametricOPF" class:
+#------------------------------------------------------------------------------
+
+class ParametricOPF(OPF):
+    """ Solves DC optimal power flow along a path of values of a parameter:
+    either a factor by which the demand at every bus is scaled (L{LOAD}) or
+    the offer price, in $/MWh, of a single generator (L{PRICE}).
+
+    The parameter enters the QP or LP linearly, through the right hand side
+    of the power balance constraints or the linear cost coefficients, so the
+    solution is affine in the parameter while the set of binding
+    constraints is unchanged.  The OPF model is built once.  At each step
+    the optimality conditions of the active set of the previous solution
+    are solved using a retained factorisation and the solution is accepted
+    if it is feasible and the multipliers have the correct sign.  The
+    interior point solver is only called, warm-started from the previous
+    point, where the active set changes.
+    """
+
+    def __init__(self, case, path, parameter=LOAD, generator=None,
+                 ignore_ang_lim=True, opt=None):
+        """ Initialises a new ParametricOPF instance.
+        """
+        # The model is retained and its constraint bounds updated along a
+        # load path.
+        super(ParametricOPF, self).__init__(case, True, ignore_ang_lim, opt,
+                                            persistent=True)
+
+        #: Sequence of parameter values.
+        self.path = path
+
+        #: Parameter varied along the path, LOAD or PRICE.
+        self.parameter = parameter
+
+        #: Generator with a polynomial cost function whose offer price, the
+        #: linear cost coefficient, is set to each value of a PRICE path.
+        self.generator = generator
+
+        #: Tolerance, relative to the largest multiplier, above which a
+        #: constraint is considered binding.
+        self.active_tol = 1e-6
+
+        #: Tolerance on constraint violations (p.u.) and multiplier signs
+        #: when testing the solution of an active set.
+        self.feas_tol = 1e-6
+
+        # Generator costs or bus demands of the base case.
+        self._base = None
+
+
+    def solve(self, solver_klass=DCOPFSolver):
+        """ Solves the OPF at each point on the path and returns a results
+        dictionary with the objective function value, the on-line generator
+        outputs (MW), connected bus voltage angles (degrees) and nodal
+        prices ($/MWh) and the on-line branch flow limit multipliers at
+        each point (rows).  The "resolved" array flags the points at which
+        the interior point solver was called and "breakpoints" are the
+        estimated parameter values at which the active set changes.  The
+        demands or generator costs are restored after the sweep and the
+        results of the last point are set on the case.
+        """
+        t0 = time()
+
+        case = self.case
+        path = asarray(self.path, dtype=float64)
+        n = len(path)
+
+        if self.parameter == PRICE:
+            g = self.generator
+            if (g is None) or (g.pcost_model != POLYNOMIAL):
+                logger.error("A generator with polynomial costs is required "
+                             "for a price path.")
+                return {"converged": False}
+            self._base = g.p_cost
+        elif self.parameter == LOAD:
+            self._base = [b.p_demand for b in case.buses]
+        else:
+            logger.error("Invalid parameter [%s]." % self.parameter)
+            return {"converged": False}
+
+        try:
+            result = self._sweep(path, solver_klass)
+        finally:
+            # Restore the base case.
+            if self.parameter == PRICE:
+                self.generator.p_cost = self._base
+            else:
+                for b, p in zip(case.buses, self._base):
+                    b.p_demand = p
+            self._base = None
+
+        result["elapsed"] = time() - t0
+
+        if self.opt.has_key("verbose") and self.opt["verbose"]:
+            logger.info("Parametric OPF (%d points, %d solved) completed in "
+                        "%.3fs." % (n, result["resolved"].sum(),
+                                    result["elapsed"]))
+
+        return result
+
+
+    def _sweep(self, path, solver_klass):
+        """ Solves the OPF at each point on the path with the parameter set
+        on the case and returns a results dictionary.
+        """
+        case = self.case
+        base_mva = case.base_mva
+        n = len(path)
+
+        self._set_parameter(path[0])
+        om = self._construct_opf_model(case)
+        bs, ln, gn = om._components
+        solver = solver_klass(om, opt=self.opt)
+
+        ipol, ipwl, _, _, nw, ny, nxyz = solver._dimension_data(bs, ln, gn)
+        _, xmin, xmax = solver._var_bounds()
+        x0 = solver._initial_interior_point(bs, gn, xmin, xmax, ny)
+
+        f = zeros(n)
+        Va, p_lmbda = zeros((n, len(bs))), zeros((n, len(bs)))
+        Pg = zeros((n, len(gn)))
+        mu_s_from, mu_s_to = zeros((n, len(ln))), zeros((n, len(ln)))
+        resolved = zeros(n, dtype=bool)
+        breakpoints = []
+        converged = True
+
+        s, active, g0 = None, None, None
+        for k, t in enumerate(path):
+            self._set_parameter(t)
+            if self.parameter == LOAD:
+                self.update_constraint_bounds()
+
+            AA, ll, uu = solver._linear_constraints(om)
+            HH, CC, C0 = solver._objective(gn, ipol, ipwl, nw, ny, nxyz,
+                                           base_mva)
+
+            sk = None
+            if active is not None:
+                sk, g1 = active.solve(CC, ll, uu, xmin, xmax)
+                if sk is None:
+                    # The active set changes between the last point and this.
+                    alpha = active.step(g0, g1)
+                    breakpoints.append(path[k - 1] + alpha * (t - path[k - 1]))
+                else:
+                    g0 = g1
+
+            if sk is None:
+                solver._lmbda0 = None if s is None else s["lmbda"]
+                sk = solver._run_opf(HH, CC, AA, ll, uu, xmin, xmax,
+                    x0 if s is None else s["x"], self.opt)
+                resolved[k] = True
+                converged = converged and sk["converged"]
+
+                active = _ActiveSet(HH, AA, ll, uu, xmin, xmax, sk["lmbda"],
+                                    self.active_tol, self.feas_tol)
+                sa, g0 = active.solve(CC, ll, uu, xmin, xmax)
+                if sa is None:
+                    # Degenerate or not identified, so solve the next point.
+                    active = None
+            s = sk
+
+            Vak, Pgk = solver._update_solution_data(s, HH, CC, C0)
+            solver._update_case(bs, ln, gn, base_mva, om._Bf, om._Pfinj,
+                                Vak, Pgk, s["lmbda"])
+
+            f[k] = s["f"]
+            Va[k, :] = [b.v_angle for b in bs]
+            p_lmbda[k, :] = [b.p_lmbda for b in bs]
+            Pg[k, :] = [g.p for g in gn]
+            mu_s_from[k, :] = [l.mu_s_from for l in ln]
+            mu_s_to[k, :] = [l.mu_s_to for l in ln]
+
+        return {"path": path, "f": f, "Pg": Pg, "Va": Va, "p_lmbda": p_lmbda,
+                "mu_s_from": mu_s_from, "mu_s_to": mu_s_to,
+                "resolved": resolved, "breakpoints": array(breakpoints),
+                "converged": converged}
+
+
+    def _set_parameter(self, t):
+        """ Sets the bus demands or the generator offer price of the case
+        for the given parameter value.
+        """
+        if self.parameter == PRICE:
+            p_cost = list(self._base)
+            p_cost[-2] = t
+            self.generator.p_cost = tuple(p_cost)
+        else:
+            for b, p in zip(self.case.buses, self._base):
+                b.p_demand = t * p
+
+#------------------------------------------------------------------------------
+#  "_ActiveSet" class:
+#------------------------------------------------------------------------------
+
+class _ActiveSet(object):
+    """ Defines the constraints binding at a solution of the QP or LP::
+
+        min 1/2 x'*H*x + c'*x
+        s.t. l <= A*x <= u
+             xmin <= x <= xmax
+
+    and solves the equality constrained problem in which the binding
+    constraints are enforced as equalities and the others are ignored, for
+    other values of c, l, u, xmin and xmax.  The KKT matrix is factorised
+    once.
+    """
+
+    def __init__(self, H, A, l, u, xmin, xmax, lmbda, active_tol=1e-6,
+                 feas_tol=1e-6):
+        """ Initialises a new _ActiveSet instance from the multipliers of a
+        solution.
+        """
+        mu_l, mu_u = lmbda["mu_l"], lmbda["mu_u"]
+        lower, upper = lmbda["lower"], lmbda["upper"]
+
+        tol = active_tol * max(1.0, absolute(concatenate(
+            [mu_l, mu_u, lower, upper])).max())
+
+        eq = (u - l) <= feas_tol
+        fixed = (xmax - xmin) <= feas_tol
+
+        self._ieq = flatnonzero(eq)
+        self._iu = flatnonzero(~eq & (mu_u > tol) & (mu_u >= mu_l))
+        self._il = flatnonzero(~eq & (mu_l > tol) & (mu_l > mu_u))
+        self._jeq = flatnonzero(fixed)
+        self._ju = flatnonzero(~fixed & (upper > tol) & (upper >= lower))
+        self._jl = flatnonzero(~fixed & (lower > tol) & (lower > upper))
+
+        self.H, self.A = H, A
+        self.feas_tol = feas_tol
+        nx = H.shape[0]
+
+        I = speye(nx, nx, format="csr")
+        Aw = vstack([A[self._ieq, :], A[self._iu, :], A[self._il, :],
+                     I[self._jeq, :], I[self._ju, :], I[self._jl, :]], "csr")
+        self._nw = Aw.shape[0]
+        K = vstack([hstack([H, Aw.T]),
+                    hstack([Aw, csr_matrix((self._nw, self._nw))])], "csc")
+        self._K = K
+        try:
+            self._lu = splu(K)
+        except RuntimeError:
+            # The active set does not define a unique solution.
+            self._lu = None
+
+
+    def solve(self, c, l, u, xmin, xmax):
+        """ Returns a solution dictionary for the active set and the vector
+        of constraint margins and multiplier signs, which are non-negative
+        if the solution is optimal.  The solution is None if it is not
+        optimal and both are None if the active set does not define a
+        unique solution.
+        """
+        if self._lu is None:
+            return None, None
+        A, H = self.A, self.H
+        nx = H.shape[0]
+        ieq, iu, il = self._ieq, self._iu, self._il
+        jeq, ju, jl = self._jeq, self._ju, self._jl
+
+        rhs = r_[-c, u[ieq], u[iu], l[il], xmax[jeq], xmax[ju], xmin[jl]]
+        z = self._lu.solve(rhs)
+        if absolute(self._K * z - rhs).max() > \
+                self.feas_tol * max(1.0, absolute(rhs).max()):
+            return None, None
+        x, nu = z[:nx], z[nx:]
+
+        # Split the multipliers by constraint.
+        i1 = len(ieq)
+        i2 = i1 + len(iu)
+        i3 = i2 + len(il)
+        i4 = i3 + len(jeq)
+        i5 = i4 + len(ju)
+        nu_eq, nu_u, nu_l = nu[:i1], nu[i1:i2], -nu[i2:i3]
+        nu_xeq, nu_xu, nu_xl = nu[i3:i4], nu[i4:i5], -nu[i5:]
+
+        # Margins of the inactive constraints and signs of the multipliers,
+        # scaled to per-unit.
+        Ax = A * x
+        scale = max(1.0, absolute(nu).max())
+        g = concatenate([(u - Ax)[u < Inf], (Ax - l)[l > -Inf],
+                         (xmax - x)[xmax < Inf], (x - xmin)[xmin > -Inf],
+                         r_[nu_u, nu_l, nu_xu, nu_xl] / scale])
+
+        if g.min() < -self.feas_tol:
+            return None, g
+
+        nA = A.shape[0]
+        mu_l, mu_u = zeros(nA), zeros(nA)
+        lower, upper = zeros(nx), zeros(nx)
+        mu_u[ieq] = nu_eq.clip(0.0)
+        mu_l[ieq] = (-nu_eq).clip(0.0)
+        mu_u[iu] = nu_u.clip(0.0)
+        mu_l[il] = nu_l.clip(0.0)
+        upper[jeq] = nu_xeq.clip(0.0)
+        lower[jeq] = (-nu_xeq).clip(0.0)
+        upper[ju] = nu_xu.clip(0.0)
+        lower[jl] = nu_xl.clip(0.0)
+
+        f = 0.5 * dot(x, H * x) + dot(c, x)
+
+        return {"x": x, "f": f, "converged": True,
+                "lmbda": {"mu_l": mu_l, "mu_u": mu_u,
+                          "lower": lower, "upper": upper},
+                "output": {"iterations": 0,
+                           "message": "Active set unchanged."}}, g
+
+
+    def step(self, g0, g1):
+        """ Returns the fraction of the step from the point with margins
+        C{g0} to the point with margins C{g1}, along which the solution is
+        affine, at which the first margin becomes negative.
+        """
+        if g0 is None or g1 is None:
+            return 1.0
+        iv = flatnonzero(g1 < -self.feas_tol)
+        alpha = g0[iv] / (g0[iv] - g1[iv])
+        return float(alpha.clip(0.0, 1.0).min()) if len(iv) else 1.0
+
 #------------------------------------------------------------------------------
 #  "OPFModel" class:
 #------------------------------------------------------------------------------
@@ -722,6 +1797,13 @@ class OPFModel(object):
         #: User defined costs.
         self.costs = []
 
+        # Linear constraint coefficients for each set, expanded to all of
+        # the optimisation variables.
+        self._lin_blocks = {}
+
+        # Assembled linear constraint matrix.
+        self._lin_A = None
+
 
     @property
     def var_N(self):
@@ -739,6 +1821,10 @@ class OPFModel(object):
         var.iN = self.var_N + var.N - 1
         self.vars.append(var)
 
+        # Constraint coefficients must be expanded to the new variables.
+        self._lin_blocks = {}
+        self._lin_A = None
+
 
     def add_vars(self, vars):
         """ Adds a set of variables to the model.
@@ -747,6 +1833,38 @@ class OPFModel(object):
             self.add_var(var)
 
 
+    def set_var(self, var):
+        """ Replaces the variable set of the same name or adds the variable
+        set to the model.  The linear constraints are re-assembled only if
+        the number of variables in the set changes.
+        """
+        names = [v.name for v in self.vars]
+        if var.name not in names:
+            self.add_var(var)
+        else:
+            self.vars[names.index(var.name)] = var
+            self._index_vars()
+
+
+    def remove_var(self, name):
+        """ Removes the named variable set from the model.
+        """
+        self.vars.remove(self.get_var(name))
+        self._index_vars()
+
+
+    def update_var(self, name, v0=None, vl=None, vu=None):
+        """ Updates the initial values and bounds of the named variable set.
+        """
+        var = self.get_var(name)
+        if v0 is not None:
+            var.v0 = v0
+        if vl is not None:
+            var.vl = vl
+        if vu is not None:
+            var.vu = vu
+
+
     def get_var(self, name):
         """ Returns the variable set with the given name.
         """
@@ -780,42 +1898,103 @@ class OPFModel(object):
 
 
     def linear_constraints(self):
-        """ Returns the linear constraints.
+        """ Returns the linear constraints.  The coefficients of each set
+        are expanded to all of the optimisation variables once and only the
+        sets that have since changed are expanded again.
         """
         if self.lin_N == 0:
             return None, array([]), array([])
 
-        A = lil_matrix((self.lin_N, self.var_N), dtype=float64)
+        if self._lin_A is None:
+            blocks = [self._lin_block(lin) for lin in self.lin_constraints
+                      if lin.N]
+            self._lin_A = vstack(blocks, "csr")
+
         l = -Inf * ones(self.lin_N)
         u = -l
 
         for lin in self.lin_constraints:
-            if lin.N:                   # non-zero number of rows to add
-                Ak = lin.A              # A for kth linear constrain set
-                i1 = lin.i1             # starting row index
-                iN = lin.iN             # ending row index
-                vsl = lin.vs            # var set list
-                kN = -1                 # initialize last col of Ak used
-                Ai = lil_matrix((lin.N, self.var_N), dtype=float64)
-                for v in vsl:
-                    var = self.get_var(v)
-                    j1 = var.i1         # starting column in A
-                    jN = var.iN         # ending column in A
-                    k1 = kN + 1         # starting column in Ak
-                    kN = kN + var.N     # ending column in Ak
-
-                    if j1 == jN:
-                        # FIXME: Single column slicing broken in lil.
-                        for i in range(Ai.shape[0]):
-                            Ai[i, j1] = Ak[i, k1]
-                    else:
-                        Ai[:, j1:jN + 1] = Ak[:, k1:kN + 1]
+            if lin.N:
+                l[lin.i1:lin.iN + 1] = lin.l
+                u[lin.i1:lin.iN + 1] = lin.u
+
+        return self._lin_A, l, u
+
+
+    def _lin_block(self, lin):
+        """ Returns the coefficients of the given linear constraint set
+        with a column for each optimisation variable.
+        """
+        if not self._lin_blocks.has_key(lin.name):
+            # Column in A of each column of the constraint set.
+            cols = array([], dtype=int)
+            for v in lin.vs:
+                var = self.get_var(v)
+                cols = r_[cols, arange(var.i1, var.iN + 1)]
+
+            Ak = csr_matrix(lin.A).tocoo()
+            self._lin_blocks[lin.name] = csr_matrix((Ak.data,
+                (Ak.row, cols[Ak.col])), (lin.N, self.var_N))
 
-                A[i1:iN + 1, :] = Ai
-                l[i1:iN + 1] = lin.l
-                u[i1:iN + 1] = lin.u
+        return self._lin_blocks[lin.name]
 
-        return A.tocsr(), l, u
+
+    def set_constraint(self, con):
+        """ Replaces the linear constraint set of the same name or adds the
+        constraint set to the model.
+        """
+        names = [c.name for c in self.lin_constraints]
+        if con.name not in names:
+            self.add_constraint(con)
+        else:
+            self.lin_constraints[names.index(con.name)] = con
+            self._index_constraints()
+        self._lin_blocks.pop(con.name, None)
+        self._lin_A = None
+
+
+    def remove_constraint(self, name):
+        """ Removes the named linear constraint set from the model.
+        """
+        self.lin_constraints.remove(self.get_lin_constraint(name))
+        self._index_constraints()
+        self._lin_blocks.pop(name, None)
+        self._lin_A = None
+
+
+    def update_lin_constraint(self, name, l=None, u=None):
+        """ Updates the bounds of the named linear constraint set.
+        """
+        con = self.get_lin_constraint(name)
+        if l is not None:
+            con.l = l
+        if u is not None:
+            con.u = u
+
+
+    def _index_vars(self):
+        """ Updates the indexes of the variable sets.  Expanded constraint
+        coefficients are discarded if the columns have moved.
+        """
+        i1 = 0
+        for var in self.vars:
+            if (getattr(var, "i1", None) != i1) or \
+                (var.iN != i1 + var.N - 1):
+                self._lin_blocks = {}
+                self._lin_A = None
+            var.i1 = i1
+            var.iN = i1 + var.N - 1
+            i1 += var.N
+
+
+    def _index_constraints(self):
+        """ Updates the row indexes of the linear constraint sets.
+        """
+        i1 = 0
+        for con in self.lin_constraints:
+            con.i1 = i1
+            con.iN = i1 + con.N - 1
+            i1 += con.N
 
 
     def add_constraint(self, con):
@@ -838,6 +2017,7 @@ class OPFModel(object):
                     logger.error("Number of columns of A does not match number"
                         " of variables, A is %d x %d, nv = %d", N, M, nv)
                 self.lin_constraints.append(con)
+                self._lin_A = None
         elif isinstance(con, NonLinearConstraint):
             N = con.N
             if con.name in [c.name for c in self.nln_constraints]:
@@ -0,0 +1,364 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines a presolver for the quadratic and linear programs of DC OPF.
+
+Fixed variables are substituted out of the problem and constraint rows
+that are empty, unbounded, singletons, duplicates or implied by the
+variable bounds are removed before solving.  The solution of the reduced
+problem, including the Lagrange multipliers, is mapped back to the
+original problem afterwards.
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import logging
+
+from numpy import \
+    array, Inf, zeros, ones, arange, flatnonzero, where, maximum, \
+    absolute, asarray, isfinite, r_
+
+from scipy.sparse import csr_matrix, csc_matrix
+
+#------------------------------------------------------------------------------
+#  Logging:
+#------------------------------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+#------------------------------------------------------------------------------
+#  "Presolver" class:
+#------------------------------------------------------------------------------
+
+class Presolver(object):
+    """ Reduces problems of the form::
+
+            min 1/2 x'*H*x + C'*x
+             x
+
+    subject to::
+
+            l <= A*x <= u       (linear constraints)
+            xmin <= x <= xmax   (variable bounds)
+
+    and restores the solution of the reduced problem.  Limits with a
+    magnitude of 1e10 or more are treated as infinite.  Each pass of the
+    presolver:
+
+      - substitutes variables with equal lower and upper bounds,
+      - removes empty rows and rows without finite limits,
+      - replaces rows with a single non-zero by bounds on the variable,
+      - merges rows that are multiples of one another and
+      - removes limits that cannot be reached within the variable bounds.
+
+    Passes are made until no further reduction is possible.
+    """
+
+    def __init__(self, H, c, A, l, u, xmin, xmax, tol=1e-9, max_passes=5):
+        """ Initialises a new Presolver instance.
+        """
+        nx = len(c)
+
+        #: Problem data.
+        self.H = csr_matrix((nx, nx)) if H is None else csr_matrix(H)
+        self.c = asarray(c, float)
+        self.A = csr_matrix(A)
+        self.l = where(asarray(l, float) > -1e10, l, -Inf)
+        self.u = where(asarray(u, float) < 1e10, u, Inf)
+        self.xmin = where(asarray(xmin, float) > -1e10, xmin, -Inf)
+        self.xmax = where(asarray(xmax, float) < 1e10, xmax, Inf)
+
+        #: Tolerance used to identify fixed variables and duplicate rows.
+        self.tol = tol
+
+        #: Maximum number of reduction passes.
+        self.max_passes = max_passes
+
+        #: Constant term of the objective function from fixed variables.
+        self.f0 = 0.0
+
+        # Postsolve data for each pass.
+        self._passes = []
+
+    #--------------------------------------------------------------------------
+    #  Public interface:
+    #--------------------------------------------------------------------------
+
+    def presolve(self):
+        """ Returns the reduced problem data, (H, c, A, l, u, xmin, xmax).
+        """
+        H, c, A, l, u = self.H, self.c, self.A, self.l, self.u
+        xmin, xmax = self.xmin, self.xmax
+
+        nx, nA = len(c), A.shape[0]
+
+        for _ in range(self.max_passes):
+            p = _Pass(H, c, A, l, u, xmin, xmax, self.tol)
+            H, c, A, l, u, xmin, xmax = p.reduce()
+
+            if (len(p.icol) == len(p.c)) and (len(p.irow) == len(p.l)):
+                break
+            self._passes.append(p)
+            self.f0 += p.f0
+
+        logger.info("Presolve removed %d of %d variables and %d of %d "
+                    "constraints." % (nx - len(c), nx, nA - len(l), nA))
+
+        return H, c, A, l, u, xmin, xmax
+
+
+    def reduce_point(self, x):
+        """ Returns the reduced optimisation vector.
+        """
+        if x is None:
+            return None
+        for p in self._passes:
+            x = x[p.icol]
+        return x
+
+
+    def reduce_multipliers(self, lmbda):
+        """ Returns the multipliers of the reduced problem with which to
+        warm-start the solver.
+        """
+        if lmbda is None:
+            return None
+        def pad(v, n):
+            v = asarray(v, float)[:n]
+            return r_[v, zeros(n - len(v))]
+        lmbda = dict(lmbda)
+        for p in self._passes:
+            nx, nA = len(p.c), len(p.l)
+            lmbda["lower"] = pad(lmbda["lower"], nx)[p.icol]
+            lmbda["upper"] = pad(lmbda["upper"], nx)[p.icol]
+            lmbda["mu_l"] = pad(lmbda["mu_l"], nA)[p.irow]
+            lmbda["mu_u"] = pad(lmbda["mu_u"], nA)[p.irow]
+        return lmbda
+
+
+    def postsolve(self, solution):
+        """ Maps the solution dictionary of the reduced problem back to the
+        original problem.
+        """
+        x, lmbda = solution["x"], dict(solution["lmbda"])
+
+        for p in reversed(self._passes):
+            x, lmbda = p.restore(x, lmbda)
+
+        solution["x"] = x
+        solution["lmbda"] = lmbda
+        solution["f"] = solution["f"] + self.f0
+
+        return solution
+
+#------------------------------------------------------------------------------
+#  "_Pass" class:
+#------------------------------------------------------------------------------
+
+class _Pass(object):
+    """ Defines a single presolve pass.
+    """
+
+    def __init__(self, H, c, A, l, u, xmin, xmax, tol):
+        self.H, self.c, self.A, self.l, self.u = H, c, A, l, u
+        self.xmin, self.xmax = xmin, xmax
+        self.tol = tol
+
+        #: Indexes of the variables and constraints retained.
+        self.icol = arange(len(c))
+        self.irow = arange(len(l))
+
+        #: Indexes and values of the fixed variables.
+        self.ifix = array([], int)
+        self.xfix = array([])
+
+        #: Constant term of the objective function.
+        self.f0 = 0.0
+
+        # Rows providing the bounds on retained variables (-1 for none) and
+        # their coefficients.
+        self._src_lo = self._src_hi = None
+        # Rows providing the limits of retained rows and their scale.
+        self._src_l = self._src_u = None
+        self._scale_l = self._scale_u = None
+
+
+    def reduce(self):
+        """ Returns the reduced problem data.
+        """
+        H, c, A, l, u = self.H, self.c, self.A, self.l, self.u
+        xmin, xmax = self.xmin.copy(), self.xmax.copy()
+        tol = self.tol
+        nA = len(l)
+
+        # Substitute fixed variables.
+        bounded = isfinite(xmin) & isfinite(xmax)
+        fixed = zeros(len(c), bool)
+        fixed[bounded] = (xmax - xmin)[bounded] <= \
+            tol * maximum(1.0, absolute(xmin[bounded]))
+        self.ifix = flatnonzero(fixed)
+        self.icol = flatnonzero(~fixed)
+        self.xfix = xfix = xmin[self.ifix]
+
+        if len(self.ifix):
+            Afix = A[:, self.ifix] * xfix
+            l, u = l - Afix, u - Afix
+            Hrf = H[self.icol, :][:, self.ifix]
+            Hff = H[self.ifix, :][:, self.ifix]
+            self.f0 = 0.5 * xfix.dot(Hff * xfix) + c[self.ifix].dot(xfix)
+            c = c[self.icol] + Hrf * xfix
+            H = H[self.icol, :][:, self.icol]
+            A = A[:, self.icol]
+            xmin, xmax = xmin[self.icol], xmax[self.icol]
+
+        A = csr_matrix(A)
+        A.eliminate_zeros()
+        A.sort_indices()
+        nnz = A.indptr[1:] - A.indptr[:-1]
+
+        nx = len(c)
+        keep = ones(nA, bool)
+        src_lo, src_hi = -ones(nx, int), -ones(nx, int)
+        src_l, src_u = arange(nA), arange(nA)
+        scale_l, scale_u = ones(nA), ones(nA)
+        l, u = l.copy(), u.copy()
+
+        # Empty rows and rows without finite limits.
+        for i in flatnonzero(nnz == 0):
+            if (l[i] > tol) or (u[i] < -tol):
+                logger.warning("Presolve: infeasible empty constraint row.")
+        keep[nnz == 0] = False
+        keep[(l == -Inf) & (u == Inf)] = False
+
+        # Rows with a single non-zero are replaced by variable bounds.
+        for i in flatnonzero(keep & (nnz == 1)):
+            j = A.indices[A.indptr[i]]
+            a = A.data[A.indptr[i]]
+            lo, hi = (l[i] / a, u[i] / a) if a > 0 else (u[i] / a, l[i] / a)
+            if lo > xmin[j]:
+                xmin[j], src_lo[j] = lo, i
+            if hi < xmax[j]:
+                xmax[j], src_hi[j] = hi, i
+            if xmin[j] > xmax[j]:
+                if xmin[j] - xmax[j] > tol * maximum(1.0, abs(xmax[j])):
+                    logger.warning("Presolve: infeasible variable bounds.")
+                xmin[j] = xmax[j]
+            keep[i] = False
+
+        # Rows that are multiples of another are merged into that row.
+        groups = {}
+        for i in flatnonzero(keep):
+            idx = A.indices[A.indptr[i]:A.indptr[i + 1]]
+            val = A.data[A.indptr[i]:A.indptr[i + 1]]
+            s = val[0]
+            key = (tuple(idx), tuple((val / s / tol).round().astype(int)))
+            if not groups.has_key(key):
+                groups[key] = (i, s)
+                continue
+            k, sk = groups[key]
+            s = s / sk # row i = s * row k
+            lo, hi = (l[i] / s, u[i] / s) if s > 0 else (u[i] / s, l[i] / s)
+            if lo > l[k]:
+                l[k], src_l[k], scale_l[k] = lo, i, s
+            if hi < u[k]:
+                u[k], src_u[k], scale_u[k] = hi, i, s
+            keep[i] = False
+
+        # Limits that can not be reached within the variable bounds.
+        Apos = A.multiply(A > 0).tocsr()
+        Aneg = A.multiply(A < 0).tocsr()
+        Apos.eliminate_zeros()
+        Aneg.eliminate_zeros()
+        amin = Apos * xmin + Aneg * xmax
+        amax = Apos * xmax + Aneg * xmin
+        ineq = l != u
+        l[ineq & (amin >= l)] = -Inf
+        u[ineq & (amax <= u)] = Inf
+        keep[(l == -Inf) & (u == Inf)] = False
+
+        self.irow = flatnonzero(keep)
+        self._src_lo, self._src_hi = src_lo, src_hi
+        self._src_l, self._src_u = src_l, src_u
+        self._scale_l, self._scale_u = scale_l, scale_u
+        self._A = A
+
+        return H, c, A[self.irow, :], l[self.irow], u[self.irow], xmin, xmax
+
+
+    def restore(self, x, lmbda):
+        """ Returns the optimisation vector and the multipliers for the
+        problem prior to this pass.
+        """
+        nA, nx = len(self.l), len(self.c)
+        A = self._A
+
+        mu_l, mu_u = zeros(nA), zeros(nA)
+        lower = asarray(lmbda["lower"], float).copy()
+        upper = asarray(lmbda["upper"], float).copy()
+
+        # Multipliers of merged rows go to the rows providing the limits.
+        for k, mul, muu in zip(self.irow, lmbda["mu_l"], lmbda["mu_u"]):
+            i, s = self._src_l[k], self._scale_l[k]
+            if s > 0:
+                mu_l[i] += mul / s
+            else:
+                mu_u[i] += mul / -s
+            i, s = self._src_u[k], self._scale_u[k]
+            if s > 0:
+                mu_u[i] += muu / s
+            else:
+                mu_l[i] += muu / -s
+
+        # Multipliers of bounds from singleton rows go to the rows.
+        for j in flatnonzero(self._src_lo >= 0):
+            i = self._src_lo[j]
+            a = A.data[A.indptr[i]]
+            if a > 0:
+                mu_l[i] += lower[j] / a
+            else:
+                mu_u[i] += lower[j] / -a
+            lower[j] = 0.0
+        for j in flatnonzero(self._src_hi >= 0):
+            i = self._src_hi[j]
+            a = A.data[A.indptr[i]]
+            if a > 0:
+                mu_u[i] += upper[j] / a
+            else:
+                mu_l[i] += upper[j] / -a
+            upper[j] = 0.0
+
+        # Fixed variables and the multipliers of their bounds.
+        xx = zeros(nx)
+        xx[self.icol] = x
+        xx[self.ifix] = self.xfix
+
+        ll, uu = zeros(nx), zeros(nx)
+        ll[self.icol], uu[self.icol] = lower, upper
+        if len(self.ifix):
+            Af = csc_matrix(self.A)[:, self.ifix]
+            g = (self.H[self.ifix, :] * xx + self.c[self.ifix] +
+                 Af.T * (mu_u - mu_l))
+            ll[self.ifix] = maximum(g, 0.0)
+            uu[self.ifix] = maximum(-g, 0.0)
+
+        lmbda = dict(lmbda)
+        lmbda.update({"mu_l": mu_l, "mu_u": mu_u, "lower": ll, "upper": uu})
+
+        return xx, lmbda
+
+# EOF -------------------------------------------------------------------------
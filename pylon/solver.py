@@ -35,9 +35,10 @@ from scipy.sparse import lil_matrix, csr_matrix, hstack, vstack
 
 from case import REFERENCE
 from generator import POLYNOMIAL, PW_LINEAR
+from presolve import Presolver
 
 #from pdipm import pdipm, pdipm_qp
-from pips import pips, qps_pips
+from pips import pips, qpips
 
 #------------------------------------------------------------------------------
 #  Constants:
@@ -68,6 +69,21 @@ class _Solver(object):
         #: Number of equality constraints.
         self._nieq = 0
 
+        #: Optional starting value of the optimisation vector, typically
+        #: that of a previous solution.
+        self.x0 = None
+
+        #: Optional multipliers of a previous solution with which to
+        #: warm-start the solver from C{x0} (See pips.py for details).
+        self.lmbda0 = None
+
+        # Multipliers used, if those given match the problem dimension.
+        self._lmbda0 = None
+
+        #: Remove fixed variables and redundant constraints before solving
+        #: linear and quadratic programs (See presolve.py for details).
+        self.presolve = False
+
 
     def solve(self):
         """ Solves optimal power flow and returns a results dict.
@@ -164,15 +180,31 @@ class _Solver(object):
         return x0, xmin, xmax
 
 
+    def _warm_start_point(self, x0):
+        """ Returns the starting point and multipliers for the solver.  The
+        given interior point is used unless a previous solution for a
+        problem of the same dimension has been supplied.
+        """
+        if self.x0 is not None and len(self.x0) == len(x0):
+            lmbda0 = self.lmbda0
+            if lmbda0 is not None and len(lmbda0["lower"]) != len(x0):
+                lmbda0 = None
+            return self.x0, lmbda0
+        else:
+            return x0, None
+
+
     def _initial_interior_point(self, buses, generators, xmin, xmax, ny):
         """ Selects an interior initial point for interior point solver.
         """
-        Va = self.om.get_var("Va")
-        va_refs = [b.v_angle * pi / 180.0 for b in buses
-                   if b.type == REFERENCE]
         x0 = (xmin + xmax) / 2.0
 
-        x0[Va.i1:Va.iN + 1] = va_refs[0] # Angles set to first reference angle.
+        if "Va" in [v.name for v in self.om.vars]:
+            Va = self.om.get_var("Va")
+            va_refs = [b.v_angle * pi / 180.0 for b in buses
+                       if b.type == REFERENCE]
+            # Angles set to first reference angle.
+            x0[Va.i1:Va.iN + 1] = va_refs[0]
 
         if ny > 0:
             yvar = self.om.get_var("y")
@@ -227,26 +259,20 @@ class DCOPFSolver(_Solver):
         ipol, ipwl, nb, nl, nw, ny, nxyz = self._dimension_data(bs, ln, gn)
         # Split the constraints in equality and inequality.
         AA, ll, uu = self._linear_constraints(self.om)
-        # Piece-wise linear components of the objective function.
-        Npwl, Hpwl, Cpwl, fparm_pwl, any_pwl = self._pwl_costs(ny, nxyz, ipwl)
-        # Quadratic components of the objective function.
-        Npol, Hpol, Cpol, fparm_pol, polycf, npol = \
-            self._quadratic_costs(gn, ipol, nxyz, base_mva)
-        # Combine pwl, poly and user costs.
-        NN, HHw, CCw, ffparm = \
-            self._combine_costs(Npwl, Hpwl, Cpwl, fparm_pwl, any_pwl,
-                                Npol, Hpol, Cpol, fparm_pol, npol, nw)
-        # Transform quadratic coefficients for w into coefficients for X.
-        HH, CC, C0 = self._transform_coefficients(NN, HHw, CCw, ffparm, polycf,
-                                                  any_pwl, npol, nw)
+        # Quadratic and linear coefficients of the objective function.
+        HH, CC, C0 = self._objective(gn, ipol, ipwl, nw, ny, nxyz, base_mva)
         # Bounds on the optimisation variables.
         _, xmin, xmax = self._var_bounds()
 
         # Select an interior initial point for interior point solver.
         x0 = self._initial_interior_point(bs, gn, xmin, xmax, ny)
+        x0, self._lmbda0 = self._warm_start_point(x0)
 
         # Call the quadratic/linear solver.
-        s = self._run_opf(HH, CC, AA, ll, uu, xmin, xmax, x0, self.opt)
+        if self.presolve:
+            s = self._run_presolved(HH, CC, AA, ll, uu, xmin, xmax, x0)
+        else:
+            s = self._run_opf(HH, CC, AA, ll, uu, xmin, xmax, x0, self.opt)
 
         # Compute the objective function value.
         Va, Pg = self._update_solution_data(s, HH, CC, C0)
@@ -257,6 +283,52 @@ class DCOPFSolver(_Solver):
         return s
 
 
+    def write_qps(self, file_or_filename, name=None):
+        """ Writes the quadratic program that is solved for DC optimal power
+        flow to file in QPS format (See io/qps.py for details).  Variables
+        and constraints are named after their sets in the OPF model.
+        """
+        from pylon.io.qps import QPSWriter
+
+        base_mva = self.om.case.base_mva
+        bs, ln, gn, _ = self._unpack_model(self.om)
+        ipol, ipwl, nb, nl, nw, ny, nxyz = self._dimension_data(bs, ln, gn)
+        AA, ll, uu = self._linear_constraints(self.om)
+        HH, CC, C0 = self._objective(gn, ipol, ipwl, nw, ny, nxyz, base_mva)
+        _, xmin, xmax = self._var_bounds()
+
+        col_names = ["%s_%d" % (var.name, i) for var in self.om.vars
+                     for i in range(var.N)]
+        row_names = ["%s_%d" % (lin.name, i) for lin in self.om.lin_constraints
+                     for i in range(lin.N)]
+
+        if name is None:
+            name = self.om.case.name
+
+        writer = QPSWriter(HH, CC, AA, ll, uu, xmin, xmax, C0, name,
+                           row_names, col_names)
+
+        return writer.write(file_or_filename)
+
+
+    def _objective(self, gn, ipol, ipwl, nw, ny, nxyz, base_mva):
+        """ Returns the quadratic and linear coefficients and the constant
+        term of the objective function.
+        """
+        # Piece-wise linear components of the objective function.
+        Npwl, Hpwl, Cpwl, fparm_pwl, any_pwl = self._pwl_costs(ny, nxyz, ipwl)
+        # Quadratic components of the objective function.
+        Npol, Hpol, Cpol, fparm_pol, polycf, npol = \
+            self._quadratic_costs(gn, ipol, nxyz, base_mva)
+        # Combine pwl, poly and user costs.
+        NN, HHw, CCw, ffparm = \
+            self._combine_costs(Npwl, Hpwl, Cpwl, fparm_pwl, any_pwl,
+                                Npol, Hpol, Cpol, fparm_pol, npol, nw)
+        # Transform quadratic coefficients for w into coefficients for X.
+        return self._transform_coefficients(NN, HHw, CCw, ffparm, polycf,
+                                            any_pwl, npol, nw)
+
+
     def _pwl_costs(self, ny, nxyz, ipwl):
         """ Returns the piece-wise linear components of the objective function.
         """
@@ -264,7 +336,8 @@ class DCOPFSolver(_Solver):
         if any_pwl:
             y = self.om.get_var("y")
             # Sum of y vars.
-            Npwl = csr_matrix((ones(ny), (zeros(ny), array(ipwl) + y.i1)))
+            Npwl = csr_matrix((ones(ny), (zeros(ny, int),
+                                          range(y.i1, y.iN + 1))), (1, nxyz))
             Hpwl = csr_matrix((1, 1))
             Cpwl = array([1])
             fparm_pwl = array([[1., 0., 0., 1.]])
@@ -360,13 +433,29 @@ class DCOPFSolver(_Solver):
         N = self._nieq
 
         if HH.nnz > 0:
-            solution = qps_pips(HH, CC, AA, ll, uu, xmin, xmax, x0, opt)
+            solution = qpips(HH, CC, AA, ll, uu, xmin, xmax, x0, opt,
+                             self._lmbda0)
         else:
-            solution = qps_pips(None, CC, AA, ll, uu, xmin, xmax, x0, opt)
+            solution = qpips(None, CC, AA, ll, uu, xmin, xmax, x0, opt,
+                             self._lmbda0)
 
         return solution
 
 
+    def _run_presolved(self, HH, CC, AA, ll, uu, xmin, xmax, x0):
+        """ Solves the reduced problem from the presolver and maps the
+        solution back to the original problem.
+        """
+        ps = Presolver(HH, CC, AA, ll, uu, xmin, xmax)
+        HH, CC, AA, ll, uu, xmin, xmax = ps.presolve()
+        x0 = ps.reduce_point(x0)
+        self._lmbda0 = ps.reduce_multipliers(self._lmbda0)
+
+        s = self._run_opf(HH, CC, AA, ll, uu, xmin, xmax, x0, self.opt)
+
+        return ps.postsolve(s)
+
+
     def _update_solution_data(self, s, HH, CC, C0):
         """ Returns the voltage angle and generator set-point vectors.
         """
@@ -418,6 +507,79 @@ class DCOPFSolver(_Solver):
             generator.mu_pmin = lower[Pg_v.i1:Pg_v.iN + 1][k] / base_mva
             generator.mu_pmax = upper[Pg_v.i1:Pg_v.iN + 1][k] / base_mva
 
+#------------------------------------------------------------------------------
+#  "PTDFSolver" class:
+#------------------------------------------------------------------------------
+
+class PTDFSolver(DCOPFSolver):
+    """ Defines a solver for the compact DC optimal power flow formulation
+    in which the bus voltage angles are eliminated using the power transfer
+    distribution factors.  The optimisation variables are the generator
+    set-points and the constraints are the system power balance and the
+    flow limits of the monitored branches.
+    """
+
+    def _update_solution_data(self, s, HH, CC, C0):
+        """ Returns the voltage angle and generator set-point vectors.  The
+        angles are found from the bus power injections.
+        """
+        om = self.om
+        Pg_v = om.get_var("Pg")
+        Pg = s["x"][Pg_v.i1:Pg_v.iN + 1]
+
+        Pbus = om._Cg * Pg + om._bmis
+        Va = om._Va_ref * ones(len(Pbus))
+        _, lu, noslack = om._factors
+        Va[noslack] += lu.solve(Pbus[noslack])
+
+        s["f"] = s["f"] + C0
+
+        return Va, Pg
+
+
+    def _update_case(self, bs, ln, gn, base_mva, Bf, Pfinj, Va, Pg, lmbda):
+        """ Calculates the result attribute values.  The price at each bus
+        is the price of the power balance constraint less the flow limit
+        prices weighted by the transfer distribution factors.
+        """
+        Pbal = self.om.get_lin_constraint("Pbal")
+        Pf = self.om.get_lin_constraint("Pf")
+        Pg_v = self.om.get_var("Pg")
+        ia = self.om._ia
+
+        mu_l = lmbda["mu_l"]
+        mu_u = lmbda["mu_u"]
+        lower = lmbda["lower"]
+        upper = lmbda["upper"]
+
+        lam = mu_u[Pbal.i1] - mu_l[Pbal.i1]
+        mu_f = mu_u[Pf.i1:Pf.iN + 1]
+        mu_t = mu_l[Pf.i1:Pf.iN + 1]
+        p_lmbda = lam - self.om._Hf.T.dot(mu_f - mu_t)
+
+        for i, bus in enumerate(bs):
+            bus.v_angle = Va[i] * 180.0 / pi
+            bus.p_lmbda = p_lmbda[i] / base_mva
+
+        mu_s_from = zeros(len(ln))
+        mu_s_to = zeros(len(ln))
+        mu_s_from[ia] = mu_f
+        mu_s_to[ia] = mu_t
+        F = Bf * Va + Pfinj
+
+        for l, branch in enumerate(ln):
+            branch.p_from = F[l] * base_mva
+            branch.p_to = -branch.p_from
+
+            branch.mu_s_from = mu_s_from[l] / base_mva
+            branch.mu_s_to = mu_s_to[l] / base_mva
+
+        for k, generator in enumerate(gn):
+            generator.p = Pg[k] * base_mva
+
+            generator.mu_pmin = lower[Pg_v.i1:Pg_v.iN + 1][k] / base_mva
+            generator.mu_pmax = upper[Pg_v.i1:Pg_v.iN + 1][k] / base_mva
+
 #------------------------------------------------------------------------------
 #  "PIPSSolver" class:
 #------------------------------------------------------------------------------
@@ -479,9 +641,14 @@ class PIPSSolver(_Solver):
 
         # Select an interior initial point for interior point solver.
         x0 = self._initial_interior_point(self._bs, self._gn, xmin, xmax, self._ny)
+        x0, self._lmbda0 = self._warm_start_point(x0)
 
-        # Build admittance matrices.
-        self._Ybus, self._Yf, self._Yt = case.Y
+        # Admittance matrices, built with the model if not by the caller.
+        if hasattr(self.om, "_Ybus"):
+            self._Ybus, self._Yf, self._Yt = \
+                self.om._Ybus, self.om._Yf, self.om._Yt
+        else:
+            self._Ybus, self._Yf, self._Yt = case.Y
 
         # Optimisation variables.
 
@@ -508,7 +675,7 @@ class PIPSSolver(_Solver):
         """ Solves using Python Interior Point Solver (PIPS).
         """
         s = pips(self._costfcn, x0, A, l, u, xmin, xmax,
-                 self._consfcn, self._hessfcn, self.opt)
+                 self._consfcn, self._hessfcn, self.opt, self._lmbda0)
         return s
 
 
@@ -0,0 +1,129 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines a test case for OPF decomposed by area.
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import unittest
+
+from os.path import join, dirname
+from multiprocessing import active_children
+
+from numpy import array
+
+from pylon import Case, OPF, ADMMOPF
+from pylon.admm import _Area
+from pylon.util import mfeq1
+
+#------------------------------------------------------------------------------
+#  Constants:
+#------------------------------------------------------------------------------
+
+DATA_DIR = join(dirname(__file__), "data")
+
+#------------------------------------------------------------------------------
+#  "ADMMOPFTest" class:
+#------------------------------------------------------------------------------
+
+class ADMMOPFTest(unittest.TestCase):
+    """ Defines a test case for OPF decomposed by area.
+    """
+
+    def _load(self):
+        """ Returns the case with the buses divided between two areas.
+        """
+        case = Case.load(join(DATA_DIR, "case6ww", "case6ww.pkl"))
+        for bus in case.buses[3:]:
+            bus.area = 2
+        return case
+
+
+    def _results(self, case):
+        """ Returns the generator outputs, bus angles and prices and branch
+        flows of the case.
+        """
+        return (array([g.p for g in case.generators]),
+                array([b.v_angle for b in case.buses]),
+                array([b.p_lmbda for b in case.buses]),
+                array([l.p_from for l in case.branches]))
+
+
+    def test_dc(self):
+        """ Test that the solution agrees with the monolithic DC OPF.
+        """
+        case = self._load()
+        admm = ADMMOPF(case, dc=True, processes=1)
+        admm.tol = 1e-6
+        solution = admm.solve(compare=True)
+
+        self.assertTrue(solution["converged"])
+        self.assertTrue(solution["primal_residual"][-1] < 1e-6)
+        self.assertTrue(solution["primal_residual"][0] > 1e-3)
+        self.assertEqual(len(solution["rho"]), solution["iterations"])
+        self.assertTrue(solution["monolithic"]["converged"])
+        self.assertAlmostEqual(solution["f"], solution["monolithic"]["f"],
+                               places=1)
+
+        expected = self._load()
+        OPF(expected, dc=True).solve()
+        for a, b in zip(self._results(case), self._results(expected)):
+            self.assertTrue(mfeq1(a, b, 0.05))
+
+
+    def test_processes(self):
+        """ Test that the areas solved in a pool of processes give the same
+        solution as those solved in turn.
+        """
+        case = self._load()
+        f = ADMMOPF(case, dc=True, processes=1).solve()["f"]
+        expected = self._results(case)
+
+        case = self._load()
+        solution = ADMMOPF(case, dc=True, processes=2).solve()
+
+        self.assertTrue(solution["converged"])
+        self.assertAlmostEqual(solution["f"], f, places=6)
+        for a, b in zip(self._results(case), expected):
+            self.assertTrue(mfeq1(a, b, 1e-6))
+        self.assertEqual(active_children(), [])
+
+
+    def test_process_error(self):
+        """ Test that an error in an area is raised and the processes are
+        stopped.
+        """
+        def fail(self, *args):
+            raise ValueError, "Area %s failed." % self.area
+
+        solve = _Area.solve
+        _Area.solve = fail
+        try:
+            admm = ADMMOPF(self._load(), dc=True, processes=2)
+            self.assertRaises(ValueError, admm.solve)
+        finally:
+            _Area.solve = solve
+
+        self.assertEqual(active_children(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# EOF -------------------------------------------------------------------------
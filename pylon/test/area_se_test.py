@@ -0,0 +1,172 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines a test case for state estimation decomposed by area.
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import os
+import unittest
+
+from multiprocessing import active_children
+
+from numpy import array, random
+
+from pylon import Case, StateEstimator, MultiAreaStateEstimator
+from pylon.area_se import _Area
+
+from pylon.test.se_test import measure, IEEE30_FILE
+
+#------------------------------------------------------------------------------
+#  "MultiAreaStateEstimatorTest" class:
+#------------------------------------------------------------------------------
+
+class MultiAreaStateEstimatorTest(unittest.TestCase):
+    """ Defines a test case for state estimation decomposed by area.
+    """
+
+    def _load(self):
+        """ Returns the IEEE 30 bus case with the buses divided between three
+        areas and noisy measurements.
+        """
+        case = Case.load(IEEE30_FILE)
+        for bus in case.buses[10:20]:
+            bus.area = 2
+        for bus in case.buses[20:]:
+            bus.area = 3
+
+        _, meas = measure(case)
+        noise = random.RandomState(1).randn(len(meas))
+        for m, e in zip(meas, noise):
+            m.value += 0.01 * e
+
+        return case, meas
+
+
+    def test_estimation(self):
+        """ Test that the estimate agrees with the centralized estimate.
+        """
+        sigma = array([0.02, 0.02, 0.02, 0.02, 0.015, 0.015, 0.01, 0.01])
+
+        case, meas = self._load()
+        expected = StateEstimator(case, meas, sigma, verbose=False).run()
+
+        case, meas = self._load()
+        se = MultiAreaStateEstimator(case, meas, sigma, verbose=False,
+                                     processes=1)
+        solution = se.run()
+
+        self.assertTrue(solution["converged"])
+        self.assertEqual(solution["iterations"], expected["iterations"])
+        self.assertTrue(abs(solution["V"] - expected["V"]).max() < 1e-10)
+        self.assertTrue(abs(solution["z_est"] - expected["z_est"]).max() <
+                        1e-10)
+        self.assertAlmostEqual(solution["error_sqrsum"],
+                               expected["error_sqrsum"], places=8)
+
+        self.assertEqual(len(solution["area_elapsed"]), 3)
+        self.assertTrue(solution["coordination_elapsed"] > 0.0)
+
+        # The Jacobian of each area spans the state of its buses and of the
+        # ends of its tie lines only.
+        for a in se._areas:
+            self.assertTrue(len(a.buses) < len(case.buses))
+            self.assertEqual(a.jac.H.shape[1], len(a.ia) + len(a.ib))
+            self.assertTrue(a.jac.H.shape[1] < 2 * len(se._nonref))
+
+
+    def test_processes(self):
+        """ Test that the areas solved in a pool of processes give the same
+        estimate as those solved in turn.
+        """
+        sigma = array([0.02, 0.02, 0.02, 0.02, 0.015, 0.015, 0.01, 0.01])
+
+        case, meas = self._load()
+        V = MultiAreaStateEstimator(case, meas, sigma, verbose=False,
+                                    processes=1).run()["V"]
+
+        case, meas = self._load()
+        se = MultiAreaStateEstimator(case, meas, sigma, verbose=False,
+                                     processes=2)
+        solution = se.run()
+
+        self.assertTrue(solution["converged"])
+        self.assertTrue(abs(solution["V"] - V).max() < 1e-12)
+
+        # The areas are held by the same processes when estimated again.
+        processes = active_children()
+        self.assertEqual(len(processes), 2)
+        solution = se.run()
+        self.assertTrue(abs(solution["V"] - V).max() < 1e-12)
+        self.assertEqual(active_children(), processes)
+
+        se.close()
+        self.assertEqual(active_children(), [])
+
+
+    def test_process_error(self):
+        """ Test that an error in an area is raised and the processes are
+        stopped.
+        """
+        def fail(self, V):
+            raise ValueError, "Area %s failed." % self.area
+
+        sigma = array([0.02, 0.02, 0.02, 0.02, 0.015, 0.015, 0.01, 0.01])
+
+        case, meas = self._load()
+        se = MultiAreaStateEstimator(case, meas, sigma, verbose=False,
+                                     processes=2)
+
+        solve = _Area.solve
+        _Area.solve = fail
+        try:
+            self.assertRaises(ValueError, se.run)
+        finally:
+            _Area.solve = solve
+
+        self.assertEqual(active_children(), [])
+
+
+    def test_process_exit(self):
+        """ Test that the exit of a process holding an area is raised and
+        the other processes are stopped.
+        """
+        def exit(self, V):
+            os._exit(1)
+
+        sigma = array([0.02, 0.02, 0.02, 0.02, 0.015, 0.015, 0.01, 0.01])
+
+        case, meas = self._load()
+        se = MultiAreaStateEstimator(case, meas, sigma, verbose=False,
+                                     processes=2)
+
+        solve = _Area.solve
+        _Area.solve = exit
+        try:
+            self.assertRaises(RuntimeError, se.run)
+        finally:
+            _Area.solve = solve
+
+        self.assertEqual(active_children(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# EOF -------------------------------------------------------------------------
@@ -25,12 +25,13 @@ import os
 from os.path import join, dirname, exists, getsize
 import unittest
 import tempfile
-from numpy import complex128
+from numpy import complex128, zeros, isnan, arange, linspace, delete
+from numpy.linalg import solve
 
 from scipy import alltrue
 from scipy.io.mmio import mmread
 
-from pylon import Case, Bus, Branch, Generator, NewtonPF, XB, BX
+from pylon import Case, Bus, Branch, Generator, NewtonPF, XB, BX, REFERENCE
 from pylon.io import PickleReader
 from pylon.util import CaseReport, mfeq2
 
@@ -150,6 +151,73 @@ class CaseMatrixTest(unittest.TestCase):
         self.assertTrue(mfeq2(dSbus_dVa, mp_dSbus_dVa.tocsr(), 1e-12),
                         self.case_name)
 
+
+    def test_PTDF(self):
+        """ Test transfer distribution factors against DC power flow.
+        """
+        self.case.index_buses()
+        B, Bf, _, _ = self.case.Bdc
+        nb = B.shape[0]
+
+        P = linspace(-1.0, 1.0, nb)
+        Va = self._dc_angles(B, P)
+
+        PTDF = self.case.makePTDF()
+
+        self.assertTrue(abs(Bf * Va - PTDF.dot(P)).max() < 1e-10,
+                        self.case_name)
+
+
+    def test_LODF(self):
+        """ Test line outage distribution factors against the DC power flow
+        of each network with a branch removed.
+        """
+        self.case.index_buses()
+        buses = self.case.connected_buses
+        branches = self.case.online_branches
+        B, Bf, _, _ = self.case.Bdc
+        nl = len(branches)
+
+        P = linspace(-1.0, 1.0, B.shape[0])
+        F = Bf * self._dc_angles(B, P)
+
+        LODF = self.case.makeLODF()
+        self.assertEqual(LODF.shape, (nl, nl))
+
+        for k in range(nl):
+            if isnan(LODF[0, k]):
+                continue
+            self.assertEqual(LODF[k, k], -1.0)
+
+            ln = branches[:k] + branches[k + 1:]
+            Bk, Bfk, _, _ = self.case.makeBdc(buses, ln)
+            Fk = Bfk * self._dc_angles(Bk, P)
+            Fc = delete(F + LODF[:, k] * F[k], k)
+
+            self.assertTrue(abs(Fk - Fc).max() < 1e-10, self.case_name)
+
+        # Factors for a subset of outages.
+        outages = arange(0, nl, 2)
+        self.assertTrue(alltrue((self.case.makeLODF(outages=outages) ==
+                                 LODF[:, outages]) | isnan(LODF[:, outages])))
+
+        # Factors from a given factorisation.
+        factors = self.case.factorBdc(buses, branches)
+        self.assertTrue(alltrue((self.case.makeLODF(buses, branches,
+            factors=factors) == LODF) | isnan(LODF)))
+
+
+    def _dc_angles(self, B, P):
+        """ Returns the voltage angles for the given injections with the
+        reference bus angle at zero.
+        """
+        ref = [i for i, b in enumerate(self.case.connected_buses)
+               if b.type == REFERENCE][0]
+        ns = [i for i in range(B.shape[0]) if i != ref]
+        Va = zeros(B.shape[0])
+        Va[ns] = solve(B.toarray()[ns, :][:, ns], P[ns])
+        return Va
+
 #------------------------------------------------------------------------------
 #  "CaseMatrix24RTSTest" class:
 #------------------------------------------------------------------------------
@@ -0,0 +1,265 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines a test case for the dynamic simulation models.
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import unittest
+
+from os.path import join, dirname
+
+from numpy import array, exp, pi, abs, c_
+
+from scipy.sparse.linalg import splu
+
+from pylon import Case, NewtonPF
+from pylon.dyn import \
+    DynamicCase, DynamicSolver, DynamicGenerator, Exciter, Governor, \
+    ModifiedEuler, RungeKutta, RungeKuttaFehlberg, RungeKuttaHighamHall, \
+    ModifiedEuler2, Trapezoidal, BusChange, CLASSICAL, FOURTH_ORDER, \
+    IEEE_DC1A, GENERAL_IEEE
+
+#------------------------------------------------------------------------------
+#  Constants:
+#------------------------------------------------------------------------------
+
+DATA_FILE = join(dirname(__file__), "data", "case6ww", "case6ww.pkl")
+
+#------------------------------------------------------------------------------
+#  "DynamicCaseTest" class:
+#------------------------------------------------------------------------------
+
+class DynamicCaseTest(unittest.TestCase):
+    """ Defines a test case for the generator, exciter and governor models.
+    """
+
+    def setUp(self):
+        """ The test runner will execute this method prior to each test.
+        """
+        self.case = case = Case.load(DATA_FILE)
+        NewtonPF(case).solve()
+
+        self.dyn_case = dyn_case = DynamicCase(case)
+        for i, g in enumerate(case.online_generators):
+            if i == 0:
+                exciter = Exciter(g)
+            else:
+                exciter = Exciter(g, IEEE_DC1A, ka=40.0, ta=0.2, ke=1.0,
+                    te=0.3, kf=0.06, tf=1.0, aex=0.01, bex=0.5)
+            if i == 1:
+                governor = Governor(g)
+            else:
+                governor = Governor(g, GENERAL_IEEE, k=20.0, t1=0.5, t2=0.1,
+                    t3=0.2, p_up=0.1, p_down=-0.1, p_max=2.0, p_min=0.0)
+            model = CLASSICAL if i == 0 else FOURTH_ORDER
+
+            dyn_case.dyn_generators.append(DynamicGenerator(g, exciter,
+                governor, model, h=5.0, d=0.0, x=0.1, x_tr=0.1, xd=0.1,
+                xq=1.5, xd_tr=0.1, xq_tr=0.1, td=6.0, tq=0.5))
+            dyn_case.exciters.append(exciter)
+            dyn_case.governors.append(governor)
+
+        DynamicSolver(dyn_case)
+
+        buses = case.connected_buses
+        self.gbus = [g.bus._i for g in case.online_generators]
+        self.U0 = array([b.v_magnitude * exp(1j * b.v_angle * pi / 180.0)
+                         for b in buses])
+
+
+    def test_tabulate(self):
+        """ Test the rows and parameters of the model tables.
+        """
+        dc = self.dyn_case
+
+        self.assertEqual(list(dc._generators[CLASSICAL].rows), [0])
+        self.assertEqual(list(dc._generators[FOURTH_ORDER].rows), [1, 2])
+        self.assertEqual(list(dc._exciters[IEEE_DC1A].rows), [1, 2])
+        self.assertEqual(list(dc._governors[GENERAL_IEEE].rows), [0, 2])
+        self.assertEqual(list(dc._generators[FOURTH_ORDER].xq), [1.5, 1.5])
+        self.assertEqual(list(dc._exciters[IEEE_DC1A].ka), [40.0, 40.0])
+
+
+    def test_steady_state(self):
+        """ Test that the initial conditions are a steady state.
+        """
+        dc = self.dyn_case
+        Ug = self.U0[self.gbus]
+
+        Efd0, Xgen0 = dc.generatorInit(Ug)
+        Id0, Iq0, Pe0 = dc.machineCurrents(Xgen0, Ug)
+        Xexc0, Pexc0 = dc.exciterInit(Efd0, abs(Ug))
+        Xgov0, Pgov0 = dc.governorInit(Pe0, Xgen0[:, 1])
+
+        places = 12
+        self.assertAlmostEqual(Pe0[0], 1.0787549688, places=8)
+        self.assertAlmostEqual(
+            abs(dc.generator(Xgen0, Xexc0, Xgov0, c_[Id0, Iq0, Pe0])).max(),
+            0.0, places)
+        self.assertAlmostEqual(
+            abs(dc.exciter(Xexc0, Pexc0, abs(Ug))).max(), 0.0, places)
+        self.assertAlmostEqual(
+            abs(dc.governor(Xgov0, Pgov0, Xgen0[:, 1])).max(), 0.0, places)
+
+        # The network solution reproduces the power flow voltages.
+        augYbus = dc.getAugYbus(self.U0, self.gbus)
+        U = dc.solveNetwork(Xgen0, splu(augYbus.tocsc()), self.gbus)
+        self.assertAlmostEqual(abs(U - self.U0).max(), 0.0, places=8)
+
+
+    def test_explicit(self):
+        """ Test the explicit integration methods.
+        """
+        dc = self.dyn_case
+
+        Xgen2, Xexc2, Xgov2, _ = self._integrate(RungeKutta(dc), 0.001, 0.1,
+                                                 0.2)
+
+        for method in [ModifiedEuler(dc), RungeKutta(dc),
+                       RungeKuttaFehlberg(dc, tol=1e-06),
+                       RungeKuttaHighamHall(dc, tol=1e-06),
+                       ModifiedEuler2(dc, tol=1e-08)]:
+            # Steady state.
+            Xgen, _, _, _ = self._integrate(method, 0.005, 0.0, 0.02)
+            self.assertAlmostEqual(abs(Xgen - self._Xgen0).max(), 0.0, 8)
+
+            # Rotor angle disturbance.
+            Xgen, Xexc, Xgov, _ = self._integrate(method, 0.005, 0.1, 0.2)
+            self.assertTrue(abs(Xgen - Xgen2).max() < 1e-03)
+            self.assertTrue(abs(Xexc - Xexc2).max() < 1e-03)
+            self.assertTrue(abs(Xgov - Xgov2).max() < 1e-03)
+
+        self.assertFalse(method.eulerfailed)
+
+
+    def test_trapezoidal(self):
+        """ Test the implicit trapezoidal rule with stiff exciters.
+        """
+        for exciter in self.dyn_case.exciters:
+            exciter.ta = 0.001
+        self.dyn_case.tabulate()
+
+        # Steady state.
+        Xgen, _, _, method = self._integrate(Trapezoidal(self.dyn_case), 0.05,
+                                             0.0)
+        self.assertAlmostEqual(abs(Xgen - self._Xgen0).max(), 0.0, places=8)
+        self.assertEqual(method.factorisations, 1)
+
+        # Rotor angle disturbance, with a large step reusing the first
+        # factorisation and with a small step.
+        Xgen, Xexc, _, method = self._integrate(Trapezoidal(self.dyn_case),
+                                                0.05, 0.1)
+        Xgen2, Xexc2, _, _ = self._integrate(Trapezoidal(self.dyn_case),
+                                             0.0025, 0.1)
+
+        self.assertEqual(method.factorisations, 1)
+        self.assertTrue(abs(Xgen[:, 0] - Xgen2[:, 0]).max() < 5e-03)
+        self.assertTrue(abs(Xexc[:, 0] - Xexc2[:, 0]).max() < 5e-03)
+
+
+    def test_solve(self):
+        """ Test dynamic simulation of a cleared bus fault.
+        """
+        dc = self.dyn_case
+        dc.stoptime = 0.5
+        dc.stepsize = 0.01
+
+        bus = self.case.buses[3]
+        dc.events = [BusChange(bus, 0.1, "b_shunt", -1e04),
+                     BusChange(bus, 0.15, "b_shunt", bus.b_shunt)]
+
+        method = Trapezoidal(dc)
+        solution = DynamicSolver(dc, method, verbose=False).solve()
+
+        time = solution["time"]
+        self.assertAlmostEqual(time[0], -0.02, places=9)
+        self.assertAlmostEqual(time[-1], 0.5, places=9)
+
+        # Values are saved before and after each event.
+        before = abs(time - 0.1).argmin()
+        self.assertAlmostEqual(time[before + 1], 0.1, places=9)
+        Vm = abs(solution["voltages"][:, bus._i])
+        self.assertTrue(Vm[before] > 0.9)
+        self.assertTrue(Vm[before + 1] < 0.2)
+        self.assertTrue(Vm[-1] > 0.9)
+
+        # The iteration matrix is refactorised for the faulted and cleared
+        # networks and is otherwise mostly reused.
+        self.assertTrue(3 <= method.factorisations <= 5)
+
+        # Explicit reference, from the restored network.
+        reference = DynamicSolver(dc, RungeKutta(dc), verbose=False).solve()
+        self.assertEqual(len(reference["time"]), len(time))
+        self.assertTrue(
+            abs(solution["angles"] - reference["angles"]).max() < 0.1)
+
+        # Steps in which the Newton iterations do not converge are rejected
+        # and repeated with half the step size.
+        solution = DynamicSolver(dc, Trapezoidal(dc, max_iter=2),
+                                 verbose=False).solve()
+        time = solution["time"]
+        self.assertTrue(solution["failed"] > 0)
+        self.assertAlmostEqual(time[-1], 0.5, places=9)
+        self.assertTrue(len(time) > len(reference["time"]))
+        self.assertTrue(abs(solution["angles"][-1] -
+                            reference["angles"][-1]).max() < 0.1)
+
+
+    def _integrate(self, method, stepsize, disturbance, stoptime=1.0):
+        """ Integrates for the stop time from the initial state with the
+        rotor angle of the second generator disturbed.  The steps rejected
+        by adaptive methods are repeated with the new step size.
+        """
+        dc = self.dyn_case
+        gbus = self.gbus
+        Ug = self.U0[gbus]
+
+        Efd0, self._Xgen0 = dc.generatorInit(Ug)
+        Id0, Iq0, Pe0 = dc.machineCurrents(self._Xgen0, Ug)
+        Xexc, Pexc = dc.exciterInit(Efd0, abs(Ug))
+        Xgov, Pgov = dc.governorInit(Pe0, self._Xgen0[:, 1])
+        augYbus_solver = splu(dc.getAugYbus(self.U0, gbus).tocsc())
+
+        Xgen = self._Xgen0.copy()
+        Xgen[1, 0] += disturbance
+
+        # Generator, exciter and governor inputs after the disturbance.
+        U = dc.solveNetwork(Xgen, augYbus_solver, gbus)
+        Id, Iq, Pe = dc.machineCurrents(Xgen, U[gbus])
+        Vgen, Vexc, Vgov = c_[Id, Iq, Pe], abs(U[gbus]), Xgen[:, 1]
+
+        t = 0.0
+        while t < stoptime - 1e-09:
+            if t + stepsize > stoptime + 1e-09:
+                stepsize = stoptime - t
+            Xgen, _, Vgen, Xexc, _, Vexc, Xgov, _, Vgov, _, _, newstepsize = \
+                method.solve(t, Xgen, None, Vgen, Xexc, Pexc, Vexc, Xgov,
+                             Pgov, Vgov, augYbus_solver, gbus, stepsize)
+            if not getattr(method, "failed", False):
+                t += stepsize
+            stepsize = newstepsize
+
+        return Xgen, Xexc, Xgov, method
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# EOF -------------------------------------------------------------------------
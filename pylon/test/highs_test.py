@@ -0,0 +1,103 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines a test case for the HiGHS DC OPF solver.
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import unittest
+
+from os.path import join, dirname
+
+from scipy.io.mmio import mmread
+
+from pylon import Case, OPF
+from pylon.highs import HiGHSSolver, HAVE_HIGHS
+
+#------------------------------------------------------------------------------
+#  Constants:
+#------------------------------------------------------------------------------
+
+DATA_DIR = join(dirname(__file__), "data")
+
+#------------------------------------------------------------------------------
+#  "HiGHSSolverTest" class:
+#------------------------------------------------------------------------------
+
+class HiGHSSolverTest(unittest.TestCase):
+    """ Defines a test case for the HiGHS DC OPF solver.
+    """
+
+    def __init__(self, methodName='runTest'):
+        super(HiGHSSolverTest, self).__init__(methodName)
+
+        #: Name of a case with piecewise linear costs only.
+        self.case_name = "case30pwl"
+        self.case = None
+
+
+    def setUp(self):
+        """ The test runner will execute this method prior to each test.
+        """
+        if not HAVE_HIGHS:
+            self.skipTest("HiGHS requires SciPy 1.7 or later.")
+        self.case = Case.load(join(DATA_DIR, self.case_name,
+                                   self.case_name + ".pkl"))
+        self.case.sort_generators() # ext2int
+
+
+    def test_solution(self):
+        """ Test objective function value and prices of the LP solution.
+        """
+        solution = OPF(self.case, dc=True).solve(HiGHSSolver)
+
+        mpf = mmread(join(DATA_DIR, self.case_name, "opf", "f_DC.mtx"))
+        bus = mmread(join(DATA_DIR, self.case_name, "opf", "Bus_DC.mtx"))
+        branch = mmread(join(DATA_DIR, self.case_name, "opf", "Branch_DC.mtx"))
+
+        pl = 2
+
+        self.assertTrue(solution["converged"])
+        self.assertAlmostEqual(solution["f"], mpf[0], places=3)
+
+        for i, bs in enumerate(self.case.buses):
+            self.assertAlmostEqual(bs.p_lmbda, bus[i, 13], pl) # lam_P
+
+        for i, ln in enumerate(self.case.branches):
+            self.assertAlmostEqual(ln.mu_s_from, branch[i, 17], pl) # mu_Sf
+            self.assertAlmostEqual(ln.mu_s_to, branch[i, 18], pl) # mu_St
+
+
+    def test_quadratic_costs(self):
+        """ Test that problems with quadratic costs are solved using PIPS.
+        """
+        case = Case.load(join(DATA_DIR, "case6ww", "case6ww.pkl"))
+        case.sort_generators()
+        solution = OPF(case, dc=True).solve(HiGHSSolver)
+
+        mpf = mmread(join(DATA_DIR, "case6ww", "opf", "f_DC.mtx"))
+
+        self.assertTrue(solution["converged"])
+        self.assertAlmostEqual(solution["f"], mpf[0], places=6)
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# EOF -------------------------------------------------------------------------
@@ -0,0 +1,132 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines a test case for the decomposition of nodal prices.
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import unittest
+
+from os.path import join, dirname
+
+from numpy import array, outer
+
+from pylon import Case, OPF, MultiPeriodOPF, LMPDecomposition
+from pylon.util import mfeq2
+
+#------------------------------------------------------------------------------
+#  Constants:
+#------------------------------------------------------------------------------
+
+DATA_DIR = join(dirname(__file__), "data")
+
+#------------------------------------------------------------------------------
+#  "LMPDecompositionTest" class:
+#------------------------------------------------------------------------------
+
+class LMPDecompositionTest(unittest.TestCase):
+    """ Defines a test case for the decomposition of nodal prices.
+    """
+
+    def test_dc(self):
+        """ Test the components of DC OPF prices with congestion.
+        """
+        case = Case.load(join(DATA_DIR, "case_ieee30", "case_ieee30.pkl"))
+        for l in case.branches:
+            l.rate_a = min(l.rate_a, 30.0)
+        OPF(case, dc=True).solve()
+
+        lmp = LMPDecomposition(case)
+        d = lmp.decompose()
+        p_lmbda = array([[b.p_lmbda for b in case.buses]])
+
+        self.assertEqual(d["energy"].shape, (1, len(case.buses)))
+        self.assertTrue((d["energy"] == p_lmbda[0, lmp.ref]).all())
+        self.assertEqual(d["congestion"][0, lmp.ref], 0.0)
+        self.assertTrue(abs(d["congestion"]).max() > 1.0)
+        self.assertTrue(abs(d["loss"]).max() < 1e-6)
+        self.assertTrue(abs(d["residual"]).max() < 1e-6)
+        self.assertTrue(mfeq2(d["energy"] + d["congestion"] + d["loss"] +
+                              d["residual"], p_lmbda))
+
+        # The buses are indexed in the given order without re-indexing the
+        # buses of the case.
+        indexes = [b._i for b in case.buses]
+        buses = case.buses[::-1]
+        reverse = LMPDecomposition(case, buses, ref=len(buses) - 1 - lmp.ref)
+        r = reverse.decompose()
+
+        self.assertEqual([b._i for b in case.buses], indexes)
+        self.assertTrue(mfeq2(r["congestion"][:, ::-1], d["congestion"]))
+
+
+    def test_ac(self):
+        """ Test the marginal loss and congestion components of AC OPF
+        prices.
+        """
+        case = Case.load(join(DATA_DIR, "case6ww", "case6ww.pkl"))
+        OPF(case, dc=False).solve()
+
+        lmp = LMPDecomposition(case, dc=False)
+        d = lmp.decompose()
+        p_lmbda = array([[b.p_lmbda for b in case.buses]])
+
+        self.assertEqual(d["loss"][0, lmp.ref], 0.0)
+        self.assertTrue(abs(d["loss"]).max() > 0.1)
+        self.assertTrue(abs(d["congestion"]).max() > 0.1)
+        self.assertTrue(abs(d["residual"]).max() < 1e-4)
+        self.assertTrue(mfeq2(d["energy"] + d["congestion"] + d["loss"] +
+                              d["residual"], p_lmbda))
+
+
+    def test_periods(self):
+        """ Test the decomposition of a batch of periods.
+        """
+        case = Case.load(join(DATA_DIR, "case6ww", "case6ww.pkl"))
+        for l in case.branches:
+            l.rate_a = min(l.rate_a, 40.0)
+        Pd = array([bus.p_demand for bus in case.buses])
+        solution = MultiPeriodOPF(case, outer([0.7, 0.9, 1.0], Pd)).solve()
+
+        lmp = LMPDecomposition(case)
+        d = lmp.decompose(solution["p_lmbda"], solution["mu_s_from"],
+                          solution["mu_s_to"])
+
+        self.assertEqual(d["congestion"].shape, (3, len(case.buses)))
+        self.assertEqual(abs(d["congestion"][0]).max(), 0.0)
+        self.assertTrue(abs(d["congestion"][2]).max() > 0.1)
+        self.assertTrue(abs(d["loss"]).max() < 1e-6)
+        self.assertTrue(abs(d["residual"]).max() < 1e-6)
+
+        # Multipliers must be given for each branch in each period.
+        self.assertRaises(ValueError, lmp.decompose, solution["p_lmbda"],
+                          solution["mu_s_from"][:, 1:], solution["mu_s_to"])
+        self.assertRaises(ValueError, lmp.decompose, solution["p_lmbda"],
+                          solution["mu_s_from"][1:], solution["mu_s_to"][1:])
+
+        # The last period is set on the case.
+        last = lmp.decompose()
+        for key in ["energy", "congestion", "loss", "residual"]:
+            self.assertTrue(mfeq2(d[key][2:], last[key], 1e-10))
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# EOF -------------------------------------------------------------------------
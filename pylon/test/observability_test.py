@@ -0,0 +1,113 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Test case for the observability analysis.
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import unittest
+
+from numpy import ones
+
+from pylon import Case
+from pylon.estimator import StateEstimator, PG
+from pylon.observability import ObservabilityAnalysis, ACTIVE, REACTIVE
+from pylon.observability import _null_space_vector
+
+from pylon.test.se_test import measure, IEEE30_FILE
+
+#------------------------------------------------------------------------------
+#  "ObservabilityAnalysisTest" class:
+#------------------------------------------------------------------------------
+
+class ObservabilityAnalysisTest(unittest.TestCase):
+    """ Tests the observability analysis with the IEEE 30 bus case and a
+    measurement set without the flows at buses 26 and 29.
+    """
+
+    def setUp(self):
+        """ The test runner will execute this method prior to each test.
+        """
+        self.case = case = Case.load(IEEE30_FILE)
+        self.V, meas = measure(case)
+
+        buses = case.connected_buses
+        self.cut = [l for l in case.online_branches
+                    if (l.from_bus in [buses[25], buses[28]]) or
+                    (l.to_bus in [buses[25], buses[28]])]
+        self.meas = [m for m in meas if m.b_or_l not in self.cut]
+
+
+    def test_null_space(self):
+        """ Test the factorisation with zero pivot detection.
+        """
+        case = self.case
+        case.index_buses()
+        B = case.Bdc[0]
+        x = _null_space_vector(B.tocsc(), 1e-08)
+
+        # The null space of the susceptance matrix is the flat vector.
+        self.assertTrue(abs(B * x).max() < 1e-10)
+        self.assertTrue(abs(x - x[0]).max() < 1e-10)
+        self.assertTrue(abs(x[0]) > 0.0)
+
+
+    def test_islands(self):
+        """ Test identification of the observable islands.
+        """
+        oa = ObservabilityAnalysis(self.case, self.meas)
+        buses = self.case.connected_buses
+
+        islands, unobservable = oa.islands(ACTIVE)
+        self.assertEqual(len(islands), 3)
+        self.assertEqual(islands[1:], [[buses[25]], [buses[28]]])
+        self.assertEqual(set(unobservable), set(self.cut))
+
+        # All voltage magnitudes are measured.
+        islands, unobservable = oa.islands(REACTIVE)
+        self.assertEqual(len(islands), 1)
+        self.assertEqual(unobservable, [])
+
+        self.assertFalse(oa.observable())
+
+
+    def test_placement(self):
+        """ Test placement of pseudo-measurements and estimation.
+        """
+        oa = ObservabilityAnalysis(self.case, self.meas)
+        pseudo = oa.pseudo_measurements(0.1)
+
+        self.assertEqual(len(pseudo), 2)
+        self.assertEqual([m.type for m in pseudo], [PG, PG])
+        self.assertTrue(ObservabilityAnalysis(self.case,
+            self.meas + pseudo).observable())
+
+        se = StateEstimator(self.case, self.meas, 0.01 * ones(8),
+                            verbose=False)
+        solution = se.run()
+
+        self.assertTrue(solution["converged"])
+        self.assertEqual(len(solution["z"]), len(self.meas) + 2)
+        self.assertTrue(abs(solution["V"] - self.V).max() < 1e-3)
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# EOF -------------------------------------------------------------------------
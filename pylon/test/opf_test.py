@@ -27,8 +27,11 @@ from os.path import join, dirname
 
 from scipy.io.mmio import mmread
 
-from pylon import Case, OPF
-from pylon.opf import DCOPFSolver, PIPSSolver
+from numpy import array, outer, diff, Inf, isnan, linspace
+
+from pylon import Case, OPF, MultiPeriodOPF, ParametricOPF
+from pylon.opf import DCOPFSolver, PIPSSolver, PRICE
+from pylon.generator import PW_LINEAR
 from pylon.util import mfeq2, mfeq1
 
 #------------------------------------------------------------------------------
@@ -37,6 +40,64 @@ from pylon.util import mfeq2, mfeq1
 
 DATA_DIR = join(dirname(__file__), "data")
 
+#------------------------------------------------------------------------------
+#  "check_warm_start" function:
+#------------------------------------------------------------------------------
+
+def check_warm_start(test, opf):
+    """ Solves, scales the load and checks that the warm-started solution
+        matches that from a cold start in fewer iterations.
+    """
+    msg = test.case_name
+    opf.solve()
+    for bus in test.case.buses:
+        bus.p_demand *= 1.03
+    warm = opf.solve()
+
+    test.case.reset()
+    cold = OPF(test.case, dc=opf.dc).solve()
+
+    test.assertTrue(warm["converged"], msg)
+    test.assertTrue(warm["output"]["iterations"] <
+                    cold["output"]["iterations"], msg)
+    test.assertTrue(abs(warm["f"] - cold["f"]) < 1e-5 * abs(cold["f"]), msg)
+
+#------------------------------------------------------------------------------
+#  "check_persistent" function:
+#------------------------------------------------------------------------------
+
+def check_persistent(test, opf):
+    """ Solves, changes costs, limits, demands and ratings, updates the
+        retained model and checks the solution against a new model.
+    """
+    msg = test.case_name
+    opf.solve()
+    om = opf.om
+
+    for g in test.case.generators:
+        if g.pcost_model == PW_LINEAR:
+            g.p_cost = [(x, 1.1 * c) for x, c in g.p_cost]
+        else:
+            g.p_cost = (1.1 * g.p_cost[0],) + tuple(g.p_cost[1:])
+        g.p_max *= 1.1
+    for bus in test.case.buses:
+        bus.p_demand *= 1.02
+    for ln in test.case.branches:
+        ln.rate_a *= 1.1
+
+    opf.update_costs()
+    opf.update_var_bounds()
+    opf.update_constraint_bounds()
+    updated = opf.solve()
+
+    test.assertTrue(opf.om is om, msg)
+
+    test.case.reset()
+    new = OPF(test.case, dc=opf.dc).solve()
+
+    test.assertTrue(updated["converged"], msg)
+    test.assertTrue(abs(updated["f"] - new["f"]) < 1e-6 * abs(new["f"]), msg)
+
 #------------------------------------------------------------------------------
 #  "DCOPFTest" class:
 #------------------------------------------------------------------------------
@@ -276,6 +337,10 @@ class DCOPFSolverTest(unittest.TestCase):
         self.om = None
         self.solver = None
 
+        # Is the optimum not unique?  Only the objective, bus prices and
+        # total dispatch are then compared with MATPOWER.
+        self.degenerate = False
+
 
     def setUp(self):
         """ The test runner will execute this method prior to each test.
@@ -441,6 +506,9 @@ class DCOPFSolverTest(unittest.TestCase):
         diff = 1e-09
 
         self.assertAlmostEqual(solution["f"], mpf[0], places=6)
+        if self.degenerate:
+            self._check_degenerate(solution, diff)
+            return
         self.assertTrue(mfeq1(solution["x"], mpx.flatten(), diff), msg)
         self.assertTrue(mfeq1(lmbda["mu_l"], mpmu_l.flatten(), diff), msg)
         self.assertTrue(mfeq1(lmbda["mu_u"], mpmu_u.flatten(), diff), msg)
@@ -448,6 +516,75 @@ class DCOPFSolverTest(unittest.TestCase):
         self.assertTrue(mfeq1(lmbda["upper"], mpmuUB.flatten(), diff), msg)
 
 
+    def test_solution_mehrotra(self):
+        """ Test DC OPF solution using Mehrotra's predictor-corrector method.
+        """
+        msg = self.case_name
+        iterations = self.solver.solve()["output"]["iterations"]
+
+        mpf = mmread(join(DATA_DIR, self.case_name, "opf", "f_DC.mtx"))
+        mpx = mmread(join(DATA_DIR, self.case_name, "opf", "x_DC.mtx"))
+        mpmu_u = mmread(join(DATA_DIR, self.case_name, "opf", "mu_u_DC.mtx"))
+
+        for max_gondzio in [0, 3]:
+            opt = {"mehrotra": True, "max_gondzio": max_gondzio}
+            om = self.opf._construct_opf_model(self.case)
+            solution = DCOPFSolver(om, opt).solve()
+            lmbda = solution["lmbda"]
+
+            self.assertTrue(solution["converged"], msg)
+            self.assertTrue(solution["output"]["iterations"] <= iterations,
+                            msg)
+            self.assertAlmostEqual(solution["f"], mpf[0], places=4)
+            if self.degenerate:
+                self._check_degenerate(solution, 1e-06)
+                continue
+            self.assertTrue(mfeq1(solution["x"], mpx.flatten(), 1e-06), msg)
+            self.assertTrue(mfeq1(lmbda["mu_u"], mpmu_u.flatten(), 1e-05),
+                            msg)
+
+
+    def _check_degenerate(self, solution, diff):
+        """ Checks the bus prices and total dispatch of a solution that is
+            not unique.
+        """
+        msg = self.case_name
+        mpx = mmread(join(DATA_DIR, self.case_name, "opf", "x_DC.mtx"))
+        mpmu_l = mmread(join(DATA_DIR, self.case_name, "opf", "mu_l_DC.mtx"))
+        mpmu_u = mmread(join(DATA_DIR, self.case_name, "opf", "mu_u_DC.mtx"))
+        mpx, mpmu_l, mpmu_u = mpx.flatten(), mpmu_l.flatten(), mpmu_u.flatten()
+
+        Pmis = self.om.get_lin_constraint("Pmis")
+        Pg = self.om.get_var("Pg")
+        ip = range(Pmis.i1, Pmis.iN + 1)
+        ig = range(Pg.i1, Pg.iN + 1)
+
+        # Relative to the largest price.
+        lmbda = solution["lmbda"]
+        prices = lmbda["mu_u"][ip] - lmbda["mu_l"][ip]
+        mpprices = mpmu_u[ip] - mpmu_l[ip]
+        self.assertTrue(abs(prices - mpprices).max() <
+                        diff * max(abs(mpprices).max(), 1.0), msg)
+        self.assertAlmostEqual(solution["x"][ig].sum(), mpx[ig].sum(), 6)
+
+
+    def test_warm_start(self):
+        """ Test warm-starting DC OPF from the previous solution.
+        """
+        check_warm_start(self, OPF(self.case, dc=True, warm_start=True))
+
+
+    def test_persistent(self):
+        """ Test updating a retained DC OPF model.
+        """
+        # The model is only retained if persistent.
+        opf = OPF(self.case, dc=True)
+        opf.solve()
+        self.assertTrue(opf.om is None)
+
+        check_persistent(self, OPF(self.case, dc=True, persistent=True))
+
+
     def test_integrate_solution(self):
         """ Test integration of DC OPF solution.
         """
@@ -525,6 +662,9 @@ class DCOPFSolverCase30PWLTest(DCOPFSolverTest):
 
         self.case_name = "case30pwl"
 
+        # Generators 3 and 4 have the same marginal cost at the optimum.
+        self.degenerate = True
+
 #------------------------------------------------------------------------------
 #  "PIPSSolverTest" class:
 #------------------------------------------------------------------------------
@@ -643,6 +783,18 @@ class PIPSSolverTest(unittest.TestCase):
 #                mfeq1(lmbda["nl_mu_u"], nl_mu_u.flatten()), msg)
 
 
+    def test_warm_start(self):
+        """ Test warm-starting AC OPF from the previous solution.
+        """
+        check_warm_start(self, OPF(self.case, dc=False, warm_start=True))
+
+
+    def test_persistent(self):
+        """ Test updating a retained AC OPF model.
+        """
+        check_persistent(self, OPF(self.case, dc=False, persistent=True))
+
+
     def test_integrate_solution(self):
         """ Test integration of AC OPF solution.
         """
@@ -722,6 +874,322 @@ class PIPSSolvercase30PWLTest(PIPSSolverTest):
 
         self.case_name = "case30pwl"
 
+#------------------------------------------------------------------------------
+#  "MultiPeriodOPFTest" class:
+#------------------------------------------------------------------------------
+
+class MultiPeriodOPFTest(unittest.TestCase):
+    """ Defines a test case for multi-period DC OPF.
+    """
+
+    def __init__(self, methodName='runTest'):
+        super(MultiPeriodOPFTest, self).__init__(methodName)
+
+        #: Name of the folder in which the MatrixMarket data exists.
+        self.case_name = "case6ww"
+
+        self.case = None
+
+
+    def setUp(self):
+        """ The test runner will execute this method prior to each test.
+        """
+        self.case = Case.load(join(DATA_DIR, self.case_name,
+                                   self.case_name + ".pkl"))
+
+        Pd = array([bus.p_demand for bus in self.case.buses])
+        self.demand = outer([0.76, 0.85, 0.97, 0.96, 0.91, 0.84], Pd)
+
+
+    def test_periods(self):
+        """ Test that periods without ramp limits are solved independently.
+        """
+        solution = MultiPeriodOPF(self.case, self.demand).solve()
+
+        self.assertTrue(solution["converged"])
+
+        f = 0.0
+        for t, Pd in enumerate(self.demand):
+            for i, bus in enumerate(self.case.buses):
+                bus.p_demand = Pd[i]
+            s = OPF(self.case, dc=True).solve()
+            f += s["f"]
+
+            Pg = array([g.p for g in self.case.generators])
+            p_lmbda = array([bus.p_lmbda for bus in self.case.buses])
+            self.assertTrue(mfeq1(solution["Pg"][t], Pg, 1e-06))
+            self.assertTrue(mfeq1(solution["p_lmbda"][t], p_lmbda, 1e-06))
+
+        self.assertAlmostEqual(solution["f"], f, places=4)
+
+
+    def test_ramp_limits(self):
+        """ Test limits on the change in generator output between periods.
+        """
+        f = MultiPeriodOPF(self.case, self.demand).solve()["f"]
+
+        ramp_up, ramp_down = [Inf, 10.0, Inf], [Inf, 5.0, Inf]
+        solution = MultiPeriodOPF(self.case, self.demand, ramp_up,
+                                  ramp_down).solve()
+        dPg = diff(solution["Pg"][:, 1])
+
+        self.assertTrue(solution["converged"])
+        self.assertTrue((dPg <= 10.0 + 1e-06).all())
+        self.assertTrue((dPg >= -5.0 - 1e-06).all())
+        self.assertTrue(solution["f"] > f)
+        self.assertTrue(solution["mu_ramp_up"][:, 1].max() > 0.0)
+        self.assertTrue(solution["mu_ramp_down"][:, 1].max() > 0.0)
+
+#------------------------------------------------------------------------------
+#  "SCOPFTest" class:
+#------------------------------------------------------------------------------
+
+class SCOPFTest(unittest.TestCase):
+    """ Defines a test case for security constrained DC OPF.
+    """
+
+    def __init__(self, methodName='runTest'):
+        super(SCOPFTest, self).__init__(methodName)
+
+        #: Name of the folder in which the case data exists.
+        self.case_name = "case_ieee30"
+
+        self.case = None
+
+
+    def setUp(self):
+        """ The test runner will execute this method prior to each test.
+        """
+        self.case = Case.load(join(DATA_DIR, self.case_name,
+                                   self.case_name + ".pkl"))
+        for l in self.case.branches:
+            l.rate_a = l.rate_c = min(l.rate_a, 40.0)
+
+
+    def test_secure(self):
+        """ Test that no flow exceeds its limit after any branch outage.
+        """
+        f = OPF(self.case, dc=True).solve()["f"]
+
+        solution = OPF(self.case, dc=True, scopf=True).solve()
+
+        self.assertTrue(solution["converged"])
+        self.assertTrue(solution["contingency_constraints"] > 0)
+        self.assertTrue(solution["f"] > f)
+
+        branches = self.case.online_branches
+        F = array([l.p_from for l in branches])
+        rate_c = array([l.rate_c for l in branches])
+        LODF = self.case.makeLODF()
+
+        for k in range(len(branches)):
+            if not isnan(LODF[0, k]):
+                Fc = F + LODF[:, k] * F[k]
+                self.assertTrue((abs(Fc) <= rate_c + 1e-03).all())
+
+
+    def test_contingencies(self):
+        """ Test limiting the outages to a subset of branches.
+        """
+        solution = OPF(self.case, dc=True, scopf=True,
+                       contingencies=[]).solve()
+        f = OPF(self.case, dc=True).solve()["f"]
+
+        self.assertTrue(solution["converged"])
+        self.assertEqual(solution["contingency_constraints"], 0)
+        self.assertAlmostEqual(solution["f"], f, places=6)
+
+        branches = self.case.online_branches
+        solution = OPF(self.case, dc=True, scopf=True,
+                       contingencies=branches[:5]).solve()
+
+        self.assertTrue(solution["converged"])
+        self.assertTrue(f <= solution["f"])
+
+
+    def test_factorisation(self):
+        """ Test that the susceptance matrices are built once for the model
+        and once for screening all blocks of outages.
+        """
+        case = self.case
+        makeBdc = case.makeBdc
+        calls = []
+        def count(*args):
+            calls.append(args)
+            return makeBdc(*args)
+        case.makeBdc = count
+
+        opf = OPF(case, dc=True, scopf=True)
+        opf.scopf_block = 5
+        solution = opf.solve()
+
+        self.assertTrue(solution["converged"])
+        self.assertTrue(solution["contingency_constraints"] > 0)
+        self.assertEqual(len(calls), 2)
+
+#------------------------------------------------------------------------------
+#  "PTDFOPFTest" class:
+#------------------------------------------------------------------------------
+
+class PTDFOPFTest(unittest.TestCase):
+    """ Defines a test case for the PTDF formulation of DC OPF.
+    """
+
+    def __init__(self, methodName='runTest'):
+        super(PTDFOPFTest, self).__init__(methodName)
+
+        #: Name of the folder in which the case data exists.
+        self.case_name = "case_ieee30"
+
+
+    def _load(self):
+        """ Returns the case with ratings reduced to congest the network.
+        """
+        case = Case.load(join(DATA_DIR, self.case_name,
+                              self.case_name + ".pkl"))
+        for l in case.branches:
+            l.rate_a = min(l.rate_a, 30.0)
+        return case
+
+
+    def test_solution(self):
+        """ Test that the solution and prices match those of the DC OPF.
+        """
+        case = self._load()
+        dcopf = OPF(case, dc=True).solve()
+        p_lmbda = array([bus.p_lmbda for bus in case.buses])
+        v_angle = array([bus.v_angle for bus in case.buses])
+        p = array([g.p for g in case.generators])
+        mu_s = array([(l.mu_s_from, l.mu_s_to) for l in case.branches])
+
+        case = self._load()
+        solution = OPF(case, dc=True, ptdf=True).solve()
+
+        self.assertTrue(solution["converged"])
+        self.assertAlmostEqual(solution["f"], dcopf["f"], places=4)
+        self.assertTrue(p_lmbda.max() - p_lmbda.min() > 1.0)
+        self.assertTrue(mfeq1(array([bus.p_lmbda for bus in case.buses]),
+                              p_lmbda, 1e-6))
+        self.assertTrue(mfeq1(array([bus.v_angle for bus in case.buses]),
+                              v_angle, 1e-6))
+        self.assertTrue(mfeq1(array([g.p for g in case.generators]), p, 1e-5))
+        self.assertTrue(mfeq2(array([(l.mu_s_from, l.mu_s_to)
+                                     for l in case.branches]), mu_s, 1e-6))
+
+
+    def test_monitored(self):
+        """ Test that flow limits are only added for violated branches.
+        """
+        case = self._load()
+        opf = OPF(case, dc=True, ptdf=True, persistent=True)
+        solution = opf.solve()
+
+        Pf = opf.om.get_lin_constraint("Pf")
+        self.assertTrue(0 < Pf.N < len(case.branches))
+        self.assertEqual(opf.om.lin_N, Pf.N + 1)
+
+        for l in case.branches:
+            self.assertTrue(abs(l.p_from) <= l.rate_a + 1e-3)
+
+        # Demand update of the retained model.
+        for bus in case.buses:
+            bus.p_demand *= 1.1
+        opf.update_constraint_bounds()
+        solution = opf.solve()
+
+        case = self._load()
+        for bus in case.buses:
+            bus.p_demand *= 1.1
+        f = OPF(case, dc=True).solve()["f"]
+
+        self.assertTrue(solution["converged"])
+        self.assertAlmostEqual(solution["f"], f, places=4)
+
+#------------------------------------------------------------------------------
+#  "ParametricOPFTest" class:
+#------------------------------------------------------------------------------
+
+class ParametricOPFTest(unittest.TestCase):
+    """ Defines a test case for parametric DC OPF.
+    """
+
+    def _load(self):
+        """ Returns the case with ratings reduced to congest the network.
+        """
+        case = Case.load(join(DATA_DIR, "case_ieee30", "case_ieee30.pkl"))
+        for l in case.branches:
+            l.rate_a = min(l.rate_a, 30.0)
+        return case
+
+
+    def test_load(self):
+        """ Test a load scaling path against independent DC OPF solutions.
+        """
+        path = linspace(0.6, 1.2, 31)
+        case = self._load()
+        Pd = array([bus.p_demand for bus in case.buses])
+        solution = ParametricOPF(case, path).solve()
+
+        self.assertTrue(solution["converged"])
+        self.assertEqual(solution["p_lmbda"].shape, (31, len(case.buses)))
+        self.assertTrue(0 < solution["resolved"].sum() < 31)
+        self.assertTrue(solution["resolved"][0])
+        self.assertTrue(len(solution["breakpoints"]) > 0)
+        self.assertTrue((diff(solution["breakpoints"]) > 0.0).all())
+        self.assertTrue(mfeq1(array([bus.p_demand for bus in case.buses]), Pd))
+
+        for k in [0, 7, 15, 30]:
+            case = self._load()
+            for bus in case.buses:
+                bus.p_demand *= path[k]
+            f = OPF(case, dc=True).solve()["f"]
+
+            self.assertAlmostEqual(solution["f"][k], f, places=3)
+            self.assertTrue(mfeq1(solution["Pg"][k],
+                array([g.p for g in case.generators]), 1e-4))
+            self.assertTrue(mfeq1(solution["p_lmbda"][k],
+                array([bus.p_lmbda for bus in case.buses]), 1e-4))
+
+
+    def test_price(self):
+        """ Test the supply curve of a generator.
+        """
+        case = self._load()
+        g = case.generators[1]
+        p_cost = g.p_cost
+        solution = ParametricOPF(case, linspace(0.0, 80.0, 41), PRICE,
+                                 g).solve()
+
+        self.assertTrue(solution["converged"])
+        self.assertTrue(solution["resolved"].sum() < 41)
+        self.assertTrue((diff(solution["Pg"][:, 1]) < 1e-6).all())
+        self.assertTrue(solution["Pg"][0, 1] > solution["Pg"][-1, 1])
+        self.assertEqual(g.p_cost, p_cost)
+
+        # Results of the last point are set on the case.
+        self.assertAlmostEqual(g.p, solution["Pg"][-1, 1], places=6)
+
+
+    def test_error(self):
+        """ Test that the demands and costs are restored if a point fails.
+        """
+        class FailingSolver(DCOPFSolver):
+            def _run_opf(self, *args):
+                raise ValueError, "Solver failed."
+
+        case = self._load()
+        g = case.generators[1]
+        Pd = array([bus.p_demand for bus in case.buses])
+        p_cost = g.p_cost
+
+        opf = ParametricOPF(case, [0.6, 1.2])
+        self.assertRaises(ValueError, opf.solve, FailingSolver)
+        self.assertTrue(mfeq1(array([bus.p_demand for bus in case.buses]), Pd))
+
+        opf = ParametricOPF(case, [10.0, 20.0], PRICE, g)
+        self.assertRaises(ValueError, opf.solve, FailingSolver)
+        self.assertEqual(g.p_cost, p_cost)
+
 
 if __name__ == "__main__":
     import logging, sys
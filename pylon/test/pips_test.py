@@ -0,0 +1,124 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines a test case for the quadratic program solvers of PIPS.
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import unittest
+
+from os.path import join, dirname
+
+from pips import qps_pips, qpips
+
+from pylon import Case, OPF
+from pylon.solver import DCOPFSolver
+from pylon.util import mfeq1
+
+#------------------------------------------------------------------------------
+#  Constants:
+#------------------------------------------------------------------------------
+
+DATA_DIR = join(dirname(__file__), "data")
+
+#------------------------------------------------------------------------------
+#  "QPSolverTest" class:
+#------------------------------------------------------------------------------
+
+class QPSolverTest(unittest.TestCase):
+    """ Tests that L{pips.qpips} gives the iterates of L{pips.qps_pips} for
+    DC OPF.
+    """
+
+    def setUp(self):
+        """ The test runner will execute this method prior to each test.
+        """
+        case = Case.load(join(DATA_DIR, "case_ieee30", "case_ieee30.pkl"))
+        for l in case.branches:
+            l.rate_a = min(l.rate_a, 30.0)
+
+        om = OPF(case, dc=True)._construct_opf_model(case)
+        solver = DCOPFSolver(om)
+
+        bs, ln, gn, _ = solver._unpack_model(om)
+        ipol, ipwl, nb, nl, nw, ny, nxyz = solver._dimension_data(bs, ln, gn)
+        AA, ll, uu = solver._linear_constraints(om)
+        HH, CC, _ = solver._objective(gn, ipol, ipwl, nw, ny, nxyz,
+                                      case.base_mva)
+        _, xmin, xmax = solver._var_bounds()
+        x0 = solver._initial_interior_point(bs, gn, xmin, xmax, ny)
+
+        #: DC OPF problem data.
+        self.qp = (HH, CC, AA, ll, uu, xmin, xmax)
+        self.x0 = x0
+
+        #: Index of the power balance constraints.
+        Pmis = om.get_lin_constraint("Pmis")
+        self.ipmis = slice(Pmis.i1, Pmis.iN + 1)
+
+
+    def test_cold_start(self):
+        """ Test the solution, multipliers and iteration count.
+        """
+        self._compare(self.qp, self.x0)
+
+
+    def test_warm_start(self):
+        """ Test a solve warm-started from a solution with greater demand.
+        """
+        HH, CC, AA, ll, uu, xmin, xmax = self.qp
+        s = qpips(HH, CC, AA, ll, uu, xmin, xmax, self.x0)
+
+        ll, uu = ll.copy(), uu.copy()
+        ll[self.ipmis] *= 1.05
+        uu[self.ipmis] *= 1.05
+        qp = (HH, CC, AA, ll, uu, xmin, xmax)
+
+        cold = self._compare(qp, self.x0)
+        warm = self._compare(qp, s["x"], s["lmbda"])
+
+        self.assertTrue(warm["output"]["iterations"] <
+                        cold["output"]["iterations"])
+
+
+    def _compare(self, qp, x0, lmbda0=None):
+        """ Compares the solutions from qps_pips and qpips and returns that
+        of qpips.
+        """
+        HH, CC, AA, ll, uu, xmin, xmax = qp
+        expected = qps_pips(HH, CC, AA, ll, uu, xmin, xmax, x0, {}, lmbda0)
+        actual = qpips(HH, CC, AA, ll, uu, xmin, xmax, x0, {}, lmbda0)
+
+        self.assertTrue(expected["converged"])
+        self.assertTrue(actual["converged"])
+        self.assertEqual(actual["output"]["iterations"],
+                         expected["output"]["iterations"])
+        self.assertAlmostEqual(actual["f"], expected["f"], places=8)
+        self.assertTrue(mfeq1(actual["x"], expected["x"], 1e-8))
+        for key in ["mu_l", "mu_u", "lower", "upper"]:
+            self.assertTrue(mfeq1(actual["lmbda"][key],
+                                  expected["lmbda"][key], 1e-6))
+
+        return actual
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# EOF -------------------------------------------------------------------------
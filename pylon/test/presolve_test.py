@@ -0,0 +1,144 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines a test case for the OPF presolver.
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import unittest
+
+from os.path import join, dirname
+
+from numpy import array, Inf
+from scipy.sparse import csr_matrix
+
+from pips import qpips
+
+from pylon import Case, OPF
+from pylon.presolve import Presolver
+from pylon.util import mfeq1, mfeq2
+
+#------------------------------------------------------------------------------
+#  Constants:
+#------------------------------------------------------------------------------
+
+DATA_DIR = join(dirname(__file__), "data")
+
+#------------------------------------------------------------------------------
+#  "PresolverTest" class:
+#------------------------------------------------------------------------------
+
+class PresolverTest(unittest.TestCase):
+    """ Defines a test case for the OPF presolver.
+    """
+
+    def test_reductions(self):
+        """ Test the solution and multipliers of a reduced problem.
+        """
+        H = csr_matrix(array([[1003.1,  4.3,     6.3,     5.9,   1.0],
+                              [4.3,     2.2,     2.1,     3.9,   0.0],
+                              [6.3,     2.1,     3.5,     4.8,   0.0],
+                              [5.9,     3.9,     4.8,     10,    0.0],
+                              [1.0,     0.0,     0.0,     0.0,   2.0]]))
+        c = array([0.0, 0.0, 0.0, 0.0, 1.0])
+        A = csr_matrix(array([[1,       1,       1,       1,     1   ],
+                              [0.17,    0.11,    0.10,    0.18,  0   ],
+                              [0.34,    0.22,    0.20,    0.36,  0   ],
+                              [0,       0,       0,       2,     0   ],
+                              [1,       0,       1,       0,     0   ],
+                              [0,       1,       0,       0,     1   ]]))
+        l = array([1.2,  0.10, 0.22, -Inf,  -Inf, -Inf])
+        u = array([1.2,  Inf,  Inf,  0.4,   Inf,  Inf])
+        xmin = array([0.0, 0.0, 0.0, 0.0, 0.2])
+        xmax = array([Inf, Inf, Inf, Inf, 0.2])
+
+        s = qpips(H, c, A, l, u, xmin, xmax)
+
+        ps = Presolver(H, c, A, l, u, xmin, xmax)
+        HH, CC, AA, ll, uu, xxmin, xxmax = ps.presolve()
+
+        # Fixed, duplicate, singleton and unbounded rows and columns.
+        self.assertEqual(AA.shape, (2, 4))
+
+        sp = ps.postsolve(qpips(HH, CC, AA, ll, uu, xxmin, xxmax))
+
+        self.assertTrue(s["converged"])
+        self.assertTrue(sp["converged"])
+        self.assertAlmostEqual(sp["f"], s["f"], places=6)
+        self.assertTrue(mfeq1(sp["x"], s["x"], 1e-6))
+
+        # The multipliers are not unique, so test the optimality conditions.
+        x, lmbda = sp["x"], sp["lmbda"]
+        mu_l, mu_u = lmbda["mu_l"], lmbda["mu_u"]
+        lower, upper = lmbda["lower"], lmbda["upper"]
+
+        dL = H * x + c + A.T * (mu_u - mu_l) + upper - lower
+        self.assertTrue(abs(dL).max() < 1e-6)
+
+        Ax = A * x
+        self.assertTrue((mu_l[l == -Inf] == 0.0).all())
+        self.assertTrue((mu_u[u == Inf] == 0.0).all())
+        self.assertTrue(abs(mu_l[l > -Inf] * (Ax - l)[l > -Inf]).max() < 1e-6)
+        self.assertTrue(abs(mu_u[u < Inf] * (u - Ax)[u < Inf]).max() < 1e-6)
+        self.assertTrue(abs(lower * (x - xmin)).max() < 1e-6)
+        self.assertTrue((min(mu_l.min(), mu_u.min(), lower.min(),
+                             upper.min()) >= 0.0))
+
+
+    def test_opf(self):
+        """ Test that DC OPF results are unchanged by presolve.
+        """
+        def load():
+            case = Case.load(join(DATA_DIR, "case_ieee30",
+                                  "case_ieee30.pkl"))
+            for l in case.branches:
+                l.rate_a = min(l.rate_a, 30.0)
+            g = case.generators[1]
+            g.p_min = g.p_max = 40.0
+            return case
+
+        def results(case):
+            return (array([b.p_lmbda for b in case.buses]),
+                    array([b.v_angle for b in case.buses]),
+                    array([g.p for g in case.generators]),
+                    array([(g.mu_pmin, g.mu_pmax) for g in case.generators]),
+                    array([(l.mu_s_from, l.mu_s_to) for l in case.branches]))
+
+        for ptdf in [False, True]:
+            case = load()
+            f = OPF(case, dc=True, ptdf=ptdf).solve()["f"]
+            expected = results(case)
+
+            case = load()
+            solution = OPF(case, dc=True, ptdf=ptdf, presolve=True).solve()
+            actual = results(case)
+
+            self.assertTrue(solution["converged"])
+            self.assertAlmostEqual(solution["f"], f, places=4)
+            self.assertEqual(case.generators[1].p, 40.0)
+            for a, b in zip(actual[:3], expected[:3]):
+                self.assertTrue(mfeq1(a, b, 1e-5))
+            for a, b in zip(actual[3:], expected[3:]):
+                self.assertTrue(mfeq2(a, b, 1e-5))
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# EOF -------------------------------------------------------------------------
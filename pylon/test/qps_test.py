@@ -0,0 +1,148 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines a test case for writing and reading QPS files.
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import unittest
+
+from os.path import join, dirname
+from StringIO import StringIO
+
+from numpy import array, Inf
+
+from pips import qps_pips
+
+from pylon import Case, OPF
+from pylon.solver import DCOPFSolver
+from pylon.io import QPSReader
+from pylon.util import mfeq1, mfeq2
+
+#------------------------------------------------------------------------------
+#  Constants:
+#------------------------------------------------------------------------------
+
+DATA_DIR = join(dirname(__file__), "data")
+
+QPS = """\
+NAME          TESTQP
+ROWS
+ N  COST
+ G  LIM1
+ L  LIM2
+ E  MYEQN
+ E  RNGEQN
+COLUMNS
+    X1        COST         1.0   LIM1         1.0
+    X1        LIM2         1.0
+    MARKER    'MARKER'     'INTORG'
+    X2        COST         2.0   LIM1         1.0
+    X2        MYEQN       -1.0
+    MARKER    'MARKER'     'INTEND'
+    X3        COST        -1.0   MYEQN        1.0
+    X3        RNGEQN       1.0
+RHS
+    RHS       COST        -3.0
+    RHS       LIM1         2.0   LIM2         4.0
+    RHS       MYEQN        7.0   RNGEQN       1.0
+RANGES
+    RNG       LIM2         2.5   RNGEQN      -0.5
+BOUNDS
+ UP BND       X1           4.0
+ MI BND       X2
+ UP BND       X3          -1.0
+QUADOBJ
+    X1        X1           2.0
+    X2        X1           1.0
+ENDATA
+"""
+
+#------------------------------------------------------------------------------
+#  "QPSTest" class:
+#------------------------------------------------------------------------------
+
+class QPSTest(unittest.TestCase):
+    """ Defines a test case for writing and reading QPS files.
+    """
+
+    def test_read(self):
+        """ Test reading ranges, bounds and quadratic objective terms.
+        """
+        reader = QPSReader()
+        p = reader.read(StringIO(QPS))
+
+        self.assertEqual(reader.name, "TESTQP")
+        self.assertEqual(reader.col_names, ["X1", "X2", "X3"])
+        self.assertEqual(reader.c0, 3.0)
+
+        self.assertTrue(mfeq2(p["H"], array([[2.0, 1.0, 0.0],
+                                             [1.0, 0.0, 0.0],
+                                             [0.0, 0.0, 0.0]])))
+        self.assertTrue(mfeq1(p["c"], array([1.0, 2.0, -1.0])))
+        self.assertTrue(mfeq2(p["A"], array([[1.0,  1.0, 0.0],
+                                             [1.0,  0.0, 0.0],
+                                             [0.0, -1.0, 1.0],
+                                             [0.0,  0.0, 1.0]])))
+        self.assertTrue(mfeq1(p["l"], array([2.0, 1.5, 7.0, 0.5])))
+        self.assertTrue(mfeq1(p["u"], array([Inf, 4.0, 7.0, 1.0])))
+        self.assertTrue(mfeq1(p["xmin"], array([0.0, -Inf, -Inf])))
+        self.assertTrue(mfeq1(p["xmax"], array([4.0, Inf, -1.0])))
+
+
+    def test_opf(self):
+        """ Test that a written DC OPF problem is read back and solved.
+        """
+        case = Case.load(join(DATA_DIR, "case_ieee30", "case_ieee30.pkl"))
+        for l in case.branches:
+            l.rate_a = min(l.rate_a, 30.0)
+        case.sort_generators()
+
+        opf = OPF(case, dc=True)
+        om = opf._construct_opf_model(case)
+        solver = DCOPFSolver(om)
+
+        file = StringIO()
+        solver.write_qps(file)
+        f = solver.solve()["f"]
+
+        reader = QPSReader()
+        p = reader.read(StringIO(file.getvalue()))
+
+        AA, ll, uu = solver._linear_constraints(om)
+        _, xmin, xmax = solver._var_bounds()
+
+        self.assertEqual(reader.name, case.name)
+        self.assertEqual(reader.col_names[0], "Va_0")
+        self.assertEqual(len(reader.row_names), AA.shape[0])
+        self.assertTrue(mfeq2(p["A"], AA, 1e-12))
+        self.assertTrue(mfeq1(p["l"], ll))
+        self.assertTrue(mfeq1(p["u"], uu))
+        self.assertTrue(mfeq1(p["xmin"], xmin))
+        self.assertTrue(mfeq1(p["xmax"], xmax))
+
+        s = qps_pips(**p)
+        self.assertTrue(s["converged"])
+        self.assertAlmostEqual(s["f"] + reader.c0, f, places=4)
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# EOF -------------------------------------------------------------------------
@@ -22,18 +22,61 @@
 #------------------------------------------------------------------------------
 
 from os.path import join, dirname
+from StringIO import StringIO
 import unittest
 
-from scipy import array
+from scipy import array, diag, r_, exp, pi, linalg, angle, Inf
 
+from scipy.sparse import vstack, hstack, identity, csr_matrix
+
+from pylon import Case
 from pylon.io import PickleReader
-from pylon.estimator import StateEstimator, Measurement, PF, PT, PG, VM
+from pylon.estimator import StateEstimator, FastDecoupledEstimator, \
+    TrackingStateEstimator, BadDataDetector, PMUStateEstimator, \
+    Measurement, MeasurementSet, TYPES, PF, PT, QF, QT, PG, QG, VM, VA, \
+    VPH, IFPH, ITPH
+from pylon.case import PV, PQ
+from pylon.estimator import _MeasurementJacobian, _sparse_inverse
 
 #------------------------------------------------------------------------------
 #  Constants:
 #------------------------------------------------------------------------------
 
 DATA_FILE = join(dirname(__file__), "data", "case3bus_P6_6.pkl")
+IEEE30_FILE = join(dirname(__file__), "data", "case_ieee30", "case_ieee30.pkl")
+
+#------------------------------------------------------------------------------
+#  "measure" function:
+#------------------------------------------------------------------------------
+
+def measure(case):
+    """ Returns exact flow, injection and voltage magnitude measurements of
+    the voltages of the given case.
+    """
+    case.index_buses()
+    buses, branches = case.connected_buses, case.online_branches
+    V = array([b.v_magnitude * exp(1j * b.v_angle * pi / 180.0)
+               for b in buses])
+    Ybus, Yf, Yt = case.Y
+    Sf = V[[l.from_bus._i for l in branches]] * (Yf * V).conj()
+    St = V[[l.to_bus._i for l in branches]] * (Yt * V).conj()
+    Sg = V * (Ybus * V).conj() + array([complex(b.p_demand, b.q_demand)
+                                        for b in buses]) / case.base_mva
+
+    meas = []
+    for i, l in enumerate(branches):
+        meas.extend([Measurement(l, PF, Sf[i].real),
+                     Measurement(l, QF, Sf[i].imag)])
+        if i % 2:
+            meas.extend([Measurement(l, PT, St[i].real),
+                         Measurement(l, QT, St[i].imag)])
+    for g in case.online_generators:
+        meas.extend([Measurement(g.bus, PG, Sg[g.bus._i].real),
+                     Measurement(g.bus, QG, Sg[g.bus._i].imag)])
+    for b in buses:
+        meas.append(Measurement(b, VM, abs(V[b._i])))
+
+    return V, meas
 
 #------------------------------------------------------------------------------
 #  "StateEstimatorTest" class:
@@ -84,6 +127,323 @@ class StateEstimatorTest(unittest.TestCase):
         self.assertAlmostEqual(abs(V[2]), abs(0.9790+0.0007j), places)
 
 
+    def test_jacobian(self):
+        """ Test the fixed-pattern measurement Jacobian and gain matrix.
+        """
+        case = self.case
+        case.index_buses()
+        Ybus, Yf, Yt = case.Y
+        V = array([1.0, 1.02 - 0.02j, 0.98 + 0.01j])
+        f, t, nonref = [0, 0, 1], [1, 2, 2], [1, 2]
+
+        idx = [[0, 1], [2], [0], [1, 2], [0, 2], [1], [1, 2], [2]]
+        jac = _MeasurementJacobian(Ybus, Yf, Yt, f, t, nonref,
+                                   array([0.1j, 0.2, 0.0]), idx)
+        z_est, H = jac.evaluate(V)
+
+        dSbus_dVm, dSbus_dVa = case.dSbus_dV(Ybus, V)
+        dSf_dVa, dSf_dVm, dSt_dVa, dSt_dVm, _, _ = case.dSbr_dV(Yf, Yt, V)
+        I, Z = identity(3, format="csr"), csr_matrix((3, 3))
+        blocks = [(dSf_dVa.real, dSf_dVm.real), (dSt_dVa.real, dSt_dVm.real),
+                  (dSf_dVa.imag, dSf_dVm.imag), (dSt_dVa.imag, dSt_dVm.imag),
+                  (dSbus_dVa.real, dSbus_dVm.real),
+                  (dSbus_dVa.imag, dSbus_dVm.imag), (Z, I), (I, Z)]
+        expected = vstack([hstack([dVa[ix, :][:, nonref],
+                                   dVm[ix, :][:, nonref]])
+                           for (dVa, dVm), ix in zip(blocks, idx)], "csr")
+
+        self.assertEqual(H.shape, (12, 4))
+        self.assertTrue(abs(H - expected).max() < 1e-12)
+
+        Sf = V[f] * (Yf * V).conj()
+        Sg = V * (Ybus * V).conj() + array([0.1j, 0.2, 0.0])
+        self.assertAlmostEqual(z_est[0], Sf[0].real, 12)
+        self.assertAlmostEqual(z_est[7], Sg[2].real, 12)
+        self.assertAlmostEqual(z_est[8], Sg[1].imag, 12)
+
+        w = r_[1.0:13.0]
+        G = jac.gain(w)
+        self.assertTrue(abs(G - expected.T * diag(w) * expected).max() < 1e-9)
+
+#------------------------------------------------------------------------------
+#  "FastDecoupledEstimatorTest" class:
+#------------------------------------------------------------------------------
+
+class FastDecoupledEstimatorTest(unittest.TestCase):
+    """ Tests the fast decoupled state estimator.
+    """
+
+    def setUp(self):
+        """ The test runner will execute this method prior to each test.
+        """
+        self.case = Case.load(IEEE30_FILE)
+        self.V, self.measurements = measure(self.case)
+        self.sigma = array([0.02, 0.02, 0.02, 0.02, 0.015, 0.015, 0.01, 0.01])
+
+
+    def test_estimation(self):
+        """ Test that the estimate is that of the Gauss-Newton method.
+        """
+        expected = StateEstimator(self.case, self.measurements, self.sigma,
+                                  verbose=False).run()
+
+        se = FastDecoupledEstimator(self.case, self.measurements, self.sigma,
+                                    verbose=False)
+        solution = se.run()
+
+        self.assertTrue(expected["converged"])
+        self.assertTrue(solution["converged"])
+        self.assertTrue(abs(solution["V"] - expected["V"]).max() < 1e-6)
+        self.assertTrue(abs(solution["V"] - self.V).max() < 1e-6)
+
+
+    def test_factorisation(self):
+        """ Test that the gain matrix factors are reused for new values.
+        """
+        se = FastDecoupledEstimator(self.case, self.measurements, self.sigma,
+                                    verbose=False)
+        se.run()
+        lu = se._lu
+
+        for m in self.measurements:
+            if m.type == VM:
+                m.value *= 1.01
+        solution = se.run()
+
+        self.assertTrue(solution["converged"])
+        self.assertTrue(se._lu is lu)
+
+        se.sigma = self.sigma * 2.0
+        se.run()
+        self.assertFalse(se._lu is lu)
+
+#------------------------------------------------------------------------------
+#  "TrackingStateEstimatorTest" class:
+#------------------------------------------------------------------------------
+
+class TrackingStateEstimatorTest(unittest.TestCase):
+    """ Tests the tracking state estimator.
+    """
+
+    def test_update(self):
+        """ Test estimation of a stream of snapshots.
+        """
+        case = Case.load(IEEE30_FILE)
+        V, measurements = measure(case)
+        sigma = array([0.02, 0.02, 0.02, 0.02, 0.015, 0.015, 0.01, 0.01])
+
+        layout = [(m.b_or_l, m.type) for m in measurements]
+        z = array([m.value for m in measurements])
+
+        se = TrackingStateEstimator(case, layout, sigma)
+        solution = se.update(z)
+
+        self.assertTrue(solution["converged"])
+        self.assertTrue(abs(solution["V"] - V).max() < 1e-6)
+        self.assertTrue(abs(solution["residuals"]).max() < 1e-6)
+
+        # Warm start from the last estimate.
+        solution = se.update(z)
+        self.assertEqual(solution["iterations"], 1)
+
+        # Compare with a new estimation of different values.
+        vm = array([m.type == VM for m in measurements])
+        z[vm] *= 1.01
+        solution = se.update(z)
+
+        for m, value in zip(measurements, z):
+            m.value = value
+        expected = StateEstimator(case, measurements, sigma,
+                                  verbose=False).run()
+
+        self.assertTrue(solution["converged"])
+        self.assertTrue(abs(solution["V"] - expected["V"]).max() < 1e-6)
+        self.assertTrue(abs(solution["residuals"][vm]).max() > 1e-4)
+        self.assertAlmostEqual(solution["error_sqrsum"],
+                               expected["error_sqrsum"], 4)
+
+#------------------------------------------------------------------------------
+#  "BadDataDetectorTest" class:
+#------------------------------------------------------------------------------
+
+class BadDataDetectorTest(unittest.TestCase):
+    """ Tests bad data detection and identification.
+    """
+
+    def setUp(self):
+        """ The test runner will execute this method prior to each test.
+        """
+        self.case = Case.load(IEEE30_FILE)
+        self.V, self.measurements = measure(self.case)
+        self.sigma = array([0.02, 0.02, 0.02, 0.02, 0.015, 0.015, 0.01, 0.01])
+
+
+    def test_sparse_inverse(self):
+        """ Test the entries of the inverse of the gain matrix.
+        """
+        se = StateEstimator(self.case, self.measurements, self.sigma,
+                            verbose=False)
+        se.run()
+
+        G = se._jac.gain(1.0 / se._sigma_vector()**2)
+        Z = _sparse_inverse(G)
+        Gi = linalg.inv(G.toarray())
+        Gc = G.tocoo()
+
+        self.assertTrue(abs(Z - Gi[Gc.row, Gc.col]).max() <
+                        1e-8 * abs(Gi).max())
+
+
+    def test_detection(self):
+        """ Test the removal of a gross measurement error.
+        """
+        se = StateEstimator(self.case, self.measurements, self.sigma,
+                            verbose=False)
+
+        solution = BadDataDetector(se).run()
+        self.assertFalse(solution["detected"])
+        self.assertEqual(solution["bad"], [])
+
+        bad = self.measurements[5]
+        bad.value += 0.3
+        solution = BadDataDetector(se).run()
+
+        self.assertTrue(solution["converged"])
+        self.assertFalse(solution["detected"])
+        self.assertEqual(solution["bad"], [bad])
+        self.assertTrue(abs(solution["V"] - self.V).max() < 1e-6)
+
+
+    def test_not_converged(self):
+        """ Test the solution when the first estimate does not converge.
+        """
+        se = StateEstimator(self.case, self.measurements, self.sigma,
+                            max_iter=1, verbose=False)
+
+        solution = BadDataDetector(se).run()
+        self.assertFalse(solution["converged"])
+        self.assertFalse(solution["detected"])
+        self.assertEqual(solution["bad"], [])
+        self.assertEqual(solution["error_sqrsum"], Inf)
+        self.assertEqual(list(solution["r_norm"]), [0.0] * len(solution["z"]))
+
+
+    def test_exactly_determined(self):
+        """ Test a measurement set without redundancy.
+        """
+        meas = []
+        for b in self.case.connected_buses:
+            if b.type in [PV, PQ]:
+                meas.extend([Measurement(b, VA, angle(self.V[b._i])),
+                             Measurement(b, VM, abs(self.V[b._i]))])
+        se = StateEstimator(self.case, meas, self.sigma, verbose=False)
+
+        solution = BadDataDetector(se).run()
+        self.assertTrue(solution["converged"])
+        self.assertFalse(solution["detected"])
+        self.assertEqual(solution["bad"], [])
+        self.assertTrue(solution["error_sqrsum"] < 1e-12)
+        self.assertEqual(list(solution["r_norm"]), [0.0] * len(meas))
+        self.assertTrue(abs(solution["V"] - self.V).max() < 1e-6)
+
+#------------------------------------------------------------------------------
+#  "PMUStateEstimatorTest" class:
+#------------------------------------------------------------------------------
+
+class PMUStateEstimatorTest(unittest.TestCase):
+    """ Tests the linear phasor measurement state estimator.
+    """
+
+    def test_estimation(self):
+        """ Test estimation of frames of phasor measurements.
+        """
+        case = Case.load(IEEE30_FILE)
+        V, _ = measure(case)
+        _, Yf, Yt = case.Y
+        If, It = Yf * V, Yt * V
+
+        # Voltage phasors at every other bus and currents at both ends of
+        # every branch.
+        meas = [Measurement(b, VPH, V[b._i]) for b in case.buses[::2]]
+        for i, l in enumerate(case.branches):
+            meas.extend([Measurement(l, IFPH, If[i]),
+                         Measurement(l, ITPH, It[i])])
+        sigma = array([0.01, 0.02, 0.02])
+
+        se = PMUStateEstimator(case, meas, sigma)
+        solution = se.run()
+
+        self.assertTrue(abs(solution["V"] - V).max() < 1e-10)
+        self.assertTrue(abs(solution["residuals"]).max() < 1e-10)
+        self.assertAlmostEqual(case.buses[3].v_magnitude, abs(V[3]), 10)
+
+        # Compare a frame with noise to the dense weighted least squares
+        # solution.
+        z = solution["z"] * (1.0 + 0.01 * exp(1j * r_[0:len(meas)]))
+        w = diag(1.0 / array([sigma[[VPH, IFPH, ITPH].index(m.type)]
+                              for m in meas])**2)
+        A = se.A.toarray()
+        G = A.conj().T.dot(w).dot(A)
+        expected = linalg.solve(G, A.conj().T.dot(w).dot(z))
+
+        solution = se.update(z)
+        self.assertTrue(abs(solution["V"] - expected).max() < 1e-10)
+        self.assertTrue(solution["error_sqrsum"] > 0.0)
+
+#------------------------------------------------------------------------------
+#  "MeasurementSetTest" class:
+#------------------------------------------------------------------------------
+
+class MeasurementSetTest(unittest.TestCase):
+    """ Tests the columnar measurement set.
+    """
+
+    def test_read_csv(self):
+        """ Test reading a measurement set from comma separated values.
+        """
+        ms = MeasurementSet.read_csv(StringIO("type,index,value,sigma\n"
+                                              "Pf,2,0.5,0.01\n"
+                                              "Vm,3,1.01,\n"))
+
+        self.assertEqual(list(ms.types), [TYPES.index(PF), TYPES.index(VM)])
+        self.assertEqual(list(ms.index), [2, 3])
+        self.assertEqual(list(ms.values), [0.5, 1.01])
+        self.assertEqual(ms.sigma[0], 0.01)
+        self.assertTrue(ms.sigma[1] != ms.sigma[1])
+
+        self.assertRaises(ValueError, MeasurementSet, ["Px"], [0], [1.0])
+
+
+    def test_estimation(self):
+        """ Test that a measurement set gives the estimate of the objects.
+        """
+        case = Case.load(IEEE30_FILE)
+        V, meas = measure(case)
+        sigma = array([0.02, 0.02, 0.02, 0.02, 0.015, 0.015, 0.01, 0.01])
+        meas[0].sigma = 0.05
+
+        case.index_branches()
+        ms = MeasurementSet.from_measurements(meas)
+        csv = "type,index,value,sigma\n" + "".join(["%s,%d,%r,%r\n" % \
+            (TYPES[ms.types[k]], ms.index[k], ms.values[k], ms.sigma[k])
+            for k in range(len(ms))])
+        ms = MeasurementSet.read_csv(StringIO(csv))
+
+        expected = StateEstimator(case, meas, sigma, verbose=False).run()
+        se = StateEstimator(case, ms, sigma, verbose=False)
+        solution = se.run()
+
+        self.assertTrue(solution["converged"])
+        self.assertTrue(abs(solution["V"] - expected["V"]).max() < 1e-12)
+        self.assertTrue(abs(solution["z"] - expected["z"]).max() < 1e-12)
+        self.assertTrue(abs(solution["V"] - V).max() < 1e-6)
+
+        # Bad data are identified by position.
+        ms.values[5] += 0.3
+        solution = BadDataDetector(se).run()
+        self.assertEqual(solution["bad"], [5])
+
+
 if __name__ == "__main__":
     unittest.main()
 
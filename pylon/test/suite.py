@@ -40,11 +40,30 @@ from opf_test import \
     DCOPFSolverTest, DCOPFSolverCase24RTSTest, DCOPFSolverCaseIEEE30Test
 from opf_test import \
     PIPSSolverTest, PIPSSolverCase24RTSTest, PIPSSolvercaseIEEE30Test
+from opf_test import \
+    MultiPeriodOPFTest, SCOPFTest, PTDFOPFTest, ParametricOPFTest
 from opf_model_test import \
     OPFModelTest
+from highs_test import HiGHSSolverTest
+from presolve_test import PresolverTest
+from pips_test import QPSolverTest
+from lmp_test import LMPDecompositionTest
+from admm_test import ADMMOPFTest
+from uc_test import UCTest
+
+from qps_test import QPSTest
 
 from reader_test import MatpowerReaderTest, PSSEReaderTest#, PSATReaderTest
-from se_test import StateEstimatorTest
+from se_test import \
+    StateEstimatorTest, FastDecoupledEstimatorTest, \
+    TrackingStateEstimatorTest, BadDataDetectorTest, PMUStateEstimatorTest, \
+    MeasurementSetTest
+
+from observability_test import ObservabilityAnalysisTest
+
+from area_se_test import MultiAreaStateEstimatorTest
+
+from dyn_test import DynamicCaseTest
 
 #------------------------------------------------------------------------------
 #  "suite" function:
@@ -81,15 +100,36 @@ def suite():
     suite.addTest(unittest.makeSuite(PIPSSolverTest))
     suite.addTest(unittest.makeSuite(PIPSSolverCase24RTSTest))
     suite.addTest(unittest.makeSuite(PIPSSolvercaseIEEE30Test))
+    suite.addTest(unittest.makeSuite(MultiPeriodOPFTest))
+    suite.addTest(unittest.makeSuite(SCOPFTest))
+    suite.addTest(unittest.makeSuite(PTDFOPFTest))
+    suite.addTest(unittest.makeSuite(ParametricOPFTest))
     suite.addTest(unittest.makeSuite(OPFModelTest))
+    suite.addTest(unittest.makeSuite(HiGHSSolverTest))
+    suite.addTest(unittest.makeSuite(PresolverTest))
+    suite.addTest(unittest.makeSuite(QPSolverTest))
+    suite.addTest(unittest.makeSuite(LMPDecompositionTest))
+    suite.addTest(unittest.makeSuite(ADMMOPFTest))
+    suite.addTest(unittest.makeSuite(UCTest))
 
     # Read/write test cases.
     suite.addTest(unittest.makeSuite(MatpowerReaderTest))
     suite.addTest(unittest.makeSuite(PSSEReaderTest))
+    suite.addTest(unittest.makeSuite(QPSTest))
 #    suite.addTest(unittest.makeSuite(PSATReaderTest))
 
     # State estimator test.
     suite.addTest(unittest.makeSuite(StateEstimatorTest))
+    suite.addTest(unittest.makeSuite(FastDecoupledEstimatorTest))
+    suite.addTest(unittest.makeSuite(TrackingStateEstimatorTest))
+    suite.addTest(unittest.makeSuite(BadDataDetectorTest))
+    suite.addTest(unittest.makeSuite(PMUStateEstimatorTest))
+    suite.addTest(unittest.makeSuite(MeasurementSetTest))
+    suite.addTest(unittest.makeSuite(ObservabilityAnalysisTest))
+    suite.addTest(unittest.makeSuite(MultiAreaStateEstimatorTest))
+
+    # Dynamic simulation test.
+    suite.addTest(unittest.makeSuite(DynamicCaseTest))
 
     return suite
 
@@ -0,0 +1,131 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines a test case for the MILP unit commitment solver.
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import unittest
+
+from os.path import join, dirname
+
+from numpy import array, outer
+
+from pylon import Case, UDOPF
+from pylon.uc import UC, milp
+
+#------------------------------------------------------------------------------
+#  Constants:
+#------------------------------------------------------------------------------
+
+DATA_DIR = join(dirname(__file__), "data")
+
+#------------------------------------------------------------------------------
+#  "UCTest" class:
+#------------------------------------------------------------------------------
+
+class UCTest(unittest.TestCase):
+    """ Defines a test case for the MILP unit commitment solver.
+    """
+
+    def setUp(self):
+        """ The test runner will execute this method prior to each test.
+        """
+        if milp is None:
+            self.skipTest("Unit commitment requires SciPy 1.9 or later.")
+        self.case = Case.load(join(DATA_DIR, "case6ww", "case6ww.pkl"))
+
+
+    def test_single_period(self):
+        """ Test single period commitment, dispatch and prices.
+        """
+        solution = UC(self.case).solve()
+        generators = self.case.generators
+
+        self.assertTrue(solution["converged"])
+        # Generator 1 gets shutdown.
+        self.assertEqual(list(solution["commitment"][0]), [False, True, True])
+        self.assertFalse(generators[0].online)
+        self.assertAlmostEqual(generators[1].p, 110.80, places=2)
+        self.assertAlmostEqual(generators[2].p,  99.20, places=2)
+        self.assertAlmostEqual(solution["f"], 2841.59, places=2)
+
+        for i, bus in enumerate(self.case.connected_buses):
+            self.assertEqual(solution["p_lmbda"][0, i], bus.p_lmbda)
+        self.assertEqual(solution["mu_s_from"].shape,
+                         (1, len(self.case.online_branches)))
+
+
+    def test_udopf(self):
+        """ Test that the commitment costs no more than that of UDOPF.
+        """
+        case = Case.load(join(DATA_DIR, "case24_ieee_rts",
+                              "case24_ieee_rts.pkl"))
+        solution = UC(case).solve()
+
+        case = Case.load(join(DATA_DIR, "case24_ieee_rts",
+                              "case24_ieee_rts.pkl"))
+        udopf = UDOPF(case, dc=True).solve()
+
+        self.assertTrue(solution["converged"])
+        self.assertTrue(solution["f"] <= udopf["f"])
+
+
+    def test_multi_period(self):
+        """ Test multi-period commitment with startup and shutdown costs.
+        """
+        for g in self.case.generators:
+            g.c_startup = 200.0
+            g.c_shutdown = 100.0
+        self.case.generators[0].online = False
+
+        Pd = array([bus.p_demand for bus in self.case.buses])
+        demand = outer([0.6, 1.0, 1.3, 0.7], Pd)
+
+        solution = UC(self.case, demand).solve()
+        commitment = solution["commitment"]
+
+        self.assertTrue(solution["converged"])
+        self.assertEqual(commitment.shape, (4, 3))
+        self.assertTrue(commitment[2].all())
+
+        # Demand met in each period.
+        for t in range(4):
+            self.assertAlmostEqual(solution["Pg"][t].sum(), demand[t].sum(),
+                                   places=4)
+            self.assertEqual(solution["Pg"][t, ~commitment[t]].sum(), 0.0)
+
+        # Startup and shutdown costs are included.
+        f = sum([s["f"] for s in solution["solutions"]])
+        starts = (commitment[1:] > commitment[:-1]).sum() + \
+            (commitment[0] > array([False, True, True])).sum()
+        stops = (commitment[1:] < commitment[:-1]).sum() + \
+            (commitment[0] < array([False, True, True])).sum()
+        self.assertAlmostEqual(solution["f"], f + 200.0 * starts +
+                               100.0 * stops, places=6)
+
+        # Bus demands are restored.
+        for i, bus in enumerate(self.case.buses):
+            self.assertEqual(bus.p_demand, Pd[i])
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# EOF -------------------------------------------------------------------------
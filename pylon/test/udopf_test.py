@@ -26,6 +26,7 @@ import logging
 import unittest
 
 from os.path import dirname, join
+from multiprocessing import active_children
 
 from pylon.case import Case
 from pylon.opf import UDOPF
@@ -37,6 +38,8 @@ from pylon.opf import UDOPF
 DATA_FILE = join(dirname(__file__), "data", "case6ww.pkl")
 PWL_FILE  = join(dirname(__file__), "..", "..", "pyreto", "test", "data",
     "t_auction_case.pkl")
+RTS_FILE = join(dirname(__file__), "data", "case24_ieee_rts",
+    "case24_ieee_rts.pkl")
 
 #------------------------------------------------------------------------------
 #  "UOPFTestCase" class:
@@ -79,6 +82,48 @@ class UOPFTestCase(unittest.TestCase):
         self.assertTrue(solution["converged"] == True)
         self.assertTrue(False not in [g.online for g in generators])
 
+#------------------------------------------------------------------------------
+#  "UDOPFProcessesTestCase" class:
+#------------------------------------------------------------------------------
+
+class UDOPFProcessesTestCase(unittest.TestCase):
+    """ Defines a test case for evaluating decommitment candidates in
+    multiple processes.
+    """
+
+    def test_processes(self):
+        """ Test that the solution does not depend on the number of processes.
+        """
+        solutions = []
+        for processes in [1, 2]:
+            case = Case.load(RTS_FILE)
+            solution = UDOPF(case, dc=True, processes=processes).solve()
+            online = [g.online for g in case.generators]
+            solutions.append((solution["converged"], solution["f"], online))
+
+        self.assertTrue(solutions[0][0])
+        # Nine generators are shut down.
+        self.assertEqual(solutions[0][2].count(False), 9)
+        self.assertEqual(solutions[0], solutions[1])
+
+
+    def test_process_error(self):
+        """ Test that an error evaluating a candidate is raised and the
+        processes are stopped.
+        """
+        def fail(self, *args):
+            raise ValueError, "Candidate failed."
+
+        solve_candidate = UDOPF._solve_candidate
+        UDOPF._solve_candidate = fail
+        try:
+            udopf = UDOPF(Case.load(RTS_FILE), dc=True, processes=2)
+            self.assertRaises(ValueError, udopf.solve)
+        finally:
+            UDOPF._solve_candidate = solve_candidate
+
+        self.assertEqual(active_children(), [])
+
 
 if __name__ == "__main__":
     logging.basicConfig(stream=sys.stdout, level=logging.DEBUG,
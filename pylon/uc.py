@@ -0,0 +1,353 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines a unit commitment solver using mixed-integer linear programming.
+
+The MILP is solved by HiGHS using C{scipy.optimize.milp}, which is available
+from SciPy version 1.9.  See U{http://www.highs.dev/} for more information.
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import logging
+
+from time import time
+
+from numpy import \
+    array, zeros, ones, r_, Inf, linspace, polyval, polyder, where, arange, \
+    atleast_2d, diff
+
+from scipy.sparse import csr_matrix, hstack, vstack, block_diag
+
+try:
+    from scipy.optimize import milp, LinearConstraint, Bounds
+except ImportError:
+    milp = None
+
+from generator import POLYNOMIAL, PW_LINEAR
+from opf import OPF
+
+#------------------------------------------------------------------------------
+#  Logging:
+#------------------------------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+#------------------------------------------------------------------------------
+#  "UC" class:
+#------------------------------------------------------------------------------
+
+class UC(object):
+    """ Solves single or multi-period unit commitment with a DC network
+    model as a mixed-integer linear program.
+
+    Each generator has binary on/off, startup and shutdown variables in
+    each period, with startup and shutdown costs given by C{c_startup} and
+    C{c_shutdown}.  Piecewise linear costs are modelled exactly and
+    polynomial costs are approximated by tangents at C{n_points} output
+    levels between the generation limits.  Dispatchable loads are always
+    committed.  The dispatch and nodal prices of each period are computed
+    by a final OPF with the commitment fixed.
+
+    All generators of the case are available for commitment and their
+    C{online} attributes at the time of solving give the commitment prior
+    to the first period.
+    """
+
+    def __init__(self, case, demand=None, ignore_ang_lim=True, opt=None,
+                 n_points=10, mip_rel_gap=1e-4, time_limit=None):
+        """ Initialises a new UC instance.
+        """
+        #: Case for which to commit generators.
+        self.case = case
+
+        #: Active power demand (MW) at each bus (columns) in each period
+        #: (rows).  The demand of the case for a single period by default.
+        self.demand = demand
+
+        #: Ignore angle difference limits for branches even if specified.
+        self.ignore_ang_lim = ignore_ang_lim
+
+        #: OPF solver options (See pips.py for futher details).
+        self.opt = {} if opt is None else opt
+
+        #: Number of tangents approximating each polynomial cost function.
+        self.n_points = n_points
+
+        #: Relative MIP optimality gap at which to stop.
+        self.mip_rel_gap = mip_rel_gap
+
+        #: Maximum time (s) for which to solve the MILP.
+        self.time_limit = time_limit
+
+    #--------------------------------------------------------------------------
+    #  Public interface:
+    #--------------------------------------------------------------------------
+
+    def solve(self):
+        """ Solves the unit commitment problem and returns a results
+        dictionary with the commitment, dispatch (MW), nodal prices ($/MWh)
+        and branch flow limit multipliers of each period and the OPF
+        solution of each.  The results of the last period are set on the
+        case.
+        """
+        if milp is None:
+            raise ImportError, "Unit commitment requires SciPy 1.9 or later."
+
+        t0 = time()
+
+        case = self.case
+        generators = case.generators
+        buses = case.buses
+        ng = len(generators)
+
+        Pd = array([b.p_demand for b in buses])
+        demand = atleast_2d(Pd if self.demand is None else self.demand)
+        nt = demand.shape[0]
+
+        u0 = array([g.online for g in generators], dtype=float)
+
+        # Build the MILP with all generators on-line.
+        for g in generators:
+            g.online = True
+        try:
+            c, A, l, u, xmin, xmax, integrality, iu = \
+                self._milp_data(demand, u0)
+        finally:
+            for i, g in enumerate(generators):
+                g.online = bool(u0[i])
+
+        res = self._solve_milp(c, A, l, u, xmin, xmax, integrality)
+
+        if res["x"] is None:
+            logger.error("Unit commitment MILP failed [%s]." % res["message"])
+            return {"converged": False, "f": Inf,
+                    "output": {"message": res["message"]}}
+
+        nx = len(res["x"]) / nt
+        commitment = array([res["x"][t * nx + iu:t * nx + iu + ng] > 0.5
+                            for t in range(nt)])
+
+        logger.info("Unit commitment MILP solved in %.3fs [%s]." %
+                    (time() - t0, res["message"]))
+
+        # Fixed-commitment OPF for the dispatch and prices of each period,
+        # given for the same buses and branches as by MultiPeriodOPF.
+        bs, ln = case.connected_buses, case.online_branches
+        solutions = []
+        Pg = zeros((nt, ng))
+        p_lmbda = zeros((nt, len(bs)))
+        mu_s_from = zeros((nt, len(ln)))
+        mu_s_to = zeros((nt, len(ln)))
+        for t in range(nt):
+            for i, g in enumerate(generators):
+                g.online = bool(commitment[t, i])
+            for i, b in enumerate(buses):
+                b.p_demand = demand[t, i]
+
+            solution = OPF(case, True, self.ignore_ang_lim, self.opt).solve()
+            solutions.append(solution)
+
+            Pg[t, :] = [g.p if g.online else 0.0 for g in generators]
+            p_lmbda[t, :] = [b.p_lmbda for b in bs]
+            mu_s_from[t, :] = [l.mu_s_from for l in ln]
+            mu_s_to[t, :] = [l.mu_s_to for l in ln]
+
+        for i, b in enumerate(buses):
+            b.p_demand = Pd[i]
+
+        # Total cost including startup and shutdown costs.
+        c_startup = array([g.c_startup for g in generators])
+        c_shutdown = array([g.c_shutdown for g in generators])
+        du = diff(r_[u0[None, :], commitment.astype(float)], axis=0)
+        f = sum([s["f"] for s in solutions]) + \
+            (c_startup * (du > 0)).sum() + (c_shutdown * (du < 0)).sum()
+
+        converged = False not in [s["converged"] for s in solutions]
+
+        elapsed = time() - t0
+        logger.info("Unit commitment solved in %.3fs." % elapsed)
+
+        return {"converged": converged, "f": f, "commitment": commitment,
+                "Pg": Pg, "p_lmbda": p_lmbda, "mu_s_from": mu_s_from,
+                "mu_s_to": mu_s_to, "solutions": solutions,
+                "elapsed": elapsed,
+                "output": {"message": res["message"], "milp_f": res["f"]}}
+
+    #--------------------------------------------------------------------------
+    #  Private interface:
+    #--------------------------------------------------------------------------
+
+    def _milp_data(self, demand, u0):
+        """ Returns the objective function coefficients, constraints,
+        variable bounds and integrality of the MILP and the index of the
+        first commitment variable of the first period.  The variables of
+        each period are those of the DC OPF model followed by polynomial
+        cost variables, z, and commitment, startup and shutdown variables,
+        u, v and w, for each generator.
+        """
+        case = self.case
+        base_mva = case.base_mva
+        nt = demand.shape[0]
+
+        opf = OPF(case, dc=True, ignore_ang_lim=self.ignore_ang_lim)
+        om = opf._construct_opf_model(case)
+        gn = case.online_generators
+        ng = len(gn)
+        nxo = om.var_N
+
+        A, l, u = om.linear_constraints()
+        A = csr_matrix(A)
+        _, xmin, xmax = _var_bounds(om)
+
+        Pg = om.get_var("Pg")
+        ipg = Pg.i1 + arange(ng)
+
+        # Piecewise linear costs are offset by the commitment variable.
+        Ay = csr_matrix((A.shape[0], ng))
+        if "y" in [v.name for v in om.vars]:
+            ycon = om.get_lin_constraint("ycon")
+            gpwl = [i for i, g in enumerate(gn) if g.pcost_model == PW_LINEAR]
+            rows = []
+            for i in gpwl:
+                rows.extend([i] * (len(gn[i].p_cost) - 1))
+            iy = arange(ycon.i1, ycon.iN + 1)
+            Ay = csr_matrix((-u[iy], (iy, rows)), (A.shape[0], ng))
+            u[iy] = 0.0
+
+        # Tangents to the polynomial cost functions.
+        ipol = [i for i, g in enumerate(gn) if g.pcost_model == POLYNOMIAL]
+        npol = len(ipol)
+        nz = len(ipol) * self.n_points
+        Ap = csr_matrix((nz, nxo))
+        Az = csr_matrix((nz, npol))
+        Au = csr_matrix((nz, ng))
+        if npol:
+            Apv, Auv = [], []
+            for i in ipol:
+                g = gn[i]
+                p = linspace(max(g.p_min, 0.0), g.p_max, self.n_points)
+                c = polyval(g.p_cost, p)
+                dc = polyval(polyder(list(g.p_cost)), p)
+                Apv.extend(dc * base_mva)
+                Auv.extend(c - dc * p)
+            rows = arange(nz)
+            gcol = array([ipg[i] for i in ipol]).repeat(self.n_points)
+            ucol = array(ipol).repeat(self.n_points)
+            zcol = arange(npol).repeat(self.n_points)
+            Ap = csr_matrix((Apv, (rows, gcol)), (nz, nxo))
+            Az = csr_matrix((-ones(nz), (rows, zcol)), (nz, npol))
+            Au = csr_matrix((Auv, (rows, ucol)), (nz, ng))
+
+        # Generation limits: Pmin * u <= Pg <= Pmax * u.
+        Pmin = array([g.p_min / base_mva for g in gn])
+        Pmax = array([g.p_max / base_mva for g in gn])
+        Alim = csr_matrix((r_[ones(ng), -ones(ng)],
+                           (arange(2 * ng), r_[ipg, ipg])), (2 * ng, nxo))
+        Alimu = csr_matrix((r_[-Pmax, Pmin], (arange(2 * ng), r_[arange(ng),
+                           arange(ng)])), (2 * ng, ng))
+        xmin[ipg] = where(Pmin < 0.0, Pmin, 0.0)
+        xmax[ipg] = where(Pmax > 0.0, Pmax, 0.0)
+
+        Z = lambda m, n: csr_matrix((m, n))
+        Ai = vstack([
+            hstack([A, Z(A.shape[0], npol), Ay, Z(A.shape[0], 2 * ng)]),
+            hstack([Ap, Az, Au, Z(nz, 2 * ng)]),
+            hstack([Alim, Z(2 * ng, npol), Alimu, Z(2 * ng, 2 * ng)])
+        ], "csr")
+        li = r_[l, -Inf * ones(nz + 2 * ng)]
+        ui = r_[u, zeros(nz + 2 * ng)]
+
+        # Dispatchable loads are always committed.
+        umin = array([1.0 if g.is_load else 0.0 for g in gn])
+        xmini = r_[xmin, -Inf * ones(npol), umin, zeros(2 * ng)]
+        xmaxi = r_[xmax, Inf * ones(npol), ones(3 * ng)]
+
+        nx = nxo + npol + 3 * ng
+        iu = nxo + npol
+        ci = zeros(nx)
+        if "y" in [v.name for v in om.vars]:
+            y = om.get_var("y")
+            ci[y.i1:y.iN + 1] = 1.0
+        ci[nxo:nxo + npol] = 1.0
+        ci[iu + ng:iu + 2 * ng] = [g.c_startup for g in gn]
+        ci[iu + 2 * ng:iu + 3 * ng] = [g.c_shutdown for g in gn]
+
+        # Power balance in each period.
+        Pmis = om.get_lin_constraint("Pmis")
+        bs = case.connected_buses
+        Gs = array([b.g_shunt for b in bs])
+        ib = array([case.buses.index(b) for b in bs])
+        li_t, ui_t = [], []
+        for t in range(nt):
+            bmis = -(demand[t, ib] - Gs) / base_mva - om._Pbusinj
+            lt, ut = li.copy(), ui.copy()
+            lt[Pmis.i1:Pmis.iN + 1] = bmis
+            ut[Pmis.i1:Pmis.iN + 1] = bmis
+            li_t.append(lt)
+            ui_t.append(ut)
+
+        # Commitment transitions: u(t) - u(t-1) - v(t) + w(t) = 0.
+        ii = arange(nt * ng)
+        jj = (ii // ng) * nx + iu + ii % ng
+        Atr = csr_matrix((r_[ones(nt * ng), -ones(nt * ng), ones(nt * ng)],
+                          (r_[ii, ii, ii], r_[jj, jj + ng, jj + 2 * ng])),
+                         (nt * ng, nt * nx))
+        if nt > 1:
+            iip = arange(ng, nt * ng)
+            Atr = Atr + csr_matrix((-ones(len(iip)), (iip, jj[:-ng])),
+                                   (nt * ng, nt * nx))
+        btr = r_[u0, zeros((nt - 1) * ng)]
+
+        AA = vstack([block_diag([Ai] * nt, "csr"), Atr], "csr")
+        ll = r_[r_[tuple(li_t)], btr]
+        uu = r_[r_[tuple(ui_t)], btr]
+
+        integrality = zeros(nt * nx)
+        for t in range(nt):
+            integrality[t * nx + iu:(t + 1) * nx] = 1
+
+        cc = r_[tuple([ci] * nt)]
+        xxmin = r_[tuple([xmini] * nt)]
+        xxmax = r_[tuple([xmaxi] * nt)]
+
+        # HiGHS treats limits of 1e20 or more as infinite.
+        ll = where(ll > -1e10, ll, -Inf)
+        uu = where(uu < 1e10, uu, Inf)
+        xxmin = where(xxmin > -1e10, xxmin, -Inf)
+        xxmax = where(xxmax < 1e10, xxmax, Inf)
+
+        return cc, AA, ll, uu, xxmin, xxmax, integrality, iu
+
+
+    def _solve_milp(self, c, A, l, u, xmin, xmax, integrality):
+        """ Solves the MILP using HiGHS and returns a dictionary of the
+        solution vector, which is None if no solution was found, the
+        objective function value and a message.
+        """
+        options = {"disp": self.opt.has_key("verbose") and self.opt["verbose"],
+                   "mip_rel_gap": self.mip_rel_gap}
+        if self.time_limit is not None:
+            options["time_limit"] = self.time_limit
+
+        res = milp(c, integrality=integrality, bounds=Bounds(xmin, xmax),
+                   constraints=LinearConstraint(A, l, u), options=options)
+
+        return {"x": res.x, "f": res.fun, "message": res.message}
+
+# EOF -------------------------------------------------------------------------
@@ -27,6 +27,9 @@ import os.path
 import pickle
 import random
 
+from multiprocessing import Process, Queue
+from Queue import Empty
+
 from numpy import ones, array, exp, pi, Inf
 
 from itertools import count, izip
@@ -268,6 +271,101 @@ def factorial(n):
         n = n - 1
     return f
 
+#------------------------------------------------------------------------------
+#  "PinnedPool" class:
+#------------------------------------------------------------------------------
+
+class PinnedPool(object):
+    """ Pool of processes in which each object is held by the same process
+    for the life of the pool.  Only the objects held by a process are sent
+    to it, once, and any state that they retain between calls, such as
+    factorisations or solver models, is kept in that process.  The objects
+    are distributed between the processes in turn.
+
+    Note that the objects held by the processes are copies, so changes are
+    not seen by the originals.
+    """
+
+    def __init__(self, objects, processes=None, poll=1.0):
+        """ Initialises a new PinnedPool instance, with a process for each
+        object if C{processes} is None.
+        """
+        n = len(objects) if processes is None else \
+            max(1, min(processes, len(objects)))
+
+        #: Index of the process holding each object.
+        self.owner = [k % n for k in range(len(objects))]
+
+        #: Interval (s) at which a process is checked to be alive while its
+        #: results are awaited.
+        self.poll = poll
+
+        # Process with its task and result queues for each worker.
+        self._workers = []
+        for j in range(n):
+            held = dict([(k, o) for k, o in enumerate(objects) if k % n == j])
+            tasks, results = Queue(), Queue()
+            p = Process(target=_pinned_worker, args=(held, tasks, results))
+            p.daemon = True
+            p.start()
+            self._workers.append((p, tasks, results))
+
+
+    def map(self, method, args):
+        """ Calls the named method of each object with the corresponding
+        tuple of arguments and returns the results in order.  The first
+        exception raised by a method is raised once all have returned.  A
+        RuntimeError is raised if a process exits before returning its
+        results.
+        """
+        for k, a in enumerate(args):
+            self._workers[self.owner[k]][1].put((k, method, a))
+
+        # Each process returns the results of its objects in order.
+        results, error = [], None
+        for k in range(len(args)):
+            p, _, queue = self._workers[self.owner[k]]
+            while True:
+                try:
+                    ok, value = queue.get(timeout=self.poll)
+                    break
+                except Empty:
+                    if not p.is_alive():
+                        raise RuntimeError, "Process holding object %d " \
+                            "exited with code %s." % (k, p.exitcode)
+            if not ok and error is None:
+                error = value
+            results.append(value)
+
+        if error is not None:
+            raise error
+
+        return results
+
+
+    def close(self):
+        """ Stops the processes and waits for them to exit.
+        """
+        for _, tasks, _ in self._workers:
+            tasks.put(None)
+        for p, _, _ in self._workers:
+            p.join()
+        self._workers = []
+
+
+def _pinned_worker(held, tasks, results):
+    """ Calls methods of the objects held by a process of a L{PinnedPool}
+    until it is closed.
+    """
+    # Results left unread if the pool is closed after an error must not
+    # prevent the process from exiting.
+    results.cancel_join_thread()
+    for k, method, args in iter(tasks.get, None):
+        try:
+            results.put((True, getattr(held[k], method)(*args)))
+        except Exception, e:
+            results.put((False, e))
+
 #------------------------------------------------------------------------------
 #  "CaseReport" class:
 #------------------------------------------------------------------------------
@@ -109,12 +109,16 @@ class SmartMarket(object):
         #: Solver solution dictionary.
         self._solution = {"f": 0.0}
 
+        #: OPF retaining its model between market rounds.
+        self._opf = None
+
 
     def reset(self):
-        """ Resets the market.
+        """ Resets the market.  The retained OPF model is discarded.
         """
         self.offers = []
         self.bids = []
+        self._opf = None
 
 
     def getOffbids(self, g):
@@ -268,10 +272,17 @@ class SmartMarket(object):
         """
         if self.decommit:
             solver = UDOPF(self.case, dc=(self.locationalAdjustment == "dc"))
+        elif self._opf is not None:
+            # Only the offers, bids and demands change between rounds.
+            solver = self._opf
+            solver.update_costs()
+            solver.update_var_bounds()
+            solver.update_constraint_bounds()
         elif self.locationalAdjustment == "dc":
-            solver = OPF(self.case, dc=True)
+            solver = self._opf = OPF(self.case, dc=True, persistent=True)
         else:
-            solver = OPF(self.case, dc=False, opt={"verbose": True})
+            solver = self._opf = OPF(self.case, dc=False,
+                                     opt={"verbose": True}, persistent=True)
 
         self._solution = solver.solve()
 
@@ -243,9 +243,12 @@ class DCMarketTestCase(unittest.TestCase):
         """
         self.assertEqual(len(self.mkt.offers), 18)
         self.assertEqual(len(self.mkt.bids), 9)
+        self.mkt.run()
+        self.assertTrue(self.mkt._opf is not None)
         self.mkt.reset()
         self.assertEqual(len(self.mkt.offers), 0)
         self.assertEqual(len(self.mkt.bids), 0)
+        self.assertTrue(self.mkt._opf is None)
 
 
     def testHaveQ(self):